@@ -1,16 +1,15 @@
-import json
-import re
-from datetime import datetime
+from phreakbot_core import releases
 
-import requests
+REPO = "esphome/esphome"
 
 
 def config(bot):
+    releases.watch(bot, REPO, "ESPHome")
     return {
         "commands": ["espver", "esphomever"],
         "permissions": ["user"],
         "events": [],
-        "help": "Fetches latest ESPhome release info.",
+        "help": "Shows latest ESPhome release info. Usage: !espver [dev]",
     }
 
 
@@ -19,37 +18,26 @@ def run(bot, event):
     if event["channel"] not in ["#nlhomeautomation", "#fdi-status"]:
         return bot.signal_cont
 
-    showdev = False
-    if event["command_args"] in ["dev", "devel", "development"]:
-        showdev = True
+    showdev = event["command_args"] in ["dev", "devel", "development"]
 
-    req = requests.get("https://api.github.com/repos/esphome/esphome/releases")
-    jsontxt = req.text
-    try:
-        obj = json.loads(jsontxt)
-    except Exception as e:
-        bot.say("Parsing content failed: %s" % e)
-        return bot.signal_cont
-
-    dev = ""
-    rls = ""
-    for elem in obj:
-        if not dev and elem["target_commitish"] == "dev":
-            dev = "ESPHome latest development version %s, released %s, see %s" % (
-                elem["name"],
-                elem["published_at"],
-                elem["html_url"],
-            )
-        if not rls and elem["target_commitish"] == "release":
-            rls = "ESPHome latest release version %s, released %s, see %s" % (
-                elem["name"],
-                elem["published_at"],
-                elem["html_url"],
-            )
+    info = releases.latest(bot, REPO)
+    if info is None:
+        bot.add_response("ESPHome release info is not available yet.")
+        return bot.signal_stop
 
     if showdev:
-        bot.say(dev)
+        if info.dev is None:
+            bot.add_response("No ESPHome development version newer than the latest release.")
+        else:
+            bot.add_response(
+                "ESPHome latest development version %s, released %s, see %s"
+                % (info.dev.name, info.dev.published, info.dev.url)
+            )
         return bot.signal_stop
 
-    bot.say(rls)
+    if info.stable is not None:
+        bot.add_response(
+            "ESPHome latest release version %s, released %s, see %s"
+            % (info.stable.name, info.stable.published, info.stable.url)
+        )
     return bot.signal_stop
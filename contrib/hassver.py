@@ -1,16 +1,17 @@
-import json
 import re
-from datetime import datetime
 
-import requests
+from phreakbot_core import releases
+
+REPO = "home-assistant/core"
 
 
 def config(bot):
+    releases.watch(bot, REPO, "Home Assistant")
     return {
         "commands": ["hassver", "haver"],
         "permissions": ["user"],
         "events": [],
-        "help": "Fetches latest HomeAssistant release info.",
+        "help": "Shows latest HomeAssistant release info.",
     }
 
 
@@ -19,17 +20,15 @@ def run(bot, event):
     if event["channel"] not in ["#nlhomeautomation", "#fdi-status"]:
         return bot.signal_cont
 
-    req = requests.get("https://www.home-assistant.io/version.json")
-    jsontxt = req.text
-    try:
-        obj = json.loads(jsontxt)
-    except Exception as e:
-        bot.add_response(f"Parsing content failed: {e}")
+    info = releases.latest(bot, REPO)
+    if info is None or info.stable is None:
+        bot.add_response("Home Assistant release info is not available yet.")
         return bot.signal_cont
-    release_date_obj = datetime.fromisoformat(obj["release_date"])
+    version = info.stable.tag
+    release_date = info.stable.published[:10]
 
     bot.add_response(
-        f"Latest Home Assistant version is {obj['current_version']} released {release_date_obj.strftime('%Y-%m-%d')}, see https://github.com/home-assistant/core/releases/tag/{obj['current_version']} !"
+        f"Latest Home Assistant version is {version} released {release_date}, see {info.stable.url} !"
     )
 
     # Update the topic for the channel if bot has permission
@@ -60,15 +59,15 @@ def run(bot, event):
                     match = re.match(r"^\s*LastHass: ([^\s]+) released", topic_part)
                     if match:
                         found = True
-                        if obj["current_version"] == match.group(1):
+                        if version == match.group(1):
                             set_topic = False
                         else:
-                            new_part = f"LastHass: {obj['current_version']} released {release_date_obj.strftime('%Y-%m-%d')}"
+                            new_part = f"LastHass: {version} released {release_date}"
                     new_topic_parts.append(new_part)
 
                 if not found:
                     new_topic_parts.append(
-                        f"LastHass: {obj['current_version']} released {release_date_obj.strftime('%Y-%m-%d')}"
+                        f"LastHass: {version} released {release_date}"
                     )
 
                 if set_topic:
@@ -0,0 +1,13 @@
+-- migrate: no-transaction
+-- Case-insensitive lookups (lower(username) = ..., LOWER(item) = LOWER(...))
+-- could not use the plain indexes. Built concurrently, so a live bot keeps
+-- writing while they are created.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_lower_username
+    ON phreakbot_users (lower(username));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_hostmasks_lower_hostmask
+    ON phreakbot_hostmasks (lower(hostmask));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_karma_lower_item_channel
+    ON phreakbot_karma (lower(item), channel);
@@ -0,0 +1,61 @@
+-- Tell every bot on this database which cached entries a change to users,
+-- hostmasks, permissions, auto-op or autovoice affects, including changes
+-- made by hand in psql (see phreakbot_core/cache_notify.py). The payload
+-- is JSON: the table, the old and new row, and for auto-op rows the
+-- user's hostmasks.
+
+CREATE OR REPLACE FUNCTION phreakbot_notify_cache() RETURNS trigger AS $$
+DECLARE
+    old_row JSONB;
+    new_row JSONB;
+    hostmasks JSON;
+    payload TEXT;
+BEGIN
+    IF TG_LEVEL = 'ROW' THEN
+        IF TG_OP <> 'INSERT' THEN
+            old_row := to_jsonb(OLD);
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            new_row := to_jsonb(NEW);
+        END IF;
+        -- Auto-op checks are cached per hostmask
+        IF TG_TABLE_NAME = 'phreakbot_autoop' THEN
+            SELECT json_agg(lower(hostmask)) INTO hostmasks FROM phreakbot_hostmasks
+            WHERE users_id IN ((old_row ->> 'users_id')::int, (new_row ->> 'users_id')::int);
+        END IF;
+    END IF;
+    payload := json_build_object(
+        'table', TG_TABLE_NAME, 'old', old_row, 'new', new_row, 'hostmasks', hostmasks
+    )::text;
+    -- NOTIFY payloads are limited to 8000 bytes. Without rows (and after
+    -- TRUNCATE) the bots drop every entry built from the table.
+    IF octet_length(payload) >= 8000 THEN
+        payload := json_build_object('table', TG_TABLE_NAME)::text;
+    END IF;
+    PERFORM pg_notify('phreakbot_cache', payload);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY[
+        'phreakbot_users', 'phreakbot_hostmasks', 'phreakbot_perms', 'phreakbot_autoop', 'phreakbot_autovoice'
+    ] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_notify', t);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE ON %I '
+            'FOR EACH ROW EXECUTE PROCEDURE phreakbot_notify_cache()',
+            t || '_notify', t
+        );
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_notify_truncate', t);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE PROCEDURE phreakbot_notify_cache()',
+            t || '_notify_truncate', t
+        );
+    END LOOP;
+END
+$$;
@@ -0,0 +1,129 @@
+-- The schema of dbschema.psql for the embedded SQLite backend
+-- (db_backend "sqlite"). Column types name the PostgreSQL types the bot
+-- expects back (BOOLEAN, DATE, TIMESTAMP, TIMESTAMPTZ, JSONB); the backend
+-- converts those columns to bool, date, datetime and dict values.
+-- SERIAL columns become INTEGER PRIMARY KEY, the karma direction enum a
+-- CHECK constraint. Indexes that would duplicate a UNIQUE constraint are
+-- left out.
+
+CREATE TABLE IF NOT EXISTS phreakbot_users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(64) UNIQUE NOT NULL,
+    dob DATE,
+    is_admin BOOLEAN NOT NULL DEFAULT FALSE,
+    is_owner BOOLEAN NOT NULL DEFAULT FALSE
+);
+
+-- Enforce at most one owner to prevent race conditions during !owner claim
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_single_owner
+    ON phreakbot_users (is_owner) WHERE is_owner = TRUE;
+
+CREATE TABLE IF NOT EXISTS phreakbot_hostmasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    users_id INT NOT NULL REFERENCES phreakbot_users (id),
+    hostmask VARCHAR(255) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS phreakbot_perms (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    users_id INT NOT NULL REFERENCES phreakbot_users (id),
+    permission VARCHAR(50) NOT NULL,
+    -- empty channel = global permission
+    channel VARCHAR(150) NOT NULL DEFAULT '',
+    UNIQUE (users_id, permission, channel)
+);
+
+CREATE TABLE IF NOT EXISTS phreakbot_infoitems (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    users_id INT NOT NULL REFERENCES phreakbot_users (id),
+    item TEXT NOT NULL,
+    value TEXT NOT NULL,
+    channel VARCHAR(150) NOT NULL,
+    insert_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (item, value, channel)
+);
+
+CREATE TABLE IF NOT EXISTS phreakbot_karma (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item TEXT NOT NULL,
+    karma INT NOT NULL DEFAULT 0,
+    channel VARCHAR(150) NOT NULL,
+    UNIQUE (item, channel)
+);
+
+CREATE TABLE IF NOT EXISTS phreakbot_karma_why (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    karma_id INT NOT NULL REFERENCES phreakbot_karma (id),
+    direction TEXT NOT NULL CHECK (direction IN ('up', 'down')),
+    reason TEXT NOT NULL,
+    channel VARCHAR(150) NOT NULL,
+    update_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (karma_id, direction, reason, channel)
+);
+
+CREATE TABLE IF NOT EXISTS phreakbot_karma_who (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    karma_id INT NOT NULL REFERENCES phreakbot_karma (id),
+    users_id INT NOT NULL REFERENCES phreakbot_users (id),
+    direction TEXT NOT NULL CHECK (direction IN ('up', 'down')),
+    amount INT NOT NULL,
+    update_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (karma_id, users_id, direction)
+);
+
+CREATE TABLE IF NOT EXISTS phreakbot_quotes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    users_id INT NOT NULL REFERENCES phreakbot_users (id),
+    quote TEXT NOT NULL,
+    channel VARCHAR(150) NOT NULL,
+    insert_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS phreakbot_autoop (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    users_id INT NOT NULL REFERENCES phreakbot_users (id),
+    channel VARCHAR(150) NOT NULL DEFAULT '',
+    UNIQUE (users_id, channel)
+);
+
+CREATE TABLE IF NOT EXISTS phreakbot_autovoice (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel VARCHAR(150) NOT NULL UNIQUE,
+    enabled BOOLEAN NOT NULL DEFAULT FALSE
+);
+
+-- Delayed actions (e.g. tempban expiry), run by the bot's timer service
+CREATE TABLE IF NOT EXISTS phreakbot_timers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    due_at TIMESTAMPTZ NOT NULL,
+    action VARCHAR(64) NOT NULL,
+    -- optional name; a new timer with the same action and key replaces the old one
+    timer_key VARCHAR(255),
+    payload JSONB NOT NULL DEFAULT '{}',
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_hostmasks_users_id ON phreakbot_hostmasks(users_id);
+CREATE INDEX IF NOT EXISTS idx_users_lower_username ON phreakbot_users (lower(username));
+CREATE INDEX IF NOT EXISTS idx_hostmasks_lower_hostmask ON phreakbot_hostmasks (lower(hostmask));
+
+-- Same expression the backend translates birthday.BIRTHDAY_KEY to
+CREATE INDEX IF NOT EXISTS idx_users_birthday
+    ON phreakbot_users ((CAST(strftime('%m', dob) AS INTEGER) * 100 + CAST(strftime('%d', dob) AS INTEGER)))
+    WHERE dob IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_perms_channel ON phreakbot_perms(channel);
+CREATE INDEX IF NOT EXISTS idx_infoitems_item_channel ON phreakbot_infoitems(item, channel);
+CREATE INDEX IF NOT EXISTS idx_infoitems_channel ON phreakbot_infoitems(channel);
+CREATE INDEX IF NOT EXISTS idx_karma_channel ON phreakbot_karma(channel);
+CREATE INDEX IF NOT EXISTS idx_karma_lower_item_channel ON phreakbot_karma (lower(item), channel);
+CREATE INDEX IF NOT EXISTS idx_karma_who_users_id ON phreakbot_karma_who(users_id);
+CREATE INDEX IF NOT EXISTS idx_quotes_channel ON phreakbot_quotes(channel);
+CREATE INDEX IF NOT EXISTS idx_quotes_users_id ON phreakbot_quotes(users_id);
+CREATE INDEX IF NOT EXISTS idx_autoop_channel ON phreakbot_autoop(channel);
+CREATE INDEX IF NOT EXISTS idx_timers_due_at ON phreakbot_timers(due_at);
+CREATE INDEX IF NOT EXISTS idx_timers_action_key ON phreakbot_timers(action, timer_key);
+
+INSERT OR IGNORE INTO phreakbot_users (username) VALUES ('phreakbot_import_user');
+INSERT OR IGNORE INTO phreakbot_hostmasks (users_id, hostmask)
+    SELECT id, 'phreakbot_import_user' FROM phreakbot_users WHERE username = 'phreakbot_import_user';
@@ -10,6 +10,8 @@ import sys
 
 import requests
 
+from phreakbot_core.fanout import fan_out, split_targets
+
 # Check if this module is being reloaded
 if "asn" in sys.modules:
     # This is a reload, not a fresh import
@@ -24,7 +26,9 @@ def config(bot):
         "permissions": ["user"],
         "help": "Look up ASN information for an IP address or AS number.\n"
         "Usage: !asn <IP address> - Look up ASN info for an IP address\n"
-        "       !asn AS<number> - Look up ASN info for an AS number (e.g., AS15169)",
+        "       !asn <target> [<target>...] - Look up several IP addresses and AS numbers at once\n"
+        "       !asn AS<number> - Look up ASN info for an AS number (e.g., AS15169)\n"
+        "       !asn <name> - Search networks in PeeringDB by name prefix",
     }
 
 
@@ -41,6 +45,26 @@ def run(bot, event):
         )
         return
 
+    targets, dropped = split_targets(query)
+    if len(targets) > 1 and all(_is_target(target) for target in targets):
+        return fan_out(bot, lookup, targets, dropped)
+
+    lookup(bot, query)
+
+
+def _is_target(query):
+    """Whether query is an AS number or IP address (not a name to search)"""
+    if re.match(r"^(?:AS)?\d+$", query, re.IGNORECASE):
+        return True
+    try:
+        ipaddress.ip_address(query)
+        return True
+    except ValueError:
+        return False
+
+
+def lookup(bot, query):
+    """Look up one IP address or AS number, or search networks by name"""
     # Check if the query is an AS number
     as_match = re.match(r"^(?:AS)?(\d+)$", query, re.IGNORECASE)
     if as_match:
@@ -54,14 +78,48 @@ def run(bot, event):
         lookup_asn_by_ip(bot, query)
         return
     except ValueError:
-        bot.add_response(
-            f"Invalid input: {query}. Please provide a valid IP address or AS number."
-        )
+        pass
+
+    peeringdb = bot.dataset("peeringdb")
+    if peeringdb is not None:
+        search_networks(bot, peeringdb, query)
+        return
+
+    bot.add_response(
+        f"Invalid input: {query}. Please provide a valid IP address or AS number."
+    )
+
+
+def search_networks(bot, peeringdb, query):
+    """List PeeringDB networks whose name starts with query"""
+    matches = peeringdb.search(query, kind="net", limit=6)
+    if not matches:
+        bot.add_response(f"No networks found matching '{query}'")
         return
+    listed = ", ".join(f"{net.name} (AS{net.asn})" for net in matches[:5])
+    more = " and more" if len(matches) > 5 else ""
+    bot.add_response(f"Networks matching '{query}': {listed}{more}")
 
 
 def lookup_asn_by_ip(bot, ip):
-    """Look up ASN information for an IP address"""
+    """Look up ASN information for an IP address
+
+    Answers from the local routing table when it is loaded and only
+    falls back to ipinfo.io before the first table has been imported.
+    """
+    table = bot.dataset("ipasn")
+    if table is not None:
+        info = table.lookup(ip)
+        if info is None:
+            bot.add_response(f"ASN Lookup for {ip}: not announced in the global routing table")
+            return
+        name = info.name or "Unknown"
+        result = f"ASN Lookup for {ip}: AS{info.asn} ({name}) | Prefix: {info.prefix}"
+        if info.country:
+            result += f" | Country: {info.country}"
+        bot.add_response(result)
+        return
+
     try:
         # Use ipinfo.io API for IP to ASN lookup (free tier, no auth needed)
         response = requests.get(
@@ -99,7 +157,35 @@ def lookup_asn_by_ip(bot, ip):
 
 
 def lookup_asn_by_number(bot, asn):
-    """Look up ASN information for an AS number"""
+    """Look up ASN information for an AS number
+
+    Answers from the local PeeringDB snapshot or routing table when they
+    know the AS and only asks RIPE otherwise.
+    """
+    peeringdb = bot.dataset("peeringdb")
+    net = peeringdb.network(asn) if peeringdb is not None else None
+    if net is not None:
+        result = f"ASN Lookup for AS{asn}: {net.name}"
+        org = peeringdb.organization(net)
+        if org and org.country:
+            result += f" | Country: {org.country}"
+        if net.info_type:
+            result += f" | Type: {net.info_type}"
+        if net.policy_general:
+            result += f" | Policy: {net.policy_general}"
+        exchanges = len(peeringdb.exchanges_of(asn))
+        if exchanges:
+            result += f" | IXPs: {exchanges} (see !peering AS{asn})"
+        bot.add_response(result)
+        return
+
+    table = bot.dataset("ipasn")
+    name = table.name(asn) if table is not None else ""
+    if name:
+        country = table.countries.get(int(asn), "Unknown")
+        bot.add_response(f"ASN Lookup for AS{asn}: {name} | Country: {country}")
+        return
+
     try:
         # Use RIPE NCC API - more reliable and open
         response = requests.get(
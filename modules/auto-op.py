@@ -5,6 +5,8 @@
 
 import asyncio
 
+from phreakbot_core.repositories import AutoOp, DatabaseUnavailable, Users
+
 
 def config(bot):
     """Return module configuration"""
@@ -41,48 +43,32 @@ def _check_auto_op(bot, event):
     if event["nick"] == bot.nickname:
         return
 
-    # Check if the database connection is available
-    conn = bot.db_get()
-    if not conn:
-        return
+    channel = event["channel"]
+    nick = event["nick"]
 
     try:
-        channel = event["channel"]
-        nick = event["nick"]
-        hostmask = event["hostmask"]
-
-        cur = conn.cursor()
-
         # Check if the user is in the auto-op list for this channel
-        cur.execute(
-            "SELECT 1 FROM phreakbot_autoop a "
-            "JOIN phreakbot_users u ON a.users_id = u.id "
-            "JOIN phreakbot_hostmasks h ON u.id = h.users_id "
-            "WHERE h.hostmask = %s AND (a.channel = %s OR a.channel = '')",
-            (hostmask.lower(), channel.lower()),
-        )
-
-        if cur.fetchone():
-            # Give the user operator status
-            bot.logger.info(f"Auto-opping {nick} in {channel}")
-            # Schedule mode change asynchronously
-
-            try:
-                # Create a coroutine to set the mode
-                async def set_op():
-                    await bot.set_mode(channel, "+o", nick)
+        if not AutoOp(bot).has_auto_op(event["hostmask"], channel):
+            return
+    except DatabaseUnavailable:
+        return
+    except Exception as e:
+        bot.logger.error(f"Error in auto-op check: {e}")
+        return
 
-                # Schedule it to run
-                asyncio.create_task(set_op())
-            except Exception as e:
-                bot.logger.error(f"Error setting mode: {e}")
+    # Give the user operator status
+    bot.logger.info(f"Auto-opping {nick} in {channel}")
+    # Schedule mode change asynchronously
 
-        cur.close()
-        bot.db_return(conn)
+    try:
+        # Create a coroutine to set the mode
+        async def set_op():
+            await bot.set_mode(channel, "+o", nick)
 
+        # Schedule it to run
+        asyncio.create_task(set_op())
     except Exception as e:
-        bot.db_return(conn)
-        bot.logger.error(f"Error in auto-op check: {e}")
+        bot.logger.error(f"Error setting mode: {e}")
 
 
 def _add_auto_op(bot, event):
@@ -111,63 +97,30 @@ def _add_auto_op(bot, event):
         bot.add_response("Please specify a valid channel name (e.g. #channel).")
         return
 
-
-    # Check if the database connection is available
-    conn = bot.db_get()
-    if not conn:
-        bot.add_response("Database connection is not available.")
-        return
-
     try:
-        cur = conn.cursor()
-
         # Find the user in the database
-        cur.execute(
-            "SELECT id FROM phreakbot_users WHERE username ILIKE %s", (nick.lower(),)
-        )
-        user = cur.fetchone()
-
+        user = Users(bot).by_username(nick)
         if not user:
             bot.add_response(
                 f"User '{nick}' not found. They need to be registered first."
             )
-            cur.close()
-            bot.db_return(conn)
             return
 
-        user_id = user[0]
-
-        # Check if the user is already in the auto-op list for this channel
-        cur.execute(
-            "SELECT 1 FROM phreakbot_autoop WHERE users_id = %s AND channel = %s",
-            (user_id, channel.lower()),
-        )
-
-        if cur.fetchone():
-            bot.add_response(
-                f"User '{nick}' is already in the auto-op list for {channel}."
-            )
-            cur.close()
-            bot.db_return(conn)
-            return
-
-        # Add the user to the auto-op list
-        cur.execute(
-            "INSERT INTO phreakbot_autoop (users_id, channel) VALUES (%s, %s)",
-            (user_id, channel.lower()),
-        )
-
-        conn.commit()
-        cur.close()
-        bot.db_return(conn)
-
-        bot.add_response(f"Added '{nick}' to the auto-op list for {channel}.")
-
+        added = AutoOp(bot).add(user.id, channel)
+    except DatabaseUnavailable:
+        bot.add_response("Database connection is not available.")
+        return
     except Exception as e:
-        conn.rollback()
-        bot.db_return(conn)
         bot.logger.error(f"Error adding auto-op: {e}")
         bot.add_response("Error updating auto-op settings.")
+        return
+
+    if added:
+        bot.add_response(f"Added '{nick}' to the auto-op list for {channel}.")
+    else:
+        bot.add_response(
+            f"User '{nick}' is already in the auto-op list for {channel}."
+        )
 
 
 def _remove_auto_op(bot, event):
@@ -196,50 +149,26 @@ def _remove_auto_op(bot, event):
         bot.add_response("Please specify a valid channel name (e.g. #channel).")
         return
 
-
-    # Check if the database connection is available
-    conn = bot.db_get()
-    if not conn:
-        bot.add_response("Database connection is not available.")
-        return
-
     try:
-        cur = conn.cursor()
-
         # Find the user in the database
-        cur.execute(
-            "SELECT id FROM phreakbot_users WHERE username ILIKE %s", (nick.lower(),)
-        )
-        user = cur.fetchone()
-
+        user = Users(bot).by_username(nick)
         if not user:
             bot.add_response(f"User '{nick}' not found.")
-            cur.close()
-            bot.db_return(conn)
             return
 
-        user_id = user[0]
-
-        # Remove the user from the auto-op list
-        cur.execute(
-            "DELETE FROM phreakbot_autoop WHERE users_id = %s AND channel = %s",
-            (user_id, channel.lower()),
-        )
-
-        if cur.rowcount > 0:
-            conn.commit()
-            bot.add_response(f"Removed '{nick}' from the auto-op list for {channel}.")
-        else:
-            bot.add_response(f"User '{nick}' is not in the auto-op list for {channel}.")
-
-        cur.close()
-        bot.db_return(conn)
-
+        removed = AutoOp(bot).remove(user.id, channel)
+    except DatabaseUnavailable:
+        bot.add_response("Database connection is not available.")
+        return
     except Exception as e:
-        conn.rollback()
-        bot.db_return(conn)
         bot.logger.error(f"Error removing auto-op: {e}")
         bot.add_response("Error updating auto-op settings.")
+        return
+
+    if removed:
+        bot.add_response(f"Removed '{nick}' from the auto-op list for {channel}.")
+    else:
+        bot.add_response(f"User '{nick}' is not in the auto-op list for {channel}.")
 
 
 def _list_auto_op(bot, event):
@@ -250,50 +179,24 @@ def _list_auto_op(bot, event):
         bot.add_response("Please specify a valid channel name (e.g. #channel).")
         return
 
-
-    # Check if the database connection is available
-    conn = bot.db_get()
-    if not conn:
+    autoop = AutoOp(bot)
+    try:
+        users = autoop.users(channel)
+        global_users = autoop.users("")
+    except DatabaseUnavailable:
         bot.add_response("Database connection is not available.")
         return
-
-    try:
-        cur = conn.cursor()
-
-        # Get users in the auto-op list for this channel
-        cur.execute(
-            "SELECT u.username FROM phreakbot_users u "
-            "JOIN phreakbot_autoop a ON u.id = a.users_id "
-            "WHERE a.channel = %s "
-            "ORDER BY u.username",
-            (channel.lower(),),
-        )
-
-        users = [row[0] for row in cur.fetchall()]
-
-        # Get users with global auto-op
-        cur.execute(
-            "SELECT u.username FROM phreakbot_users u "
-            "JOIN phreakbot_autoop a ON u.id = a.users_id "
-            "WHERE a.channel = '' "
-            "ORDER BY u.username"
-        )
-
-        global_users = [row[0] for row in cur.fetchall()]
-        cur.close()
-        bot.db_return(conn)
-
-        if users or global_users:
-            if users:
-                bot.add_response(f"Users with auto-op in {channel}: {', '.join(users)}")
-            if global_users:
-                bot.add_response(
-                    f"Users with global auto-op: {', '.join(global_users)}"
-                )
-        else:
-            bot.add_response(f"No users in the auto-op list for {channel}.")
-
     except Exception as e:
-        bot.db_return(conn)
         bot.logger.error(f"Error listing auto-op: {e}")
         bot.add_response("Error retrieving auto-op settings.")
+        return
+
+    if users or global_users:
+        if users:
+            bot.add_response(f"Users with auto-op in {channel}: {', '.join(users)}")
+        if global_users:
+            bot.add_response(
+                f"Users with global auto-op: {', '.join(global_users)}"
+            )
+    else:
+        bot.add_response(f"No users in the auto-op list for {channel}.")
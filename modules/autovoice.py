@@ -5,6 +5,8 @@
 
 import asyncio
 
+from phreakbot_core.repositories import AutoVoice, DatabaseUnavailable, Users
+
 
 def config(bot):
     """Return module configuration"""
@@ -37,58 +39,31 @@ def _check_autovoice(bot, event):
     if event["nick"] == bot.nickname:
         return
 
-    # Check if the database connection is available
-    conn = bot.db_get()
-    if not conn:
-        return
+    channel = event["channel"]
+    nick = event["nick"]
 
     try:
-        channel = event["channel"]
-        nick = event["nick"]
-        hostmask = event["hostmask"]
-
-        cur = conn.cursor()
-
-        # Check if autovoice is enabled for this channel
-        cur.execute(
-            "SELECT 1 FROM phreakbot_autovoice WHERE channel = %s AND enabled = TRUE",
-            (channel.lower(),),
-        )
-
-        if not cur.fetchone():
-            # Autovoice is not enabled for this channel
-            cur.close()
-            bot.db_return(conn)
+        # Check if autovoice is enabled for this channel and the user is registered
+        if not AutoVoice(bot).is_enabled(channel) or not Users(bot).is_registered(event["hostmask"]):
             return
+    except DatabaseUnavailable:
+        return
+    except Exception as e:
+        bot.logger.error(f"Error in autovoice check: {e}")
+        return
 
-        # Check if the user is registered
-        cur.execute(
-            "SELECT 1 FROM phreakbot_users u "
-            "JOIN phreakbot_hostmasks h ON u.id = h.users_id "
-            "WHERE h.hostmask = %s",
-            (hostmask.lower(),),
-        )
-
-        if cur.fetchone():
-            # Give the user voice status
-            bot.logger.info(f"Auto-voicing {nick} in {channel}")
-            # Schedule mode change asynchronously
-
-            try:
-
-                async def set_voice():
-                    await bot.set_mode(channel, "+v", nick)
+    # Give the user voice status
+    bot.logger.info(f"Auto-voicing {nick} in {channel}")
+    # Schedule mode change asynchronously
 
-                asyncio.create_task(set_voice())
-            except Exception as e:
-                bot.logger.error(f"Error setting voice mode: {e}")
+    try:
 
-        cur.close()
-        bot.db_return(conn)
+        async def set_voice():
+            await bot.set_mode(channel, "+v", nick)
 
+        asyncio.create_task(set_voice())
     except Exception as e:
-        bot.db_return(conn)
-        bot.logger.error(f"Error in autovoice check: {e}")
+        bot.logger.error(f"Error setting voice mode: {e}")
 
 
 def _manage_autovoice(bot, event):
@@ -117,87 +92,60 @@ def _manage_autovoice(bot, event):
         bot.add_response("Please specify a valid channel name (e.g. #channel).")
         return
 
-
-    # Check if the database connection is available
-    conn = bot.db_get()
-    if not conn:
-        bot.add_response("Database connection is not available.")
+    if action not in ("on", "off", "status"):
+        bot.add_response("Invalid option. Use 'on', 'off', or 'status'.")
         return
 
+    autovoice = AutoVoice(bot)
     try:
-        cur = conn.cursor()
-
-        if action == "on":
-            # Enable autovoice for the channel
-            cur.execute(
-                "INSERT INTO phreakbot_autovoice (channel, enabled) VALUES (%s, TRUE) "
-                "ON CONFLICT (channel) DO UPDATE SET enabled = TRUE",
-                (channel.lower(),),
-            )
-            conn.commit()
-
-            # Set moderated mode on the channel
-            bot.logger.info(f"Setting moderated mode on {channel}")
-
-            try:
-
-                async def set_moderated():
-                    await bot.set_mode(channel, "+m")
-
-                asyncio.create_task(set_moderated())
-            except Exception as e:
-                bot.logger.error(f"Error setting moderated mode: {e}")
-
-            bot.add_response(
-                f"Autovoice enabled for {channel}. Channel set to moderated mode (+m)."
-            )
-
-        elif action == "off":
-            # Disable autovoice for the channel
-            cur.execute(
-                "INSERT INTO phreakbot_autovoice (channel, enabled) VALUES (%s, FALSE) "
-                "ON CONFLICT (channel) DO UPDATE SET enabled = FALSE",
-                (channel.lower(),),
-            )
-            conn.commit()
-
-            # Remove moderated mode from the channel
-            bot.logger.info(f"Removing moderated mode from {channel}")
-
-            try:
-
-                async def unset_moderated():
-                    await bot.set_mode(channel, "-m")
-
-                asyncio.create_task(unset_moderated())
-            except Exception as e:
-                bot.logger.error(f"Error removing moderated mode: {e}")
-
-            bot.add_response(
-                f"Autovoice disabled for {channel}. Channel moderated mode removed (-m)."
-            )
-
-        elif action == "status":
-            # Check if autovoice is enabled for the channel
-            cur.execute(
-                "SELECT enabled FROM phreakbot_autovoice WHERE channel = %s",
-                (channel.lower(),),
-            )
-            result = cur.fetchone()
-            if result:
-                status = "enabled" if result[0] else "disabled"
-                bot.add_response(f"Autovoice is {status} for {channel}.")
-            else:
-                bot.add_response(f"Autovoice is not configured for {channel}.")
-
+        if action == "status":
+            enabled = autovoice.status(channel)
         else:
-            bot.add_response("Invalid option. Use 'on', 'off', or 'status'.")
-
-        cur.close()
-        bot.db_return(conn)
-
+            autovoice.set_enabled(channel, action == "on")
+    except DatabaseUnavailable:
+        bot.add_response("Database connection is not available.")
+        return
     except Exception as e:
-        conn.rollback()
-        bot.db_return(conn)
         bot.logger.error(f"Error managing autovoice: {e}")
         bot.add_response("Error updating autovoice settings.")
+        return
+
+    if action == "on":
+        # Set moderated mode on the channel
+        bot.logger.info(f"Setting moderated mode on {channel}")
+
+        try:
+
+            async def set_moderated():
+                await bot.set_mode(channel, "+m")
+
+            asyncio.create_task(set_moderated())
+        except Exception as e:
+            bot.logger.error(f"Error setting moderated mode: {e}")
+
+        bot.add_response(
+            f"Autovoice enabled for {channel}. Channel set to moderated mode (+m)."
+        )
+
+    elif action == "off":
+        # Remove moderated mode from the channel
+        bot.logger.info(f"Removing moderated mode from {channel}")
+
+        try:
+
+            async def unset_moderated():
+                await bot.set_mode(channel, "-m")
+
+            asyncio.create_task(unset_moderated())
+        except Exception as e:
+            bot.logger.error(f"Error removing moderated mode: {e}")
+
+        bot.add_response(
+            f"Autovoice disabled for {channel}. Channel moderated mode removed (-m)."
+        )
+
+    elif enabled is None:
+        bot.add_response(f"Autovoice is not configured for {channel}.")
+    else:
+        status = "enabled" if enabled else "disabled"
+        bot.add_response(f"Autovoice is {status} for {channel}.")
@@ -3,15 +3,28 @@
 #
 # Birthday module for PhreakBot
 
+import asyncio
+import calendar
 import datetime
 import re
 
+ANNOUNCE_ACTION = "birthday.announce"
+UPCOMING_DAYS = 30
+
+# Month * 100 + day of the birth date, as indexed by idx_users_birthday.
+# Queries must use this exact expression for the index to apply.
+BIRTHDAY_KEY = "(EXTRACT(MONTH FROM dob) * 100 + EXTRACT(DAY FROM dob))::int"
+
 
 def config(bot):
     """Return module configuration"""
+    bot.add_timer_action(ANNOUNCE_ACTION, _announce_birthdays)
+    # Kept if already pending, so a restart after the announcement time
+    # still runs the overdue announcement
+    bot.schedule(_next_announcement(bot), ANNOUNCE_ACTION, key="daily", replace=False)
     return {
         "events": ["join"],  # Check birthdays when users join
-        "commands": ["bd", "bd-set", "age"],
+        "commands": ["bd", "bd-set", "bd-today", "age"],
         "permissions": ["user"],
         "help": "Birthday management and notifications.\n"
         "Usage: !bd - List upcoming birthdays\n"
@@ -31,6 +44,8 @@ def run(bot, event):
             _set_birthday(bot, event)
         elif event["command"] == "bd":
             _show_birthdays(bot, event)
+        elif event["command"] == "bd-today":
+            _show_todays_birthdays(bot)
         elif event["command"] == "age":
             _show_age(bot, event)
 
@@ -83,6 +98,8 @@ def _set_birthday(bot, event):
                 conn.commit()
                 cur.close()
                 bot.db_return(conn)
+                bot.db_invalidate_users()
+                bot.state.pop("birthdays_today", None)
 
                 bot.add_response(
                     f"Your birthday has been set to {dob.strftime('%d-%m-%Y')}."
@@ -115,8 +132,8 @@ def _show_birthdays(bot, event):
         # If a nickname is provided, show that user's birthday
         if args:
             cur.execute(
-                "SELECT username, dob FROM phreakbot_users WHERE username ILIKE %s AND dob IS NOT NULL",
-                (args,),
+                "SELECT username, dob FROM phreakbot_users WHERE lower(username) = %s AND dob IS NOT NULL",
+                (args.lower(),),
             )
             user = cur.fetchone()
 
@@ -131,63 +148,24 @@ def _show_birthdays(bot, event):
         # Otherwise, show upcoming birthdays
         else:
             today = datetime.date.today()
-
-            # Get users with birthdays in the next 30 days
-            cur.execute(
-                """
-                SELECT username, dob,
-                       EXTRACT(DAY FROM dob) as day,
-                       EXTRACT(MONTH FROM dob) as month
-                FROM phreakbot_users
-                WHERE dob IS NOT NULL
-                ORDER BY
-                    EXTRACT(MONTH FROM dob),
-                    EXTRACT(DAY FROM dob)
-                """
-            )
-
-            users = cur.fetchall()
+            users = _birthdays_between(cur, today, UPCOMING_DAYS)
 
             if users:
-                upcoming = []
-                today_month = today.month
-                today_day = today.day
-
-                for username, dob, day, month in users:
-                    # Calculate days until next birthday
-                    next_birthday = datetime.date(today.year, int(month), int(day))
-                    if next_birthday < today:
-                        next_birthday = datetime.date(
-                            today.year + 1, int(month), int(day)
+                bot.add_response(f"Upcoming birthdays in the next {UPCOMING_DAYS} days:")
+                for username, dob in users:
+                    next_birthday = _next_birthday(dob, today)
+                    days = (next_birthday - today).days
+                    next_age = next_birthday.year - dob.year
+                    if days == 0:
+                        bot.add_response(
+                            f"🎂 TODAY: {username} turns {next_age} today! 🎉"
+                        )
+                    else:
+                        bot.add_response(
+                            f"In {days} days: {username} will turn {next_age} on {dob.strftime('%d-%m')}."
                         )
-
-                    days_until = (next_birthday - today).days
-
-                    if days_until <= 30:
-                        age = today.year - dob.year
-                        if today < datetime.date(today.year, dob.month, dob.day):
-                            age -= 1
-
-                        upcoming.append((username, dob, days_until, age + 1))
-
-                if upcoming:
-                    # Sort by days until birthday
-                    upcoming.sort(key=lambda x: x[2])
-
-                    bot.add_response("Upcoming birthdays in the next 30 days:")
-                    for username, dob, days, next_age in upcoming:
-                        if days == 0:
-                            bot.add_response(
-                                f"🎂 TODAY: {username} turns {next_age} today! 🎉"
-                            )
-                        else:
-                            bot.add_response(
-                                f"In {days} days: {username} will turn {next_age} on {dob.strftime('%d-%m')}."
-                            )
-                else:
-                    bot.add_response("No upcoming birthdays in the next 30 days.")
             else:
-                bot.add_response("No birthdays have been set yet.")
+                bot.add_response(f"No upcoming birthdays in the next {UPCOMING_DAYS} days.")
 
         cur.close()
         bot.db_return(conn)
@@ -213,8 +191,8 @@ def _show_age(bot, event):
         # If a nickname is provided, show that user's age
         if args:
             cur.execute(
-                "SELECT username, dob FROM phreakbot_users WHERE username ILIKE %s AND dob IS NOT NULL",
-                (args,),
+                "SELECT username, dob FROM phreakbot_users WHERE lower(username) = %s AND dob IS NOT NULL",
+                (args.lower(),),
             )
             user = cur.fetchone()
         # Otherwise, show the requester's age
@@ -294,41 +272,120 @@ def _show_age(bot, event):
         bot.add_response("Error retrieving birthday information.")
 
 
-def _check_todays_birthdays(bot, channel):
-    """Check for birthdays today and send congratulations"""
+def _day_key(date):
+    return date.month * 100 + date.day
+
+
+def _next_birthday(dob, today):
+    """Date of the next birthday on or after today; 29-02 is 28-02 in other years."""
+    for year in (today.year, today.year + 1):
+        try:
+            birthday = dob.replace(year=year)
+        except ValueError:
+            birthday = datetime.date(year, 2, 28)
+        if birthday >= today:
+            return birthday
+
+
+def _birthdays_between(cur, start, days):
+    """(username, dob) of birthdays from start to start + days, soonest first.
+
+    One range scan on the birthday index, split in two at the year end.
+    """
+    end = start + datetime.timedelta(days=days)
+    first, last = _day_key(start), _day_key(end)
+    if last == 228 and not calendar.isleap(end.year):
+        last = 229
+    if first <= last:
+        where = f"{BIRTHDAY_KEY} BETWEEN %s AND %s"
+    else:
+        where = f"({BIRTHDAY_KEY} >= %s OR {BIRTHDAY_KEY} <= %s)"
+    cur.execute(
+        f"SELECT username, dob FROM phreakbot_users "
+        f"WHERE dob IS NOT NULL AND {where} "
+        f"ORDER BY {BIRTHDAY_KEY} < %s, {BIRTHDAY_KEY}, username",
+        (first, last, first),
+    )
+    return cur.fetchall()
+
+
+def _todays_birthdays(bot):
+    """(username, age) of today's birthdays, queried once per day. Blocking."""
+    today = datetime.date.today()
+    cached = bot.state.get("birthdays_today")
+    if cached and cached[0] == today:
+        return cached[1]
+
     conn = bot.db_get()
     if not conn:
-        return
-
+        return []
     try:
-        today = datetime.date.today()
-
         cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT username, dob
-            FROM phreakbot_users
-            WHERE
-                dob IS NOT NULL AND
-                EXTRACT(DAY FROM dob) = %s AND
-                EXTRACT(MONTH FROM dob) = %s
-            """,
-            (today.day, today.month),
-        )
-
-        birthday_users = cur.fetchall()
+        users = [
+            (username, today.year - dob.year)
+            for username, dob in _birthdays_between(cur, today, 0)
+        ]
         cur.close()
+    finally:
         bot.db_return(conn)
 
-        if birthday_users:
-            bot.add_response(f"🎂 Today's Birthdays 🎂", private=False)
+    bot.state["birthdays_today"] = (today, users)
+    return users
 
-            for username, dob in birthday_users:
-                age = today.year - dob.year
-                bot.add_response(
-                    f"Happy {age}th Birthday to {username}! 🎉🎈🎁", private=False
-                )
 
+def _birthday_lines(users):
+    lines = ["🎂 Today's Birthdays 🎂"]
+    for username, age in users:
+        lines.append(f"Happy {age}th Birthday to {username}! 🎉🎈🎁")
+    return lines
+
+
+def _show_todays_birthdays(bot):
+    """Show today's birthdays"""
+    try:
+        users = _todays_birthdays(bot)
+    except Exception as e:
+        bot.logger.error(f"Database error in birthday module: {e}")
+        bot.add_response("Error retrieving birthday information.")
+        return
+
+    if users:
+        for line in _birthday_lines(users):
+            bot.add_response(line)
+    else:
+        bot.add_response("No birthdays today.")
+
+
+def _check_todays_birthdays(bot, channel):
+    """Check for birthdays today and send congratulations"""
+    try:
+        users = _todays_birthdays(bot)
     except Exception as e:
-        bot.db_return(conn)
         bot.logger.error(f"Error checking today's birthdays: {e}")
+        return
+
+    for line in _birthday_lines(users) if users else ():
+        bot.add_response(line, private=False)
+
+
+def _next_announcement(bot):
+    """Next local time of day set by birthday_announce_time (HH:MM, default 09:00)."""
+    hour, minute = map(int, bot.config.get("birthday_announce_time", "09:00").split(":"))
+    now = datetime.datetime.now()
+    when = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if when <= now:
+        when += datetime.timedelta(days=1)
+    # Local wall-clock time, with the UTC offset of that day
+    return when.astimezone()
+
+
+async def _announce_birthdays(bot, payload):
+    """Daily timer action: congratulate today's birthdays, then schedule tomorrow"""
+    try:
+        users = await asyncio.get_running_loop().run_in_executor(None, _todays_birthdays, bot)
+        channels = bot.config.get("birthday_channels", bot.config.get("channels", []))
+        for line in _birthday_lines(users) if users else ():
+            for channel in channels:
+                await bot.message(channel, line)
+    finally:
+        bot.schedule(_next_announcement(bot), ANNOUNCE_ACTION, key="daily")
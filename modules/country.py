@@ -3,9 +3,10 @@
 #
 # Country module for PhreakBot
 
-import re
 import socket
 
+from phreakbot_core.resolver import resolve_async
+
 
 def config(bot):
     """Return module configuration"""
@@ -18,32 +19,39 @@ def config(bot):
     }
 
 
-def run(bot, event):
+async def run(bot, event):
     """Handle country commands"""
-    host = event["command_args"]
+    host = event["command_args"].strip()
 
     if not host:
         bot.add_response("Please specify a hostname or IP address.")
         return
 
+    geoip = bot.dataset("geoip")
+    if geoip is None:
+        bot.add_response("GeoIP database is not available.")
+        return
+
     try:
-        # Try to resolve the hostname to an IP address
+        # Try to resolve the hostname to an IP address (IPv4 preferred)
         try:
-            ip = socket.gethostbyname(host)
+            addresses = await resolve_async(host)
         except socket.gaierror:
+            addresses = []
+        if not addresses:
             bot.add_response(f"Could not resolve hostname: {host}")
             return
+        ip = next((addr for addr in addresses if ":" not in addr), addresses[0])
 
-        # Use a simple regex to validate the IP address
-        if not re.match(r"^(\d{1,3}\.){3}\d{1,3}$", ip):
-            bot.add_response(f"Invalid IP address: {ip}")
+        country = geoip.country(ip)
+        if country is None:
+            bot.add_response(f"No country information found for {ip}")
             return
 
-        # In a real implementation, we would use a GeoIP database to look up the country
-        # For this example, we'll just return a placeholder message
-        bot.add_response(
-            f"IP address {ip} is located in [Country information would be displayed here]"
-        )
+        code, name = country
+        label = f"{name} ({code})" if name and code else name or code
+        prefix = f"{host} ({ip})" if host != ip else ip
+        bot.add_response(f"{prefix} is located in {label}")
 
     except Exception as e:
         bot.logger.error(f"Error in country module: {e}")
@@ -37,7 +37,7 @@ def run(bot, event):
 
         # Check by username
         cur.execute(
-            "SELECT id FROM phreakbot_users WHERE username ILIKE %s", (tnick.lower(),)
+            "SELECT id FROM phreakbot_users WHERE lower(username) = %s", (tnick.lower(),)
         )
         user = cur.fetchone()
 
@@ -61,6 +61,7 @@ def run(bot, event):
         conn.commit()
         cur.close()
         bot.db_return(conn)
+        bot.db_invalidate_users()
 
         bot.add_response(f"Obliterated user '{tnick}' from existence.")
 
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Feed module for PhreakBot
+# Manages the RSS/Atom feeds the bot polls and the channels they post to
+
+from urllib.parse import urlparse
+
+
+def config(bot):
+    """Return module configuration"""
+    return {
+        "events": [],
+        "commands": ["feed"],
+        "permissions": ["user"],
+        "help": "Manage RSS/Atom feed subscriptions.\n"
+        "Usage: !feed list - Show the feeds and their channels\n"
+        "       !feed show <name> - Show the latest items of a feed\n"
+        "       !feed add <name> <url> [minutes] - Follow a feed (owner/admin)\n"
+        "       !feed del <name> - Stop following a feed (owner/admin)\n"
+        "       !feed sub <name> - Post new items in this channel (owner/admin)\n"
+        "       !feed unsub <name> - Stop posting new items in this channel (owner/admin)",
+    }
+
+
+def run(bot, event):
+    """Handle feed commands"""
+    args = event["command_args"].split()
+    action = args[0].lower() if args else "list"
+
+    if action == "list":
+        list_feeds(bot)
+        return
+
+    if action == "show":
+        if len(args) < 2:
+            bot.add_response("Usage: !feed show <name>")
+            return
+        show_feed(bot, args[1])
+        return
+
+    if action not in ("add", "del", "sub", "unsub"):
+        bot.add_response("Usage: !feed list|show|add|del|sub|unsub (see !help feed)")
+        return
+
+    if not bot._check_permissions(event, ["owner", "admin", "feed"]):
+        bot.add_response("You don't have permission to manage feeds.")
+        return
+
+    if len(args) < 2:
+        bot.add_response(f"Usage: !feed {action} <name>" + (" <url> [minutes]" if action == "add" else ""))
+        return
+    name = args[1].lower()
+
+    if action == "add":
+        if len(args) < 3 or urlparse(args[2]).scheme not in ("http", "https"):
+            bot.add_response("Usage: !feed add <name> <http(s) url> [minutes]")
+            return
+        if name in bot.feeds.feeds:
+            bot.add_response(f"Feed '{name}' already exists")
+            return
+        try:
+            minutes = int(args[3]) if len(args) > 3 else 15
+        except ValueError:
+            bot.add_response("Interval must be a number of minutes")
+            return
+        feed = bot.feeds.add_feed(name, args[2], interval=minutes * 60)
+        save(bot)
+        bot.add_response(f"Following feed '{name}' every {feed.interval // 60} minutes")
+        return
+
+    if name not in bot.feeds.feeds:
+        bot.add_response(f"Unknown feed '{name}'")
+        return
+
+    if action == "del":
+        bot.feeds.remove_feed(name)
+        save(bot)
+        bot.add_response(f"Stopped following feed '{name}'")
+        return
+
+    channel = event["channel"]
+    if not channel.startswith("#"):
+        bot.add_response("Subscribe from the channel that should receive the feed.")
+        return
+    if action == "sub":
+        bot.feeds.subscribe(name, channel)
+        bot.add_response(f"New items of '{name}' will be posted in {channel}")
+    else:
+        bot.feeds.unsubscribe(name, channel)
+        bot.add_response(f"New items of '{name}' will no longer be posted in {channel}")
+    save(bot)
+
+
+def list_feeds(bot):
+    """Show the followed feeds"""
+    if not bot.feeds.feeds:
+        bot.add_response("No feeds configured")
+        return
+    for name, feed in sorted(bot.feeds.feeds.items()):
+        channels = ", ".join(feed.channels) or "no channels"
+        status = f" (error: {feed.error})" if feed.error else ""
+        bot.add_response(f"{name}: {feed.url} every {feed.interval // 60}m -> {channels}{status}")
+
+
+def show_feed(bot, name):
+    """Show the cached items of a feed"""
+    items = bot.feeds.items(name.lower())[:5]
+    if not items:
+        bot.add_response(f"No items for feed '{name}'")
+        return
+    for item in items:
+        bot.add_response(f"{item.title} - {item.link}" if item.link else item.title)
+
+
+def save(bot):
+    """Persist the feed subscriptions in the config file"""
+    bot.config["feeds"] = bot.feeds.to_config()
+    bot.save_config()
@@ -4,7 +4,8 @@
 # PhreakBot - InfoItems module for pydle version
 #
 import re
-from datetime import datetime
+
+from phreakbot_core.repositories import DatabaseUnavailable, Infoitems
 
 
 def config(bot):
@@ -146,27 +147,23 @@ def _add_infoitem(bot, event, item, value):
         bot.reply("You need to be a registered user to add info items.")
         return
 
-    conn = bot.db_get()
-    if conn:
-        try:
-            cur = conn.cursor()
-            cur.execute(
-                "INSERT INTO phreakbot_infoitems (users_id, item, value, channel) VALUES (%s, %s, %s, %s) RETURNING id",
-                (event["user_info"]["id"], item, value, event["channel"]),
-            )
-            item_id = cur.fetchone()[0]
-            conn.commit()
-            bot.reply(f"Info item '{item}' added successfully with ID {item_id}.")
-            bot.logger.info(f"Added info item '{item}' with ID {item_id}")
-        except Exception as e:
-            bot.logger.error(f"Error adding info item: {e}")
-            bot.reply("Error adding info item. Please try again or contact the bot administrator.")
-            conn.rollback()
-        finally:
-            cur.close()
-            bot.db_return(conn)
-    else:
+    try:
+        item_id = Infoitems(bot).add(event["user_info"]["id"], item, value, event["channel"])
+    except DatabaseUnavailable:
         bot.reply("Database connection not available.")
+        return
+    except Exception as e:
+        bot.logger.error(f"Error adding info item: {e}")
+        bot.reply("Error adding info item. Please try again or contact the bot administrator.")
+        return
+
+    bot.reply(f"Info item '{item}' added successfully with ID {item_id}.")
+    bot.logger.info(f"Added info item '{item}' with ID {item_id}")
+
+
+def _may_delete(event, infoitem):
+    """Owners may delete any info item, other users only their own"""
+    return "owner" in event["user_info"]["permissions"]["global"] or infoitem.users_id == event["user_info"]["id"]
 
 
 def _delete_infoitem(bot, event, item_id):
@@ -176,82 +173,46 @@ def _delete_infoitem(bot, event, item_id):
         bot.reply("You need to be a registered user to delete info items.")
         return
 
-    conn = bot.db_get()
-    if conn:
-        try:
-            cur = conn.cursor()
+    infoitems = Infoitems(bot)
+    try:
+        infoitem = infoitems.get(item_id)
+        if not infoitem:
+            bot.reply(f"Info item with ID {item_id} not found.")
+            return
 
-            # First check if the item exists and belongs to the user or if user is admin
-            cur.execute(
-                "SELECT i.id, i.item, i.users_id FROM phreakbot_infoitems i WHERE i.id = %s",
-                (item_id,),
-            )
-            item = cur.fetchone()
-
-            if not item:
-                bot.reply(f"Info item with ID {item_id} not found.")
-                cur.close()
-                bot.db_return(conn)
-                return
-
-            # Check if user is owner or the item belongs to the user
-            is_owner = False
-            for perm in event["user_info"]["permissions"]["global"]:
-                if perm == "owner":
-                    is_owner = True
-                    break
-
-            if not is_owner and item[2] != event["user_info"]["id"]:
-                bot.reply("You can only delete your own info items.")
-                cur.close()
-                bot.db_return(conn)
-                return
-
-            # Delete the item
-            cur.execute("DELETE FROM phreakbot_infoitems WHERE id = %s", (item_id,))
-            conn.commit()
-            bot.reply(f"Info item '{item[1]}' with ID {item_id} deleted successfully.")
-            bot.logger.info(f"Deleted info item '{item[1]}' with ID {item_id}")
-        except Exception as e:
-            bot.logger.error(f"Error deleting info item: {e}")
-            bot.reply("Error deleting info item. Please try again or contact the bot administrator.")
-            conn.rollback()
-        finally:
-            cur.close()
-            bot.db_return(conn)
-    else:
+        if not _may_delete(event, infoitem):
+            bot.reply("You can only delete your own info items.")
+            return
+
+        infoitems.delete(infoitem)
+    except DatabaseUnavailable:
         bot.reply("Database connection not available.")
+        return
+    except Exception as e:
+        bot.logger.error(f"Error deleting info item: {e}")
+        bot.reply("Error deleting info item. Please try again or contact the bot administrator.")
+        return
+
+    bot.reply(f"Info item '{infoitem.item}' with ID {item_id} deleted successfully.")
+    bot.logger.info(f"Deleted info item '{infoitem.item}' with ID {item_id}")
 
 
 def _get_infoitem(bot, event, item):
     """Get all values for an info item"""
-    conn = bot.db_get()
-    if conn:
-        try:
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT i.id, i.value, u.username, i.insert_time FROM phreakbot_infoitems i "
-                "JOIN phreakbot_users u ON i.users_id = u.id "
-                "WHERE i.item = %s AND i.channel = %s "
-                "ORDER BY i.insert_time",
-                (item, event["channel"]),
-            )
+    try:
+        values = Infoitems(bot).values(item, event["channel"])
+    except DatabaseUnavailable:
+        bot.reply("Database connection not available.")
+        return
+    except Exception as e:
+        bot.logger.error(f"Error retrieving info item: {e}")
+        bot.reply("Error retrieving info item. Please try again or contact the bot administrator.")
+        return
 
-            items = cur.fetchall()
-
-            if not items:
-                bot.reply(f"No info found for '{item}'.")
-            else:
-                values = [value for _, value, _, _ in items]
-                bot.reply(f"{item}: {', '.join(values)}")
-        except Exception as e:
-            bot.logger.error(f"Error retrieving info item: {e}")
-            bot.reply("Error retrieving info item. Please try again or contact the bot administrator.")
-        finally:
-            cur.close()
-            bot.db_return(conn)
+    if not values:
+        bot.reply(f"No info found for '{item}'.")
     else:
-        bot.reply("Database connection not available.")
+        bot.reply(f"{item}: {', '.join(values)}")
 
 
 def _forget_infoitem(bot, event, item, value):
@@ -261,91 +222,55 @@ def _forget_infoitem(bot, event, item, value):
         bot.reply("You need to be a registered user to delete info items.")
         return
 
-    conn = bot.db_get()
-    if conn:
-        try:
-            cur = conn.cursor()
-
-            # First check if the item exists with the specified value
-            cur.execute(
-                "SELECT i.id, i.item, i.value, i.users_id FROM phreakbot_infoitems i WHERE i.item = %s AND i.value = %s AND i.channel = %s",
-                (item, value, event["channel"]),
+    infoitems = Infoitems(bot)
+    try:
+        matches = infoitems.find(item, value, event["channel"])
+        if not matches:
+            bot.reply(f"No info item '{item}' with value '{value}' found.")
+            return
+
+        # If there are multiple matches, we need to be more specific
+        if len(matches) > 1:
+            bot.reply(
+                f"Multiple matches found for '{item}' with value '{value}'. Please use !infoitem del <id> with one of these IDs:"
             )
-            items = cur.fetchall()
-
-            if not items:
-                bot.reply(f"No info item '{item}' with value '{value}' found.")
-                cur.close()
-                bot.db_return(conn)
-                return
-
-            # If there are multiple matches, we need to be more specific
-            if len(items) > 1:
-                bot.reply(
-                    f"Multiple matches found for '{item}' with value '{value}'. Please use !infoitem del <id> with one of these IDs:"
-                )
-                for item_id, item_name, item_value, _ in items:
-                    bot.reply(f"• [{item_id}] {item_value}")
-                cur.close()
-                bot.db_return(conn)
-                return
-
-            # We have exactly one match
-            item_id, item_name, item_value, user_id = items[0]
-
-            # Check if user is owner or the item belongs to the user
-            is_owner = False
-            for perm in event["user_info"]["permissions"]["global"]:
-                if perm == "owner":
-                    is_owner = True
-                    break
-
-            if not is_owner and user_id != event["user_info"]["id"]:
-                bot.reply("You can only delete your own info items.")
-                cur.close()
-                bot.db_return(conn)
-                return
-
-            # Delete the item
-            cur.execute("DELETE FROM phreakbot_infoitems WHERE id = %s", (item_id,))
-            conn.commit()
-            bot.reply(f"Info item '{item}' with value '{value}' deleted successfully.")
-            bot.logger.info(f"Deleted info item '{item}' with ID {item_id}")
-        except Exception as e:
-            bot.logger.error(f"Error deleting info item: {e}")
-            bot.reply("Error deleting info item. Please try again or contact the bot administrator.")
-            conn.rollback()
-        finally:
-            cur.close()
-            bot.db_return(conn)
-    else:
+            for match in matches:
+                bot.reply(f"• [{match.id}] {match.value}")
+            return
+
+        # We have exactly one match
+        infoitem = matches[0]
+        if not _may_delete(event, infoitem):
+            bot.reply("You can only delete your own info items.")
+            return
+
+        infoitems.delete(infoitem)
+    except DatabaseUnavailable:
         bot.reply("Database connection not available.")
+        return
+    except Exception as e:
+        bot.logger.error(f"Error deleting info item: {e}")
+        bot.reply("Error deleting info item. Please try again or contact the bot administrator.")
+        return
+
+    bot.reply(f"Info item '{item}' with value '{value}' deleted successfully.")
+    bot.logger.info(f"Deleted info item '{item}' with ID {infoitem.id}")
 
 
 def _list_infoitems(bot, event):
     """List all info items in the current channel"""
-    conn = bot.db_get()
-    if conn:
-        try:
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT DISTINCT item FROM phreakbot_infoitems WHERE channel = %s ORDER BY item",
-                (event["channel"],),
-            )
+    try:
+        items = Infoitems(bot).items(event["channel"])
+    except DatabaseUnavailable:
+        bot.reply("Database connection not available.")
+        return
+    except Exception as e:
+        bot.logger.error(f"Error listing info items: {e}")
+        bot.reply("Error listing info items. Please try again or contact the bot administrator.")
+        return
 
-            items = cur.fetchall()
-
-            if not items:
-                bot.reply("No info items found in this channel.")
-            else:
-                bot.reply(f"Info items in this channel ({len(items)} items):")
-                item_list = ", ".join([item[0] for item in items])
-                bot.reply(f"• {item_list}")
-        except Exception as e:
-            bot.logger.error(f"Error listing info items: {e}")
-            bot.reply("Error listing info items. Please try again or contact the bot administrator.")
-        finally:
-            cur.close()
-            bot.db_return(conn)
+    if not items:
+        bot.reply("No info items found in this channel.")
     else:
-        bot.reply("Database connection not available.")
+        bot.reply(f"Info items in this channel ({len(items)} items):")
+        bot.reply(f"• {', '.join(items)}")
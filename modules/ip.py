@@ -7,9 +7,10 @@ import re
 import socket
 import ipaddress
 import requests
-import netaddr
 
-from phreakbot_core.url_safety import BLOCKED_NETWORKS
+from phreakbot_core.fanout import fan_out, split_targets
+from phreakbot_core.resolver import resolve
+from phreakbot_core.url_safety import is_ip_blocked
 
 
 def config(bot):
@@ -19,7 +20,7 @@ def config(bot):
         "commands": ["ip"],
         "permissions": ["user"],
         "help": "Look up information about an IP address or hostname.\n"
-        "Usage: !ip <hostname|ip> - Show IP information",
+        "Usage: !ip <hostname|ip> [<hostname|ip>...] - Show IP information",
     }
 
 
@@ -34,25 +35,20 @@ def run(bot, event):
         bot.add_response("Please provide an IP address or hostname (e.g., !ip 8.8.8.8 or !ip google.com)")
         return
 
+    targets, dropped = split_targets(query)
+    if len(targets) > 1:
+        return fan_out(bot, lookup_host, targets, dropped)
+
+    lookup_host(bot, query)
+
+
+def lookup_host(bot, query):
+    """Resolve a hostname or IP address and show information on its addresses"""
     try:
         # Try to resolve the hostname to an IP address
         try:
-            ip_addresses = socket.getaddrinfo(query, None)
-            # Get unique IPs (both IPv4 and IPv6)
-            unique_ips = set()
-            for addr_info in ip_addresses:
-                family, socktype, proto, canonname, sockaddr = addr_info
-                if family == socket.AF_INET:  # IPv4
-                    unique_ips.add(sockaddr[0])
-                elif family == socket.AF_INET6:  # IPv6
-                    unique_ips.add(sockaddr[0])
-
-            # If the query itself is an IP address, just use that
-            try:
-                ipaddress.ip_address(query)
-                unique_ips = {query}
-            except ValueError:
-                pass
+            # Get unique IPs (both IPv4 and IPv6); IP literals resolve to themselves
+            unique_ips = resolve(query)
 
             if not unique_ips:
                 bot.add_response(f"Could not resolve any IP addresses for: {query}")
@@ -61,18 +57,14 @@ def run(bot, event):
             # Filter out private/blocked addresses before reporting
             public_ips = []
             for ip in unique_ips:
-                try:
-                    addr = netaddr.IPAddress(ip)
-                    if any(addr in net for net in BLOCKED_NETWORKS):
-                        bot.logger.warning(f"IP lookup blocked for private address: {ip}")
-                        bot.add_response(f"Resolved address {ip} is a private/reserved address.")
-                        continue
-                except (netaddr.AddrFormatError, ValueError):
-                    pass
+                if is_ip_blocked(ip):
+                    bot.logger.warning(f"IP lookup blocked for private address: {ip}")
+                    bot.add_response(f"Resolved address {ip} is a private/reserved address.")
+                    continue
                 public_ips.append(ip)
 
             for ip in public_ips:
-                ip_info = get_ip_info(ip)
+                ip_info = get_ip_info(ip, asn_table=bot.dataset("ipasn"), geoip=bot.dataset("geoip"))
                 bot.add_response(ip_info)
 
         except socket.gaierror:
@@ -84,8 +76,13 @@ def run(bot, event):
         bot.add_response("Error looking up IP information.")
 
 
-def get_ip_info(ip):
-    """Get information about an IP address"""
+def get_ip_info(ip, asn_table=None, geoip=None):
+    """Get information about an IP address
+
+    The origin AS comes from the local routing table and the location from
+    the local GeoIP database when they are loaded; ip-api.com is only
+    queried when no GeoIP database is available.
+    """
     try:
         # Parse the IP address
         ip_obj = ipaddress.ip_address(ip)
@@ -113,7 +110,12 @@ def get_ip_info(ip):
 
         # Get geolocation information for public IPs
         geo_info = ""
-        if ip_obj.is_global and not ip_obj.is_private:
+        if ip_obj.is_global and geoip is not None:
+            location = geoip.location(ip) or "Unknown"
+            geo_info = f" | Location: {location}"
+            if asn_table is not None:
+                geo_info += f" | {format_origin(asn_table.lookup(ip))}"
+        elif ip_obj.is_global and not ip_obj.is_private:
             try:
                 response = requests.get(f"https://ip-api.com/json/{ip}?fields=country,regionName,city,isp,org,as", timeout=5)
                 if response.status_code == 200:
@@ -130,11 +132,15 @@ def get_ip_info(ip):
                     isp = data.get("isp", "Unknown")
                     org = data.get("org", "Unknown")
                     asn = data.get("as", "Unknown")
+                    if asn_table is not None:
+                        asn = format_origin(asn_table.lookup(ip))
 
                     geo_info = f" | Location: {location} | ISP: {isp} | Organization: {org} | {asn}"
             except Exception:
                 # If geolocation fails, continue without it
                 pass
+            if not geo_info and asn_table is not None:
+                geo_info = f" | {format_origin(asn_table.lookup(ip))}"
 
         # Format the result
         result = f"IP: {ip} | Type: {ip_version}, {ip_type_str}{geo_info}"
@@ -142,3 +148,11 @@ def get_ip_info(ip):
 
     except Exception as e:
         return f"Error processing IP {ip}: {str(e)}"
+
+
+def format_origin(info):
+    """Format an AsnInfo from the local routing table"""
+    if info is None:
+        return "Not announced"
+    name = f" {info.name}" if info.name else ""
+    return f"AS{info.asn}{name} ({info.prefix})"
@@ -7,6 +7,8 @@
 import requests
 from netaddr import IPNetwork
 
+from phreakbot_core.fanout import fan_out, split_targets
+
 
 def config(bot):
     """Return module configuration"""
@@ -15,7 +17,7 @@ def config(bot):
         "commands": ["irr", "irrexplorer", "roa"],
         "permissions": ["user"],
         "help": "Check routing information for an IP or prefix using IRRExplorer.\n"
-        "Usage: !irr <ip_or_prefix> - Show IRRExplorer information\n"
+        "Usage: !irr <ip_or_prefix> [<ip_or_prefix>...] - Show IRRExplorer information\n"
         "       !roa <ip_or_prefix> - Alias for !irr (checks ROA status)\n"
         "       !irrexplorer <ip_or_prefix> - Alias for !irr",
     }
@@ -39,11 +41,19 @@ def _print_items(bot, results, status):
 
 def run(bot, event):
     """Handle IRRExplorer commands"""
-    net = event["command_args"]
-    if not net:
+    targets, dropped = split_targets(event["command_args"] or "")
+    if not targets:
         bot.add_response("Please specify an IP address or prefix to check.")
         return
 
+    if len(targets) > 1:
+        return fan_out(bot, check_prefix, targets, dropped)
+
+    check_prefix(bot, targets[0])
+
+
+def check_prefix(bot, net):
+    """Show the IRRExplorer report of one IP address or prefix"""
     try:
         # typecast to IPNetwork so we know it's a valid IP or prefix
         IPNetwork(net)
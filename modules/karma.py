@@ -4,7 +4,8 @@
 Karma module for PhreakBot
 """
 import re
-import psycopg2.extras
+
+from phreakbot_core.repositories import DatabaseUnavailable, Karma
 
 
 def config(bot):
@@ -42,7 +43,7 @@ def _handle_karma_pattern(bot, event):
         return False
 
     item = match.group(1).lower()
-    direction = "up" if match.group(2) == "++" else "down"
+    delta = 1 if match.group(2) == "++" else -1
     reason = match.group(3)
     channel = event.get("channel", "")
 
@@ -50,57 +51,18 @@ def _handle_karma_pattern(bot, event):
         bot.reply("You can't give karma to yourself!")
         return True
 
-    conn = bot.db_get()
-    if not conn:
-        bot.reply("Database connection is not available.")
-        return True
-
     try:
-        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        cur.execute("SELECT * FROM phreakbot_karma WHERE LOWER(item) = LOWER(%s) AND channel = %s", (item, channel))
-        karma_item = cur.fetchone()
-
-        if direction == "up":
-            if karma_item:
-                cur.execute("UPDATE phreakbot_karma SET karma = karma + 1 WHERE id = %s", (karma_item["id"],))
-                karma_value = karma_item["karma"] + 1
-            else:
-                cur.execute("INSERT INTO phreakbot_karma (item, karma, channel) VALUES (%s, 1, %s) RETURNING id, karma", (item, channel))
-                karma_value = cur.fetchone()["karma"]
-        else:
-            if karma_item:
-                cur.execute("UPDATE phreakbot_karma SET karma = karma - 1 WHERE id = %s", (karma_item["id"],))
-                karma_value = karma_item["karma"] - 1
-            else:
-                cur.execute("INSERT INTO phreakbot_karma (item, karma, channel) VALUES (%s, -1, %s) RETURNING id, karma", (item, channel))
-                karma_value = cur.fetchone()["karma"]
-
-        if reason:
-            # Need to get the karma_id first
-            cur.execute(
-                "SELECT id FROM phreakbot_karma WHERE LOWER(item) = LOWER(%s) AND channel = %s",
-                (item, channel),
-            )
-            karma_row = cur.fetchone()
-            if karma_row:
-                cur.execute(
-                    "INSERT INTO phreakbot_karma_why (karma_id, reason, direction, channel) VALUES (%s, %s, %s, %s)",
-                    (karma_row["id"], reason, direction, channel),
-                )
-
-        conn.commit()
-        cur.close()
-        bot.db_return(conn)
-        bot.reply(f"{item} now has {karma_value} karma")
+        karma_value = Karma(bot).change(item, channel, delta, reason)
+    except DatabaseUnavailable:
+        bot.reply("Database connection is not available.")
         return True
-
     except Exception as e:
         bot.logger.error(f"Error in karma module: {e}")
-        conn.rollback()
-        cur.close()
-        bot.db_return(conn)
         return True
 
+    bot.reply(f"{item} now has {karma_value} karma")
+    return True
+
 
 def _cmd_karma(bot, event):
     args = event["command_args"].strip()
@@ -110,47 +72,34 @@ def _cmd_karma(bot, event):
 
     item = args.split()[0].lower()
     channel = event.get("channel", "")
-    conn = bot.db_get()
-    if not conn:
-        bot.reply("Database connection is not available.")
-        return True
+    karma = Karma(bot)
 
     try:
-        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        cur.execute("SELECT * FROM phreakbot_karma WHERE LOWER(item) = LOWER(%s) AND channel = %s", (item, channel))
-        karma_item = cur.fetchone()
-
-        if not karma_item:
-            bot.reply(f"'{item}' has no karma.")
-            cur.close()
-            bot.db_return(conn)
-            return True
-
-        cur.execute(
-            "SELECT kw.* FROM phreakbot_karma_why kw JOIN phreakbot_karma k ON kw.karma_id = k.id WHERE LOWER(k.item) = LOWER(%s) AND k.channel = %s ORDER BY kw.id DESC LIMIT 3",
-            (item, channel),
-        )
-        reasons = cur.fetchall()
-
-        response = f"{item} has {karma_item['karma']} karma"
-        if reasons:
-            response += " - Recent reasons: "
-            reason_texts = []
-            for reason in reasons:
-                direction = "+" if reason["direction"] == "up" else "-"
-                reason_texts.append(f"{direction}1 for {reason['reason']}")
-            response += ", ".join(reason_texts)
-
-        bot.reply(response)
-        cur.close()
-        bot.db_return(conn)
+        karma_item = karma.get(item, channel)
+        reasons = karma.reasons(item, channel) if karma_item else []
+    except DatabaseUnavailable:
+        bot.reply("Database connection is not available.")
         return True
-
     except Exception as e:
         bot.logger.error(f"Error in karma module: {e}")
-        bot.db_return(conn)
         return True
 
+    if not karma_item:
+        bot.reply(f"'{item}' has no karma.")
+        return True
+
+    response = f"{item} has {karma_item.karma} karma"
+    if reasons:
+        response += " - Recent reasons: "
+        reason_texts = []
+        for reason in reasons:
+            direction = "+" if reason.direction == "up" else "-"
+            reason_texts.append(f"{direction}1 for {reason.reason}")
+        response += ", ".join(reason_texts)
+
+    bot.reply(response)
+    return True
+
 
 def _cmd_topkarma(bot, event):
     args = event["command_args"].strip()
@@ -161,39 +110,30 @@ def _cmd_topkarma(bot, event):
             limit = 10
 
     channel = event.get("channel", "")
-    conn = bot.db_get()
-    if not conn:
-        bot.reply("Database connection is not available.")
-        return True
+    karma = Karma(bot)
 
     try:
-        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-
-        cur.execute("SELECT * FROM phreakbot_karma WHERE karma > 0 AND channel = %s ORDER BY karma DESC LIMIT %s", (channel, limit))
-        top_positive = cur.fetchall()
-
-        cur.execute("SELECT * FROM phreakbot_karma WHERE karma < 0 AND channel = %s ORDER BY karma ASC LIMIT %s", (channel, limit))
-        top_negative = cur.fetchall()
-
-        if top_positive:
-            bot.reply(f"Top {len(top_positive)} positive karma:")
-            karma_texts = [f"{item['item']}: {item['karma']}" for item in top_positive]
-            bot.reply(", ".join(karma_texts))
-        else:
-            bot.reply("No positive karma found.")
-
-        if top_negative:
-            bot.reply(f"Top {len(top_negative)} negative karma:")
-            karma_texts = [f"{item['item']}: {item['karma']}" for item in top_negative]
-            bot.reply(", ".join(karma_texts))
-        else:
-            bot.reply("No negative karma found.")
-
-        cur.close()
-        bot.db_return(conn)
+        top_positive = karma.top(channel, limit)
+        top_negative = karma.top(channel, limit, positive=False)
+    except DatabaseUnavailable:
+        bot.reply("Database connection is not available.")
         return True
-
     except Exception as e:
         bot.logger.error(f"Error in karma module: {e}")
-        bot.db_return(conn)
         return True
+
+    if top_positive:
+        bot.reply(f"Top {len(top_positive)} positive karma:")
+        karma_texts = [f"{item.item}: {item.karma}" for item in top_positive]
+        bot.reply(", ".join(karma_texts))
+    else:
+        bot.reply("No positive karma found.")
+
+    if top_negative:
+        bot.reply(f"Top {len(top_negative)} negative karma:")
+        karma_texts = [f"{item.item}: {item.karma}" for item in top_negative]
+        bot.reply(", ".join(karma_texts))
+    else:
+        bot.reply("No negative karma found.")
+
+    return True
@@ -6,12 +6,12 @@
 
 import asyncio
 
-# Dictionary to track scheduled unbans
-scheduled_unbans = {}
+UNBAN_ACTION = "kickban.unban"
 
 
 def config(bot):
     """Return module configuration"""
+    bot.add_timer_action(UNBAN_ACTION, _timed_unban)
     return {
         "events": [],
         "commands": ["kick", "kickban", "unban"],
@@ -231,6 +231,7 @@ def _unban_user(bot, event):
                 await bot.set_mode(channel, "-b", hostmask)
 
             asyncio.create_task(unban())
+            bot.cancel_timer(UNBAN_ACTION, _unban_key(channel, hostmask))
             bot.add_response(f"Unbanned {hostmask} from {channel}")
         except Exception as e:
             bot.logger.error(f"Error unbanning {hostmask}: {str(e)}")
@@ -240,37 +241,30 @@ def _unban_user(bot, event):
         bot.add_response(f"Error unbanning {hostmask}: {str(e)}")
 
 
-async def _unban_after_delay(bot, channel, hostmask, minutes):
-    """Wait for the specified minutes, then unban"""
-    await asyncio.sleep(minutes * 60)
-    key = f"{channel}:{hostmask}"
-    try:
-        bot.logger.info(f"Auto-unbanning {hostmask} in {channel}")
-        await bot.set_mode(channel, "-b", hostmask)
-        bot.add_response(f"Auto-unban: {hostmask} has been unbanned")
-    except Exception as e:
-        bot.logger.error(f"Error in auto-unban: {str(e)}")
-    finally:
-        if key in scheduled_unbans:
-            del scheduled_unbans[key]
+async def _timed_unban(bot, payload):
+    """Timer action lifting a temporary ban"""
+    channel, hostmask = payload["channel"], payload["hostmask"]
+    bot.logger.info(f"Auto-unbanning {hostmask} in {channel}")
+    await bot.set_mode(channel, "-b", hostmask)
+    await bot.message(channel, f"Auto-unban: {hostmask} has been unbanned")
 
 
-def _schedule_unban(bot, channel, hostmask, minutes):
-    """Schedule an unban after the specified number of minutes"""
-    key = f"{channel}:{hostmask}"
+def _unban_key(channel, hostmask):
+    return f"{channel}:{hostmask}".lower()
 
-    # Cancel any existing scheduled unban for this hostmask in this channel
-    if key in scheduled_unbans:
-        scheduled_unbans[key].cancel()
 
+def _schedule_unban(bot, channel, hostmask, minutes):
+    """Schedule an unban after the specified number of minutes"""
     bot.logger.info(
         f"Scheduling unban for {hostmask} in {channel} in {minutes} minutes"
     )
-
-    task = asyncio.create_task(
-        _unban_after_delay(bot, channel, hostmask, minutes)
+    # Replaces any pending unban for this hostmask in this channel
+    bot.schedule(
+        minutes * 60,
+        UNBAN_ACTION,
+        {"channel": channel, "hostmask": hostmask},
+        key=_unban_key(channel, hostmask),
     )
-    scheduled_unbans[key] = task
 
 
 def _has_permission(bot, event):
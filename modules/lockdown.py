@@ -5,9 +5,15 @@
 # Lockdown module - Allows channel operators to lock down a channel
 #
 
-import time
+import asyncio
 import traceback
 
+KICK_REASON = "Channel lockdown: unregistered users are not allowed during lockdown"
+
+# Kick tasks still running; the event loop only keeps weak references
+_kick_tasks = set()
+
+
 def config(pb):
     """Return module configuration"""
     return {
@@ -20,7 +26,8 @@ def config(pb):
         "permissions": ["admin", "owner"]
     }
 
-def run(pb, event):
+
+async def run(pb, event):
     """Handle lockdown commands"""
     if event["command"] == "lockdown":
         channel = event["channel"]
@@ -31,72 +38,33 @@ def run(pb, event):
             return
 
         # Set channel mode +im (invite-only and moderated)
-        pb.connection.mode(channel, "+im")
-
-        # Get list of users who aren't registered
-        kicked_count = 0
-
-        # Check if the channel exists in the bot's channels dictionary
-        if channel in pb.channels:
-            pb.logger.info(f"Checking users in {channel} for lockdown kick")
-
-            try:
-                # Get all users in the channel
-                users = list(pb.channels[channel].users())
-                pb.logger.info(f"Users in {channel}: {users}")
-
-                # Process each user in the channel
-                for nick in users:
-                    # Skip the bot itself
-                    if nick == pb.connection.get_nickname():
-                        continue
-
-                    pb.logger.info(f"Checking if {nick} is registered")
-
-                    try:
-                        # Create a hostmask for the user (this is an approximation)
-                        user_hostmask = f"{nick}!{nick}@{pb.connection.server}"
-
-                        # Check if user is in the database (registered)
-                        user_info = pb.db_get_userinfo_by_userhost(user_hostmask)
-
-                        # Also try by username directly as a fallback
-                        if not user_info:
-                            # Try to get user info from the database by username
-                            conn = pb.db_get()
-                            if conn:
-                                try:
-                                    cur = conn.cursor()
-                                    cur.execute(
-                                        "SELECT * FROM phreakbot_users WHERE username ILIKE %s", (nick.lower(),)
-                                    )
-                                    user_by_username = cur.fetchone()
-                                    cur.close()
-
-                                    if user_by_username:
-                                        user_info = True  # Just need to know they exist
-                                finally:
-                                    pb.db_return(conn)
-
-                        pb.logger.info(f"User info for {nick} ({user_hostmask}): {user_info is not None}")
-
-                        if not user_info:
-                            # User is not registered, kick them
-                            pb.logger.info(f"Kicking unregistered user {nick}")
-                            pb.connection.kick(channel, nick, "Channel lockdown: unregistered users are not allowed during lockdown")
-                            kicked_count += 1
-                        else:
-                            pb.logger.info(f"User {nick} is registered, not kicking")
-                    except Exception as e:
-                        pb.logger.error(f"Error checking user {nick}: {str(e)}")
-                        pb.logger.error(f"Traceback: {traceback.format_exc()}")
-            except Exception as e:
-                pb.logger.error(f"Error processing users in {channel}: {str(e)}")
-                pb.logger.error(f"Traceback: {traceback.format_exc()}")
-        else:
+        await pb.set_mode(channel, "+im")
+
+        if channel not in pb.channels:
             pb.logger.warning(f"Channel {channel} not found in bot's channels dictionary")
+            pb.reply(f"Channel {channel} is now locked down (mode +im).")
+            return
 
-        pb.reply(f"Channel {channel} is now locked down (mode +im). Kicked {kicked_count} unregistered users.")
+        members = [nick for nick in pb.channels[channel]["users"] if nick.lower() != pb.nickname.lower()]
+        pb.logger.info(f"Checking {len(members)} users in {channel} for lockdown kick")
+
+        loop = asyncio.get_running_loop()
+        try:
+            registered = await loop.run_in_executor(None, find_registered, pb, members)
+        except Exception as e:
+            pb.logger.error(f"Error checking users in {channel}: {str(e)}")
+            pb.logger.error(f"Traceback: {traceback.format_exc()}")
+            pb.reply(f"Channel {channel} is now locked down (mode +im). Could not check registrations, nobody was kicked.")
+            return
+
+        unregistered = [nick for nick in members if nick not in registered]
+        if unregistered:
+            # Kicks are paced; the reply does not wait for the last of them
+            task = asyncio.create_task(_kick(pb, channel, unregistered))
+            _kick_tasks.add(task)
+            task.add_done_callback(_kick_tasks.discard)
+
+        pb.reply(f"Channel {channel} is now locked down (mode +im). Kicking {len(unregistered)} unregistered users.")
 
     elif event["command"] == "unlock":
         channel = event["channel"]
@@ -107,5 +75,41 @@ def run(pb, event):
             return
 
         # Set channel mode -im (remove invite-only and moderated)
-        pb.connection.mode(channel, "-im")
+        await pb.set_mode(channel, "-im")
         pb.reply(f"Channel {channel} is now unlocked (mode -im).")
+
+
+async def _kick(pb, channel, nicks):
+    try:
+        batches = await pb.kick_many(channel, nicks, KICK_REASON)
+        pb.logger.info(f"Kicked {len(nicks)} unregistered users from {channel} in {batches} KICKs")
+    except Exception as e:
+        pb.logger.error(f"Lockdown kicks in {channel} failed: {str(e)}")
+
+
+def find_registered(pb, members):
+    """Return the members known to the user database, in one query. Blocking.
+
+    A member is registered if their tracked hostmask or their nick
+    (as username) is in the database, as for db_get_userinfo_by_userhost.
+    """
+    if not members:
+        return set()
+    hostmasks = {nick: pb.user_hostmasks.get(nick.lower(), "").lower() for nick in members}
+
+    conn = pb.db_get()
+    if not conn:
+        raise RuntimeError("database connection is not available")
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT lower(hostmask) FROM phreakbot_hostmasks WHERE lower(hostmask) = ANY(%s) "
+            "UNION ALL SELECT lower(username) FROM phreakbot_users WHERE lower(username) = ANY(%s)",
+            ([mask for mask in hostmasks.values() if mask], [nick.lower() for nick in members]),
+        )
+        known = {row[0] for row in cur.fetchall()}
+        cur.close()
+    finally:
+        pb.db_return(conn)
+
+    return {nick for nick in members if nick.lower() in known or hostmasks[nick] in known}
@@ -3,9 +3,12 @@
 #
 # MAC address lookup module for PhreakBot
 
+import os
 import re
 import requests
 
+from phreakbot_core.oui import OuiDatabase
+
 
 def config(bot):
     """Return module configuration"""
@@ -38,7 +41,12 @@ def run(bot, event):
             return
 
         # Get MAC address information
-        mac_info = get_mac_info(mac_address)
+        mac_info = get_mac_info(
+            mac_address,
+            oui_db=get_oui_db(bot),
+            remote=bot.config.get("mac_remote_lookup", True),
+            api_key=bot.config.get("macaddress_io_api_key"),
+        )
         bot.add_response(mac_info)
 
     except Exception as e:
@@ -62,57 +70,99 @@ def clean_mac_address(mac):
     return mac.upper()
 
 
-def get_mac_info(mac):
-    """Get information about a MAC address"""
+def get_oui_db(bot):
+    """Return the local IEEE registry, reopening it if it was updated on disk
+
+    If there was no usable database at startup, it is opened once the file
+    appears. A file that fails to open is retried only when it changes;
+    until then the previous database, if any, keeps answering.
+    """
+    db = getattr(bot, "oui_db", None)
+    if db is not None and not db.changed():
+        return db
+
+    path = db.path if db is not None else bot.config.get("oui_db_path", "data/oui.bin")
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return db
+    if mtime == getattr(bot, "_oui_db_failed_mtime", None):
+        return db
+    new_db = OuiDatabase.open_optional(path, bot.logger)
+    if new_db is None:
+        bot._oui_db_failed_mtime = mtime
+        return db
+    bot.oui_db = new_db
+    if db is not None:
+        db.close()
+    return new_db
+
+
+def get_mac_info(mac, oui_db=None, remote=True, api_key=None):
+    """Get information about a MAC address
+
+    The local IEEE registry is consulted first. Remote APIs are only
+    queried when it has no answer and ``remote`` is enabled; macaddress.io
+    is used only if an API key is configured.
+    """
     try:
         # Format MAC for display
         formatted_mac = format_mac_for_display(mac)
 
+        # Check if this is a partial MAC address
+        is_partial = len(mac) < 12
+        partial_note = " (Partial MAC - showing OUI information only)" if is_partial else ""
+
+        if oui_db is not None:
+            entry = oui_db.lookup(mac)
+            if entry:
+                result = f"MAC: {formatted_mac}{partial_note} | Vendor: {entry.organization}"
+                if entry.address:
+                    result += f" | Address: {entry.address}"
+                return result + f" | Block Type: {entry.registry} ({entry.prefix}/{entry.bits})"
+
+        if not remote:
+            return f"MAC: {formatted_mac} | Vendor: Unknown (No information found)"
+
         # For OUI lookup, we need the first 6 characters (3 bytes)
         oui = mac[:6]
 
-        # Use the macaddress.io API for lookup
-        api_url = f"https://api.macaddress.io/v1?apiKey=at_XqJi1rAyYWQwMNBcOUGOdA7aMFKH8&output=json&search={oui}"
+        if api_key:
+            response = requests.get(
+                "https://api.macaddress.io/v1",
+                params={"apiKey": api_key, "output": "json", "search": oui},
+                timeout=5,
+            )
 
-        response = requests.get(api_url, timeout=5)
+            if response.status_code == 200:
+                data = response.json()
 
-        if response.status_code == 200:
-            data = response.json()
+                # Extract vendor information
+                vendor_name = data.get("vendorDetails", {}).get("companyName", "Unknown")
+                vendor_address = data.get("vendorDetails", {}).get("companyAddress", "Unknown")
 
-            # Extract vendor information
-            vendor_name = data.get("vendorDetails", {}).get("companyName", "Unknown")
-            vendor_address = data.get("vendorDetails", {}).get("companyAddress", "Unknown")
+                # Format the result
+                result = f"MAC: {formatted_mac}{partial_note} | Vendor: {vendor_name} | Address: {vendor_address}"
 
-            # Check if this is a partial MAC address
-            is_partial = len(mac) < 12
-            partial_note = " (Partial MAC - showing OUI information only)" if is_partial else ""
+                # Add block type information if available
+                block_type = data.get("blockDetails", {}).get("blockType", None)
+                if block_type:
+                    result += f" | Block Type: {block_type}"
 
-            # Format the result
-            result = f"MAC: {formatted_mac}{partial_note} | Vendor: {vendor_name} | Address: {vendor_address}"
+                return result
+
+        # Fallback to the keyless macvendors.com API
+        api_url = f"https://api.macvendors.com/{oui}"
+        response = requests.get(api_url, timeout=5)
 
-            # Add block type information if available
-            block_type = data.get("blockDetails", {}).get("blockType", None)
-            if block_type:
-                result += f" | Block Type: {block_type}"
+        if response.status_code == 200:
+            vendor_name = response.text.strip()
 
+            # Format the result
+            result = f"MAC: {formatted_mac}{partial_note} | Vendor: {vendor_name}"
             return result
         else:
-            # Fallback to macvendors.co API if the first one fails
-            api_url = f"https://api.macvendors.com/{oui}"
-            response = requests.get(api_url, timeout=5)
-
-            if response.status_code == 200:
-                vendor_name = response.text.strip()
-
-                # Check if this is a partial MAC address
-                is_partial = len(mac) < 12
-                partial_note = " (Partial MAC - showing OUI information only)" if is_partial else ""
-
-                # Format the result
-                result = f"MAC: {formatted_mac}{partial_note} | Vendor: {vendor_name}"
-                return result
-            else:
-                return f"MAC: {formatted_mac} | Vendor: Unknown (No information found)"
+            return f"MAC: {formatted_mac} | Vendor: Unknown (No information found)"
 
     except Exception as e:
         return f"Error processing MAC {mac}: {str(e)}"
@@ -4,8 +4,12 @@
 # Mass Meet module for PhreakBot
 # Registers all users in channels and merges hostmasks
 
+import asyncio
+import time
 import traceback
 
+from psycopg2.extras import execute_values
+
 
 def config(bot):
     """Return module configuration"""
@@ -18,188 +22,151 @@ def config(bot):
     }
 
 
-def run(bot, event):
+async def run(bot, event):
     """Handle massmeet command"""
     if event["command"] != "massmeet":
         return
 
-    # Check if the database connection is available
-    conn = bot.db_get()
-    if not conn:
+    current_channel = event["channel"]
+    if current_channel not in bot.channels:
+        bot.logger.warning(f"Channel {current_channel} not in bot.channels")
+        bot.add_response(f"Could not access channel {current_channel}")
+        return
+
+    if bot.db_pool is None:
         bot.add_response("Database connection is not available.")
         return
 
-    bot.add_response("Starting mass meet process. This may take a moment...")
+    started = time.perf_counter()
+
+    # One WHO round gives the hostmask of everyone, not only of the users
+    # that joined or spoke since the bot did
+    users = await bot.who(current_channel)
+    skipped = 0
+    for nick in bot.channels[current_channel].get("users", {}):
+        if nick not in users:
+            hostmask = bot.user_hostmasks.get(nick.lower())
+            if hostmask:
+                users[nick] = hostmask
+            else:
+                skipped += 1
+    users.pop(bot.nickname, None)
+    bot.logger.info(f"Found {len(users)} users with a hostmask in {current_channel}")
+
+    loop = asyncio.get_running_loop()
+    try:
+        stats = await loop.run_in_executor(None, register_users, bot, users)
+    except Exception as e:
+        bot.logger.error(f"Error in massmeet module: {e}")
+        bot.logger.error(f"Traceback: {traceback.format_exc()}")
+        bot.add_response("Error during mass meet process.")
+        return
+
+    # Report results
+    summary = (
+        f"Mass meet complete! "
+        f"Processed {stats['total_users']} users: "
+        f"{stats['registered_new']} new registrations, "
+        f"{stats['merged_hostmasks']} hostmasks merged, "
+        f"{stats['already_registered']} already registered, "
+        f"{stats['skipped'] + skipped} skipped "
+        f"in {time.perf_counter() - started:.2f}s."
+    )
+    bot.add_response(summary)
+
+
+def register_users(bot, users):
+    """Register {nick: hostmask} in one transaction with set-based queries. Blocking.
+
+    Existing rows are found with ``lower(...) = ANY`` lookups on the
+    lower() indexes instead of ILIKE per user, so rows stored with mixed
+    case are found too.
+    """
+    by_nick = {}
+    seen_hostmasks = set()
+    for nick, hostmask in users.items():
+        nick, hostmask = nick.lower(), hostmask.lower()
+        if nick not in by_nick and hostmask not in seen_hostmasks:
+            by_nick[nick] = hostmask
+            seen_hostmasks.add(hostmask)
 
-    # Statistics to track actions
     stats = {
-        "total_users": 0,
+        "total_users": len(by_nick),
         "registered_new": 0,
         "merged_hostmasks": 0,
         "already_registered": 0,
-        "errors": 0,
-        "skipped": 0,
+        "skipped": len(users) - len(by_nick),
     }
+    if not by_nick:
+        return stats
 
+    conn = bot.db_get()
+    if not conn:
+        raise RuntimeError("database connection is not available")
     try:
-        # Get all users from all channels
-        all_users = {}
-
-        # Get the current channel from the event
-        current_channel = event["channel"]
-        bot.logger.info(f"Processing channel: {current_channel}")
-
-        # Get users from the channel
-        if current_channel in bot.channels:
-            channel_users = bot.channels[current_channel].get("users", {})
-            bot.logger.info(f"Found {len(channel_users)} users in {current_channel}")
-
-            for nick in channel_users:
-                if nick.lower() == bot.nickname.lower():
-                    continue
-
-                try:
-                    # Try to get hostmask from cache first
-                    if nick.lower() in bot.user_hostmasks:
-                        hostmask = bot.user_hostmasks[nick.lower()]
-                        bot.logger.info(f"Using cached hostmask for {nick}: {hostmask}")
-                    else:
-                        # Skip users without cached hostmask for now
-                        bot.logger.warning(f"No cached hostmask for {nick}, skipping")
-                        stats["skipped"] += 1
-                        continue
-
-                    all_users[nick] = hostmask
-                except Exception as e:
-                    bot.logger.error(f"Error getting hostmask for {nick}: {e}")
-                    stats["errors"] += 1
-                    continue
-        else:
-            bot.logger.warning(f"Channel {current_channel} not in bot.channels")
-            bot.add_response(f"Could not access channel {current_channel}")
-            bot.db_return(conn)
-            return
-
-        stats["total_users"] = len(all_users)
-        bot.logger.info(f"Found {len(all_users)} users to process")
-
-        # Process each user
         cur = conn.cursor()
-
-        for nickname, hostmask in all_users.items():
-            try:
-                bot.logger.info(
-                    f"Processing user: {nickname} with hostmask: {hostmask}"
-                )
-
-                # Check if the user exists in the database by nickname
-                cur.execute(
-                    "SELECT id, username FROM phreakbot_users WHERE username ILIKE %s",
-                    (nickname.lower(),),
-                )
-                user_by_name = cur.fetchone()
-
-                # Check if the hostmask is associated with any user
-                cur.execute(
-                    "SELECT u.id, u.username FROM phreakbot_users u JOIN phreakbot_hostmasks h ON u.id = h.users_id WHERE h.hostmask ILIKE %s",
-                    (hostmask.lower(),),
+        cur.execute(
+            "SELECT lower(username), id FROM phreakbot_users WHERE lower(username) = ANY(%s)",
+            (list(by_nick),),
+        )
+        user_ids = dict(cur.fetchall())
+        cur.execute(
+            "SELECT lower(hostmask), users_id FROM phreakbot_hostmasks WHERE lower(hostmask) = ANY(%s)",
+            (list(seen_hostmasks),),
+        )
+        hostmask_owners = dict(cur.fetchall())
+
+        new_users = []
+        new_hostmasks = []
+        for nick, hostmask in by_nick.items():
+            user_id = user_ids.get(nick)
+            owner = hostmask_owners.get(hostmask)
+            if user_id is not None and owner == user_id:
+                stats["already_registered"] += 1
+            elif owner is not None:
+                # Hostmask belongs to another user
+                stats["skipped"] += 1
+            elif user_id is not None:
+                new_hostmasks.append((user_id, hostmask))
+                stats["merged_hostmasks"] += 1
+            else:
+                new_users.append(nick)
+
+        if new_users:
+            # A user registered concurrently is not returned and not counted
+            created = execute_values(
+                cur,
+                "INSERT INTO phreakbot_users (username) VALUES %s "
+                "ON CONFLICT (username) DO NOTHING RETURNING id, username",
+                [(nick,) for nick in new_users],
+                page_size=1000,
+                fetch=True,
+            )
+            stats["registered_new"] = len(created)
+            stats["skipped"] += len(new_users) - len(created)
+            new_hostmasks.extend((user_id, by_nick[nick]) for user_id, nick in created)
+            if created:
+                execute_values(
+                    cur,
+                    "INSERT INTO phreakbot_perms (users_id, permission) VALUES %s ON CONFLICT DO NOTHING",
+                    [(user_id, "user") for user_id, _ in created],
+                    page_size=1000,
                 )
-                user_by_hostmask = cur.fetchone()
-
-                # Case 1: User exists by name and hostmask matches the same user
-                if (
-                    user_by_name
-                    and user_by_hostmask
-                    and user_by_name[0] == user_by_hostmask[0]
-                ):
-                    bot.logger.info(
-                        f"User {nickname} already registered with matching hostmask"
-                    )
-                    stats["already_registered"] += 1
-                    continue
-
-                # Case 2: User exists by name but hostmask doesn't match or is not registered
-                if user_by_name and (
-                    not user_by_hostmask or user_by_name[0] != user_by_hostmask[0]
-                ):
-                    # Merge the hostmask to the existing user
-                    if user_by_hostmask:
-                        bot.logger.info(
-                            f"Hostmask {hostmask} already associated with user {user_by_hostmask[1]}, skipping"
-                        )
-                        stats["skipped"] += 1
-                        continue
-
-                    bot.logger.info(
-                        f"Merging hostmask {hostmask} to user {user_by_name[1]}"
-                    )
-                    cur.execute(
-                        "INSERT INTO phreakbot_hostmasks (users_id, hostmask) VALUES (%s, %s)",
-                        (user_by_name[0], hostmask.lower()),
-                    )
-                    stats["merged_hostmasks"] += 1
-                    continue
-
-                # Case 3: User doesn't exist by name but hostmask is registered
-                if not user_by_name and user_by_hostmask:
-                    bot.logger.info(
-                        f"Nickname {nickname} not in database but hostmask {hostmask} is registered to {user_by_hostmask[1]}, skipping"
-                    )
-                    stats["skipped"] += 1
-                    continue
-
-                # Case 4: User doesn't exist by name or hostmask - register new user
-                if not user_by_name and not user_by_hostmask:
-                    bot.logger.info(
-                        f"Registering new user {nickname} with hostmask {hostmask}"
-                    )
-
-                    # Create new user
-                    cur.execute(
-                        "INSERT INTO phreakbot_users (username) VALUES (%s) RETURNING id",
-                        (nickname.lower(),),
-                    )
-                    user_id = cur.fetchone()[0]
-
-                    # Add hostmask
-                    cur.execute(
-                        "INSERT INTO phreakbot_hostmasks (users_id, hostmask) VALUES (%s, %s)",
-                        (user_id, hostmask.lower()),
-                    )
-
-                    # Add user permission
-                    cur.execute(
-                        "INSERT INTO phreakbot_perms (users_id, permission) VALUES (%s, %s)",
-                        (user_id, "user"),
-                    )
-
-                    stats["registered_new"] += 1
-
-            except Exception as e:
-                bot.logger.error(f"Error processing user {nickname}: {e}")
-                stats["errors"] += 1
-
-        # Commit all changes
+        if new_hostmasks:
+            execute_values(
+                cur,
+                "INSERT INTO phreakbot_hostmasks (users_id, hostmask) VALUES %s ON CONFLICT (hostmask) DO NOTHING",
+                new_hostmasks,
+                page_size=1000,
+            )
         conn.commit()
         cur.close()
-        bot.db_return(conn)
-
-        # Report results
-        summary = (
-            f"Mass meet complete! "
-            f"Processed {stats['total_users']} users: "
-            f"{stats['registered_new']} new registrations, "
-            f"{stats['merged_hostmasks']} hostmasks merged, "
-            f"{stats['already_registered']} already registered, "
-            f"{stats['skipped']} skipped, "
-            f"{stats['errors']} errors."
-        )
-        bot.add_response(summary)
-
-    except Exception as e:
+    except Exception:
         conn.rollback()
+        raise
+    finally:
         bot.db_return(conn)
-        bot.logger.error(f"Error in massmeet module: {e}")
 
-        bot.logger.error(f"Traceback: {traceback.format_exc()}")
-        bot.add_response("Error during mass meet process.")
+    if stats["registered_new"] or stats["merged_hostmasks"]:
+        bot.db_invalidate_users()
+    return stats
@@ -36,8 +36,8 @@ def run(bot, event):
 
         # Check if the database user exists
         cur.execute(
-            "SELECT id, username FROM phreakbot_users WHERE username = %s",
-            (merge_db_user,),
+            "SELECT id, username FROM phreakbot_users WHERE lower(username) = %s",
+            (merge_db_user.lower(),),
         )
         db_userinfo = cur.fetchone()
         if not db_userinfo:
@@ -61,7 +61,7 @@ def run(bot, event):
 
         # Check if the hostmask is already associated with a user
         cur.execute(
-            "SELECT u.* FROM phreakbot_users u JOIN phreakbot_hostmasks h ON u.id = h.users_id WHERE h.hostmask = %s",
+            "SELECT u.* FROM phreakbot_users u JOIN phreakbot_hostmasks h ON u.id = h.users_id WHERE lower(h.hostmask) = %s",
             (merge_userhost.lower(),),
         )
         existing_user = cur.fetchone()
@@ -82,6 +82,7 @@ def run(bot, event):
         conn.commit()
         cur.close()
         bot.db_return(conn)
+        bot.db_invalidate_users()
 
         bot.add_response(
             f"Hostmask '{merge_userhost}' added to '{db_userinfo[1]}', '{merge_irc_nick}' is now identified."
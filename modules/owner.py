@@ -221,6 +221,7 @@ def _claim_ownership(bot, event):
         conn.commit()
         cur.close()
         bot.db_return(conn)
+        bot.db_invalidate_users()
         bot.add_response(f"Congratulations! You are now my owner, {event['nick']}!")
 
     except psycopg2.errors.UniqueViolation:
@@ -308,6 +309,7 @@ def _add_admin(bot, event, username):
         conn.commit()
         cur.close()
         bot.db_return(conn)
+        bot.db_invalidate_users()
         bot.add_response(f"{username} is now an admin.")
     except Exception as e:
         conn.rollback()
@@ -357,6 +359,7 @@ def _remove_admin(bot, event, username):
         conn.commit()
         cur.close()
         bot.db_return(conn)
+        bot.db_invalidate_users()
         bot.add_response(f"{username} is no longer an admin.")
     except Exception as e:
         conn.rollback()
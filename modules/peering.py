@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PeeringDB module for PhreakBot
+# Shows where a network peers, from the local PeeringDB snapshot
+
+from phreakbot_core.asn import parse_asn
+from phreakbot_core.peeringdb import format_speed
+
+MAX_LISTED = 8
+
+
+def config(bot):
+    """Return module configuration"""
+    return {
+        "events": [],
+        "commands": ["peering"],
+        "permissions": ["user"],
+        "help": "Show the peering details of a network from PeeringDB.\n"
+        "Usage: !peering <ASN|name> - Show policy, IXPs and facilities of a network",
+    }
+
+
+def run(bot, event):
+    """Handle the peering command"""
+    query = event["command_args"].strip()
+    if not query:
+        bot.add_response("Please specify an AS number or network name (e.g., !peering AS13335)")
+        return
+
+    peeringdb = bot.dataset("peeringdb")
+    if peeringdb is None:
+        bot.add_response("PeeringDB data is not available yet.")
+        return
+
+    try:
+        net = peeringdb.network(parse_asn(query))
+    except ValueError:
+        matches = peeringdb.search(query, kind="net", limit=MAX_LISTED + 1)
+        if len(matches) > 1:
+            listed = ", ".join(f"{m.name} (AS{m.asn})" for m in matches[:MAX_LISTED])
+            more = " and more" if len(matches) > MAX_LISTED else ""
+            bot.add_response(f"Networks matching '{query}': {listed}{more}")
+            return
+        net = matches[0] if matches else None
+
+    if net is None:
+        bot.add_response(f"No PeeringDB record found for {query}")
+        return
+
+    bot.add_response(format_network(net))
+    bot.add_response(format_exchanges(peeringdb, net.asn))
+    facilities = peeringdb.facilities_of(net.asn)
+    if facilities:
+        names = ", ".join(fac.name for fac in facilities[:MAX_LISTED])
+        more = f" and {len(facilities) - MAX_LISTED} more" if len(facilities) > MAX_LISTED else ""
+        bot.add_response(f"Facilities ({len(facilities)}): {names}{more}")
+
+
+def format_network(net):
+    """Format the summary line of a network"""
+    parts = [f"AS{net.asn} {net.name}"]
+    if net.policy_general:
+        parts.append(f"Policy: {net.policy_general}")
+    if net.info_prefixes4 or net.info_prefixes6:
+        parts.append(f"Max prefixes: {net.info_prefixes4 or 0} v4 / {net.info_prefixes6 or 0} v6")
+    if net.irr_as_set:
+        parts.append(f"IRR: {net.irr_as_set}")
+    if net.website:
+        parts.append(net.website)
+    return " | ".join(parts)
+
+
+def format_exchanges(peeringdb, asn):
+    """Format the IXPs a network is connected to, largest capacity first"""
+    exchanges = peeringdb.exchanges_of(asn)
+    if not exchanges:
+        return f"AS{asn} has no public IX connections in PeeringDB"
+    listed = []
+    for ix, connections in exchanges[:MAX_LISTED]:
+        speeds = [c.speed for c in connections]
+        if len(speeds) > 1 and len(set(speeds)) == 1:
+            capacity = f"{len(speeds)}x{format_speed(speeds[0])}"
+        else:
+            capacity = format_speed(sum(speeds))
+        listed.append(f"{ix.name} ({capacity})")
+    more = f" and {len(exchanges) - MAX_LISTED} more" if len(exchanges) > MAX_LISTED else ""
+    return f"IXPs ({len(exchanges)}): {', '.join(listed)}{more}"
@@ -3,6 +3,8 @@
 #
 # Permission management module for PhreakBot
 
+from phreakbot_core.repositories import DatabaseUnavailable, Perms, Users
+
 
 def config(bot):
     """Return module configuration"""
@@ -20,7 +22,7 @@ def config(bot):
 VALID_PERMISSIONS = frozenset({
     "user", "owner", "admin", "op", "meet", "perm", "topic",
     "join", "part", "autoop", "autovoice", "modules", "karma",
-    "quotes", "rbl", "whois", "asn", "ip", "roa",
+    "quotes", "rbl", "whois", "asn", "ip", "roa", "feed",
 })
 
 
@@ -44,70 +46,40 @@ def run(bot, event):
 
     # args_arr should now only hold permissions to set
 
-    # Check if the user exists in the database
-    conn = bot.db_get()
-    if not conn:
-        bot.add_response("Database connection is not available.")
+    if bot.re.match(r"(?:set|add)", mode):
+        invalid = [p for p in args_arr if p not in VALID_PERMISSIONS]
+        if invalid:
+            bot.add_response(f"Unknown permission(s): {', '.join(invalid)}. Valid permissions: {', '.join(sorted(VALID_PERMISSIONS))}")
+            return
+        adding = True
+    elif bot.re.match(r"(?:rem(?:ove)?|del(?:ete)?)", mode):
+        adding = False
+    else:
+        bot.add_response(f"Unknown mode: {mode}. Use 'add' or 'remove'.")
         return
 
     try:
-        cur = conn.cursor()
-
-        # Find the user ID by nickname
-        cur.execute(
-            "SELECT id FROM phreakbot_users WHERE username ILIKE %s", (nick.lower(),)
-        )
-        user = cur.fetchone()
-
+        # Check if the user exists in the database
+        user = Users(bot).by_username(nick)
         if not user:
             bot.add_response(
                 f"Could not match nick '{nick}' to a known user. Try using !meet first?"
             )
-            cur.close()
-            bot.db_return(conn)
             return
 
-        user_id = user[0]
-
-        if bot.re.match(r"(?:set|add)", mode):
-            invalid = [p for p in args_arr if p not in VALID_PERMISSIONS]
-            if invalid:
-                bot.add_response(f"Unknown permission(s): {', '.join(invalid)}. Valid permissions: {', '.join(sorted(VALID_PERMISSIONS))}")
-                cur.close()
-                bot.db_return(conn)
-                return
-            counter = 0
-            for permission in args_arr:
-                # Use ON CONFLICT to handle duplicate permissions
-                cur.execute(
-                    "INSERT INTO phreakbot_perms (users_id, permission, channel) VALUES (%s, %s, %s) ON CONFLICT DO NOTHING",
-                    (user_id, permission, channel.lower()),
-                )
-                counter += 1
-
-            conn.commit()
-            bot.add_response(f"Added {counter} permissions to '{nick}'")
-
-        elif bot.re.match(r"(?:rem(?:ove)?|del(?:ete)?)", mode):
-            counter = 0
-            for permission in args_arr:
-                cur.execute(
-                    "DELETE FROM phreakbot_perms WHERE users_id = %s AND permission = %s AND channel = %s",
-                    (user_id, permission, channel.lower()),
-                )
-                counter += 1
-
-            conn.commit()
-            bot.add_response(f"Removed {counter} permissions from '{nick}'")
-
+        if adding:
+            Perms(bot).add(user.id, args_arr, channel)
         else:
-            bot.add_response(f"Unknown mode: {mode}. Use 'add' or 'remove'.")
-
-        cur.close()
-        bot.db_return(conn)
-
+            Perms(bot).remove(user.id, args_arr, channel)
+    except DatabaseUnavailable:
+        bot.add_response("Database connection is not available.")
+        return
     except Exception as e:
-        conn.rollback()
-        bot.db_return(conn)
         bot.logger.error(f"Database error in perm module: {e}")
         bot.add_response("Error managing permissions.")
+        return
+
+    if adding:
+        bot.add_response(f"Added {len(args_arr)} permissions to '{nick}'")
+    else:
+        bot.add_response(f"Removed {len(args_arr)} permissions from '{nick}'")
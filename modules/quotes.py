@@ -3,7 +3,7 @@
 #
 # Quotes module for PhreakBot
 
-import random
+from phreakbot_core.repositories import DatabaseUnavailable, Quotes
 
 
 def config(bot):
@@ -47,44 +47,18 @@ def run(bot, event):
 def _show_quote(bot, event):
     """Show a quote from the database"""
     search_term = event["command_args"]
-
-    conn = bot.db_get()
-    if not conn:
-        bot.add_response("Database connection is not available.")
-        return
+    quotes = Quotes(bot)
 
     try:
-        cur = conn.cursor()
-
-        if not search_term:
-            # Show a random quote
-            cur.execute(
-                "SELECT q.id, q.quote, u.username, q.channel, q.insert_time FROM phreakbot_quotes q "
-                "JOIN phreakbot_users u ON q.users_id = u.id "
-                "ORDER BY RANDOM() LIMIT 1"
-            )
-        elif search_term.isdigit():
+        if search_term.isdigit():
             # Show a specific quote by ID
-            cur.execute(
-                "SELECT q.id, q.quote, u.username, q.channel, q.insert_time FROM phreakbot_quotes q "
-                "JOIN phreakbot_users u ON q.users_id = u.id "
-                "WHERE q.id = %s",
-                (int(search_term),),
-            )
+            quote = quotes.get(int(search_term))
         else:
-            # Search for quotes containing the search term
-            cur.execute(
-                "SELECT q.id, q.quote, u.username, q.channel, q.insert_time FROM phreakbot_quotes q "
-                "JOIN phreakbot_users u ON q.users_id = u.id "
-                "WHERE q.quote ILIKE %s "
-                "ORDER BY RANDOM() LIMIT 1",
-                (f"%{search_term}%",),
-            )
-
-        quote = cur.fetchone()
-        cur.close()
-    finally:
-        bot.db_return(conn)
+            # Show a random quote, or a random one containing the search term
+            quote = quotes.random(search_term)
+    except DatabaseUnavailable:
+        bot.add_response("Database connection is not available.")
+        return
 
     if not quote:
         if search_term:
@@ -93,9 +67,13 @@ def _show_quote(bot, event):
             bot.add_response("No quotes found in the database.")
         return
 
-    quote_id, quote_text, username, channel, timestamp = quote
-    bot.add_response(
-        f"Quote #{quote_id}: {quote_text} (added by {username} in {channel} on {timestamp.strftime('%Y-%m-%d')})"
+    bot.add_response(_format_quote(quote))
+
+
+def _format_quote(quote):
+    return (
+        f"Quote #{quote.id}: {quote.quote} "
+        f"(added by {quote.username} in {quote.channel} on {quote.insert_time.strftime('%Y-%m-%d')})"
     )
 
 
@@ -108,36 +86,19 @@ def _search_quotes(bot, event):
     bot.logger.info(f"Searching quotes for: {event['command_args']}")
     search_term = event["command_args"]
 
-    conn = bot.db_get()
-    if not conn:
+    try:
+        quotes = Quotes(bot).search(search_term)
+    except DatabaseUnavailable:
         bot.add_response("Database connection is not available.")
         return
 
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT q.id, q.quote, u.username, q.channel, q.insert_time FROM phreakbot_quotes q "
-            "JOIN phreakbot_users u ON q.users_id = u.id "
-            "WHERE q.quote ILIKE %s "
-            "ORDER BY q.id LIMIT 5",
-            (f"%{search_term}%",),
-        )
-
-        quotes = cur.fetchall()
-        cur.close()
-    finally:
-        bot.db_return(conn)
-
     if not quotes:
         bot.add_response(f"No quotes found matching '{search_term}'.")
         return
 
     bot.add_response(f"Found {len(quotes)} quotes matching '{search_term}':")
     for quote in quotes:
-        quote_id, quote_text, username, channel, timestamp = quote
-        bot.add_response(
-            f"Quote #{quote_id}: {quote_text} (added by {username} in {channel} on {timestamp.strftime('%Y-%m-%d')})"
-        )
+        bot.add_response(_format_quote(quote))
 
 
 def _add_quote(bot, event):
@@ -154,43 +115,20 @@ def _add_quote(bot, event):
         bot.add_response("You need to be a registered user to add quotes.")
         return
 
-    conn = bot.db_get()
-    if not conn:
+    try:
+        quote_id = Quotes(bot).add(user_info["id"], quote_text, event["channel"])
+    except DatabaseUnavailable:
         bot.add_response("Database connection is not available.")
         return
-
-    try:
-        cur = conn.cursor()
-
-        # Check if the quote already exists
-        cur.execute(
-            "SELECT id FROM phreakbot_quotes WHERE quote = %s AND channel = %s",
-            (quote_text, event["channel"]),
-        )
-
-        if cur.fetchone():
-            bot.add_response("This quote already exists in the database.")
-            cur.close()
-            bot.db_return(conn)
-            return
-
-        # Add the new quote
-        cur.execute(
-            "INSERT INTO phreakbot_quotes (users_id, quote, channel) VALUES (%s, %s, %s) RETURNING id",
-            (user_info["id"], quote_text, event["channel"]),
-        )
-
-        quote_id = cur.fetchone()[0]
-        conn.commit()
-        cur.close()
-        bot.db_return(conn)
-
-        bot.add_response(f"Quote #{quote_id} added successfully.")
     except Exception as e:
-        conn.rollback()
-        bot.db_return(conn)
         bot.logger.error(f"Database error adding quote: {e}")
         bot.add_response("Error adding quote.")
+        return
+
+    if quote_id is None:
+        bot.add_response("This quote already exists in the database.")
+    else:
+        bot.add_response(f"Quote #{quote_id} added successfully.")
 
 
 def _delete_quote(bot, event):
@@ -208,32 +146,17 @@ def _delete_quote(bot, event):
         bot.add_response("Please provide a valid quote ID to delete.")
         return
 
-    conn = bot.db_get()
-    if not conn:
+    try:
+        deleted = Quotes(bot).delete(int(quote_id))
+    except DatabaseUnavailable:
         bot.add_response("Database connection is not available.")
         return
-
-    try:
-        cur = conn.cursor()
-
-        # Check if the quote exists
-        cur.execute("SELECT id FROM phreakbot_quotes WHERE id = %s", (int(quote_id),))
-
-        if not cur.fetchone():
-            bot.add_response(f"Quote #{quote_id} not found.")
-            cur.close()
-            bot.db_return(conn)
-            return
-
-        # Delete the quote
-        cur.execute("DELETE FROM phreakbot_quotes WHERE id = %s", (int(quote_id),))
-        conn.commit()
-        cur.close()
-        bot.db_return(conn)
-
-        bot.add_response(f"Quote #{quote_id} deleted successfully.")
     except Exception as e:
-        conn.rollback()
-        bot.db_return(conn)
         bot.logger.error(f"Database error deleting quote: {e}")
         bot.add_response("Error deleting quote.")
+        return
+
+    if deleted:
+        bot.add_response(f"Quote #{quote_id} deleted successfully.")
+    else:
+        bot.add_response(f"Quote #{quote_id} not found.")
@@ -3,10 +3,17 @@
 #
 # RBL (Realtime Blackhole List) lookup module for PhreakBot
 
-import re
-import socket
-import dns.resolver
+import asyncio
 import ipaddress
+import re
+
+import dns.asyncresolver
+
+from phreakbot_core.fanout import fan_out, split_targets
+from phreakbot_core.resolver import resolve_async
+
+# Upper bound on the mail server addresses checked for one domain
+MAX_ADDRESSES = 16
 
 
 def config(bot):
@@ -17,12 +24,13 @@ def config(bot):
         "permissions": ["user"],
         "help": "Check if a domain's mail servers are listed in various RBLs (blacklists).\n"
         "Usage: !rbl <domain> - Check if a domain's mail servers are blacklisted\n"
-        "       !rbl <IP> - Check if an IP address is blacklisted\n"
+        "       !rbl <target> [<target>...] - Check several domains and addresses at once\n"
+        "       !rbl <IP> - Check if an IPv4 or IPv6 address is blacklisted\n"
         "       !blacklist <domain or IP> - Alias for !rbl",
     }
 
 
-def run(bot, event):
+async def run(bot, event):
     """Handle RBL lookup command"""
     if event["command"] not in ["rbl", "blacklist"]:
         return
@@ -33,12 +41,22 @@ def run(bot, event):
         bot.add_response("Please provide a domain or IP address to check (e.g., !rbl example.com or !rbl 192.0.2.1)")
         return
 
+    targets, dropped = split_targets(query)
+    if len(targets) > 1:
+        await fan_out(bot, check_target, targets, dropped)
+        return
+
+    await check_target(bot, query)
+
+
+async def check_target(bot, query):
+    """Check one domain's mail servers or one address against the RBLs"""
     try:
         # Check if the query is an IP address
         try:
             ip = ipaddress.ip_address(query)
             bot.add_response(f"Checking IP: {ip}")
-            check_ip_in_rbls(bot, str(ip))
+            await check_ips_in_rbls(bot, [str(ip)])
             return
         except ValueError:
             # Not an IP address, continue with domain processing
@@ -46,116 +64,96 @@ def run(bot, event):
 
         # Check if the query is a domain
         domain_pattern = r'^([a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}$'
-        if re.match(domain_pattern, query):
-            bot.add_response(f"Checking domain: {query}")
-
-            # Look up MX records for the domain
-            mx_records = get_mx_records(query)
-
-            if mx_records:
-                mx_summary = ", ".join([f"{mx_host}" for mx_host, _ in mx_records[:3]])
-                if len(mx_records) > 3:
-                    mx_summary += f", and {len(mx_records) - 3} more"
-                bot.add_response(f"Mail servers: {mx_summary}")
-
-                # Check only the first MX record to avoid too many lookups
-                mx_host, _ = mx_records[0]
-                try:
-                    # Try to resolve the MX hostname to an IP
-                    ips = get_host_ips(mx_host)
-                    if ips:
-                        ip = ips[0]  # Just use the first IP
-                        bot.add_response(f"Primary mail server {mx_host} → {ip}")
-                        check_ip_in_rbls(bot, ip)
-                    else:
-                        bot.add_response(f"Could not resolve mail server {mx_host}")
-                except Exception as e:
-                    bot.add_response(f"Error: {str(e)[:50]}")
-            else:
-                bot.add_response(f"No mail servers found for {query}, checking A record")
-
-                # Fall back to A record if no MX records
-                try:
-                    ips = get_host_ips(query)
-                    if ips:
-                        ip = ips[0]  # Just use the first IP
-                        bot.add_response(f"Domain {query} → {ip}")
-                        check_ip_in_rbls(bot, ip)
-                    else:
-                        bot.add_response(f"Could not resolve {query}")
-                except Exception as e:
-                    bot.add_response(f"Error: {str(e)[:50]}")
+        if not re.match(domain_pattern, query):
+            bot.add_response(f"Invalid input: {query}. Please provide a valid domain or IP address.")
             return
+
+        bot.add_response(f"Checking domain: {query}")
+
+        # Look up MX records for the domain
+        mx_records = await get_mx_records(query)
+
+        if mx_records:
+            mx_summary = ", ".join([f"{mx_host}" for mx_host, _ in mx_records[:3]])
+            if len(mx_records) > 3:
+                mx_summary += f", and {len(mx_records) - 3} more"
+            bot.add_response(f"Mail servers: {mx_summary}")
+            hosts = [mx_host for mx_host, _ in mx_records]
         else:
-            bot.add_response(f"Invalid input: {query}. Please provide a valid domain or IP address.")
+            # Fall back to the domain's own addresses if there are no MX records
+            bot.add_response(f"No mail servers found for {query}, checking A/AAAA records")
+            hosts = [query]
+
+        ips = await get_hosts_ips(hosts)
+        if not ips:
+            bot.add_response(f"Could not resolve {', '.join(hosts[:3])}")
             return
+
+        if len(ips) > MAX_ADDRESSES:
+            bot.add_response(f"Checking the first {MAX_ADDRESSES} of {len(ips)} addresses")
+            ips = ips[:MAX_ADDRESSES]
+        await check_ips_in_rbls(bot, ips)
     except Exception as e:
         bot.add_response(f"Error processing request: {str(e)[:50]}")
-        return
 
 
-def get_mx_records(domain):
-    """Get MX records for a domain"""
+async def get_mx_records(domain):
+    """Get MX records for a domain, sorted by preference"""
     try:
-        # Set a timeout for DNS queries
-        resolver = dns.resolver.Resolver()
-        resolver.timeout = 2.0
+        resolver = dns.asyncresolver.Resolver()
         resolver.lifetime = 2.0
 
-        answers = resolver.resolve(domain, 'MX')
+        answers = await resolver.resolve(domain, 'MX')
         mx_records = [(str(rdata.exchange).rstrip('.'), rdata.preference) for rdata in answers]
-        return sorted(mx_records, key=lambda x: x[1])  # Sort by preference
-    except Exception:
-        return []
-
-
-def get_host_ips(hostname):
-    """Get all IP addresses for a hostname"""
-    try:
-        # Set a timeout for DNS queries
-        resolver = dns.resolver.Resolver()
-        resolver.timeout = 2.0
-        resolver.lifetime = 2.0
-
-        answers = resolver.resolve(hostname, 'A')
-        return [str(rdata) for rdata in answers]
+        # A null MX ("." with preference 0, RFC 7505) means no mail is accepted
+        mx_records = [(host, pref) for host, pref in mx_records if host]
+        return sorted(mx_records, key=lambda x: x[1])
     except Exception:
         return []
 
 
-def check_ip_in_rbls(bot, ip):
-    """Check if an IP is listed in various RBLs"""
-    # Reduced list of popular RBLs to avoid overwhelming the bot
-    rbls = [
-        "zen.spamhaus.org",
-        "bl.spamcop.net",
-        "xbl.spamhaus.org",
-        "sbl.spamhaus.org"
-    ]
-
-    # Reverse the IP for RBL lookup
-    reversed_ip = '.'.join(reversed(ip.split('.')))
-
-    listed_on = []
+async def get_hosts_ips(hostnames):
+    """Resolve several hostnames concurrently to their unique IPv4/IPv6 addresses"""
+    results = await asyncio.gather(
+        *(resolve_async(hostname) for hostname in hostnames),
+        return_exceptions=True,
+    )
+    ips = []
+    for result in results:
+        if isinstance(result, OSError):
+            continue
+        if isinstance(result, Exception):
+            raise result
+        for ip in result:
+            if ip not in ips:
+                ips.append(ip)
+    return ips
+
+
+async def check_ips_in_rbls(bot, ips):
+    """Check addresses against the configured RBLs and report the results"""
+    results = await bot.dnsbl.check_many(ips)
+
+    clean = []
+    failed = {}
+    for ip, zone_results in zip(ips, results):
+        listed_on = []
+        for result in zone_results:
+            if result.listed:
+                listed_on.append(f"{result.zone} ({', '.join(result.reasons)})")
+            elif result.error:
+                failed.setdefault(result.zone, result.error)
+        if listed_on:
+            bot.add_response(f"⚠️ IP {ip} is LISTED on: {', '.join(listed_on)}")
+        else:
+            clean.append(ip)
 
-    # Set a timeout for DNS queries
-    resolver = dns.resolver.Resolver()
-    resolver.timeout = 1.0
-    resolver.lifetime = 1.0
+    if len(clean) == 1:
+        bot.add_response(f"✅ IP {clean[0]} is NOT listed on any checked blacklists")
+    elif clean:
+        bot.add_response(f"✅ {len(clean)} IPs NOT listed on any checked blacklists: {', '.join(clean)}")
 
-    for rbl in rbls:
-        lookup = f"{reversed_ip}.{rbl}"
-        try:
-            answers = resolver.resolve(lookup, 'A')
-            if answers:
-                listed_on.append(rbl)
-        except dns.resolver.NXDOMAIN:
-            pass  # Not listed
-        except Exception:
-            pass  # Ignore errors
-
-    # Report results in a single message
-    if listed_on:
-        bot.add_response(f"⚠️ IP {ip} is LISTED on: {', '.join(listed_on)}")
-    else:
-        bot.add_response(f"✅ IP {ip} is NOT listed on any checked blacklists")
+    if failed:
+        bot.add_response(
+            "Could not check: " + ", ".join(f"{zone} ({error})" for zone, error in failed.items())
+        )
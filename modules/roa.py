@@ -9,6 +9,10 @@ import json
 import re
 import requests
 
+from phreakbot_core.asn import parse_asn
+from phreakbot_core.fanout import MAX_TARGETS, fan_out
+from phreakbot_core.rpki import INVALID_ASN, INVALID_LENGTH, NOT_FOUND, VALID
+
 
 def config(bot):
     """Return module configuration"""
@@ -17,6 +21,7 @@ def config(bot):
         "commands": ["rpki-old"],
         "permissions": ["user"],
         "help": "DEPRECATED: Use !roa or !irr instead.\n"
+        "Usage: !rpki-old <IP|prefix> [origin AS] [<IP|prefix> [origin AS]...] - Validate routes against the local RPKI VRPs\n"
         "This module is deprecated and will be removed in a future version.",
     }
 
@@ -30,8 +35,31 @@ def run(bot, event):
         bot.add_response("Please specify an IP address or prefix to check.")
         return
 
-    query = args[0]
+    routes = _split_routes(args)
+    if len(routes) > 1:
+        return fan_out(bot, _validate_route, routes[:MAX_TARGETS], max(len(routes) - MAX_TARGETS, 0))
+
+    validate(bot, *routes[0])
+
+
+def _split_routes(args):
+    """Group arguments into (IP|prefix, origin AS or None) routes"""
+    routes = []
+    for arg in args:
+        # Anything that is not an address is the origin of the route before it
+        if routes and routes[-1][1] is None and "." not in arg and ":" not in arg:
+            routes[-1] = (routes[-1][0], arg)
+        else:
+            routes.append((arg, None))
+    return routes
+
+
+def _validate_route(bot, route):
+    validate(bot, *route)
+
 
+def validate(bot, query, origin_arg=None):
+    """Validate one route, with the origin from origin_arg or the routing table"""
     # Check if the input is a CIDR prefix
     is_prefix = "/" in query
 
@@ -58,6 +86,17 @@ def run(bot, event):
             bot.add_response(f"Could not find a prefix containing {ip_address}")
             return
 
+    # Validate locally when a VRP export is loaded
+    vrps = bot.dataset("rpki")
+    if vrps is not None:
+        try:
+            origin = parse_asn(origin_arg) if origin_arg else _find_origin(bot, ip_address)
+        except ValueError:
+            bot.add_response(f"Invalid origin AS: {origin_arg}")
+            return
+        bot.add_response(_check_roa_local(vrps, ip_address, prefix, origin))
+        return
+
     # Check ROA status
     try:
         result = _check_roa(ip_address, prefix)
@@ -87,6 +126,13 @@ def _is_valid_prefix(prefix):
 
 def _find_prefix_for_ip(bot, ip_address):
     """Find the prefix that contains the given IP address"""
+    table = bot.dataset("ipasn")
+    if table is not None:
+        info = table.lookup(ip_address)
+        if info is not None:
+            bot.logger.info(f"Found prefix {info.prefix} for IP {ip_address} in local routing table")
+            return info.prefix
+
     try:
         # First try BGPView API
         bot.logger.info(f"Looking up prefix for IP {ip_address} using BGPView API")
@@ -125,6 +171,42 @@ def _find_prefix_for_ip(bot, ip_address):
             return None
 
 
+def _find_origin(bot, ip_address):
+    """Origin AS of the route covering an address, from the local routing table"""
+    table = bot.dataset("ipasn")
+    info = table.lookup(ip_address) if table is not None else None
+    return info.asn if info else None
+
+
+def _format_vrps(vrps, limit=3):
+    """Format VRPs as prefix-maxLength ASN"""
+    text = ", ".join(f"{vrp.prefix}-{vrp.max_length} AS{vrp.asn}" for vrp in vrps[:limit])
+    if len(vrps) > limit:
+        text += f" and {len(vrps) - limit} more"
+    return text
+
+
+def _check_roa_local(vrps, ip_address, prefix, origin):
+    """Validate a route against the local VRP table (RFC 6811)"""
+    if origin is None:
+        covering = vrps.covering(prefix)
+        if not covering:
+            return f"⚠️ {ip_address} (in prefix {prefix}) has no ROA (RPKI not found)."
+        return f"❓ {ip_address} (in prefix {prefix}): origin AS unknown. Covering VRPs: {_format_vrps(covering)}"
+
+    result = vrps.validate(prefix, origin)
+    route = f"{ip_address} (in prefix {prefix}, origin AS{origin})"
+    if result.state == VALID:
+        return f"✅ {route} is RPKI valid. Matching VRP: {_format_vrps(result.matched)}"
+    if result.state == INVALID_LENGTH:
+        return f"❌ {route} is RPKI invalid (prefix too specific for maxLength). VRPs: {_format_vrps(result.covering)}"
+    if result.state == INVALID_ASN:
+        return f"❌ {route} is RPKI invalid (origin AS not authorised). VRPs: {_format_vrps(result.covering)}"
+    if result.state == NOT_FOUND:
+        return f"⚠️ {route} has no ROA (RPKI not found)."
+    return f"❓ {route} has an unknown ROA status: {result.state}"
+
+
 def _check_roa(ip_address, prefix):
     """Check if a prefix has a valid ROA"""
     try:
@@ -6,12 +6,11 @@
 # This module implements the snarf/!@ function that fetches the description
 # of a URL of a website.
 
-import re
+import asyncio
 import traceback
 
-from bs4 import BeautifulSoup
-
-from phreakbot_core.url_safety import is_url_safe, safe_get
+from phreakbot_core.url_meta import DEFAULT_MAX_BYTES, fetch_page_meta
+from phreakbot_core.url_safety import is_url_safe_async
 
 
 def config(bot):
@@ -41,7 +40,7 @@ def run(bot, event):
                 url = message[2:].strip()
                 if url:
                     bot.logger.debug(f"Processing URL from !@ command: {url}")
-                    process_url(bot, event, url)
+                    return process_url(bot, event, url)
                 return
 
         # Handle regular commands
@@ -58,7 +57,7 @@ def run(bot, event):
                 bot.add_response("Please provide a URL to fetch the description.")
                 return
 
-            process_url(bot, event, url)
+            return process_url(bot, event, url)
 
     except Exception as e:
         # Catch-all exception handler to prevent the bot from crashing
@@ -70,25 +69,38 @@ def run(bot, event):
             pass
 
 
-def process_url(bot, event, url):
-    """Process a URL and display its title and description"""
+async def process_url(bot, event, url):
+    """Process a URL and display its title and description
+
+    DNS and the page fetch run off the event loop.
+    """
     try:
         # Add http:// prefix if missing
         if not url.startswith(("http://", "https://")):
             url = "http://" + url
 
-        # SSRF protection: check that the URL doesn't point to a private/blocked IP
-        is_safe, reason = is_url_safe(url)
-        if not is_safe:
-            bot.logger.warning(f"Blocked URL fetch (SSRF): {reason}")
-            bot.add_response("That URL points to a private or blocked address.")
-            return
-
         bot.logger.info(f"Processing URL: {url}")
 
-        # Fetch the description
-        bot.logger.info(f"Fetching info for URL: {url}")
-        title, description = get_url_info(url)
+        # Reuse a recent result fetched by this module or the urls module
+        cached = bot.url_cache.get(url)
+        if cached:
+            bot.logger.info(f"Using cached info for URL: {url}")
+            title, description = cached
+        else:
+            # SSRF protection: check that the URL doesn't point to a private/blocked IP
+            is_safe, reason = await is_url_safe_async(url)
+            if not is_safe:
+                bot.logger.warning(f"Blocked URL fetch (SSRF): {reason}")
+                bot.add_response("That URL points to a private or blocked address.")
+                return
+
+            # Fetch the description
+            bot.logger.info(f"Fetching info for URL: {url}")
+            title, description = await asyncio.get_running_loop().run_in_executor(
+                None, get_url_info, url, bot.config.get("url_max_bytes", DEFAULT_MAX_BYTES)
+            )
+            if title or description:
+                bot.url_cache.set(url, title, description)
 
         bot.logger.info(f"Retrieved title: {title}")
         bot.logger.info(f"Retrieved description: {description}")
@@ -111,45 +123,21 @@ def process_url(bot, event, url):
         bot.add_response("Could not fetch information for that URL.")
 
 
-def get_url_info(url):
+def get_url_info(url, max_bytes=DEFAULT_MAX_BYTES):
     """Get the title and description of a webpage"""
     # Set a timeout and user agent
     headers = {"User-Agent": "PhreakBot/1.0 URL Description Fetcher"}
 
-    response = safe_get(url, headers=headers, timeout=10)
-    response.raise_for_status()
-
-    # Parse the HTML
-    soup = BeautifulSoup(response.text, "html.parser")
-
-    # Get the title
-    title_tag = soup.find("title")
-    title = title_tag.string.strip() if title_tag and title_tag.string else None
+    # Only the document head is read; the description comes from the
+    # og:description, twitter:description or description meta tag
+    title, description = fetch_page_meta(
+        url, headers=headers, timeout=10, max_bytes=max_bytes
+    )
 
     # Limit title length
     if title and len(title) > 200:
         title = title[:197] + "..."
 
-    # Get the description from meta tags
-    description = None
-
-    # Try Open Graph description first
-    og_desc = soup.find("meta", property="og:description")
-    if og_desc and og_desc.get("content"):
-        description = og_desc["content"].strip()
-
-    # Try Twitter description next
-    if not description:
-        twitter_desc = soup.find("meta", attrs={"name": "twitter:description"})
-        if twitter_desc and twitter_desc.get("content"):
-            description = twitter_desc["content"].strip()
-
-    # Try standard meta description as fallback
-    if not description:
-        meta_desc = soup.find("meta", attrs={"name": "description"})
-        if meta_desc and meta_desc.get("content"):
-            description = meta_desc["content"].strip()
-
     # Limit description length
     if description and len(description) > 300:
         description = description[:297] + "..."
@@ -3,11 +3,11 @@
 #
 # URLs module for PhreakBot
 
+import asyncio
 import re
 
-from bs4 import BeautifulSoup
-
-from phreakbot_core.url_safety import is_url_safe, safe_get
+from phreakbot_core.url_meta import DEFAULT_MAX_BYTES, fetch_page_meta
+from phreakbot_core.url_safety import is_url_safe_async
 
 
 def config(bot):
@@ -39,28 +39,54 @@ def run(bot, event):
     # Process only the first URL to avoid spam
     url = urls[0]
 
-    # SSRF protection: check that the URL doesn't point to a private/blocked IP
-    is_safe, reason = is_url_safe(url)
-    if not is_safe:
-        bot.logger.warning(f"Blocked URL fetch (SSRF): {reason}")
+    # Don't announce the same link twice in a row in a channel
+    if bot.url_cache.recently_announced(event["channel"], url):
+        bot.logger.debug(f"Skipping recently announced URL: {url}")
+        return
+
+    cached = bot.url_cache.get(url)
+    if cached:
+        announce_title(bot, event, url, cached[0])
         return
 
+    # DNS and the page fetch must not block the event loop
+    return fetch_and_announce(bot, event, url)
+
+
+async def fetch_and_announce(bot, event, url):
+    """Fetch the title of a URL that is not cached and announce it"""
     try:
-        title = get_url_title(url)
-        if title:
-            bot.add_response(f"Title: {title}")
+        # SSRF protection: check that the URL doesn't point to a private/blocked IP
+        is_safe, reason = await is_url_safe_async(url)
+        if not is_safe:
+            bot.logger.warning(f"Blocked URL fetch (SSRF): {reason}")
+            return
+
+        title, description = await asyncio.get_running_loop().run_in_executor(
+            None, get_url_meta, url, bot.config.get("url_max_bytes", DEFAULT_MAX_BYTES)
+        )
+        if title or description:
+            bot.url_cache.set(url, title, description)
+        announce_title(bot, event, url, title)
     except Exception as e:
         bot.logger.error(f"Error fetching URL title: {e}")
 
 
+def announce_title(bot, event, url, title):
+    """Show a page title and remember it was announced in the channel"""
+    if title:
+        bot.add_response(f"Title: {title}")
+        bot.url_cache.mark_announced(event["channel"], url)
+
+
 def extract_urls(text):
     """Extract URLs from text"""
     url_pattern = re.compile(r'https?://[^\s<>"]+|www\.[^\s<>"]+')
     return url_pattern.findall(text)
 
 
-def get_url_title(url):
-    """Get the title of a webpage"""
+def get_url_meta(url, max_bytes=DEFAULT_MAX_BYTES):
+    """Get the title and description of a webpage"""
     # Add http:// prefix if missing
     if not url.startswith(("http://", "https://")):
         url = "http://" + url
@@ -69,22 +95,21 @@ def get_url_title(url):
     headers = {"User-Agent": "PhreakBot/1.0 URL Title Fetcher"}
 
     try:
-        response = safe_get(url, headers=headers, timeout=5)
-        response.raise_for_status()
-
-        # Parse the HTML
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # Get the title
-        title_tag = soup.find("title")
-        if title_tag:
-            title = title_tag.string.strip()
-            # Limit title length
-            if len(title) > 200:
-                title = title[:197] + "..."
-            return title
+        # Only the document head is read; non-HTML responses are skipped
+        title, description = fetch_page_meta(
+            url, headers=headers, timeout=5, max_bytes=max_bytes
+        )
+        # Limit title and description length
+        if title and len(title) > 200:
+            title = title[:197] + "..."
+        if description and len(description) > 300:
+            description = description[:297] + "..."
+        return title, description
     except Exception:
         # Silently fail on any error
-        pass
+        return None, None
 
-    return None
+
+def get_url_title(url, max_bytes=DEFAULT_MAX_BYTES):
+    """Get the title of a webpage"""
+    return get_url_meta(url, max_bytes=max_bytes)[0]
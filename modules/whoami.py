@@ -45,7 +45,7 @@ def run(bot, event):
             if conn:
                 try:
                     cur = conn.cursor()
-                    sql = "SELECT * FROM phreakbot_users WHERE username ILIKE %s"
+                    sql = "SELECT * FROM phreakbot_users WHERE lower(username) = %s"
                     cur.execute(sql, (event["nick"].lower(),))
                     res = cur.fetchone()
                     if res:
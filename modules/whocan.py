@@ -26,59 +26,31 @@ def run(bot, event):
     permission = args[0]
     channel = args[1] if len(args) > 1 else ""
 
-    # Check if the database connection is available
-    conn = bot.db_get()
-    if not conn:
+    if bot.db_pool is None:
         bot.add_response("Database connection is not available.")
         return
 
-    try:
-        cur = conn.cursor()
+    index = bot.db_get_permission_index()
+    if index is None:
+        bot.add_response("Error retrieving permission information.")
+        return
 
-        # Find users with the specified permission
+    users = index.get((permission, channel.lower()), [])
+    if users:
         if channel:
-            # Channel-specific permission
-            cur.execute(
-                "SELECT u.username FROM phreakbot_users u "
-                "JOIN phreakbot_perms p ON u.id = p.users_id "
-                "WHERE p.permission = %s AND p.channel = %s "
-                "ORDER BY u.username",
-                (permission, channel.lower()),
+            bot.add_response(
+                f"Users with '{permission}' permission in {channel}: {', '.join(users)}"
             )
         else:
-            # Global permission
-            cur.execute(
-                "SELECT u.username FROM phreakbot_users u "
-                "JOIN phreakbot_perms p ON u.id = p.users_id "
-                "WHERE p.permission = %s AND (p.channel = '' OR p.channel IS NULL) "
-                "ORDER BY u.username",
-                (permission,),
+            bot.add_response(
+                f"Users with global '{permission}' permission: {', '.join(users)}"
+            )
+    else:
+        if channel:
+            bot.add_response(
+                f"No users found with '{permission}' permission in {channel}."
             )
-
-        users = [row[0] for row in cur.fetchall()]
-        cur.close()
-        bot.db_return(conn)
-
-        if users:
-            if channel:
-                bot.add_response(
-                    f"Users with '{permission}' permission in {channel}: {', '.join(users)}"
-                )
-            else:
-                bot.add_response(
-                    f"Users with global '{permission}' permission: {', '.join(users)}"
-                )
         else:
-            if channel:
-                bot.add_response(
-                    f"No users found with '{permission}' permission in {channel}."
-                )
-            else:
-                bot.add_response(
-                    f"No users found with global '{permission}' permission."
-                )
-
-    except Exception as e:
-        bot.db_return(conn)
-        bot.logger.error(f"Database error in whocan module: {e}")
-        bot.add_response("Error retrieving permission information.")
+            bot.add_response(
+                f"No users found with global '{permission}' permission."
+            )
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""AS number helpers shared by the routing and peering lookups."""
+
+import re
+
+
+_ASN_RE = re.compile(r"^(?:AS)?(\d+)$", re.IGNORECASE)
+
+
+def parse_asn(value):
+    """Parse 13335, "13335" or "AS13335" into an int."""
+    if isinstance(value, int):
+        return value
+    match = _ASN_RE.match(str(value).strip())
+    if not match:
+        raise ValueError(f"invalid ASN: {value!r}")
+    return int(match.group(1))
@@ -4,6 +4,7 @@
 
 import argparse
 import importlib.util
+import itertools
 import logging
 import os
 import re
@@ -11,20 +12,32 @@ import sys
 
 import pydle
 
+from . import geoip, ipasn, peeringdb, rpki, url_safety
 from .cache import CacheMixin
+from .cache_notify import CacheNotifyMixin
 from .config import ConfigMixin
 from .database import DatabaseMixin
+from .datasets import Dataset, DatasetsMixin
+from .dnsbl import DnsblChecker
 from .events import EventsMixin
+from .feeds import FeedManager
+from .ip_policy import IPPolicy
+from .oui import OuiDatabase
 from .permissions import PermissionMixin
 from .security import SecurityMixin
+from .timers import TimersMixin
+from .url_meta import UrlMetaCache
 
 
 class PhreakBot(
     SecurityMixin,
     CacheMixin,
     DatabaseMixin,
+    CacheNotifyMixin,
     PermissionMixin,
     EventsMixin,
+    DatasetsMixin,
+    TimersMixin,
     ConfigMixin,
     pydle.Client,
 ):
@@ -52,6 +65,7 @@ class PhreakBot(
         self.re = re
         self.state = {}
         self.user_hostmasks = {}
+        self._who_requests = {}
 
         self.rate_limit = {
             "user_commands": __import__("collections").defaultdict(list),
@@ -66,14 +80,106 @@ class PhreakBot(
         self.cache = {
             "user_permissions": {},
             "user_info": {},
-            "cache_ttl": 300,
+            "user_profile": {},
+            "perm_index": {},
+            "autoop": {},
+            "autovoice": {},
+            "infoitems": {},
+            "cache_ttl": self.config.get("cache_ttl", 300),
+            # Per cache type TTLs overriding cache_ttl
+            "cache_ttls": {},
             "cache_timestamps": {},
         }
+        # Connection listening for cache invalidations, once connected
+        self._cache_listener = None
+        self._cache_listener_fd = None
+        self._cache_listen_retry = None
+
+        # SSRF policy: built-in special-purpose ranges plus configured networks
+        try:
+            url_safety.set_ip_policy(IPPolicy.from_config(self.config))
+        except ValueError as e:
+            self.logger.error(f"Invalid SSRF network in config, using defaults: {e}")
+
+        # Page titles/descriptions shared by the urls and snarf modules
+        self.url_cache = UrlMetaCache(
+            ttl=self.config.get("url_cache_ttl", 3600),
+            max_entries=self.config.get("url_cache_size", 1024),
+            repost_window=self.config.get("url_repost_window", 600),
+        )
+
+        # DNSBL zones and result cache for the rbl module
+        self.dnsbl = DnsblChecker.from_config(self.config)
+
+        # Local datasets refreshed in the background once connected
+        self.datasets = {}
+        self._dataset_tasks = None
+        self.add_dataset(
+            Dataset(
+                "ipasn",
+                self.config.get("ipasn_path", ipasn.DEFAULT_PATH),
+                ipasn.load_table,
+                url=self.config.get("ipasn_url"),
+                refresh_interval=self.config.get("ipasn_refresh_interval", 86400),
+                logger=self.logger,
+            )
+        )
+        self.add_dataset(
+            Dataset(
+                "rpki",
+                self.config.get("rpki_vrp_path", rpki.DEFAULT_PATH),
+                rpki.load_vrps,
+                url=self.config.get("rpki_vrp_url"),
+                refresh_interval=self.config.get("rpki_refresh_interval", 60),
+                logger=self.logger,
+            )
+        )
+        # MaxMind-format database; a file dropped in place is picked up on
+        # the next refresh without a restart
+        self.add_dataset(
+            Dataset(
+                "geoip",
+                self.config.get("geoip_path", geoip.DEFAULT_PATH),
+                geoip.open_database,
+                url=self.config.get("geoip_url"),
+                refresh_interval=self.config.get("geoip_refresh_interval", 3600),
+                logger=self.logger,
+            )
+        )
+        self.add_dataset(
+            Dataset(
+                "peeringdb",
+                self.config.get("peeringdb_path", peeringdb.DEFAULT_PATH),
+                peeringdb.load_dump,
+                url=self.config.get("peeringdb_url"),
+                refresh_interval=self.config.get("peeringdb_refresh_interval", 86400),
+                logger=self.logger,
+            )
+        )
+
+        # Persistent delayed actions, run by one task once connected
+        self.timer_actions = {}
+        self._timers = []
+        # Due timers whose action has no handler, {action: [entry]}
+        self._orphan_timers = {}
+        self._timer_task = None
+        self._timer_wakeup = None
+        # Ids of timers that could not be stored; negative, never a row id
+        self._memory_timer_ids = itertools.count(-1, -1)
+
+        # RSS/Atom subscriptions, polled by one task once connected
+        self.feeds = FeedManager.from_config(self.config, self.logger)
+
+        # Offline IEEE MAC registry (built by scripts/update_oui.py)
+        self.oui_db = OuiDatabase.open_optional(
+            self.config.get("oui_db_path", "data/oui.bin"), self.logger
+        )
 
         self.trigger_re = re.compile(f'^{re.escape(self.config["trigger"])}')
         self.bot_trigger_re = re.compile(f'^{re.escape(self.config["trigger"])}')
 
-        self.db_connect()
+        if self.db_connect() and self.config.get("db_migrate_on_start", True):
+            self.db_migrate()
 
         super().__init__(
             nickname=self.config["nickname"],
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming bulk import and export of infoitems, quotes and karma.
+
+Used by ``scripts/bulk_data.py``. Records are JSON Lines or CSV (with a
+header row) and name their author by username rather than by id, so a
+corpus can move between bots:
+
+- infoitems: item, value, channel, username, insert_time
+- quotes: quote, channel, username, insert_time
+- karma: item, channel, karma
+
+Imports stream the records through ``COPY ... FROM STDIN`` into a
+temporary staging table, then insert them with one set-based statement:
+usernames are mapped to user ids, unknown authors are attributed to
+``phreakbot_import_user``, and records already present (by the table's
+unique constraint, or by quote and channel) are skipped. Exports stream
+``COPY (SELECT ...) TO STDOUT``. Either way only one chunk of records is
+in memory at a time.
+"""
+
+import csv
+import io
+import json
+import time
+from collections import namedtuple
+
+
+CHUNK_SIZE = 65536
+IMPORT_USER = "phreakbot_import_user"
+
+Kind = namedtuple("Kind", ["fields", "required", "integers", "export_sql", "insert_sql"])
+
+_AUTHOR = (
+    "COALESCE(u.id, (SELECT id FROM phreakbot_users WHERE username = '" + IMPORT_USER + "'))"
+)
+
+KINDS = {
+    "infoitems": Kind(
+        ("item", "value", "channel", "username", "insert_time"),
+        ("item", "value", "channel"),
+        (),
+        "SELECT i.item, i.value, i.channel, u.username, i.insert_time::text "
+        "FROM phreakbot_infoitems i LEFT JOIN phreakbot_users u ON u.id = i.users_id ORDER BY i.id",
+        "INSERT INTO phreakbot_infoitems (users_id, item, value, channel, insert_time) "
+        "SELECT DISTINCT ON (s.item, s.value, s.channel) "
+        f"{_AUTHOR}, s.item, s.value, s.channel, COALESCE(s.insert_time::timestamp, CURRENT_TIMESTAMP) "
+        "FROM bulk_stage s LEFT JOIN phreakbot_users u ON lower(u.username) = lower(s.username) "
+        "ORDER BY s.item, s.value, s.channel, s.line "
+        "ON CONFLICT (item, value, channel) DO NOTHING",
+    ),
+    "quotes": Kind(
+        ("quote", "channel", "username", "insert_time"),
+        ("quote", "channel"),
+        (),
+        "SELECT q.quote, q.channel, u.username, q.insert_time::text "
+        "FROM phreakbot_quotes q LEFT JOIN phreakbot_users u ON u.id = q.users_id ORDER BY q.id",
+        # Quotes have no unique constraint; an identical quote in the same
+        # channel counts as a duplicate
+        "INSERT INTO phreakbot_quotes (users_id, quote, channel, insert_time) "
+        "SELECT author, quote, channel, insert_time FROM ("
+        "SELECT DISTINCT ON (s.quote, s.channel) "
+        f"{_AUTHOR} AS author, s.quote, s.channel, "
+        "COALESCE(s.insert_time::timestamp, CURRENT_TIMESTAMP) AS insert_time, s.line "
+        "FROM bulk_stage s LEFT JOIN phreakbot_users u ON lower(u.username) = lower(s.username) "
+        "WHERE NOT EXISTS (SELECT 1 FROM phreakbot_quotes q WHERE q.quote = s.quote AND q.channel = s.channel) "
+        "ORDER BY s.quote, s.channel, s.line) new ORDER BY line",
+    ),
+    "karma": Kind(
+        ("item", "channel", "karma"),
+        ("item", "channel"),
+        ("karma",),
+        "SELECT item, channel, karma FROM phreakbot_karma ORDER BY id",
+        "INSERT INTO phreakbot_karma (item, channel, karma) "
+        "SELECT DISTINCT ON (s.item, s.channel) s.item, s.channel, COALESCE(s.karma::int, 0) "
+        "FROM bulk_stage s ORDER BY s.item, s.channel, s.line "
+        "ON CONFLICT (item, channel) DO NOTHING",
+    ),
+}
+
+_END = object()
+_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+_UNESCAPES = {"\\": "\\", "t": "\t", "n": "\n", "r": "\r", "b": "\b", "f": "\f", "v": "\v"}
+
+
+def copy_field(value):
+    """Encode a value as a field of COPY text format."""
+    if value is None or value == "":
+        return "\\N"
+    return str(value).translate(_ESCAPES)
+
+
+def parse_copy_field(field):
+    """Decode a field of COPY text format."""
+    if field == "\\N":
+        return None
+    if "\\" not in field:
+        return field
+    out = []
+    chars = iter(field)
+    for char in chars:
+        if char == "\\":
+            escaped = next(chars, "")
+            out.append(_UNESCAPES.get(escaped, escaped))
+        else:
+            out.append(char)
+    return "".join(out)
+
+
+def read_records(f, fmt):
+    """Yield dicts from a JSON Lines or CSV text stream."""
+    if fmt == "csv":
+        yield from csv.DictReader(f)
+        return
+    for number, line in enumerate(f, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"line {number}: {e}") from None
+
+
+class RecordWriter:
+    """Write dicts as JSON Lines or CSV."""
+
+    def __init__(self, f, fmt, fields, integers=()):
+        self.f = f
+        self.fields = fields
+        self.integers = [fields.index(field) for field in integers]
+        self.csv = None
+        if fmt == "csv":
+            self.csv = csv.writer(f)
+            self.csv.writerow(fields)
+
+    def write(self, values):
+        for i in self.integers:
+            if values[i] is not None:
+                values[i] = int(values[i])
+        if self.csv is not None:
+            self.csv.writerow(["" if value is None else value for value in values])
+        else:
+            self.f.write(json.dumps(dict(zip(self.fields, values)), ensure_ascii=False) + "\n")
+
+
+class CopySource(io.TextIOBase):
+    """Readable stream feeding records to COPY FROM STDIN in COPY text format.
+
+    Records are converted as COPY reads, so memory use is bounded by the
+    COPY buffer size, not by the size of the input.
+    """
+
+    def __init__(self, records, kind):
+        self.records = iter(records)
+        self.kind = kind
+        self.rows = 0
+        self.invalid = 0
+        self._buffer = ""
+
+    def readable(self):
+        return True
+
+    def _line(self, record):
+        if not isinstance(record, dict) or any(
+            record.get(field) in (None, "") for field in self.kind.required
+        ):
+            return None
+        self.rows += 1
+        fields = [copy_field(self.rows)] + [copy_field(record.get(field)) for field in self.kind.fields]
+        return "\t".join(fields) + "\n"
+
+    def read(self, size=-1):
+        lines = [self._buffer]
+        buffered = len(self._buffer)
+        while size < 0 or buffered < size:
+            record = next(self.records, _END)
+            if record is _END:
+                break
+            line = self._line(record)
+            if line is None:
+                self.invalid += 1
+            else:
+                lines.append(line)
+                buffered += len(line)
+        self._buffer = "".join(lines)
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+class CopySink(io.TextIOBase):
+    """Writable stream receiving COPY TO STDOUT output and writing records."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.rows = 0
+        self._partial = ""
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        lines = (self._partial + data).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self.writer.write([parse_copy_field(field) for field in line.split("\t")])
+            self.rows += 1
+        return len(data)
+
+
+def import_records(conn, kind_name, records, chunk_size=CHUNK_SIZE):
+    """Import records in one transaction.
+
+    Returns:
+        dict: rows read, invalid (missing required fields), inserted,
+        duplicates skipped, seconds and rows_per_second
+    """
+    kind = KINDS[kind_name]
+    started = time.perf_counter()
+    source = CopySource(records, kind)
+    columns = ", ".join(f"{field} TEXT" for field in kind.fields)
+    try:
+        cur = conn.cursor()
+        cur.execute(f"CREATE TEMP TABLE bulk_stage (line BIGINT, {columns}) ON COMMIT DROP")
+        cur.copy_expert(
+            f"COPY bulk_stage (line, {', '.join(kind.fields)}) FROM STDIN", source, size=chunk_size
+        )
+        cur.execute(kind.insert_sql)
+        inserted = cur.rowcount
+        conn.commit()
+        cur.close()
+    except Exception:
+        conn.rollback()
+        raise
+
+    seconds = time.perf_counter() - started
+    return {
+        "read": source.rows + source.invalid,
+        "invalid": source.invalid,
+        "inserted": inserted,
+        "duplicates": source.rows - inserted,
+        "seconds": seconds,
+        "rows_per_second": (source.rows + source.invalid) / seconds if seconds else 0.0,
+    }
+
+
+def export_records(conn, kind_name, f, fmt, chunk_size=CHUNK_SIZE):
+    """Write every record of a kind to a text stream.
+
+    Returns:
+        dict: rows written, seconds and rows_per_second
+    """
+    kind = KINDS[kind_name]
+    started = time.perf_counter()
+    sink = CopySink(RecordWriter(f, fmt, kind.fields, kind.integers))
+    cur = conn.cursor()
+    try:
+        cur.copy_expert(f"COPY ({kind.export_sql}) TO STDOUT", sink, size=chunk_size)
+    finally:
+        cur.close()
+    seconds = time.perf_counter() - started
+    return {
+        "rows": sink.rows,
+        "seconds": seconds,
+        "rows_per_second": sink.rows / seconds if seconds else 0.0,
+    }
@@ -13,7 +13,8 @@ class CacheMixin:
         if cache_key not in self.cache["cache_timestamps"]:
             return False
         age = time.time() - self.cache["cache_timestamps"][cache_key]
-        return age < self.cache["cache_ttl"]
+        cache_type = cache_key.split(":", 1)[0]
+        return age < self.cache["cache_ttls"].get(cache_type, self.cache["cache_ttl"])
 
     def _cache_set(self, cache_type, key, value):
         """Set a value in the cache with timestamp"""
@@ -51,3 +52,9 @@ class CacheMixin:
             if cache_key in self.cache["cache_timestamps"]:
                 del self.cache["cache_timestamps"][cache_key]
             self.logger.debug(f"Invalidated cache for {cache_key}")
+
+    def _cache_invalidate_matching(self, cache_type, match):
+        """Invalidate the entries of a type for which match(key, value) is true"""
+        for key, value in list(self.cache[cache_type].items()):
+            if match(key, value):
+                self._cache_invalidate(cache_type, key)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache invalidation across bots sharing a PostgreSQL database.
+
+The triggers of migration ``0003_cache_notify`` send a NOTIFY on the
+``phreakbot_cache`` channel for every change to users, hostmasks,
+permissions, auto-op and autovoice, whether it was made by this bot,
+by another bot on the same database or by an admin in psql. Each bot
+LISTENs on a dedicated connection that the event loop watches, and drops
+exactly the cached entries the change affects: the user info and
+profiles of the user concerned, the permission index, and the auto-op
+and autovoice checks of their hostmasks and channel.
+
+While the bot listens, these entries are kept for ``cache_ttl_listening``
+seconds (default 3600) instead of ``cache_ttl`` (default 300), so the
+TTL is only a safety net; other caches, such as info items, keep
+``cache_ttl``. If the connection is lost, the bot drops these caches,
+since notifications may have been missed, returns to ``cache_ttl`` and
+reconnects every LISTEN_RETRY seconds.
+
+An SQLite database belongs to a single bot, which already drops its
+caches when it writes, so there is nothing to listen for.
+"""
+
+import asyncio
+import json
+
+import psycopg2
+
+NOTIFY_CHANNEL = "phreakbot_cache"
+LISTEN_RETRY = 60
+
+# Cache types built from each table
+_TABLE_CACHES = {
+    "phreakbot_users": ("user_info", "user_profile", "perm_index"),
+    "phreakbot_hostmasks": ("user_info", "user_profile", "autoop"),
+    "phreakbot_perms": ("user_info", "user_profile", "perm_index"),
+    "phreakbot_autoop": ("autoop",),
+    "phreakbot_autovoice": ("autovoice",),
+}
+_LISTENED_CACHES = ("user_info", "user_profile", "perm_index", "autoop", "autovoice")
+
+
+class CacheNotifyMixin:
+    """Mixin keeping the user caches in step with database notifications."""
+
+    def start_cache_listener(self):
+        """LISTEN for cache invalidations (idempotent); needs a running event loop."""
+        self._cache_listen_retry = None
+        if (
+            self._cache_listener is not None
+            or self.db_backend() != "postgresql"
+            or not self.config.get("cache_notify", True)
+        ):
+            return
+        try:
+            conn = psycopg2.connect(
+                host=self.config["db_host"],
+                port=self.config["db_port"],
+                user=self.config["db_user"],
+                password=self.config["db_password"],
+                dbname=self.config["db_name"],
+                connect_timeout=10,
+            )
+            conn.autocommit = True
+            cur = conn.cursor()
+            cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            cur.close()
+        except Exception as e:
+            self.logger.warning(f"Cannot listen for cache invalidations, retrying in {LISTEN_RETRY}s: {e}")
+            self._retry_cache_listener()
+            return
+
+        self._cache_listener = conn
+        self._cache_listener_fd = conn.fileno()
+        asyncio.get_running_loop().add_reader(self._cache_listener_fd, self._on_cache_notify)
+        # Changes made before LISTEN went unnoticed
+        self._drop_listened_caches()
+        self.cache["cache_ttls"] = dict.fromkeys(
+            _LISTENED_CACHES, self.config.get("cache_ttl_listening", 3600)
+        )
+        self.logger.info(f"Listening for cache invalidations on {NOTIFY_CHANNEL}")
+
+    def stop_cache_listener(self):
+        """Stop listening; caches fall back to cache_ttl."""
+        conn, self._cache_listener = self._cache_listener, None
+        if conn is None:
+            return
+        try:
+            asyncio.get_running_loop().remove_reader(self._cache_listener_fd)
+        except RuntimeError:
+            pass  # no running loop, nothing is watching the connection
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self.cache["cache_ttls"] = {}
+        self._drop_listened_caches()
+
+    def _retry_cache_listener(self):
+        if self._cache_listen_retry is None:
+            self._cache_listen_retry = asyncio.get_running_loop().call_later(
+                LISTEN_RETRY, self.start_cache_listener
+            )
+
+    def _on_cache_notify(self):
+        """Event loop callback: the listening connection is readable."""
+        conn = self._cache_listener
+        try:
+            conn.poll()
+        except Exception as e:
+            self.logger.warning(f"Lost the cache invalidation listener: {e}")
+            self.stop_cache_listener()
+            self._retry_cache_listener()
+            return
+        while conn.notifies:
+            notify = conn.notifies.pop(0)
+            try:
+                self.invalidate_from_notification(json.loads(notify.payload))
+            except Exception as e:
+                self.logger.warning(f"Unreadable cache notification {notify.payload!r}: {e}")
+                self._drop_listened_caches()
+
+    def _drop_listened_caches(self):
+        for cache_type in _LISTENED_CACHES:
+            self._cache_invalidate(cache_type)
+
+    def invalidate_from_notification(self, payload):
+        """Drop the cache entries affected by the change a notification describes."""
+        table = payload["table"]
+        rows = [row for row in (payload.get("old"), payload.get("new")) if row]
+        if not rows:
+            # TRUNCATE, or rows too large for a notification
+            for cache_type in _TABLE_CACHES.get(table, ()):
+                self._cache_invalidate(cache_type)
+            return
+
+        if table == "phreakbot_autovoice":
+            for row in rows:
+                self._cache_invalidate("autovoice", row["channel"].lower())
+            return
+
+        if table == "phreakbot_autoop":
+            hostmasks = set(payload.get("hostmasks") or ())
+            channels = {row["channel"].lower() for row in rows}
+            self._cache_invalidate_matching(
+                "autoop", lambda key, value: _autoop_entry(key, channels, hostmasks)
+            )
+            return
+
+        user_ids = {row["id"] if table == "phreakbot_users" else row["users_id"] for row in rows}
+        hostmasks = {row["hostmask"].lower() for row in rows if row.get("hostmask")}
+        usernames = {row["username"].lower() for row in rows if row.get("username")}
+
+        # User info is cached per hostmask but also matches by nick
+        self._cache_invalidate_matching(
+            "user_info",
+            lambda key, value: value.get("id") in user_ids
+            or key.lower() in hostmasks
+            or key.split("!")[0].lower() in usernames,
+        )
+        # Profiles are cached per (username, hostmask)
+        self._cache_invalidate_matching(
+            "user_profile",
+            lambda key, value: value.get("id") in user_ids
+            or key[0] in usernames
+            or key[1] in hostmasks,
+        )
+        if table in ("phreakbot_users", "phreakbot_perms"):
+            self._cache_invalidate("perm_index")
+        if hostmasks:
+            self._cache_invalidate_matching(
+                "autoop", lambda key, value: _autoop_entry(key, None, hostmasks)
+            )
+
+
+def _autoop_entry(key, channels, hostmasks):
+    """Whether an auto-op check, cached as "channel hostmask", is affected.
+
+    channels None means any channel; "" among them (global auto-op) too.
+    """
+    channel, hostmask = key.split(" ", 1)
+    if hostmask not in hostmasks:
+        return False
+    return channels is None or "" in channels or channel in channels
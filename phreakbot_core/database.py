@@ -1,18 +1,99 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-"""Database connection management for PhreakBot."""
+"""Database connection management for PhreakBot.
 
+The storage backend is chosen by ``db_backend``: "postgresql" (the
+default, a connection pool to the db_host server) or "sqlite" (the
+embedded database file ``sqlite_path``, see phreakbot_core/sqlite.py).
+Both hand out psycopg2-style connections from ``db_pool``.
+"""
+
+import json
 import time
 
 import psycopg2
+import psycopg2.extras
 import psycopg2.pool
 
+from . import migrations, sqlite
+
+# The few queries built on PostgreSQL arrays; SQLite aggregates JSON arrays
+_USER_INFO_SQL = {
+    "postgresql": (
+        "SELECT u.id, u.username, u.is_admin, u.is_owner, "
+        "array_agg(DISTINCT h.hostmask) as hostmasks, "
+        "array_agg(DISTINCT p.permission) FILTER (WHERE p.channel = '') as global_perms, "
+        "array_agg(DISTINCT p.permission || ':' || p.channel) FILTER (WHERE p.channel != '') as channel_perms "
+        "FROM phreakbot_users u "
+        "LEFT JOIN phreakbot_hostmasks h ON h.users_id = u.id "
+        "LEFT JOIN phreakbot_perms p ON p.users_id = u.id "
+        "WHERE lower(h.hostmask) = %s OR lower(u.username) = %s "
+        "GROUP BY u.id"
+    ),
+    "sqlite": (
+        "SELECT u.id, u.username, u.is_admin, u.is_owner, "
+        "json_group_array(DISTINCT h.hostmask) FILTER (WHERE h.hostmask IS NOT NULL) as hostmasks, "
+        "json_group_array(DISTINCT p.permission) FILTER (WHERE p.channel = '') as global_perms, "
+        "json_group_array(DISTINCT p.permission || ':' || p.channel) FILTER (WHERE p.channel != '') as channel_perms "
+        "FROM phreakbot_users u "
+        "LEFT JOIN phreakbot_hostmasks h ON h.users_id = u.id "
+        "LEFT JOIN phreakbot_perms p ON p.users_id = u.id "
+        "WHERE lower(h.hostmask) = %s OR lower(u.username) = %s "
+        "GROUP BY u.id"
+    ),
+}
+
+_USER_PROFILE_SQL = {
+    "postgresql": (
+        "SELECT u.id, u.username, u.dob, u.is_admin, u.is_owner, "
+        "ARRAY(SELECT h.hostmask FROM phreakbot_hostmasks h "
+        "WHERE h.users_id = u.id ORDER BY h.id) AS hostmasks, "
+        "ARRAY(SELECT ARRAY[p.channel, p.permission] FROM phreakbot_perms p "
+        "WHERE p.users_id = u.id ORDER BY p.channel, p.permission) AS perms "
+        "FROM phreakbot_users u "
+        "WHERE lower(u.username) = %s "
+        "OR u.id = (SELECT users_id FROM phreakbot_hostmasks WHERE lower(hostmask) = %s) "
+        "ORDER BY lower(u.username) = %s DESC LIMIT 1"
+    ),
+    "sqlite": (
+        "SELECT u.id, u.username, u.dob, u.is_admin, u.is_owner, "
+        "(SELECT json_group_array(hostmask) FROM (SELECT h.hostmask FROM phreakbot_hostmasks h "
+        "WHERE h.users_id = u.id ORDER BY h.id)) AS hostmasks, "
+        "(SELECT json_group_array(json_array(channel, permission)) FROM (SELECT p.channel, p.permission "
+        "FROM phreakbot_perms p WHERE p.users_id = u.id ORDER BY p.channel, p.permission)) AS perms "
+        "FROM phreakbot_users u "
+        "WHERE lower(u.username) = %s "
+        "OR u.id = (SELECT users_id FROM phreakbot_hostmasks WHERE lower(hostmask) = %s) "
+        "ORDER BY lower(u.username) = %s DESC LIMIT 1"
+    ),
+}
+
+
+def _array(value):
+    """An array column: a list from PostgreSQL, JSON text from SQLite."""
+    return json.loads(value) if isinstance(value, str) else value
+
 
 class DatabaseMixin:
     """Mixin for database connection pooling and queries."""
 
+    def db_backend(self):
+        """The configured storage backend, "postgresql" or "sqlite"."""
+        return "sqlite" if self.config.get("db_backend") == "sqlite" else "postgresql"
+
     def db_connect(self, max_retries=3, retry_delay=5):
-        """Connect to the PostgreSQL database with connection pooling"""
+        """Connect to the configured database backend with connection pooling"""
+        if self.db_backend() == "sqlite":
+            path = self.config.get("sqlite_path", sqlite.DEFAULT_PATH)
+            try:
+                self.db_pool = sqlite.SQLitePool(1, 20, path)
+                self.logger.info(f"Opened SQLite database {path}")
+                return True
+            except Exception as e:
+                self.logger.error(f"Could not open SQLite database {path}: {e}")
+                self.db_pool = None
+                return False
+
         for attempt in range(max_retries):
             try:
                 self.logger.info(
@@ -57,6 +138,27 @@ class DatabaseMixin:
         if self.db_pool is not None:
             self.db_pool.putconn(conn)
 
+    def db_migrate(self):
+        """Apply pending schema migrations (see phreakbot_core/migrations.py).
+
+        Returns:
+            bool: False if the migrations could not be applied
+        """
+        conn = self.db_get()
+        if not conn:
+            return False
+        try:
+            if self.db_backend() == "sqlite":
+                sqlite.migrate(conn, logger=self.logger)
+            else:
+                migrations.migrate(conn, logger=self.logger)
+            return True
+        except Exception as e:
+            self.logger.error(f"Database migration failed: {e}")
+            return False
+        finally:
+            self.db_return(conn)
+
     def ensure_db_connection(self):
         """Ensure database connection pool is alive, reconnect if needed"""
         if self.db_pool is None:
@@ -91,16 +193,8 @@ class DatabaseMixin:
         try:
             cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
             cur.execute(
-                "SELECT u.id, u.username, u.is_admin, u.is_owner, "
-                "array_agg(DISTINCT h.hostmask) as hostmasks, "
-                "array_agg(DISTINCT p.permission) FILTER (WHERE p.channel = '') as global_perms, "
-                "array_agg(DISTINCT p.permission || ':' || p.channel) FILTER (WHERE p.channel != '') as channel_perms "
-                "FROM phreakbot_users u "
-                "LEFT JOIN phreakbot_hostmasks h ON h.users_id = u.id "
-                "LEFT JOIN phreakbot_perms p ON p.users_id = u.id "
-                "WHERE h.hostmask = %s OR u.username = %s "
-                "GROUP BY u.id",
-                (hostmask, hostmask.split("!")[0] if "!" in hostmask else hostmask),
+                _USER_INFO_SQL[self.db_backend()],
+                (hostmask.lower(), hostmask.split("!")[0].lower()),
             )
             user = cur.fetchone()
             cur.close()
@@ -112,14 +206,14 @@ class DatabaseMixin:
                     "username": user["username"],
                     "is_admin": user["is_admin"],
                     "is_owner": user["is_owner"],
-                    "hostmasks": user["hostmasks"] or [],
+                    "hostmasks": _array(user["hostmasks"]) or [],
                     "permissions": {
-                        "global": user["global_perms"] or [],
+                        "global": _array(user["global_perms"]) or [],
                     },
                 }
                 # Parse channel-specific permissions
                 if user["channel_perms"]:
-                    for perm_channel in user["channel_perms"]:
+                    for perm_channel in _array(user["channel_perms"]):
                         if ":" in perm_channel:
                             perm, channel = perm_channel.rsplit(":", 1)
                             if channel not in user_info["permissions"]:
@@ -133,3 +227,104 @@ class DatabaseMixin:
             self.db_return(conn)
 
         return None
+
+    def db_get_user_profile(self, username=None, hostmask=None):
+        """Get a user's full profile in one query.
+
+        The user is found by username, or else by one of their hostmasks.
+        Returns the user_info fields plus dob and ``matched_by`` ("username"
+        or "hostmask"), or None if the user is unknown. Profiles are cached
+        until the TTL expires or db_invalidate_users() is called.
+        """
+        if not self.db_pool:
+            return None
+        username = (username or "").lower()
+        hostmask = (hostmask or "").lower()
+
+        # A tuple, since nicks may contain "|"
+        cache_key = (username, hostmask)
+        cached = self._cache_get("user_profile", cache_key)
+        if cached:
+            return cached
+
+        conn = self.db_get()
+        if not conn:
+            return None
+
+        try:
+            cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+            cur.execute(_USER_PROFILE_SQL[self.db_backend()], (username, hostmask, username))
+            user = cur.fetchone()
+            cur.close()
+        except Exception as e:
+            self.logger.error(f"Error getting user profile: {e}")
+            return None
+        finally:
+            self.db_return(conn)
+
+        if not user:
+            return None
+
+        permissions = {"global": []}
+        for channel, permission in _array(user["perms"]) or []:
+            permissions.setdefault(channel or "global", []).append(permission)
+
+        profile = {
+            "id": user["id"],
+            "username": user["username"],
+            "dob": user["dob"],
+            "is_admin": user["is_admin"],
+            "is_owner": user["is_owner"],
+            "hostmasks": _array(user["hostmasks"]) or [],
+            "permissions": permissions,
+            "matched_by": "username" if user["username"] == username else "hostmask",
+        }
+        self._cache_set("user_profile", cache_key, profile)
+        return profile
+
+    def db_get_permission_index(self):
+        """Get the reverse permission index, {(permission, channel): [usernames]}.
+
+        Global permissions have channel "". The index is built from one
+        query over all permissions and cached like user profiles.
+        """
+        if not self.db_pool:
+            return None
+
+        cached = self._cache_get("perm_index", "all")
+        if cached is not None:
+            return cached
+
+        conn = self.db_get()
+        if not conn:
+            return None
+
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT p.permission, p.channel, u.username FROM phreakbot_perms p "
+                "JOIN phreakbot_users u ON u.id = p.users_id "
+                "ORDER BY u.username"
+            )
+            rows = cur.fetchall()
+            cur.close()
+        except Exception as e:
+            self.logger.error(f"Error building permission index: {e}")
+            return None
+        finally:
+            self.db_return(conn)
+
+        index = {}
+        for permission, channel, username in rows:
+            index.setdefault((permission, channel or ""), []).append(username)
+        self._cache_set("perm_index", "all", index)
+        return index
+
+    def db_invalidate_users(self):
+        """Drop cached user info, profiles, the permission index and
+        auto-op checks.
+
+        Call after changing users, hostmasks or permissions.
+        """
+        for cache_type in ("user_info", "user_profile", "perm_index", "autoop"):
+            self._cache_invalidate(cache_type)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Background-refreshed local datasets for PhreakBot.
+
+Lookup modules answer from local copies of public data (routing tables,
+registries, databases) instead of calling a web API on every command.
+A Dataset ties a local file to an optional download URL and a loader
+that turns the file into a query structure:
+
+- refresh() downloads the file with a conditional GET (ETag and
+  Last-Modified are kept in a ``<path>.meta`` sidecar file), writes it
+  to a temporary file and renames it into place, then loads it if it
+  changed. It blocks, so the bot runs it in a worker thread.
+- ``value`` is replaced in a single assignment once a new copy has been
+  loaded completely, so readers always see either the old or the new
+  structure, never a half-built one. Until the first load it is None.
+- an optional ``on_change(old, new)`` coroutine function is awaited on
+  the event loop after a background refresh swapped in a new value.
+
+DatasetsMixin keeps the registry on the bot and starts one refresh task
+per dataset once the event loop is running.
+"""
+
+import asyncio
+import json
+import os
+import time
+
+import requests
+
+
+DEFAULT_REFRESH_INTERVAL = 86400
+RETRY_INTERVAL = 900
+DOWNLOAD_TIMEOUT = 60
+CHUNK_SIZE = 65536
+
+
+class Dataset:
+    """A local data file, its loader and its optional upstream URL."""
+
+    def __init__(
+        self,
+        name,
+        path,
+        loader,
+        url=None,
+        refresh_interval=DEFAULT_REFRESH_INTERVAL,
+        headers=None,
+        logger=None,
+        on_change=None,
+    ):
+        self.name = name
+        self.path = path
+        self.loader = loader
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.headers = headers or {}
+        self.logger = logger
+        self.on_change = on_change
+        self.value = None
+        self.loaded_at = None
+        self._mtime = None
+
+    def _log(self, level, message):
+        if self.logger:
+            getattr(self.logger, level)(f"Dataset {self.name}: {message}")
+
+    @property
+    def meta_path(self):
+        return f"{self.path}.meta"
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def download(self):
+        """Fetch the upstream file if it changed.
+
+        Returns:
+            bool: True if a new file was written
+        """
+        if not self.url:
+            return False
+
+        headers = dict(self.headers)
+        meta = self._read_meta() if os.path.exists(self.path) else {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        with requests.get(self.url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+            if response.status_code == 304:
+                self._log("debug", "not modified upstream")
+                return False
+            response.raise_for_status()
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+            os.replace(tmp_path, self.path)
+
+            meta = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "url": self.url,
+                "fetched_at": time.time(),
+            }
+        with open(self.meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        self._log("info", f"downloaded {os.path.getsize(self.path):,} bytes from {self.url}")
+        return True
+
+    def load(self, force=False):
+        """Load the local file if it changed since the last load.
+
+        Returns:
+            bool: True if a new value was swapped in
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return False
+        if not force and mtime == self._mtime and self.value is not None:
+            return False
+
+        started = time.perf_counter()
+        value = self.loader(self.path)
+        self.value = value
+        self._mtime = mtime
+        self.loaded_at = time.time()
+        self._log("info", f"loaded {self.path} in {time.perf_counter() - started:.2f}s")
+        return True
+
+    def refresh(self):
+        """Download (if configured) and load the dataset. Blocking.
+
+        Errors are logged; the current value is kept.
+
+        Returns:
+            bool: True if the refresh succeeded (whether or not data changed)
+        """
+        ok = True
+        try:
+            self.download()
+        except Exception as e:
+            ok = False
+            self._log("warning", f"download failed: {e}")
+        try:
+            self.load()
+        except Exception as e:
+            ok = False
+            self._log("error", f"load failed: {e}")
+        return ok
+
+    def load_cached(self):
+        """Load the local copy, if any, without touching the network.
+
+        Returns:
+            bool: True if a value is available afterwards
+        """
+        try:
+            self.load()
+        except Exception as e:
+            self._log("error", f"load failed: {e}")
+        return self.value is not None
+
+    async def run_forever(self):
+        """Serve the local copy, then refresh now and every ``refresh_interval`` seconds.
+
+        The copy left on disk by an earlier run is loaded before the first
+        download, so a restart does not wait for the network (stale while
+        revalidate).
+        """
+        loop = asyncio.get_running_loop()
+        if self.url:
+            await loop.run_in_executor(None, self.load_cached)
+        while True:
+            old = self.value
+            ok = await loop.run_in_executor(None, self.refresh)
+            if self.on_change is not None and self.value is not old:
+                try:
+                    await self.on_change(old, self.value)
+                except Exception as e:
+                    self._log("error", f"change handler failed: {e}")
+            delay = self.refresh_interval if ok else min(self.refresh_interval, RETRY_INTERVAL)
+            await asyncio.sleep(max(delay, 1))
+
+
+class DatasetsMixin:
+    """Mixin keeping the bot's local datasets and their refresh tasks."""
+
+    def add_dataset(self, dataset):
+        """Register a dataset; its refresh task starts with the bot.
+
+        Registering a new dataset under an existing name (a reloaded
+        module) stops the refresh task of the one it replaces.
+        """
+        previous = self.datasets.get(dataset.name)
+        self.datasets[dataset.name] = dataset
+        if self._dataset_tasks is not None:
+            if previous is not None and previous is not dataset:
+                task = self._dataset_tasks.pop(dataset.name, None)
+                if task is not None:
+                    task.cancel()
+            self._start_dataset(dataset)
+        return dataset
+
+    def dataset(self, name):
+        """Return the loaded value of a dataset, or None."""
+        dataset = self.datasets.get(name)
+        return dataset.value if dataset else None
+
+    def _start_dataset(self, dataset):
+        task = self._dataset_tasks.get(dataset.name)
+        if task is None or task.done():
+            self._dataset_tasks[dataset.name] = asyncio.get_running_loop().create_task(
+                dataset.run_forever()
+            )
+
+    def start_datasets(self):
+        """Start the refresh task of every registered dataset (idempotent)."""
+        if self._dataset_tasks is None:
+            self._dataset_tasks = {}
+        for dataset in self.datasets.values():
+            self._start_dataset(dataset)
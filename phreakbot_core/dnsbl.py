@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DNS blocklist (DNSBL) checks for PhreakBot.
+
+An address is checked against every configured zone at once: all
+queries run concurrently on the event loop, so a check takes as long as
+the slowest zone rather than the sum of all of them. Answers are decoded
+into the listing reasons published by each list (e.g. Spamhaus SBL, XBL
+and PBL return codes) and cached per (zone, address) for as long as the
+DNS TTL allows. IPv4 addresses are reversed octet by octet, IPv6
+addresses nibble by nibble.
+
+Answers in 127.255.255.0/24 are error codes from the list operator
+(e.g. Spamhaus refusing queries that arrive via a public resolver).
+They are reported as errors, never as listings.
+"""
+
+import asyncio
+import ipaddress
+import time
+from collections import OrderedDict, namedtuple
+
+import dns.asyncresolver
+import dns.exception
+import dns.rdatatype
+import dns.resolver
+
+
+DEFAULT_ZONES = (
+    "zen.spamhaus.org",
+    "bl.spamcop.net",
+    "dnsbl.dronebl.org",
+    "psbl.surriel.com",
+)
+
+MIN_TTL = 60
+MAX_TTL = 3600
+NEGATIVE_TTL = 300
+MAX_ENTRIES = 4096
+QUERY_TIMEOUT = 2.0
+MAX_CONCURRENCY = 32
+
+_SPAMHAUS_CODES = {
+    "127.0.0.2": "SBL spam source",
+    "127.0.0.3": "SBL CSS snowshoe spam",
+    "127.0.0.4": "XBL exploited host",
+    "127.0.0.5": "XBL exploited host",
+    "127.0.0.6": "XBL exploited host",
+    "127.0.0.7": "XBL exploited host",
+    "127.0.0.9": "SBL DROP hijacked netblock",
+    "127.0.0.10": "PBL ISP dynamic range",
+    "127.0.0.11": "PBL Spamhaus policy",
+}
+
+# Return codes of well-known lists; other zones report the raw address
+RETURN_CODES = {
+    "zen.spamhaus.org": _SPAMHAUS_CODES,
+    "sbl.spamhaus.org": _SPAMHAUS_CODES,
+    "xbl.spamhaus.org": _SPAMHAUS_CODES,
+    "pbl.spamhaus.org": _SPAMHAUS_CODES,
+    "sbl-xbl.spamhaus.org": _SPAMHAUS_CODES,
+    "bl.spamcop.net": {"127.0.0.2": "spam source"},
+    "psbl.surriel.com": {"127.0.0.2": "spam trap hit"},
+    "dnsbl.dronebl.org": {
+        "127.0.0.3": "IRC drone",
+        "127.0.0.5": "bottler",
+        "127.0.0.6": "spambot or drone",
+        "127.0.0.7": "DDoS drone",
+        "127.0.0.8": "SOCKS proxy",
+        "127.0.0.9": "HTTP proxy",
+        "127.0.0.10": "proxy chain",
+        "127.0.0.11": "web page proxy",
+        "127.0.0.12": "open DNS resolver",
+        "127.0.0.13": "brute force attacker",
+        "127.0.0.14": "open Wingate proxy",
+        "127.0.0.15": "compromised router",
+        "127.0.0.16": "autorooting worm",
+        "127.0.0.17": "botnet",
+        "127.0.0.18": "DNS/MX on IRC",
+        "127.0.0.19": "abused VPN",
+        "127.0.0.255": "uncategorized",
+    },
+}
+
+ERROR_CODES = {
+    "127.255.255.252": "typo in DNSBL name",
+    "127.255.255.254": "query via public resolver refused",
+    "127.255.255.255": "query limit exceeded",
+}
+
+_ERROR_NETWORK = ipaddress.ip_network("127.255.255.0/24")
+
+DnsblResult = namedtuple("DnsblResult", ["zone", "listed", "reasons", "error"])
+DnsblResult.__doc__ = """Outcome of checking one address against one zone.
+
+reasons is a tuple of decoded return codes; error is None or a string
+describing why the zone gave no usable answer.
+"""
+
+
+def reverse_address(address):
+    """Return the DNSBL query label for an IP address.
+
+    1.2.3.4 becomes 4.3.2.1; IPv6 addresses become their 32 reversed
+    nibbles. Raises ValueError for invalid addresses.
+    """
+    ip = ipaddress.ip_address(address)
+    suffix = ".in-addr.arpa" if ip.version == 4 else ".ip6.arpa"
+    return ip.reverse_pointer[: -len(suffix)]
+
+
+def decode_answer(zone, codes):
+    """Turn the A records returned by a zone into a DnsblResult."""
+    known = RETURN_CODES.get(zone.lower(), {})
+    reasons = []
+    errors = []
+    for code in codes:
+        try:
+            is_error = ipaddress.ip_address(code) in _ERROR_NETWORK
+        except ValueError:
+            is_error = True
+        if is_error:
+            errors.append(ERROR_CODES.get(code, f"error code {code}"))
+        else:
+            reason = known.get(code, code)
+            if reason not in reasons:
+                reasons.append(reason)
+    if reasons:
+        return DnsblResult(zone, True, tuple(reasons), None)
+    return DnsblResult(zone, False, (), ", ".join(errors) or None)
+
+
+class DnsblChecker:
+    """Concurrent, caching checker for a list of DNSBL zones."""
+
+    def __init__(
+        self,
+        zones=DEFAULT_ZONES,
+        timeout=QUERY_TIMEOUT,
+        min_ttl=MIN_TTL,
+        max_ttl=MAX_TTL,
+        negative_ttl=NEGATIVE_TTL,
+        max_entries=MAX_ENTRIES,
+        max_concurrency=MAX_CONCURRENCY,
+    ):
+        self.zones = tuple(zone.strip().rstrip(".") for zone in zones if zone.strip())
+        self.timeout = timeout
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.max_concurrency = max_concurrency
+        self._cache = OrderedDict()
+        self._resolver = None
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a checker from the ``rbl_zones`` and ``rbl_timeout`` settings."""
+        return cls(
+            zones=config.get("rbl_zones", DEFAULT_ZONES),
+            timeout=config.get("rbl_timeout", QUERY_TIMEOUT),
+        )
+
+    def __len__(self):
+        return len(self._cache)
+
+    def clear(self):
+        """Drop all cached results."""
+        self._cache.clear()
+
+    def _get_resolver(self):
+        if self._resolver is None:
+            self._resolver = dns.asyncresolver.Resolver()
+            self._resolver.lifetime = self.timeout
+        return self._resolver
+
+    def _cache_lookup(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if time.time() >= entry[0]:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return entry[1]
+
+    def _cache_store(self, key, result, ttl):
+        self._cache[key] = (time.time() + ttl, result)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def _nxdomain_ttl(self, exc):
+        """Negative-caching TTL from the SOA of an NXDOMAIN answer (RFC 2308)."""
+        try:
+            for response in exc.responses().values():
+                for rrset in response.authority:
+                    if rrset.rdtype == dns.rdatatype.SOA:
+                        return max(self.min_ttl, min(rrset.ttl, rrset[0].minimum, self.max_ttl))
+        except Exception:
+            pass
+        return self.negative_ttl
+
+    async def _query(self, zone, address, label):
+        key = (zone, address)
+        cached = self._cache_lookup(key)
+        if cached is not None:
+            return cached
+
+        qname = f"{label}.{zone}."
+        try:
+            answer = await self._get_resolver().resolve(qname, "A", search=False)
+        except dns.resolver.NXDOMAIN as e:
+            result = DnsblResult(zone, False, (), None)
+            self._cache_store(key, result, self._nxdomain_ttl(e))
+            return result
+        except dns.resolver.NoAnswer:
+            result = DnsblResult(zone, False, (), None)
+            self._cache_store(key, result, self.negative_ttl)
+            return result
+        except dns.exception.Timeout:
+            return DnsblResult(zone, False, (), "timeout")
+        except dns.exception.DNSException as e:
+            return DnsblResult(zone, False, (), type(e).__name__)
+
+        result = decode_answer(zone, [rdata.address for rdata in answer])
+        if result.error is None:
+            ttl = max(self.min_ttl, min(answer.rrset.ttl, self.max_ttl))
+            self._cache_store(key, result, ttl)
+        return result
+
+    async def check(self, address, zones=None):
+        """Check one address against all zones concurrently.
+
+        Raises ValueError for invalid addresses.
+
+        Returns:
+            list: DnsblResult objects in zone order
+        """
+        return (await self.check_many([address], zones=zones))[0]
+
+    async def check_many(self, addresses, zones=None):
+        """Check several addresses against all zones concurrently.
+
+        At most ``max_concurrency`` queries are in flight at once.
+        Raises ValueError if any address is invalid.
+
+        Returns:
+            list: one list of DnsblResult objects per address, in order
+        """
+        zones = self.zones if zones is None else tuple(zones)
+        labels = [(str(ipaddress.ip_address(a)), reverse_address(a)) for a in addresses]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def bounded(zone, address, label):
+            async with semaphore:
+                return await self._query(zone, address, label)
+
+        results = await asyncio.gather(
+            *(
+                bounded(zone, address, label)
+                for address, label in labels
+                for zone in zones
+            )
+        )
+        width = len(zones)
+        return [list(results[i * width : (i + 1) * width]) for i in range(len(labels))]
@@ -2,22 +2,56 @@
 # -*- coding: utf-8 -*-
 """Event handling and routing for PhreakBot."""
 
+import asyncio
+import contextvars
+import inspect
 import re
 import traceback
 
 
+# Output buffer and pending async handlers of the event being processed.
+# pydle handles every incoming line in its own task, so context variables
+# keep concurrent events from writing into each other's output.
+_active_output_var = contextvars.ContextVar("active_output", default=None)
+_pending_var = contextvars.ContextVar("pending_handlers", default=None)
+
+# Seconds to wait for the end of a WHO reply
+WHO_TIMEOUT = 30
+
+# Kick pacing: lines sent at once, then seconds between lines
+KICK_BURST = 10
+KICK_INTERVAL = 0.5
+# Bytes of a KICK line left for the comma-separated nicks
+KICK_TARGETS_BYTES = 300
+# Targets per line when TARGMAX gives a command no limit
+UNLIMITED_TARGETS = 100
+
+
 class EventsMixin:
     """Mixin for IRC event handling and module routing."""
 
+    @property
+    def _active_output(self):
+        return _active_output_var.get()
+
+    @_active_output.setter
+    def _active_output(self, value):
+        _active_output_var.set(value)
+
     async def on_connect(self):
         """Called when bot has successfully connected to the server"""
         self.logger.info(f"Successfully connected to {self.network}")
+        self.start_cache_listener()
+        self.start_datasets()
+        self.feeds.start(self.message)
         for channel in self.config["channels"]:
             try:
                 await self.join(channel)
                 self.logger.info(f"Joined channel: {channel}")
             except Exception as e:
                 self.logger.error(f"Failed to join channel {channel}: {e}")
+        # After joining, so overdue unbans can be applied right away
+        self.start_timers()
         await super().on_connect()
 
     async def on_disconnect(self, expected):
@@ -51,6 +85,46 @@ class EventsMixin:
             self.logger.info(f"Cached hostmask from raw JOIN: {hostmask}")
         await super().on_raw_join(message)
 
+    async def who(self, channel, timeout=WHO_TIMEOUT):
+        """Ask the server for everyone in a channel in one WHO round.
+
+        Returns:
+            dict: {nick: hostmask}; partial if the server does not finish
+            the reply within timeout seconds. Hostmasks are cached too.
+        """
+        key = channel.lower()
+        request = self._who_requests.get(key)
+        if request is None:
+            request = self._who_requests[key] = ({}, asyncio.get_running_loop().create_future())
+            await self.rawmsg("WHO", channel)
+        users, done = request
+        try:
+            await asyncio.wait_for(asyncio.shield(done), timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"WHO {channel} timed out after {len(users)} replies")
+        finally:
+            self._who_requests.pop(key, None)
+        return dict(users)
+
+    async def on_raw_352(self, message):
+        """RPL_WHOREPLY: <me> <channel> <user> <host> <server> <nick> <flags> :<hops> <realname>"""
+        if len(message.params) < 6:
+            return
+        channel, user, host, nick = message.params[1], message.params[2], message.params[3], message.params[5]
+        hostmask = f"{nick}!{user}@{host}"
+        self.user_hostmasks[nick.lower()] = hostmask
+        request = self._who_requests.get(channel.lower())
+        if request is not None:
+            request[0][nick] = hostmask
+
+    async def on_raw_315(self, message):
+        """RPL_ENDOFWHO: <me> <channel> :End of WHO list"""
+        if len(message.params) < 2:
+            return
+        request = self._who_requests.get(message.params[1].lower())
+        if request is not None and not request[1].done():
+            request[1].set_result(True)
+
     async def on_join(self, channel, user):
         """Called when someone joins a channel"""
         await self._handle_event(user, channel, "join")
@@ -92,7 +166,8 @@ class EventsMixin:
             "user_info": self.db_get_userinfo_by_userhost(user_host),
         }
         output = []
-        self._route_to_modules(event_obj, output)
+        pending = self._route_to_modules(event_obj, output)
+        await self._run_pending(pending, output)
         await self._process_output(event_obj, output)
 
     async def on_ctcp_version(self, by, target, contents):
@@ -121,7 +196,8 @@ class EventsMixin:
             "user_info": None,
         }
         output = []
-        self._route_to_modules(event_obj, output)
+        pending = self._route_to_modules(event_obj, output)
+        await self._run_pending(pending, output)
         await self._process_output(event_obj, output)
 
     async def _handle_message(self, source, channel, message, is_private):
@@ -201,7 +277,8 @@ class EventsMixin:
                 )
 
                 output = []
-                self._route_to_modules(event_obj, output)
+                pending = self._route_to_modules(event_obj, output)
+                await self._run_pending(pending, output)
                 await self._process_output(event_obj, output)
             else:
                 self.logger.debug(
@@ -209,12 +286,14 @@ class EventsMixin:
                 )
                 event_obj["trigger"] = "event"
                 output = []
-                self._route_to_modules(event_obj, output)
+                pending = self._route_to_modules(event_obj, output)
+                await self._run_pending(pending, output)
                 await self._process_output(event_obj, output)
         else:
             event_obj["trigger"] = "event"
             output = []
-            self._route_to_modules(event_obj, output)
+            pending = self._route_to_modules(event_obj, output)
+            await self._run_pending(pending, output)
             await self._process_output(event_obj, output)
 
     async def _handle_event(self, user, channel, event_type):
@@ -254,14 +333,50 @@ class EventsMixin:
         }
 
         output = []
-        self._route_to_modules(event_obj, output)
+        pending = self._route_to_modules(event_obj, output)
+        await self._run_pending(pending, output)
         await self._process_output(event_obj, output)
 
     def _route_to_modules(self, event, output):
-        """Route an event to the appropriate modules."""
+        """Route an event to the appropriate modules.
+
+        Returns the awaitables produced by async module handlers; they must
+        be passed to _run_pending() before the output is sent.
+        """
+        pending = []
         self._active_output = output
+        pending_token = _pending_var.set(pending)
         try:
             self._dispatch_event(event)
+        finally:
+            _pending_var.reset(pending_token)
+            self._active_output = None
+        return pending
+
+    def _defer(self, module_name, result):
+        """Queue the result of a module's run() if it is awaitable."""
+        if inspect.isawaitable(result):
+            pending = _pending_var.get()
+            if pending is None:
+                # Called outside _route_to_modules; nothing will await it
+                self.logger.error(f"Async handler of module {module_name} was not awaited")
+                if inspect.iscoroutine(result):
+                    result.close()
+                return
+            pending.append((module_name, result))
+
+    async def _run_pending(self, pending, output):
+        """Await async module handlers, collecting their output."""
+        if not pending:
+            return
+        self._active_output = output
+        try:
+            for module_name, awaitable in pending:
+                try:
+                    await awaitable
+                except Exception as e:
+                    self.logger.error(f"Error in module {module_name}: {e}")
+                    self.logger.error(f"Traceback: {traceback.format_exc()}")
         finally:
             self._active_output = None
 
@@ -318,7 +433,7 @@ class EventsMixin:
                             self.logger.debug(
                                 f"Calling module {module_name}.run() with command {event['command']}"
                             )
-                            module["object"].run(self, event)
+                            self._defer(module_name, module["object"].run(self, event))
                             handled = True
                             self.logger.debug(
                                 f"Module {module_name} handled command {event['command']}"
@@ -368,7 +483,7 @@ class EventsMixin:
                         self.logger.debug(
                             f"Calling module {module_name}.run() with event"
                         )
-                        module["object"].run(self, event)
+                        self._defer(module_name, module["object"].run(self, event))
                         self.logger.debug(f"Module {module_name} processed event")
                         handled = True
                     except Exception as e:
@@ -402,6 +517,44 @@ class EventsMixin:
         """Send a message to a channel or user"""
         await self.message(target, message)
 
+    def _targmax(self, command):
+        """Targets the server accepts per command, from ISUPPORT TARGMAX (1 if not advertised)."""
+        targmax = getattr(self, "_isupport", {}).get("TARGMAX")
+        if not isinstance(targmax, str):
+            return 1
+        for entry in targmax.split(","):
+            name, _, limit = entry.partition(":")
+            if name.upper() == command:
+                # An empty limit means no limit; the line length still applies
+                return int(limit) if limit.isdigit() else UNLIMITED_TARGETS
+        return 1
+
+    async def kick_many(self, channel, nicks, reason=None):
+        """Kick several users, as many per KICK as TARGMAX allows, paced after a burst."""
+        per_line = max(self._targmax("KICK"), 1)
+        burst = self.config.get("kick_burst", KICK_BURST)
+        interval = self.config.get("kick_interval", KICK_INTERVAL)
+        batches = []
+        batch = []
+        size = 0
+        for nick in nicks:
+            if batch and (len(batch) >= per_line or size + len(nick) + 1 > KICK_TARGETS_BYTES):
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append(nick)
+            size += len(nick) + 1
+        if batch:
+            batches.append(batch)
+
+        for sent, batch in enumerate(batches):
+            if sent >= burst:
+                await asyncio.sleep(interval)
+            if reason:
+                await self.rawmsg("KICK", channel, ",".join(batch), reason)
+            else:
+                await self.rawmsg("KICK", channel, ",".join(batch))
+        return len(batches)
+
     def reply(self, message):
         """Add a reply message to the output queue."""
         if self._active_output is not None:
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Concurrent multi-target lookups for PhreakBot commands.
+
+Lookup commands (!asn, !ip, !irr, !rbl, !rpki-old) accept several
+targets. ``fan_out()`` runs the command's single-target handler for
+each of them concurrently, at most ``lookup_concurrency`` at a time, and
+adds the results to the output in input order:
+
+- each handler runs against a ``_Capture`` proxy of the bot, so the
+  lines it adds are collected per target instead of being interleaved
+- blocking handlers run in the default thread pool; coroutine functions
+  run on the event loop
+- the lines of one target are joined into one segment, and the segments
+  are packed into at most ``max_output_lines`` lines, so the channel
+  sees a few dense lines instead of one line per target or one
+  overlong line
+"""
+
+import asyncio
+import inspect
+
+
+MAX_TARGETS = 10
+DEFAULT_CONCURRENCY = 4
+SEPARATOR = " | "
+
+
+class _Capture:
+    """Bot proxy collecting the responses of one target."""
+
+    def __init__(self, bot):
+        self._bot = bot
+        self.lines = []
+
+    def __getattr__(self, name):
+        return getattr(self._bot, name)
+
+    def add_response(self, message, private=False):
+        self.lines.append(message)
+
+    def reply(self, message):
+        self.lines.append(message)
+
+
+def split_targets(args, limit=MAX_TARGETS):
+    """Split command arguments into unique targets, keeping their order.
+
+    Returns:
+        tuple: (targets, number of targets dropped over the limit)
+    """
+    targets = list(dict.fromkeys(args.split()))
+    return targets[:limit], max(len(targets) - limit, 0)
+
+
+def compact(segments, max_lines, separator=SEPARATOR):
+    """Pack segments into at most max_lines lines of similar length, in order."""
+    if len(segments) <= max_lines:
+        return list(segments)
+    total = sum(map(len, segments)) + len(separator) * (len(segments) - 1)
+    width = total / max_lines
+    lines = []
+    current = []
+    used = 0
+    for segment in segments:
+        if current and len(lines) < max_lines - 1 and used + len(segment) > width * (len(lines) + 1):
+            lines.append(separator.join(current))
+            current = []
+        current.append(segment)
+        used += len(segment) + len(separator)
+    lines.append(separator.join(current))
+    return lines
+
+
+async def gather_bounded(handler, bot, targets, concurrency=DEFAULT_CONCURRENCY):
+    """Run handler(proxy, target) for every target, at most concurrency at once.
+
+    Returns:
+        list: The lines each target produced, in input order
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max(int(concurrency), 1))
+
+    async def run_one(target):
+        capture = _Capture(bot)
+        async with semaphore:
+            try:
+                if inspect.iscoroutinefunction(handler):
+                    await handler(capture, target)
+                else:
+                    await loop.run_in_executor(None, handler, capture, target)
+            except Exception as e:
+                bot.logger.error(f"Lookup of {target} failed: {e}")
+                capture.lines.append(f"{target}: lookup failed")
+        return capture.lines
+
+    return await asyncio.gather(*(run_one(target) for target in targets))
+
+
+async def fan_out(bot, handler, targets, dropped=0):
+    """Look up several targets concurrently and add the compacted results."""
+    results = await gather_bounded(
+        handler, bot, targets, bot.config.get("lookup_concurrency", DEFAULT_CONCURRENCY)
+    )
+    segments = [SEPARATOR.join(lines) for lines in results if lines]
+    if dropped:
+        segments.append(f"{dropped} more target(s) skipped, at most {MAX_TARGETS} per command")
+    for line in compact(segments, bot.config.get("max_output_lines", 3)):
+        bot.add_response(line)
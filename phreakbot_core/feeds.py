@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RSS/Atom feed subscriptions for PhreakBot.
+
+One FeedManager (``bot.feeds``) owns every feed the bot follows, whether
+registered by a module (e.g. tweakers) or subscribed to from IRC with
+!feed. A single poller task fetches each feed on its own interval:
+
+- requests are conditional (ETag / If-Modified-Since), so an unchanged
+  feed costs one 304 response
+- the body is streamed into an incremental XML parser, and parsing stops
+  once ``max_items`` entries have been read
+- item ids already announced are kept in a persistent seen-set, so
+  restarts do not repeat items
+- new items are sent to the channels subscribed to the feed; the first
+  fetch of a new feed only fills the seen-set
+
+The parsed items stay cached on the Feed, so commands answer from memory.
+Subscriptions live in the ``feeds`` config key; validators and seen-sets
+in a JSON state file.
+"""
+
+import asyncio
+import heapq
+import json
+import os
+import time
+from collections import OrderedDict, namedtuple
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+from .url_safety import safe_get
+
+
+DEFAULT_STATE_PATH = "data/feeds-state.json"
+DEFAULT_INTERVAL = 900
+MIN_INTERVAL = 60
+FETCH_TIMEOUT = 10
+CHUNK_SIZE = 16384
+MAX_ITEMS = 50
+SEEN_LIMIT = 500
+MAX_ANNOUNCE = 3
+USER_AGENT = "PhreakBot/1.0 Feed Fetcher"
+
+FeedItem = namedtuple("FeedItem", ["id", "title", "link", "published"])
+
+
+def _local(tag):
+    """Tag name without its XML namespace."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _text(elem):
+    return " ".join((elem.text or "").split())
+
+
+def _item(elem):
+    """Build a FeedItem from an RSS <item> or Atom <entry> element."""
+    fields = {}
+    link = None
+    for child in elem:
+        tag = _local(child.tag)
+        if tag == "link":
+            # Atom links are attributes; the alternate link is the article
+            href = child.get("href")
+            if href is None:
+                link = link or _text(child)
+            elif child.get("rel", "alternate") == "alternate":
+                link = href
+        elif tag not in fields:
+            fields[tag] = _text(child)
+    title = fields.get("title", "")
+    link = link or ""
+    item_id = fields.get("guid") or fields.get("id") or link or title
+    if not item_id:
+        return None
+    published = (
+        fields.get("pubDate") or fields.get("published") or fields.get("updated") or fields.get("date", "")
+    )
+    return FeedItem(item_id, title or "No title", link, published)
+
+
+def parse_feed(chunks, max_items=MAX_ITEMS):
+    """Parse RSS 0.9x/1.0/2.0 or Atom from an iterable of byte chunks.
+
+    Parsing is incremental and stops after max_items entries, so the
+    rest of a long feed is neither read nor parsed.
+
+    Returns:
+        list: FeedItem tuples in document order (normally newest first)
+
+    Raises:
+        ValueError: if the document is not well-formed XML
+    """
+    parser = XMLPullParser(events=("end",))
+    items = []
+    try:
+        for chunk in chunks:
+            parser.feed(chunk)
+            for _, elem in parser.read_events():
+                if _local(elem.tag) in ("item", "entry"):
+                    item = _item(elem)
+                    elem.clear()
+                    if item is not None:
+                        items.append(item)
+                        if len(items) >= max_items:
+                            return items
+        parser.close()
+    except ParseError as e:
+        if items:
+            return items
+        raise ValueError(f"invalid feed: {e}")
+    for _, elem in parser.read_events():
+        if _local(elem.tag) in ("item", "entry") and len(items) < max_items:
+            item = _item(elem)
+            if item is not None:
+                items.append(item)
+    return items
+
+
+class Feed:
+    """One feed: where to fetch it, how often, who gets new items."""
+
+    def __init__(self, name, url, interval=DEFAULT_INTERVAL, channels=()):
+        self.name = name
+        self.url = url
+        self.interval = max(int(interval), MIN_INTERVAL)
+        self.channels = list(channels)
+        self.items = []
+        self.etag = None
+        self.last_modified = None
+        self.fetched_at = None
+        self.error = None
+
+    def fetch(self, max_items=MAX_ITEMS):
+        """Fetch and parse the feed if it changed. Blocking.
+
+        Returns:
+            bool: True if new content was parsed
+        """
+        headers = {"User-Agent": USER_AGENT}
+        # Validators restored from the state file come without the items
+        # (after a restart), so the first fetch must get the full feed
+        if self.items:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+
+        response = safe_get(self.url, headers=headers, timeout=FETCH_TIMEOUT, stream=True)
+        try:
+            self.fetched_at = time.time()
+            if response.status_code == 304:
+                return False
+            response.raise_for_status()
+            self.items = parse_feed(response.iter_content(chunk_size=CHUNK_SIZE), max_items)
+            self.etag = response.headers.get("ETag")
+            self.last_modified = response.headers.get("Last-Modified")
+            return True
+        finally:
+            response.close()
+
+    def to_config(self):
+        return {"url": self.url, "interval": self.interval, "channels": list(self.channels)}
+
+
+class FeedManager:
+    """The bot's feeds, their persistent state and the shared poller."""
+
+    def __init__(self, state_path=DEFAULT_STATE_PATH, logger=None):
+        self.state_path = state_path
+        self.logger = logger
+        self.feeds = {}
+        self.send = None
+        self._seen = {}
+        self._state = self._read_state()
+        self._task = None
+        self._wakeup = None
+
+    @classmethod
+    def from_config(cls, config, logger=None):
+        manager = cls(config.get("feeds_state_path", DEFAULT_STATE_PATH), logger)
+        for name, feed in (config.get("feeds") or {}).items():
+            manager.add_feed(name, feed["url"], feed.get("interval", DEFAULT_INTERVAL), feed.get("channels", ()))
+        return manager
+
+    def _log(self, level, message):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    def _read_state(self):
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_state(self):
+        """Write validators and seen-sets atomically."""
+        state = {}
+        for name, feed in self.feeds.items():
+            state[name] = {
+                "url": feed.url,
+                "etag": feed.etag,
+                "last_modified": feed.last_modified,
+                "seen": list(self._seen.get(name, ())),
+            }
+        directory = os.path.dirname(os.path.abspath(self.state_path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def to_config(self):
+        """Feed subscriptions in the shape of the ``feeds`` config key."""
+        return {name: feed.to_config() for name, feed in self.feeds.items()}
+
+    def add_feed(self, name, url, interval=DEFAULT_INTERVAL, channels=()):
+        """Register a feed; an existing feed of that name is returned unchanged."""
+        if name in self.feeds:
+            return self.feeds[name]
+        feed = self.feeds[name] = Feed(name, url, interval, channels)
+        state = self._state.get(name, {})
+        if state.get("url") == url:
+            feed.etag = state.get("etag")
+            feed.last_modified = state.get("last_modified")
+            self._seen[name] = OrderedDict.fromkeys(state.get("seen", ()))
+        self._wake()
+        return feed
+
+    def remove_feed(self, name):
+        self._seen.pop(name, None)
+        return self.feeds.pop(name, None) is not None
+
+    def subscribe(self, name, channel):
+        feed = self.feeds[name]
+        if channel not in feed.channels:
+            feed.channels.append(channel)
+
+    def unsubscribe(self, name, channel):
+        feed = self.feeds[name]
+        if channel in feed.channels:
+            feed.channels.remove(channel)
+
+    def items(self, name):
+        """Cached items of a feed, newest first (empty until first fetched)."""
+        feed = self.feeds.get(name)
+        return feed.items if feed else []
+
+    def poll(self, feed):
+        """Fetch a feed and return the items not seen before, oldest first. Blocking."""
+        if not feed.fetch():
+            return []
+        first_fetch = feed.name not in self._seen
+        seen = self._seen.setdefault(feed.name, OrderedDict())
+        new = [item for item in feed.items if item.id not in seen]
+        for item in reversed(feed.items):
+            seen[item.id] = None
+            seen.move_to_end(item.id)
+        while len(seen) > SEEN_LIMIT:
+            seen.popitem(last=False)
+        self.save_state()
+        if first_fetch:
+            return []
+        return list(reversed(new))
+
+    async def announce(self, feed, items):
+        """Send new items to the feed's channels."""
+        if not self.send or not feed.channels:
+            return
+        for item in items[-MAX_ANNOUNCE:]:
+            text = f"📰 [{feed.name}] {item.title}"
+            if item.link:
+                text += f" - {item.link}"
+            for channel in feed.channels:
+                await self.send(channel, text)
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run_forever(self):
+        """Poll every feed on its own interval from one task."""
+        loop = asyncio.get_running_loop()
+        due = []
+        scheduled = set()
+        while True:
+            for name in self.feeds:
+                if name not in scheduled:
+                    heapq.heappush(due, (time.monotonic(), name))
+                    scheduled.add(name)
+            if not due:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            when, name = due[0]
+            delay = when - time.monotonic()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                    continue  # a feed was added; reschedule
+                except asyncio.TimeoutError:
+                    pass
+            heapq.heappop(due)
+            feed = self.feeds.get(name)
+            if feed is None:
+                scheduled.discard(name)
+                continue
+            try:
+                new = await loop.run_in_executor(None, self.poll, feed)
+                feed.error = None
+                await self.announce(feed, new)
+            except Exception as e:
+                feed.error = str(e)
+                self._log("warning", f"Feed {name}: fetch failed: {e}")
+            heapq.heappush(due, (time.monotonic() + feed.interval, name))
+
+    def start(self, send=None):
+        """Start the poller (idempotent); needs a running event loop.
+
+        Args:
+            send: Coroutine function (target, text) used to announce new items
+        """
+        if send is not None:
+            self.send = send
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self.run_forever())
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MaxMind DB (MMDB) reader for PhreakBot.
+
+Reads GeoLite2, GeoIP2 and DB-IP lite databases from a local file
+without extra dependencies. The file is memory-mapped; a lookup walks
+the binary search tree by reading record bytes straight from the map
+and only decodes the data record it lands on. Decoded records are
+cached by their offset in the data section, since many networks share
+the same record (every address in a country, for a country database).
+
+Format reference: https://maxmind.github.io/MaxMind-DB/
+"""
+
+import mmap
+import os
+import socket
+import struct
+from collections import OrderedDict
+
+
+DEFAULT_PATH = "data/GeoLite2-City.mmdb"
+
+METADATA_MARKER = b"\xab\xcd\xefMaxMind.com"
+DATA_SECTION_SEPARATOR = 16
+
+RECORD_CACHE_SIZE = 4096
+
+_DOUBLE = struct.Struct(">d")
+_FLOAT = struct.Struct(">f")
+
+
+class InvalidDatabaseError(ValueError):
+    """Raised when a file is not a valid MaxMind DB."""
+
+
+class _Decoder:
+    """Decoder for the MMDB data section format."""
+
+    def __init__(self, buf, pointer_base):
+        self._buf = buf
+        self._pointer_base = pointer_base
+
+    def _size(self, ctrl, offset):
+        size = ctrl & 0x1F
+        if size < 29:
+            return size, offset
+        buf = self._buf
+        if size == 29:
+            return 29 + buf[offset], offset + 1
+        if size == 30:
+            return 285 + int.from_bytes(buf[offset : offset + 2], "big"), offset + 2
+        return 65821 + int.from_bytes(buf[offset : offset + 3], "big"), offset + 3
+
+    def decode(self, offset):
+        """Decode the value at offset, returning (value, next offset)."""
+        buf = self._buf
+        ctrl = buf[offset]
+        offset += 1
+        kind = ctrl >> 5
+
+        if kind == 1:
+            # Pointer: the value lives elsewhere; continue after the pointer
+            ss = (ctrl >> 3) & 0x3
+            vvv = ctrl & 0x7
+            if ss == 0:
+                pointer = (vvv << 8) | buf[offset]
+            elif ss == 1:
+                pointer = ((vvv << 16) | int.from_bytes(buf[offset : offset + 2], "big")) + 2048
+            elif ss == 2:
+                pointer = ((vvv << 24) | int.from_bytes(buf[offset : offset + 3], "big")) + 526336
+            else:
+                pointer = int.from_bytes(buf[offset : offset + 4], "big")
+            value, _ = self.decode(self._pointer_base + pointer)
+            return value, offset + ss + 1
+
+        if kind == 0:
+            kind = 7 + buf[offset]
+            offset += 1
+
+        size, offset = self._size(ctrl, offset)
+
+        if kind == 2:
+            return buf[offset : offset + size].decode("utf-8"), offset + size
+        if kind == 7:
+            result = {}
+            for _ in range(size):
+                key, offset = self.decode(offset)
+                result[key], offset = self.decode(offset)
+            return result, offset
+        if kind in (5, 6, 9, 10):
+            return int.from_bytes(buf[offset : offset + size], "big"), offset + size
+        if kind == 11:
+            result = []
+            for _ in range(size):
+                value, offset = self.decode(offset)
+                result.append(value)
+            return result, offset
+        if kind == 3:
+            return _DOUBLE.unpack_from(buf, offset)[0], offset + 8
+        if kind == 8:
+            return int.from_bytes(buf[offset : offset + size], "big", signed=size == 4), offset + size
+        if kind == 14:
+            return bool(size), offset
+        if kind == 15:
+            return _FLOAT.unpack_from(buf, offset)[0], offset + 4
+        if kind == 4:
+            return bytes(buf[offset : offset + size]), offset + size
+        raise InvalidDatabaseError(f"unknown data type {kind} at offset {offset}")
+
+
+class GeoIPReader:
+    """Memory-mapped MaxMind DB reader."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        marker = self._buf.rfind(METADATA_MARKER, max(0, len(self._buf) - 128 * 1024))
+        if marker < 0:
+            self._buf.close()
+            raise InvalidDatabaseError(f"{path} is not a MaxMind DB file")
+        metadata_start = marker + len(METADATA_MARKER)
+        self.metadata, _ = _Decoder(self._buf, metadata_start).decode(metadata_start)
+
+        self.node_count = self.metadata["node_count"]
+        self.record_size = self.metadata["record_size"]
+        self.ip_version = self.metadata["ip_version"]
+        self.database_type = self.metadata.get("database_type", "")
+        if self.record_size not in (24, 28, 32):
+            self._buf.close()
+            raise InvalidDatabaseError(f"unsupported record size {self.record_size}")
+
+        self._node_bytes = self.record_size // 4
+        self._tree_size = self.node_count * self._node_bytes
+        self._data_start = self._tree_size + DATA_SECTION_SEPARATOR
+        self._decoder = _Decoder(self._buf, self._data_start)
+        self._cache = OrderedDict()
+        self._ipv4_start = self._find_ipv4_start()
+
+    def close(self):
+        self._buf.close()
+
+    def _read_node(self, node, bit):
+        """Return the left (bit 0) or right (bit 1) record of a node."""
+        buf = self._buf
+        base = node * self._node_bytes
+        size = self.record_size
+        if size == 24:
+            offset = base + 3 * bit
+            return (buf[offset] << 16) | (buf[offset + 1] << 8) | buf[offset + 2]
+        if size == 28:
+            if bit:
+                return (
+                    ((buf[base + 3] & 0x0F) << 24)
+                    | (buf[base + 4] << 16)
+                    | (buf[base + 5] << 8)
+                    | buf[base + 6]
+                )
+            return ((buf[base + 3] & 0xF0) << 20) | (buf[base] << 16) | (buf[base + 1] << 8) | buf[base + 2]
+        offset = base + 4 * bit
+        return int.from_bytes(buf[offset : offset + 4], "big")
+
+    def _find_ipv4_start(self):
+        """Node reached after the 96 zero bits of ::/96 in an IPv6 tree."""
+        if self.ip_version == 4:
+            return 0
+        node = 0
+        for _ in range(96):
+            if node >= self.node_count:
+                break
+            node = self._read_node(node, 0)
+        return node
+
+    def _find(self, address):
+        """Walk the tree for an address; return (data record offset, prefix length)."""
+        if ":" in address:
+            if self.ip_version == 4:
+                raise ValueError(f"{address} is IPv6 but the database is IPv4-only")
+            value = int.from_bytes(socket.inet_pton(socket.AF_INET6, address), "big")
+            bits = 128
+            node = 0
+        else:
+            value = int.from_bytes(socket.inet_pton(socket.AF_INET, address), "big")
+            bits = 32
+            node = self._ipv4_start
+
+        node_count = self.node_count
+        depth = 0
+        # _read_node() is inlined for the common record sizes; this is the hot path
+        buf = self._buf
+        if self.record_size == 24:
+            while depth < bits and node < node_count:
+                offset = node * 6 + 3 * ((value >> (bits - 1 - depth)) & 1)
+                node = int.from_bytes(buf[offset : offset + 3], "big")
+                depth += 1
+        elif self.record_size == 28:
+            while depth < bits and node < node_count:
+                base = node * 7
+                if (value >> (bits - 1 - depth)) & 1:
+                    node = ((buf[base + 3] & 0x0F) << 24) | int.from_bytes(buf[base + 4 : base + 7], "big")
+                else:
+                    node = ((buf[base + 3] & 0xF0) << 20) | int.from_bytes(buf[base : base + 3], "big")
+                depth += 1
+        else:
+            read_node = self._read_node
+            while depth < bits and node < node_count:
+                node = read_node(node, (value >> (bits - 1 - depth)) & 1)
+                depth += 1
+
+        if node == node_count:
+            return None, depth
+        if node > node_count:
+            return node - node_count - DATA_SECTION_SEPARATOR + self._data_start, depth
+        raise InvalidDatabaseError("invalid node in search tree")
+
+    def lookup(self, address):
+        """Return the record for an address string, or None if not found.
+
+        Records are cached and shared between lookups; treat them as
+        read-only. Raises ValueError for invalid addresses.
+        """
+        try:
+            offset, _ = self._find(address)
+        except OSError:
+            raise ValueError(f"invalid IP address: {address!r}")
+        if offset is None:
+            return None
+        cache = self._cache
+        record = cache.get(offset)
+        if record is None:
+            record, _ = self._decoder.decode(offset)
+            cache[offset] = record
+            if len(cache) > RECORD_CACHE_SIZE:
+                cache.popitem(last=False)
+        return record
+
+    def country(self, address):
+        """Return (ISO code, English name) for an address, or None."""
+        record = self.lookup(address)
+        if not record:
+            return None
+        country = record.get("country") or record.get("registered_country")
+        if not country:
+            return None
+        return country.get("iso_code", ""), country.get("names", {}).get("en", "")
+
+    def location(self, address):
+        """Return "City, Region, Country" for an address, or None."""
+        record = self.lookup(address)
+        if not record:
+            return None
+        parts = []
+        city = record.get("city", {}).get("names", {}).get("en")
+        if city:
+            parts.append(city)
+        subdivisions = record.get("subdivisions") or []
+        if subdivisions:
+            region = subdivisions[0].get("names", {}).get("en")
+            if region and region != city:
+                parts.append(region)
+        country = record.get("country") or record.get("registered_country") or {}
+        name = country.get("names", {}).get("en")
+        if name:
+            parts.append(name)
+        return ", ".join(parts) or None
+
+
+def open_database(path):
+    """Open a MaxMind DB file (Dataset loader)."""
+    if not os.path.getsize(path):
+        raise InvalidDatabaseError(f"{path} is empty")
+    return GeoIPReader(path)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compiled IP address policy for PhreakBot's SSRF protection.
+
+Allow and deny networks are compiled into one table per address family:
+for every prefix length in use, a dict maps the network bits to the rule
+for that network. A lookup shifts the address once per prefix length
+(longest first) and stops at the first hit, so it costs at most
+O(prefix length) dict probes regardless of how many networks are listed.
+The most specific matching network wins; on an exact tie the deny rule
+wins.
+
+IPv6 addresses that embed an IPv4 address (IPv4-mapped, IPv4-compatible,
+NAT64, 6to4 and Teredo) are also checked against the IPv4 rules, so
+``::ffff:127.0.0.1`` is treated exactly like ``127.0.0.1``.
+"""
+
+import ipaddress
+import socket
+
+
+# Special-purpose ranges that the bot must never connect to
+# (IANA IPv4/IPv6 Special-Purpose Address Registries and multicast).
+DEFAULT_BLOCKED_NETWORKS = (
+    # IPv4 "this network"
+    "0.0.0.0/8",
+    # RFC 1918 private addresses
+    "10.0.0.0/8",
+    "172.16.0.0/12",
+    "192.168.0.0/16",
+    # Carrier-grade NAT
+    "100.64.0.0/10",
+    # IPv4 loopback
+    "127.0.0.0/8",
+    # Link-local, including cloud provider metadata endpoints
+    "169.254.0.0/16",
+    # IETF protocol assignments
+    "192.0.0.0/24",
+    # Documentation (TEST-NET-1/2/3)
+    "192.0.2.0/24",
+    "198.51.100.0/24",
+    "203.0.113.0/24",
+    # Deprecated 6to4 relay anycast
+    "192.88.99.0/24",
+    # Benchmarking
+    "198.18.0.0/15",
+    # Multicast
+    "224.0.0.0/4",
+    # Reserved and limited broadcast
+    "240.0.0.0/4",
+    # IPv6 unspecified and loopback
+    "::/128",
+    "::1/128",
+    # IPv6 discard-only
+    "100::/64",
+    # IPv6 local-use NAT64
+    "64:ff9b:1::/48",
+    # IPv6 benchmarking and documentation
+    "2001:2::/48",
+    "2001:db8::/32",
+    # IPv6 unique local addresses
+    "fc00::/7",
+    # IPv6 link-local and deprecated site-local
+    "fe80::/10",
+    "fec0::/10",
+    # IPv6 multicast
+    "ff00::/8",
+)
+
+# IPv6 prefixes that embed an IPv4 address, as (prefix value, shift)
+_MAPPED = (0xFFFF, 32)  # ::ffff:0:0/96
+_COMPATIBLE = (0, 32)  # ::/96
+_NAT64 = (0x64FF9B << 64, 32)  # 64:ff9b::/96
+_SIX_TO_FOUR = (0x2002, 112)  # 2002::/16
+_TEREDO = (0x20010000, 96)  # 2001::/32
+
+_ALLOW = 0
+_DENY = 1
+
+
+def _embedded_ipv4_values(value):
+    """Return the integer IPv4 addresses embedded in an integer IPv6 address."""
+    top = value >> 32
+    if top == _MAPPED[0] or top == _NAT64[0] or (top == _COMPATIBLE[0] and value > 1):
+        return (value & 0xFFFFFFFF,)
+    if value >> _SIX_TO_FOUR[1] == _SIX_TO_FOUR[0]:
+        return ((value >> 80) & 0xFFFFFFFF,)
+    if value >> _TEREDO[1] == _TEREDO[0]:
+        # Teredo server, then the client address (stored inverted)
+        return ((value >> 64) & 0xFFFFFFFF, ~value & 0xFFFFFFFF)
+    return ()
+
+
+def embedded_ipv4(address):
+    """Return the IPv4 addresses embedded in an IPv6 address.
+
+    Covers IPv4-mapped, IPv4-compatible, NAT64 (64:ff9b::/96), 6to4 and
+    Teredo addresses.
+
+    Args:
+        address: an ipaddress.IPv6Address
+
+    Returns:
+        list: IPv4Address objects (empty if nothing is embedded)
+    """
+    return [ipaddress.IPv4Address(v) for v in _embedded_ipv4_values(int(address))]
+
+
+class _PrefixTable:
+    """Longest-prefix-match table for one address family."""
+
+    def __init__(self, bits):
+        self.bits = bits
+        self._by_length = {}
+        self._lengths = ()
+
+    def add(self, network, rule):
+        table = self._by_length.setdefault(network.prefixlen, {})
+        key = int(network.network_address) >> (self.bits - network.prefixlen)
+        current = table.get(key)
+        if current is None or rule == _DENY:
+            table[key] = (rule, network)
+        self._lengths = tuple(sorted(self._by_length, reverse=True))
+
+    def lookup(self, value):
+        """Return (rule, network) of the longest matching prefix, or None."""
+        bits = self.bits
+        by_length = self._by_length
+        for length in self._lengths:
+            hit = by_length[length].get(value >> (bits - length))
+            if hit is not None:
+                return hit
+        return None
+
+
+class IPPolicy:
+    """Compiled allow/deny policy for outgoing connections.
+
+    Addresses that match no network are allowed. Allow networks punch
+    holes in the deny list (e.g. allowing one internal service inside
+    10.0.0.0/8); the most specific network decides.
+    """
+
+    def __init__(self, blocked=DEFAULT_BLOCKED_NETWORKS, allowed=()):
+        self._tables = {4: _PrefixTable(32), 6: _PrefixTable(128)}
+        for network in allowed:
+            self._add(network, _ALLOW)
+        for network in blocked:
+            self._add(network, _DENY)
+
+    @classmethod
+    def from_config(cls, config):
+        """Build the policy from the defaults plus the bot configuration.
+
+        Reads the optional ``ssrf_blocked_networks`` and
+        ``ssrf_allowed_networks`` lists of CIDR strings.
+        """
+        blocked = list(DEFAULT_BLOCKED_NETWORKS)
+        blocked.extend(config.get("ssrf_blocked_networks", []))
+        return cls(blocked=blocked, allowed=config.get("ssrf_allowed_networks", []))
+
+    def _add(self, network, rule):
+        network = ipaddress.ip_network(network, strict=False)
+        self._tables[network.version].add(network, rule)
+
+    def _match(self, version, value):
+        hit = self._tables[version].lookup(value)
+        if hit is not None:
+            return hit[1] if hit[0] == _DENY else None
+        if version == 6:
+            for inner in _embedded_ipv4_values(value):
+                inner_hit = self._tables[4].lookup(inner)
+                if inner_hit is not None and inner_hit[0] == _DENY:
+                    return inner_hit[1]
+        return None
+
+    def blocked_by(self, address):
+        """Return the blocking network for an address, or None if allowed.
+
+        Accepts address strings (an IPv6 zone index is ignored) or
+        ipaddress objects. Unparseable addresses are treated as blocked.
+        """
+        if isinstance(address, str):
+            try:
+                if ":" in address:
+                    packed = socket.inet_pton(socket.AF_INET6, address.split("%", 1)[0])
+                    return self._match(6, int.from_bytes(packed, "big"))
+                packed = socket.inet_pton(socket.AF_INET, address)
+                return self._match(4, int.from_bytes(packed, "big"))
+            except OSError:
+                return "invalid address"
+        return self._match(address.version, int(address))
+
+    def is_blocked(self, address):
+        """Check if connecting to an address is forbidden."""
+        return self.blocked_by(address) is not None
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local IP-to-ASN table for PhreakBot.
+
+Imports a public routing dump and answers "which prefix and origin AS
+cover this address?" without leaving the process. Supported inputs
+(plain or gzip-compressed):
+
+- iptoasn.com TSV: ``range_start  range_end  AS_number  country  AS_description``
+- pyasn ipasn files (``prefix<TAB>asn``), e.g. from pyasn_util_convert.py
+  on an MRT RIB dump
+- ``bgpdump -m`` output of an MRT TABLE_DUMP_V2 file; the origin is the
+  last AS of the path
+
+At import time the prefixes are sorted in address order and walked like
+a depth-first traversal of a prefix (Patricia) trie, which flattens them
+into disjoint address ranges, each owned by its most specific covering
+prefix. The leading bits of an address then pick a bucket that either
+names the range covering it outright or, where ranges start inside the
+bucket, the short slice to bisect (done in C). Walking trie nodes in the
+interpreter costs several times more per lookup. IPv4 ranges are stored
+in compact unsigned-int arrays.
+
+In pure Python this does not reach 1M lookups/s for address strings:
+parsing the string alone takes a large share of the budget. See
+scripts/bench_ipasn.py for the figures.
+"""
+
+import gzip
+import ipaddress
+from socket import AF_INET, AF_INET6, inet_pton
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from struct import Struct
+
+
+DEFAULT_PATH = "data/ip2asn-combined.tsv.gz"
+
+# Prefix length marker for iptoasn ranges, which are not CIDR aligned
+RANGE = 255
+
+# Leading address bits that select a bucket, per IP version: 2**20
+# IPv4 buckets cost 8 MB; IPv6 routes all sit in a few /16s
+INDEX_BITS = {4: 20, 6: 16}
+
+# Bucket slots that do not name a range
+NO_RANGE = -1
+MIXED = -2
+
+_unpack_v4 = Struct("!I").unpack
+
+AsnInfo = namedtuple("AsnInfo", ["prefix", "asn", "name", "country"])
+_new_info = tuple.__new__
+
+
+def _open_text(path):
+    with open(path, "rb") as f:
+        gzipped = f.read(2) == b"\x1f\x8b"
+    if gzipped:
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
+
+
+def parse_iptoasn(lines):
+    """Yield (version, start, end, network, prefixlen, asn, country, name) from iptoasn TSV.
+
+    Unrouted ranges (AS 0) are skipped.
+    """
+    for line in lines:
+        fields = line.rstrip("\n").split("\t")
+        if len(fields) < 3:
+            continue
+        # inet_pton is several times faster than ipaddress on millions of lines
+        version, family = (6, AF_INET6) if ":" in fields[0] else (4, AF_INET)
+        try:
+            asn = int(fields[2])
+            start = int.from_bytes(inet_pton(family, fields[0]), "big")
+            end = int.from_bytes(inet_pton(family, fields[1]), "big")
+        except (ValueError, OSError):
+            continue
+        if asn == 0:
+            continue
+        country = fields[3] if len(fields) > 3 and fields[3] != "None" else ""
+        name = fields[4] if len(fields) > 4 else ""
+        yield version, start, end, start, RANGE, asn, country, name
+
+
+def _origin_as(path):
+    """Origin AS of a bgpdump AS path (an AS_SET yields its first member)."""
+    last = path.split()[-1] if path.split() else ""
+    last = last.strip("{}").split(",")[0]
+    return int(last)
+
+
+def parse_prefixes(lines):
+    """Yield (version, start, end, network, prefixlen, asn, "", "") from prefix dumps.
+
+    Accepts pyasn ipasn lines (``prefix asn``) and ``bgpdump -m`` lines.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith(";") or line.startswith("#"):
+            continue
+        try:
+            if "|" in line:
+                fields = line.split("|")
+                prefix, asn = fields[5], _origin_as(fields[6])
+            else:
+                prefix, asn = line.split()[:2]
+                asn = int(asn)
+            network = ipaddress.ip_network(prefix, strict=False)
+        except (ValueError, IndexError):
+            continue
+        start = int(network.network_address)
+        end = int(network.broadcast_address)
+        yield network.version, start, end, start, network.prefixlen, asn, "", ""
+
+
+def flatten(entries):
+    """Turn nested or disjoint (start, end, payload) ranges into disjoint ones.
+
+    Where ranges nest (a more specific prefix inside a covering one), the
+    innermost range owns the addresses it covers. The input must not
+    contain partially overlapping ranges, which prefixes never do.
+
+    Returns:
+        list: sorted, disjoint (start, end, payload) tuples
+    """
+    out = []
+    stack = []
+    cursor = 0
+
+    def emit(start, end, payload):
+        if start <= end:
+            out.append((start, end, payload))
+
+    for start, end, payload in sorted(entries, key=lambda e: (e[0], -e[1])):
+        while stack and stack[-1][0] < start:
+            stack_end, stack_payload = stack.pop()
+            emit(cursor, stack_end, stack_payload)
+            cursor = stack_end + 1
+        if stack:
+            emit(cursor, start - 1, stack[-1][1])
+        cursor = start
+        stack.append((end, payload))
+    while stack:
+        stack_end, stack_payload = stack.pop()
+        emit(cursor, stack_end, stack_payload)
+        cursor = stack_end + 1
+    return out
+
+
+class _FamilyTable:
+    """Disjoint, sorted ranges of one address family.
+
+    The top ``index_bits`` bits of an address select a bucket. ``slots``
+    answers most lookups directly: the range covering the whole bucket,
+    NO_RANGE if no range touches it, or MIXED if ranges start inside it.
+    Only MIXED buckets bisect, over the slice of ranges ``index`` gives;
+    a range reaching into the bucket from an earlier one is found one
+    slot back.
+    """
+
+    def __init__(self, bits, index_bits, ranges):
+        self.bits = bits
+        self.shift = bits - index_bits
+        if bits == 32:
+            self.starts = array("I", (r[0] for r in ranges))
+            self.ends = array("I", (r[1] for r in ranges))
+            self.networks = array("I", (r[2][0] for r in ranges))
+        else:
+            self.starts = [r[0] for r in ranges]
+            self.ends = [r[1] for r in ranges]
+            self.networks = [r[2][0] for r in ranges]
+        self.prefixlens = array("B", (r[2][1] for r in ranges))
+        self.asns = array("I", (r[2][2] for r in ranges))
+
+        buckets = 1 << index_bits
+        index = array("I", bytes(4 * (buckets + 1)))
+        slots = array("i", bytes(4 * buckets))
+        starts, ends, shift = self.starts, self.ends, self.shift
+        count = len(starts)
+        position = 0
+        for bucket in range(buckets):
+            while position < count and starts[position] >> shift < bucket:
+                position += 1
+            index[bucket] = position
+        index[buckets] = count
+        for bucket in range(buckets):
+            lo, hi = index[bucket], index[bucket + 1]
+            first = bucket << shift
+            last = first + (1 << shift) - 1
+            if lo == hi:
+                # Only a range from an earlier bucket can reach in
+                if lo == 0 or ends[lo - 1] < first:
+                    slots[bucket] = NO_RANGE
+                elif ends[lo - 1] >= last:
+                    slots[bucket] = lo - 1
+                else:
+                    slots[bucket] = MIXED
+            elif hi == lo + 1 and starts[lo] == first and ends[lo] >= last:
+                slots[bucket] = lo
+            else:
+                slots[bucket] = MIXED
+        self.index = index
+        self.slots = slots
+
+    def __len__(self):
+        return len(self.starts)
+
+    def find(self, value):
+        """Index of the range containing value, or -1."""
+        i = self.slots[value >> self.shift]
+        if i != MIXED:
+            return i
+        bucket = value >> self.shift
+        i = bisect_right(self.starts, value, self.index[bucket], self.index[bucket + 1]) - 1
+        if i < 0 or value > self.ends[i]:
+            return NO_RANGE
+        return i
+
+    def prefix(self, i, value):
+        """CIDR prefix for range i; for iptoasn ranges the largest aligned
+        block of the range that contains value."""
+        bits = self.bits
+        prefixlen = self.prefixlens[i]
+        if prefixlen != RANGE:
+            return self.networks[i], prefixlen
+        start, end = self.starts[i], self.ends[i]
+        # No aligned block is larger than the range itself
+        for host_bits in range((end - start + 1).bit_length() - 1, -1, -1):
+            network = value >> host_bits << host_bits
+            if network >= start and network + (1 << host_bits) - 1 <= end:
+                return network, bits - host_bits
+        return value, bits
+
+
+class AsnTable:
+    """Longest-prefix-match table mapping addresses to prefix and origin AS."""
+
+    def __init__(self, entries=()):
+        ranges = {4: {}, 6: {}}
+        self.names = {}
+        self.countries = {}
+        for version, start, end, network, prefixlen, asn, country, name in entries:
+            # A RIB dump repeats each prefix once per peer; keep the first origin
+            ranges[version].setdefault((start, end), (network, prefixlen, asn))
+            if name and asn not in self.names:
+                self.names[asn] = name
+            if country and asn not in self.countries:
+                self.countries[asn] = country
+        self._tables = {
+            version: _FamilyTable(bits, INDEX_BITS[version], flatten((k[0], k[1], v) for k, v in ranges[version].items()))
+            for version, bits in ((4, 32), (6, 128))
+        }
+        self._v4 = self._tables[4]
+        self._v6 = self._tables[6]
+
+    def __len__(self):
+        return len(self._tables[4]) + len(self._tables[6])
+
+    def find(self, address):
+        """Return (table, index, value) for an address string, or None."""
+        try:
+            if ":" in address:
+                table = self._v6
+                value = int.from_bytes(inet_pton(AF_INET6, address), "big")
+            else:
+                table = self._v4
+                value = _unpack_v4(inet_pton(AF_INET, address))[0]
+        except OSError:
+            return None
+        # Inlined _FamilyTable.find(); this is the hot path
+        i = table.slots[value >> table.shift]
+        if i == MIXED:
+            bucket = value >> table.shift
+            i = bisect_right(table.starts, value, table.index[bucket], table.index[bucket + 1]) - 1
+            if i < 0 or value > table.ends[i]:
+                return None
+        elif i == NO_RANGE:
+            return None
+        return table, i, value
+
+    def lookup_asn(self, address):
+        """Return the origin AS number for an address, or None."""
+        # find() inlined once more, without building the hit tuple
+        try:
+            if ":" in address:
+                table = self._v6
+                value = int.from_bytes(inet_pton(AF_INET6, address), "big")
+            else:
+                table = self._v4
+                value = _unpack_v4(inet_pton(AF_INET, address))[0]
+        except OSError:
+            return None
+        i = table.slots[value >> table.shift]
+        if i == MIXED:
+            bucket = value >> table.shift
+            i = bisect_right(table.starts, value, table.index[bucket], table.index[bucket + 1]) - 1
+            if i < 0 or value > table.ends[i]:
+                return None
+        elif i == NO_RANGE:
+            return None
+        return table.asns[i]
+
+    def lookup(self, address):
+        """Return AsnInfo for an address string, or None if it is not routed."""
+        hit = self.find(address)
+        if hit is None:
+            return None
+        table, i, value = hit
+        network, prefixlen = table.prefix(i, value)
+        if table is self._v4:
+            prefix = "%d.%d.%d.%d/%d" % (network >> 24, network >> 16 & 255, network >> 8 & 255, network & 255, prefixlen)
+        else:
+            prefix = str(ipaddress.IPv6Network((network, prefixlen)))
+        asn = table.asns[i]
+        # tuple.__new__ skips the namedtuple constructor's Python frame
+        return _new_info(AsnInfo, (prefix, asn, self.names.get(asn, ""), self.countries.get(asn, "")))
+
+    def name(self, asn):
+        """Return the AS name recorded for an AS number, or an empty string."""
+        return self.names.get(int(asn), "")
+
+
+def load_table(path):
+    """Build an AsnTable from an iptoasn TSV, pyasn or bgpdump file."""
+    with _open_text(path) as f:
+        first = f.readline()
+        f.seek(0)
+        if first.count("\t") >= 2:
+            return AsnTable(parse_iptoasn(f))
+        return AsnTable(parse_prefixes(f))
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+IX-F member export ingester for PhreakBot.
+
+Parses IX-F Member Export JSON (https://ixpdb.euro-ix.net/en/ixp-member-list/,
+served by IXP Manager and most exchanges) into compact records, one
+``Member`` per network per exchange, and indexes any number of exports
+together:
+
+- by ASN
+- by peering LAN address, for the addresses assigned to members
+- by peering LAN prefix, in per-prefix-length dicts like the SSRF and RPKI
+  tables, so an unassigned address still resolves to its exchange
+- by name, in a sorted casefolded index searched with one bisect
+
+Records use ``__slots__``; an export of a large exchange is a few
+thousand of them.
+"""
+
+import json
+import socket
+from bisect import bisect_left
+
+
+class Ixp:
+    """An exchange described in an IX-F export."""
+
+    __slots__ = ("name", "long_name", "url", "lans")
+
+    def __init__(self, name, long_name="", url="", lans=()):
+        self.name = name
+        self.long_name = long_name
+        self.url = url
+        self.lans = tuple(lans)
+
+    def __repr__(self):
+        return f"Ixp({self.name!r})"
+
+
+class Member:
+    """A network's connections to one exchange."""
+
+    __slots__ = (
+        "ixp",
+        "asn",
+        "name",
+        "url",
+        "policy",
+        "member_since",
+        "speeds",
+        "ipv4",
+        "ipv6",
+        "max_prefix4",
+        "max_prefix6",
+    )
+
+    def __init__(self, ixp, asn, name, url="", policy="", member_since=""):
+        self.ixp = ixp
+        self.asn = asn
+        self.name = name
+        self.url = url
+        self.policy = policy
+        self.member_since = member_since
+        self.speeds = []
+        self.ipv4 = []
+        self.ipv6 = []
+        self.max_prefix4 = None
+        self.max_prefix6 = None
+
+    @property
+    def addresses(self):
+        return self.ipv4 + self.ipv6
+
+    @property
+    def capacity(self):
+        """Total port speed in Mbit/s"""
+        return sum(self.speeds)
+
+    def __repr__(self):
+        return f"Member(AS{self.asn}, {self.ixp.name!r})"
+
+
+class IxfExport:
+    """The exchanges and members of one IX-F export."""
+
+    __slots__ = ("ixps", "members")
+
+    def __init__(self, ixps, members):
+        self.ixps = ixps
+        self.members = members
+
+    def __len__(self):
+        return len(self.members)
+
+
+def _address_key(address):
+    """Packed form of an address, or None if it is not an IP address."""
+    address = address.strip()
+    try:
+        if ":" in address:
+            return socket.inet_pton(socket.AF_INET6, address)
+        return socket.inet_pton(socket.AF_INET, address)
+    except OSError:
+        return None
+
+
+def parse_export(data, name=None):
+    """Parse an IX-F member export.
+
+    Args:
+        data: Decoded JSON of the export
+        name: Exchange name to use when the export describes a single
+            exchange (overrides its shortname)
+
+    Returns:
+        IxfExport
+
+    Raises:
+        ValueError: if the export has no member_list or no members
+    """
+    member_list = data.get("member_list") if isinstance(data, dict) else None
+    if not isinstance(member_list, list):
+        raise ValueError("IX-F export does not contain a member_list")
+
+    ixp_list = data.get("ixp_list") or [{}]
+    ixps = {}
+    for entry in ixp_list:
+        lans = []
+        for vlan in entry.get("vlan") or []:
+            for family in ("ipv4", "ipv6"):
+                lan = vlan.get(family) or {}
+                if lan.get("prefix") and lan.get("mask_length") is not None:
+                    lans.append(f"{lan['prefix']}/{lan['mask_length']}")
+        shortname = entry.get("shortname") or entry.get("name") or name or "IXP"
+        ixps[entry.get("ixp_id")] = Ixp(
+            name if name and len(ixp_list) == 1 else shortname,
+            entry.get("name", ""),
+            entry.get("url", ""),
+            lans,
+        )
+    default_ixp = next(iter(ixps.values()))
+
+    members = []
+    for entry in member_list:
+        asn = entry.get("asnum")
+        if asn is None:
+            continue
+        by_ixp = {}
+        for connection in entry.get("connection_list") or [{}]:
+            ixp = ixps.get(connection.get("ixp_id"), default_ixp)
+            member = by_ixp.get(ixp.name)
+            if member is None:
+                member = by_ixp[ixp.name] = Member(
+                    ixp,
+                    int(asn),
+                    entry.get("name", ""),
+                    entry.get("url", ""),
+                    entry.get("peering_policy", ""),
+                    entry.get("member_since", ""),
+                )
+            for interface in connection.get("if_list") or []:
+                if interface.get("if_speed"):
+                    member.speeds.append(interface["if_speed"])
+            for vlan in connection.get("vlan_list") or []:
+                ipv4 = vlan.get("ipv4") or {}
+                ipv6 = vlan.get("ipv6") or {}
+                if ipv4.get("address"):
+                    member.ipv4.append(ipv4["address"])
+                if ipv6.get("address"):
+                    member.ipv6.append(ipv6["address"])
+                if member.max_prefix4 is None and ipv4.get("max_prefix") is not None:
+                    member.max_prefix4 = ipv4["max_prefix"]
+                if member.max_prefix6 is None and ipv6.get("max_prefix") is not None:
+                    member.max_prefix6 = ipv6["max_prefix"]
+        members.extend(by_ixp.values())
+
+    if not members:
+        raise ValueError("IX-F export contains no members")
+    return IxfExport(list(ixps.values()), members)
+
+
+def load_export(path, name=None):
+    """Parse an IX-F export saved at path."""
+    with open(path, encoding="utf-8") as f:
+        return parse_export(json.load(f), name)
+
+
+class IxfIndex:
+    """Members of several exchanges, indexed for lookup and search."""
+
+    def __init__(self, exports=()):
+        self.ixps = []
+        self.by_asn = {}
+        self._addresses = {}
+        self._lans = {4: {}, 6: {}}
+        self._lan_lengths = {4: (), 6: ()}
+        names = []
+
+        for export in exports:
+            self.ixps.extend(export.ixps)
+            for ixp in export.ixps:
+                for lan in ixp.lans:
+                    self._add_lan(lan, ixp)
+            for member in export.members:
+                self.by_asn.setdefault(member.asn, []).append(member)
+                for address in member.addresses:
+                    key = _address_key(address)
+                    if key is not None:
+                        self._addresses[key] = member
+                if member.name:
+                    names.append((member.name.casefold(), member.asn, member.ixp.name, member))
+
+        names.sort(key=lambda entry: entry[:3])
+        self._names = [entry[3] for entry in names]
+        self._name_keys = [entry[0] for entry in names]
+
+    def __len__(self):
+        return sum(len(members) for members in self.by_asn.values())
+
+    def _add_lan(self, prefix, ixp):
+        address, _, length = prefix.partition("/")
+        key = _address_key(address)
+        if key is None:
+            return
+        version = 6 if len(key) == 16 else 4
+        bits = len(key) * 8
+        length = int(length)
+        tables = self._lans[version]
+        if length not in tables:
+            tables[length] = {}
+            self._lan_lengths[version] = tuple(sorted(tables, reverse=True))
+        tables[length][int.from_bytes(key, "big") >> (bits - length)] = ixp
+
+    def members(self, asn, ixp=None):
+        """Return the Member records of an AS, optionally at one exchange."""
+        members = self.by_asn.get(int(asn), [])
+        if ixp is not None:
+            members = [m for m in members if m.ixp.name == ixp]
+        return members
+
+    def ixps_of(self, asn):
+        """Return the names of the exchanges an AS is connected to."""
+        return [member.ixp.name for member in self.by_asn.get(int(asn), [])]
+
+    def find_address(self, address):
+        """Look up a peering LAN address.
+
+        Returns:
+            tuple: (Member or None, Ixp or None); the member is None for an
+            unassigned address inside a known peering LAN
+        """
+        key = _address_key(address)
+        if key is None:
+            raise ValueError(f"invalid IP address: {address!r}")
+        member = self._addresses.get(key)
+        if member is not None:
+            return member, member.ixp
+        version = 6 if len(key) == 16 else 4
+        bits = len(key) * 8
+        value = int.from_bytes(key, "big")
+        tables = self._lans[version]
+        for length in self._lan_lengths[version]:
+            ixp = tables[length].get(value >> (bits - length))
+            if ixp is not None:
+                return None, ixp
+        return None, None
+
+    def search(self, prefix, ixp=None, limit=10):
+        """Return members whose name starts with prefix, in name order."""
+        key = prefix.casefold()
+        if not key:
+            return []
+        results = []
+        i = bisect_left(self._name_keys, key)
+        while i < len(self._names) and self._name_keys[i].startswith(key) and len(results) < limit:
+            member = self._names[i]
+            i += 1
+            if ixp is None or member.ixp.name == ixp:
+                results.append(member)
+        return results
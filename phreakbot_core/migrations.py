@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Versioned schema migrations for PhreakBot.
+
+Migrations are the SQL files in ``migrations/``, named
+``<version>_<name>.sql`` and applied in version order. The versions
+applied to a database are recorded in ``schema_version``. The bot runs
+pending migrations when it starts (unless ``db_migrate_on_start`` is
+false); ``scripts/init_db.py`` runs them too.
+
+A migration normally runs in one transaction together with its
+``schema_version`` row. A migration whose first line is
+
+    -- migrate: no-transaction
+
+runs statement by statement in autocommit mode instead, which
+``CREATE INDEX CONCURRENTLY`` requires: the index is built without
+blocking writes, so it can be added to a live database. Such
+migrations must be idempotent (``IF NOT EXISTS``), since a failure
+leaves them partly applied; invalid indexes left by an interrupted
+concurrent build are dropped before the migration is retried.
+
+An advisory lock keeps bots sharing a database from migrating it at the
+same time.
+"""
+
+import os
+import re
+from collections import namedtuple
+
+
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+NO_TRANSACTION = "-- migrate: no-transaction"
+# pg_advisory_lock key of the migration runner ("pbmi")
+LOCK_KEY = 0x70626D69
+
+Migration = namedtuple("Migration", ["version", "name", "path"])
+
+_FILENAME_RE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+def list_migrations(directory=DEFAULT_DIRECTORY):
+    """Migration files in a directory, in version order."""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _FILENAME_RE.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    migrations.sort()
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"duplicate migration versions in {directory}")
+    return migrations
+
+
+def split_statements(sql):
+    """Split SQL into statements at top-level semicolons.
+
+    Quoted strings, quoted identifiers, dollar-quoted bodies and
+    comments are kept intact.
+    """
+    statements = []
+    start = i = 0
+    length = len(sql)
+    while i < length:
+        char = sql[i]
+        if sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = length if end == -1 else end + 1
+        elif sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            i = length if end == -1 else end + 2
+        elif char in ("'", '"'):
+            end = sql.find(char, i + 1)
+            while end != -1 and sql.startswith(char * 2, end):
+                end = sql.find(char, end + 2)
+            i = length if end == -1 else end + 1
+        elif char == "$":
+            match = re.match(r"\$(\w*)\$", sql[i:])
+            if match:
+                end = sql.find(match.group(0), i + len(match.group(0)))
+                i = length if end == -1 else end + len(match.group(0))
+            else:
+                i += 1
+        elif char == ";":
+            statements.append(sql[start:i])
+            start = i = i + 1
+        else:
+            i += 1
+    statements.append(sql[start:])
+    return [s.strip() for s in statements if _has_code(s)]
+
+
+def _has_code(statement):
+    for line in statement.splitlines():
+        line = line.strip()
+        if line and not line.startswith("--"):
+            return True
+    return False
+
+
+def applied_versions(cur):
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INT PRIMARY KEY, "
+        "name VARCHAR(255) NOT NULL, "
+        "applied_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    )
+    cur.execute("SELECT version FROM schema_version")
+    return {row[0] for row in cur.fetchall()}
+
+
+def pending_migrations(conn, directory=DEFAULT_DIRECTORY):
+    """Migrations not yet applied to the database."""
+    previous = conn.autocommit
+    if not previous:
+        conn.rollback()
+    conn.autocommit = True
+    try:
+        cur = conn.cursor()
+        applied = applied_versions(cur)
+        cur.close()
+    finally:
+        conn.autocommit = previous
+    return [m for m in list_migrations(directory) if m.version not in applied]
+
+
+def _drop_invalid_indexes(cur, logger=None):
+    cur.execute(
+        "SELECT i.indexrelid::regclass::text FROM pg_index i "
+        "JOIN pg_class t ON t.oid = i.indrelid "
+        "WHERE NOT i.indisvalid AND t.relname LIKE 'phreakbot\\_%'"
+    )
+    for (index,) in cur.fetchall():
+        if logger:
+            logger.warning(f"Dropping invalid index {index} left by an interrupted build")
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index}")
+
+
+def _apply(cur, migration, logger=None):
+    with open(migration.path, encoding="utf-8") as f:
+        sql = f.read()
+
+    if sql.lstrip().startswith(NO_TRANSACTION):
+        _drop_invalid_indexes(cur, logger)
+        for statement in split_statements(sql):
+            cur.execute(statement)
+        cur.execute(
+            "INSERT INTO schema_version (version, name) VALUES (%s, %s)",
+            (migration.version, migration.name),
+        )
+    else:
+        cur.execute("BEGIN")
+        try:
+            cur.execute(sql)
+            cur.execute(
+                "INSERT INTO schema_version (version, name) VALUES (%s, %s)",
+                (migration.version, migration.name),
+            )
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+
+
+def migrate(conn, directory=DEFAULT_DIRECTORY, logger=None):
+    """Apply the pending migrations to a database, in order.
+
+    Args:
+        conn: psycopg2 connection; it is left in its original autocommit mode
+        directory: Directory holding the migration files
+        logger: Optional logger for progress messages
+
+    Returns:
+        list: The migrations applied
+    """
+    migrations = list_migrations(directory)
+    previous = conn.autocommit
+    if not previous:
+        conn.rollback()
+    conn.autocommit = True
+    applied_now = []
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT pg_advisory_lock(%s)", (LOCK_KEY,))
+        try:
+            applied = applied_versions(cur)
+            for migration in migrations:
+                if migration.version in applied:
+                    continue
+                if logger:
+                    logger.info(f"Applying migration {migration.version:04d}_{migration.name}")
+                _apply(cur, migration, logger)
+                applied_now.append(migration)
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY,))
+    finally:
+        cur.close()
+        conn.autocommit = previous
+    if logger and applied_now:
+        logger.info(f"Database schema is at version {applied_now[-1].version}")
+    return applied_now
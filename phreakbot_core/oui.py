@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline IEEE MAC address registry for PhreakBot.
+
+The IEEE publishes its assignments as CSV files (MA-L/OUI, MA-M, MA-S,
+IAB and CID). build_database() compiles them into one compact binary
+file, and OuiDatabase memory-maps that file and binary-searches it, so a
+lookup touches a handful of pages and never leaves the process.
+
+File layout (all integers big-endian):
+
+    header   MAGIC, uint32 record count
+    records  count x (uint64 key, uint32 string offset), sorted by key
+    strings  uint16 length + UTF-8 "registry\\x1forganization\\x1faddress"
+
+A key is the 48-bit MAC prefix (zero-padded) shifted left by 8 bits and
+combined with the prefix length, so byte order equals numeric order and
+an exact key probe finds one assignment. Lookups try the 36, 28 and 24
+bit prefixes of the address, longest first.
+"""
+
+import csv
+import io
+import mmap
+import os
+import struct
+from collections import namedtuple
+
+
+MAGIC = b"PBOUI\x00\x01\x00"
+HEADER = struct.Struct(">8sI")
+RECORD = struct.Struct(">QI")
+LENGTH = struct.Struct(">H")
+
+# Prefix lengths used by the IEEE registries, longest first
+PREFIX_BITS = (36, 28, 24)
+
+# Hex digits of the assignment per registry file
+REGISTRY_BITS = {"MA-L": 24, "CID": 24, "MA-M": 28, "MA-S": 36, "IAB": 36}
+
+# Download locations of the registry files
+IEEE_CSV_URLS = (
+    "https://standards-oui.ieee.org/oui/oui.csv",
+    "https://standards-oui.ieee.org/cid/cid.csv",
+    "https://standards-oui.ieee.org/oui28/mam.csv",
+    "https://standards-oui.ieee.org/oui36/oui36.csv",
+    "https://standards-oui.ieee.org/iab/iab.csv",
+)
+
+_SEPARATOR = "\x1f"
+
+OuiEntry = namedtuple("OuiEntry", ["prefix", "bits", "registry", "organization", "address"])
+
+
+def _key(value, bits):
+    return (value << 8) | bits
+
+
+def parse_ieee_csv(stream):
+    """Yield (prefix value, bits, registry, organization, address) from an IEEE CSV file.
+
+    ``prefix value`` is the assignment left-aligned in 48 bits.
+    """
+    reader = csv.reader(stream)
+    for row in reader:
+        if len(row) < 3 or row[0] == "Registry":
+            continue
+        registry = row[0].strip()
+        assignment = row[1].strip()
+        bits = REGISTRY_BITS.get(registry, len(assignment) * 4)
+        try:
+            value = int(assignment, 16)
+        except ValueError:
+            continue
+        if bits not in PREFIX_BITS or len(assignment) * 4 != bits:
+            continue
+        organization = " ".join(row[2].split())
+        address = " ".join(row[3].split()) if len(row) > 3 else ""
+        yield value << (48 - bits), bits, registry, organization, address
+
+
+def build_database(csv_paths, output_path):
+    """Compile IEEE registry CSV files into a binary database.
+
+    The file is written next to ``output_path`` and renamed into place,
+    so a running bot never sees a partially written database.
+
+    Returns:
+        int: number of assignments written
+    """
+    entries = {}
+    for path in csv_paths:
+        with open(path, encoding="utf-8", errors="replace", newline="") as f:
+            for value, bits, registry, organization, address in parse_ieee_csv(f):
+                entries[_key(value, bits)] = _SEPARATOR.join((registry, organization, address))
+
+    strings = io.BytesIO()
+    offsets = {}
+    records = []
+    for key in sorted(entries):
+        text = entries[key]
+        offset = offsets.get(text)
+        if offset is None:
+            encoded = text.encode("utf-8")[:0xFFFF]
+            offset = offsets[text] = strings.tell()
+            strings.write(LENGTH.pack(len(encoded)))
+            strings.write(encoded)
+        records.append(RECORD.pack(key, offset))
+
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(records)))
+        f.writelines(records)
+        f.write(strings.getvalue())
+    os.replace(tmp_path, output_path)
+    return len(records)
+
+
+class OuiDatabase:
+    """Memory-mapped, binary-searched view of a compiled registry file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mtime = os.fstat(f.fileno()).st_mtime
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a PhreakBot OUI database")
+        self._strings = HEADER.size + self._count * RECORD.size
+
+    @classmethod
+    def open_optional(cls, path, logger=None):
+        """Open a database, returning None if it is missing or invalid."""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError, struct.error) as e:
+            if logger:
+                logger.error(f"Could not open OUI database {path}: {e}")
+            return None
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        self._mm.close()
+
+    def changed(self):
+        """Check if the file on disk has been replaced since it was opened."""
+        try:
+            return os.stat(self.path).st_mtime != self._mtime
+        except OSError:
+            return False
+
+    def _find(self, key):
+        """Binary search for an exact key, returning the string offset or None."""
+        mm = self._mm
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            found, offset = RECORD.unpack_from(mm, HEADER.size + mid * RECORD.size)
+            if found < key:
+                lo = mid + 1
+            elif found > key:
+                hi = mid
+            else:
+                return offset
+        return None
+
+    def _entry(self, value, bits, offset):
+        start = self._strings + offset
+        (length,) = LENGTH.unpack_from(self._mm, start)
+        text = self._mm[start + LENGTH.size : start + LENGTH.size + length].decode("utf-8", "replace")
+        registry, organization, address = (text.split(_SEPARATOR) + ["", ""])[:3]
+        prefix = f"{value >> (48 - bits):0{bits // 4}X}"
+        return OuiEntry(prefix, bits, registry, organization, address)
+
+    def lookup(self, mac):
+        """Find the most specific assignment for a MAC address.
+
+        Args:
+            mac: hex digits of a full or partial MAC address (at least 6)
+
+        Returns:
+            OuiEntry or None
+        """
+        digits = mac[:12]
+        known_bits = len(digits) * 4
+        value = int(digits.ljust(12, "0"), 16)
+        for bits in PREFIX_BITS:
+            if bits > known_bits:
+                continue
+            prefix = (value >> (48 - bits)) << (48 - bits)
+            offset = self._find(_key(prefix, bits))
+            if offset is not None:
+                return self._entry(prefix, bits, offset)
+        return None
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local PeeringDB snapshot for PhreakBot.
+
+Loads a PeeringDB JSON dump, in the layout of the CAIDA PeeringDB archive
+and of scripts/update_peeringdb.py (one ``{"data": [...]}`` object per
+type: ``org``, ``net``, ``ix``, ``fac``, ``netixlan``, ``netfac``), plain
+or gzip-compressed, and indexes it for the lookups the bot needs:
+
+- networks by ASN and by id
+- exchanges and facilities by id
+- IX connections (netixlan) by ASN and by exchange
+- facilities per network
+- a sorted, casefolded name index for prefix search over network names,
+  their aka and exchange names (one bisect per search)
+
+Only the fields the bot shows are kept, in namedtuples.
+"""
+
+import gzip
+import json
+from bisect import bisect_left
+from collections import namedtuple
+
+
+DEFAULT_PATH = "data/peeringdb.json"
+
+Network = namedtuple(
+    "Network",
+    [
+        "id",
+        "asn",
+        "name",
+        "aka",
+        "org_id",
+        "website",
+        "irr_as_set",
+        "info_type",
+        "info_prefixes4",
+        "info_prefixes6",
+        "policy_general",
+    ],
+)
+Exchange = namedtuple("Exchange", ["id", "name", "name_long", "city", "country", "website"])
+Facility = namedtuple("Facility", ["id", "name", "city", "country"])
+Connection = namedtuple(
+    "Connection", ["ix_id", "net_id", "asn", "ipaddr4", "ipaddr6", "speed", "is_rs_peer"]
+)
+Organization = namedtuple("Organization", ["id", "name", "country"])
+
+NETWORK = "net"
+EXCHANGE = "ix"
+
+
+def _rows(dump, kind):
+    section = dump.get(kind) or {}
+    rows = section.get("data", []) if isinstance(section, dict) else section
+    # Deleted objects are kept in some dumps
+    return [row for row in rows if row.get("status", "ok") == "ok"]
+
+
+def _pick(cls, row):
+    return cls(*(row.get(field) for field in cls._fields))
+
+
+class PeeringDB:
+    """Indexed, read-only PeeringDB snapshot."""
+
+    def __init__(self, dump):
+        self.orgs = {row["id"]: _pick(Organization, row) for row in _rows(dump, "org")}
+        self.networks = {}
+        self.by_asn = {}
+        for row in _rows(dump, "net"):
+            net = _pick(Network, row)
+            self.networks[net.id] = net
+            self.by_asn[net.asn] = net
+        self.exchanges = {row["id"]: _pick(Exchange, row) for row in _rows(dump, "ix")}
+        self.facilities = {row["id"]: _pick(Facility, row) for row in _rows(dump, "fac")}
+
+        # netixlan rows name the ixlan; every ixlan belongs to one exchange
+        ixlan_ix = {row["id"]: row.get("ix_id") for row in _rows(dump, "ixlan")}
+        self.connections_by_asn = {}
+        self.connections_by_ix = {}
+        for row in _rows(dump, "netixlan"):
+            ix_id = row.get("ix_id") or ixlan_ix.get(row.get("ixlan_id"))
+            if ix_id is None:
+                continue
+            connection = Connection(
+                ix_id,
+                row.get("net_id"),
+                row.get("asn"),
+                row.get("ipaddr4"),
+                row.get("ipaddr6"),
+                row.get("speed") or 0,
+                bool(row.get("is_rs_peer")),
+            )
+            self.connections_by_asn.setdefault(connection.asn, []).append(connection)
+            self.connections_by_ix.setdefault(ix_id, []).append(connection)
+
+        self.facilities_by_net = {}
+        for row in _rows(dump, "netfac"):
+            self.facilities_by_net.setdefault(row.get("net_id"), []).append(row.get("fac_id"))
+
+        names = []
+        for net in self.networks.values():
+            for name in {net.name, net.aka}:
+                if name:
+                    names.append((name.casefold(), NETWORK, net.id))
+        for ix in self.exchanges.values():
+            for name in {ix.name, ix.name_long}:
+                if name:
+                    names.append((name.casefold(), EXCHANGE, ix.id))
+        names.sort()
+        self._names = names
+        self._name_keys = [entry[0] for entry in names]
+
+    def __len__(self):
+        return len(self.networks)
+
+    def network(self, asn):
+        """Return the Network registered for an AS number, or None."""
+        return self.by_asn.get(int(asn))
+
+    def organization(self, net):
+        return self.orgs.get(net.org_id) if net else None
+
+    def connections(self, asn, ix_id=None):
+        """Return the IX connections of an AS, optionally at one exchange."""
+        connections = self.connections_by_asn.get(int(asn), [])
+        if ix_id is not None:
+            connections = [c for c in connections if c.ix_id == ix_id]
+        return connections
+
+    def exchanges_of(self, asn):
+        """Return [(Exchange, [Connection, ...]), ...] for an AS, largest capacity first."""
+        grouped = {}
+        for connection in self.connections(asn):
+            grouped.setdefault(connection.ix_id, []).append(connection)
+        result = [
+            (self.exchanges[ix_id], connections)
+            for ix_id, connections in grouped.items()
+            if ix_id in self.exchanges
+        ]
+        result.sort(key=lambda item: (-sum(c.speed for c in item[1]), item[0].name))
+        return result
+
+    def facilities_of(self, asn):
+        """Return the facilities an AS is present at."""
+        net = self.network(asn)
+        if net is None:
+            return []
+        return [self.facilities[f] for f in self.facilities_by_net.get(net.id, []) if f in self.facilities]
+
+    def search(self, prefix, kind=None, limit=10):
+        """Return networks and exchanges whose name starts with prefix.
+
+        Args:
+            prefix: Case-insensitive name prefix
+            kind: "net" or "ix" to restrict the results, None for both
+            limit: Maximum number of distinct objects returned
+
+        Returns:
+            list: Network and Exchange records, in name order
+        """
+        key = prefix.casefold()
+        if not key:
+            return []
+        results = []
+        seen = set()
+        i = bisect_left(self._name_keys, key)
+        names = self._names
+        while i < len(names) and names[i][0].startswith(key) and len(results) < limit:
+            _, entry_kind, object_id = names[i]
+            i += 1
+            if (kind and entry_kind != kind) or (entry_kind, object_id) in seen:
+                continue
+            seen.add((entry_kind, object_id))
+            table = self.networks if entry_kind == NETWORK else self.exchanges
+            results.append(table[object_id])
+        return results
+
+    def find_exchange(self, name):
+        """Return the exchange with this exact (case-insensitive) name, or the first prefix match."""
+        matches = self.search(name, kind=EXCHANGE, limit=10)
+        for ix in matches:
+            if ix.name.casefold() == name.casefold():
+                return ix
+        return matches[0] if matches else None
+
+
+def load_dump(path):
+    """Build a PeeringDB index from a JSON dump (plain or gzip)."""
+    with open(path, "rb") as f:
+        gzipped = f.read(2) == b"\x1f\x8b"
+    opener = gzip.open if gzipped else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return PeeringDB(json.load(f))
+
+
+def format_speed(mbps):
+    """Format a port speed in Mbit/s as 100M, 10G, 1.6T."""
+    if not mbps:
+        return "?"
+    if mbps >= 1000000:
+        return f"{mbps / 1000000:g}T"
+    if mbps >= 1000:
+        return f"{mbps / 1000:g}G"
+    return f"{mbps}M"
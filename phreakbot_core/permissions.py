@@ -42,7 +42,7 @@ class PermissionMixin:
                 if conn:
                     cur = conn.cursor()
                     cur.execute(
-                        "SELECT is_owner FROM phreakbot_users WHERE username = %s",
+                        "SELECT is_owner FROM phreakbot_users WHERE lower(username) = %s",
                         (nick.lower(),),
                     )
                     result = cur.fetchone()
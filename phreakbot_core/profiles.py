@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+User profile output shared by the whois and userinfo modules.
+
+Profiles come from ``bot.db_get_user_profile()``, which reads a user,
+their hostmasks and permissions in one query and caches the result.
+"""
+
+
+def find_channel(bot, nick):
+    """Return the first channel the bot shares with nick, or None."""
+    nick = nick.lower()
+    for channel_name, channel_data in bot.channels.items():
+        if any(user.lower() == nick for user in channel_data.get("users", ())):
+            return channel_name
+    return None
+
+
+def profile_lines(profile, channel):
+    """Describe a profile, showing the permissions for channel."""
+    how = "" if profile.get("matched_by") == "username" else " by hostmask"
+    lines = [f"Recognized{how} as user '{profile['username']}'"]
+
+    permissions = profile["permissions"]
+    if permissions.get("global"):
+        lines.append(f"Global permissions: {', '.join(permissions['global'])}")
+    if channel and permissions.get(channel.lower()):
+        lines.append(f"Channel permissions for {channel}: {', '.join(permissions[channel.lower()])}")
+
+    if profile["hostmasks"]:
+        lines.append(f"Hostmasks: {', '.join(profile['hostmasks'])}")
+
+    if profile["is_owner"]:
+        lines.append("This user is the bot owner.")
+    elif profile["is_admin"]:
+        lines.append("This user is a bot admin.")
+    return lines
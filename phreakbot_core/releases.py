@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GitHub release watcher for PhreakBot.
+
+Modules that report the latest release of a project call ``watch(bot,
+"owner/repo")`` from their config(). Each repository becomes a bot
+dataset: its releases list is fetched in the background with ETag
+revalidation (a 304 from GitHub does not count against the rate limit)
+and parsed into a ReleaseInfo holding the latest stable and development
+releases, so commands answer from memory with ``latest(bot, repo)``.
+
+Set ``github_token`` in the config to raise the rate limit. Channels
+listed for a repository in ``release_announce`` are told about new
+releases as they are published.
+"""
+
+import json
+from collections import namedtuple
+
+from .datasets import Dataset
+
+
+API_URL = "https://api.github.com/repos/{repo}/releases?per_page=30"
+DEFAULT_INTERVAL = 900
+
+Release = namedtuple("Release", ["name", "tag", "published", "url", "branch"])
+ReleaseInfo = namedtuple("ReleaseInfo", ["stable", "dev"])
+
+
+def _release(entry):
+    return Release(
+        entry.get("name") or entry.get("tag_name", ""),
+        entry.get("tag_name", ""),
+        entry.get("published_at") or "",
+        entry.get("html_url", ""),
+        entry.get("target_commitish", ""),
+    )
+
+
+def parse_releases(data):
+    """Pick the latest stable and development release from a GitHub releases list.
+
+    Drafts are skipped. The development release is the newest pre-release
+    published after the latest stable one, or None.
+    """
+    if not isinstance(data, list):
+        raise ValueError("not a GitHub releases list")
+    entries = sorted(
+        (entry for entry in data if not entry.get("draft")),
+        key=lambda entry: entry.get("published_at") or "",
+        reverse=True,
+    )
+    stable = dev = None
+    for entry in entries:
+        if entry.get("prerelease"):
+            if dev is None and stable is None:
+                dev = _release(entry)
+        elif stable is None:
+            stable = _release(entry)
+    return ReleaseInfo(stable, dev)
+
+
+def load_releases(path):
+    """Parse a GitHub releases list saved at path."""
+    with open(path, encoding="utf-8") as f:
+        return parse_releases(json.load(f))
+
+
+def dataset_name(repo):
+    return f"releases:{repo.lower()}"
+
+
+def watch(bot, repo, label=None):
+    """Follow the releases of a GitHub repository (idempotent).
+
+    Args:
+        bot: The bot instance
+        repo: "owner/name"
+        label: Project name used in announcements, defaults to repo
+
+    Returns:
+        Dataset: The dataset holding the repository's ReleaseInfo
+    """
+    name = dataset_name(repo)
+    existing = bot.datasets.get(name)
+    if existing is not None:
+        return existing
+
+    headers = {"Accept": "application/vnd.github+json", "User-Agent": "PhreakBot/1.0 Release Watcher"}
+    if bot.config.get("github_token"):
+        headers["Authorization"] = f"Bearer {bot.config['github_token']}"
+    channels = (bot.config.get("release_announce") or {}).get(repo, [])
+    slug = repo.lower().replace("/", "-")
+
+    async def announce(old, new):
+        if old is None or not channels:
+            return
+        for kind, before, after in (("release", old.stable, new.stable), ("development release", old.dev, new.dev)):
+            if after is not None and (before is None or after.tag != before.tag):
+                for channel in channels:
+                    await bot.message(channel, f"New {label or repo} {kind} {after.name}: {after.url}")
+
+    return bot.add_dataset(
+        Dataset(
+            name,
+            f"data/releases-{slug}.json",
+            load_releases,
+            url=API_URL.format(repo=repo),
+            refresh_interval=bot.config.get("github_release_interval", DEFAULT_INTERVAL),
+            headers=headers,
+            logger=bot.logger,
+            on_change=announce,
+        )
+    )
+
+
+def latest(bot, repo):
+    """Return the ReleaseInfo of a watched repository, or None until it is loaded."""
+    return bot.dataset(dataset_name(repo))
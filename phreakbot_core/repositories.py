@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Repositories: the bot's SQL for users, permissions, karma, quotes,
+infoitems, auto-op and autovoice in one place.
+
+Modules read and change data through these objects instead of running
+SQL themselves:
+
+    item = Karma(bot).get("python", "#channel")
+
+Rows come back as the namedtuples below. Every method borrows a pooled
+connection for its own statements and always gives it back:
+``Repository.transaction()`` commits when its block succeeds and rolls
+back when it raises. Without a database connection the methods raise
+DatabaseUnavailable; database errors propagate to the caller.
+
+Hot reads (the auto-op and autovoice checks on every join, ``!item?``
+lookups) go through ``Repository.fetch()``. On PostgreSQL it runs them
+as prepared statements: each pooled connection prepares a statement on
+first use and afterwards only sends the parameters. Results can be
+cached in the bot's TTL cache; the repository that changes the data
+drops the cached entries. Set ``db_prepared_statements`` to false behind
+a transaction-pooling proxy such as PgBouncer.
+"""
+
+import re
+import weakref
+from collections import namedtuple
+from contextlib import contextmanager
+
+
+User = namedtuple("User", ["id", "username", "dob", "is_admin", "is_owner"])
+KarmaItem = namedtuple("KarmaItem", ["id", "item", "karma", "channel"])
+KarmaReason = namedtuple("KarmaReason", ["direction", "reason"])
+Quote = namedtuple("Quote", ["id", "quote", "username", "channel", "insert_time"])
+InfoItem = namedtuple("InfoItem", ["id", "item", "value", "channel", "users_id"])
+
+_USER_COLUMNS = "u.id, u.username, u.dob, u.is_admin, u.is_owner"
+_QUOTE_SELECT = (
+    "SELECT q.id, q.quote, u.username, q.channel, q.insert_time FROM phreakbot_quotes q "
+    "JOIN phreakbot_users u ON q.users_id = u.id "
+)
+
+# Statements prepared on each connection, {connection: {name}}
+_prepared = weakref.WeakKeyDictionary()
+
+
+class DatabaseUnavailable(Exception):
+    """No database connection could be obtained."""
+
+
+def _numbered(sql):
+    """Replace %s placeholders with PREPARE's $1, $2, ..."""
+    count = iter(range(1, sql.count("%s") + 1))
+    return re.sub(r"%s", lambda m: f"${next(count)}", sql)
+
+
+class Repository:
+    """Base class: connection handling and the shared read path."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @contextmanager
+    def transaction(self):
+        """Cursor on a pooled connection, committed if the block succeeds."""
+        conn = self.bot.db_get()
+        if not conn:
+            raise DatabaseUnavailable()
+        cur = None
+        try:
+            cur = conn.cursor()
+            yield cur
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass  # a broken connection; report the original error
+            raise
+        finally:
+            if cur is not None:
+                cur.close()
+            self.bot.db_return(conn)
+
+    def _prepare(self):
+        return self.bot.db_backend() == "postgresql" and self.bot.config.get("db_prepared_statements", True)
+
+    def execute(self, cur, name, sql, params=()):
+        """Run a statement, as the prepared statement ``name`` on PostgreSQL."""
+        if not self._prepare():
+            cur.execute(sql, params)
+            return
+        prepared = _prepared.setdefault(cur.connection, set())
+        if name not in prepared:
+            cur.execute(f"PREPARE {name} AS {_numbered(sql)}")
+            prepared.add(name)
+        if params:
+            cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cur.execute(f"EXECUTE {name}")
+
+    def fetch(self, name, sql, params=(), one=False):
+        """Run a hot read query.
+
+        Args:
+            name: Prepared statement name
+            one: Return the first row (or None) instead of all rows
+
+        Returns:
+            The row or list of rows
+        """
+        with self.transaction() as cur:
+            self.execute(cur, name, sql, params)
+            return cur.fetchone() if one else cur.fetchall()
+
+    def cached(self, cache_type, key, load):
+        """Value from the bot's cache, or load() it and cache it."""
+        value = self.bot._cache_get(cache_type, key)
+        if value is None:
+            value = load()
+            self.bot._cache_set(cache_type, key, value)
+        return value
+
+
+class Users(Repository):
+    """Registered users and their hostmasks."""
+
+    def by_username(self, username):
+        with self.transaction() as cur:
+            cur.execute(
+                f"SELECT {_USER_COLUMNS} FROM phreakbot_users u WHERE lower(u.username) = %s",
+                (username.lower(),),
+            )
+            row = cur.fetchone()
+        return User(*row) if row else None
+
+    def by_hostmask(self, hostmask):
+        with self.transaction() as cur:
+            cur.execute(
+                f"SELECT {_USER_COLUMNS} FROM phreakbot_users u "
+                "JOIN phreakbot_hostmasks h ON u.id = h.users_id WHERE lower(h.hostmask) = %s",
+                (hostmask.lower(),),
+            )
+            row = cur.fetchone()
+        return User(*row) if row else None
+
+    def is_registered(self, hostmask):
+        """Whether a hostmask belongs to a user (checked on every join)."""
+        row = self.fetch(
+            "users_registered",
+            "SELECT 1 FROM phreakbot_hostmasks WHERE lower(hostmask) = %s",
+            (hostmask.lower(),),
+            one=True,
+        )
+        return row is not None
+
+    def create(self, username, hostmask, permissions=("user",)):
+        """Add a user with one hostmask and global permissions.
+
+        Returns:
+            int: The new user's id
+        """
+        with self.transaction() as cur:
+            cur.execute(
+                "INSERT INTO phreakbot_users (username) VALUES (%s) RETURNING id",
+                (username.lower(),),
+            )
+            user_id = cur.fetchone()[0]
+            cur.execute(
+                "INSERT INTO phreakbot_hostmasks (users_id, hostmask) VALUES (%s, %s)",
+                (user_id, hostmask.lower()),
+            )
+            for permission in permissions:
+                cur.execute(
+                    "INSERT INTO phreakbot_perms (users_id, permission) VALUES (%s, %s)",
+                    (user_id, permission),
+                )
+        self.bot.db_invalidate_users()
+        return user_id
+
+
+class Perms(Repository):
+    """Global ("" channel) and channel permissions."""
+
+    def add(self, user_id, permissions, channel=""):
+        """Grant permissions; ones the user already has are skipped."""
+        with self.transaction() as cur:
+            for permission in permissions:
+                cur.execute(
+                    "INSERT INTO phreakbot_perms (users_id, permission, channel) VALUES (%s, %s, %s) "
+                    "ON CONFLICT DO NOTHING",
+                    (user_id, permission, channel.lower()),
+                )
+        self.bot.db_invalidate_users()
+
+    def remove(self, user_id, permissions, channel=""):
+        with self.transaction() as cur:
+            for permission in permissions:
+                cur.execute(
+                    "DELETE FROM phreakbot_perms WHERE users_id = %s AND permission = %s AND channel = %s",
+                    (user_id, permission, channel.lower()),
+                )
+        self.bot.db_invalidate_users()
+
+
+class Karma(Repository):
+    """Karma per item and channel, with the reasons given."""
+
+    def get(self, item, channel):
+        with self.transaction() as cur:
+            cur.execute(
+                "SELECT id, item, karma, channel FROM phreakbot_karma "
+                "WHERE LOWER(item) = LOWER(%s) AND channel = %s",
+                (item, channel),
+            )
+            row = cur.fetchone()
+        return KarmaItem(*row) if row else None
+
+    def change(self, item, channel, delta, reason=None):
+        """Add delta to an item's karma, creating the item if needed.
+
+        The reason, if any, is recorded once per item, direction and text.
+
+        Returns:
+            int: The new karma
+        """
+        with self.transaction() as cur:
+            cur.execute(
+                "SELECT id FROM phreakbot_karma WHERE LOWER(item) = LOWER(%s) AND channel = %s",
+                (item, channel),
+            )
+            row = cur.fetchone()
+            if row:
+                cur.execute(
+                    "UPDATE phreakbot_karma SET karma = karma + %s WHERE id = %s RETURNING id, karma",
+                    (delta, row[0]),
+                )
+            else:
+                cur.execute(
+                    "INSERT INTO phreakbot_karma (item, karma, channel) VALUES (%s, %s, %s) RETURNING id, karma",
+                    (item, delta, channel),
+                )
+            karma_id, karma = cur.fetchone()
+            if reason:
+                cur.execute(
+                    "INSERT INTO phreakbot_karma_why (karma_id, reason, direction, channel) "
+                    "VALUES (%s, %s, %s, %s) ON CONFLICT DO NOTHING",
+                    (karma_id, reason, "up" if delta > 0 else "down", channel),
+                )
+        return karma
+
+    def reasons(self, item, channel, limit=3):
+        """Most recent reasons first."""
+        with self.transaction() as cur:
+            cur.execute(
+                "SELECT kw.direction, kw.reason FROM phreakbot_karma_why kw "
+                "JOIN phreakbot_karma k ON kw.karma_id = k.id "
+                "WHERE LOWER(k.item) = LOWER(%s) AND k.channel = %s ORDER BY kw.id DESC LIMIT %s",
+                (item, channel, limit),
+            )
+            return [KarmaReason(*row) for row in cur.fetchall()]
+
+    def top(self, channel, limit, positive=True):
+        """Items with the most positive (or most negative) karma."""
+        where, order = ("karma > 0", "DESC") if positive else ("karma < 0", "ASC")
+        with self.transaction() as cur:
+            cur.execute(
+                f"SELECT id, item, karma, channel FROM phreakbot_karma "
+                f"WHERE {where} AND channel = %s ORDER BY karma {order} LIMIT %s",
+                (channel, limit),
+            )
+            return [KarmaItem(*row) for row in cur.fetchall()]
+
+
+class Quotes(Repository):
+    """Channel quotes."""
+
+    def get(self, quote_id):
+        with self.transaction() as cur:
+            cur.execute(_QUOTE_SELECT + "WHERE q.id = %s", (quote_id,))
+            row = cur.fetchone()
+        return Quote(*row) if row else None
+
+    def random(self, text=None):
+        """A random quote, or a random one containing text."""
+        with self.transaction() as cur:
+            if text:
+                cur.execute(
+                    _QUOTE_SELECT + "WHERE q.quote ILIKE %s ORDER BY RANDOM() LIMIT 1", (f"%{text}%",)
+                )
+            else:
+                cur.execute(_QUOTE_SELECT + "ORDER BY RANDOM() LIMIT 1")
+            row = cur.fetchone()
+        return Quote(*row) if row else None
+
+    def search(self, text, limit=5):
+        with self.transaction() as cur:
+            cur.execute(
+                _QUOTE_SELECT + "WHERE q.quote ILIKE %s ORDER BY q.id LIMIT %s", (f"%{text}%", limit)
+            )
+            return [Quote(*row) for row in cur.fetchall()]
+
+    def add(self, user_id, text, channel):
+        """Add a quote.
+
+        Returns:
+            int: The new quote's id, or None if the channel already has it
+        """
+        with self.transaction() as cur:
+            cur.execute(
+                "SELECT id FROM phreakbot_quotes WHERE quote = %s AND channel = %s", (text, channel)
+            )
+            if cur.fetchone():
+                return None
+            cur.execute(
+                "INSERT INTO phreakbot_quotes (users_id, quote, channel) VALUES (%s, %s, %s) RETURNING id",
+                (user_id, text, channel),
+            )
+            return cur.fetchone()[0]
+
+    def delete(self, quote_id):
+        """Returns True if the quote existed."""
+        with self.transaction() as cur:
+            cur.execute("DELETE FROM phreakbot_quotes WHERE id = %s RETURNING id", (quote_id,))
+            return cur.fetchone() is not None
+
+
+class Infoitems(Repository):
+    """Values stored per item and channel ("!item = value", "!item?")."""
+
+    def values(self, item, channel):
+        """The item's values, oldest first (cached; read on every "!item?")."""
+
+        def load():
+            rows = self.fetch(
+                "infoitems_values",
+                "SELECT value FROM phreakbot_infoitems WHERE item = %s AND channel = %s ORDER BY insert_time",
+                (item, channel),
+            )
+            return [row[0] for row in rows]
+
+        return self.cached("infoitems", f"{channel} {item}", load)
+
+    def get(self, item_id):
+        with self.transaction() as cur:
+            cur.execute(
+                "SELECT id, item, value, channel, users_id FROM phreakbot_infoitems WHERE id = %s",
+                (item_id,),
+            )
+            row = cur.fetchone()
+        return InfoItem(*row) if row else None
+
+    def find(self, item, value, channel):
+        with self.transaction() as cur:
+            cur.execute(
+                "SELECT id, item, value, channel, users_id FROM phreakbot_infoitems "
+                "WHERE item = %s AND value = %s AND channel = %s",
+                (item, value, channel),
+            )
+            return [InfoItem(*row) for row in cur.fetchall()]
+
+    def items(self, channel):
+        """Names of the channel's items, sorted."""
+        with self.transaction() as cur:
+            cur.execute(
+                "SELECT DISTINCT item FROM phreakbot_infoitems WHERE channel = %s ORDER BY item", (channel,)
+            )
+            return [row[0] for row in cur.fetchall()]
+
+    def add(self, user_id, item, value, channel):
+        """Returns the new item's id."""
+        with self.transaction() as cur:
+            cur.execute(
+                "INSERT INTO phreakbot_infoitems (users_id, item, value, channel) VALUES (%s, %s, %s, %s) RETURNING id",
+                (user_id, item, value, channel),
+            )
+            item_id = cur.fetchone()[0]
+        self.bot._cache_invalidate("infoitems", f"{channel} {item}")
+        return item_id
+
+    def delete(self, infoitem):
+        with self.transaction() as cur:
+            cur.execute("DELETE FROM phreakbot_infoitems WHERE id = %s", (infoitem.id,))
+        self.bot._cache_invalidate("infoitems", f"{infoitem.channel} {infoitem.item}")
+
+
+class AutoOp(Repository):
+    """Users opped on join, per channel or everywhere ("" channel)."""
+
+    def has_auto_op(self, hostmask, channel):
+        """Whether a hostmask is auto-opped in a channel (cached; checked on every join)."""
+        hostmask, channel = hostmask.lower(), channel.lower()
+
+        def load():
+            row = self.fetch(
+                "autoop_check",
+                "SELECT 1 FROM phreakbot_autoop a "
+                "JOIN phreakbot_hostmasks h ON a.users_id = h.users_id "
+                "WHERE lower(h.hostmask) = %s AND (a.channel = %s OR a.channel = '')",
+                (hostmask, channel),
+                one=True,
+            )
+            return row is not None
+
+        return self.cached("autoop", f"{channel} {hostmask}", load)
+
+    def users(self, channel):
+        """Usernames auto-opped in a channel ("" for everywhere), sorted."""
+        with self.transaction() as cur:
+            cur.execute(
+                "SELECT u.username FROM phreakbot_users u "
+                "JOIN phreakbot_autoop a ON u.id = a.users_id "
+                "WHERE a.channel = %s ORDER BY u.username",
+                (channel.lower(),),
+            )
+            return [row[0] for row in cur.fetchall()]
+
+    def add(self, user_id, channel):
+        """Returns False if the user was auto-opped there already."""
+        with self.transaction() as cur:
+            cur.execute(
+                "INSERT INTO phreakbot_autoop (users_id, channel) VALUES (%s, %s) "
+                "ON CONFLICT DO NOTHING RETURNING id",
+                (user_id, channel.lower()),
+            )
+            added = cur.fetchone() is not None
+        self.bot._cache_invalidate("autoop")
+        return added
+
+    def remove(self, user_id, channel):
+        """Returns False if the user was not auto-opped there."""
+        with self.transaction() as cur:
+            cur.execute(
+                "DELETE FROM phreakbot_autoop WHERE users_id = %s AND channel = %s RETURNING id",
+                (user_id, channel.lower()),
+            )
+            removed = cur.fetchone() is not None
+        self.bot._cache_invalidate("autoop")
+        return removed
+
+
+class AutoVoice(Repository):
+    """Channels where registered users are voiced on join."""
+
+    def status(self, channel):
+        """True or False, or None if autovoice was never set for the channel."""
+        row = self.fetch(
+            "autovoice_status",
+            "SELECT enabled FROM phreakbot_autovoice WHERE channel = %s",
+            (channel.lower(),),
+            one=True,
+        )
+        return row[0] if row else None
+
+    def is_enabled(self, channel):
+        """Cached; checked on every join."""
+        return self.cached("autovoice", channel.lower(), lambda: bool(self.status(channel)))
+
+    def set_enabled(self, channel, enabled):
+        with self.transaction() as cur:
+            cur.execute(
+                "INSERT INTO phreakbot_autovoice (channel, enabled) VALUES (%s, %s) "
+                "ON CONFLICT (channel) DO UPDATE SET enabled = EXCLUDED.enabled",
+                (channel.lower(), enabled),
+            )
+        self.bot._cache_invalidate("autovoice", channel.lower())
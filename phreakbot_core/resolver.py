@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Caching DNS resolver for PhreakBot.
+
+Resolves hostnames to their A and AAAA addresses with dnspython and keeps
+the answers for as long as their DNS TTL allows (clamped between
+MIN_TTL and MAX_TTL). Failed lookups are cached for NEGATIVE_TTL seconds.
+The same cache backs the blocking resolve() used from module code and the
+resolve_async() coroutine used from the event loop, so the SSRF check and
+the HTTP fetch that follows it share a single lookup.
+
+Failures raise socket.gaierror, matching socket.getaddrinfo().
+"""
+
+import asyncio
+import ipaddress
+import socket
+import time
+from collections import OrderedDict
+
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+
+
+MIN_TTL = 30
+MAX_TTL = 3600
+NEGATIVE_TTL = 60
+MAX_ENTRIES = 4096
+LOOKUP_TIMEOUT = 3.0
+
+# Used when falling back to getaddrinfo(), which reports no TTL
+FALLBACK_TTL = 60
+
+RECORD_TYPES = ("A", "AAAA")
+
+
+def _not_found(hostname):
+    return socket.gaierror(socket.EAI_NONAME, f"Could not resolve hostname: {hostname}")
+
+
+def _literal_address(hostname):
+    """Return the hostname itself if it is an IP address literal."""
+    try:
+        return str(ipaddress.ip_address(hostname.strip("[]")))
+    except ValueError:
+        return None
+
+
+class CachingResolver:
+    """TTL-respecting A/AAAA resolver with a shared answer cache."""
+
+    def __init__(
+        self,
+        min_ttl=MIN_TTL,
+        max_ttl=MAX_TTL,
+        negative_ttl=NEGATIVE_TTL,
+        max_entries=MAX_ENTRIES,
+        timeout=LOOKUP_TIMEOUT,
+    ):
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._cache = OrderedDict()
+        self._resolver = None
+        self._async_resolver = None
+
+    def __len__(self):
+        return len(self._cache)
+
+    def clear(self):
+        """Drop all cached answers."""
+        self._cache.clear()
+
+    def _get_resolver(self):
+        if self._resolver is None:
+            self._resolver = dns.resolver.Resolver()
+            self._resolver.lifetime = self.timeout
+        return self._resolver
+
+    def _get_async_resolver(self):
+        if self._async_resolver is None:
+            self._async_resolver = dns.asyncresolver.Resolver()
+            self._async_resolver.lifetime = self.timeout
+        return self._async_resolver
+
+    def _cache_lookup(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if time.time() >= entry[0]:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return entry
+
+    def _cache_store(self, key, addresses, ttl):
+        ttl = max(self.min_ttl, min(ttl, self.max_ttl)) if addresses else self.negative_ttl
+        entry = (time.time() + ttl, addresses)
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return entry
+
+    @staticmethod
+    def _collect(answers):
+        """Merge A/AAAA answers into (addresses, ttl); None answers are skipped."""
+        addresses = []
+        ttls = []
+        for answer in answers:
+            if answer is None or answer.rrset is None:
+                continue
+            ttls.append(answer.rrset.ttl)
+            for rdata in answer:
+                if rdata.address not in addresses:
+                    addresses.append(rdata.address)
+        return addresses, min(ttls) if ttls else 0
+
+    def _getaddrinfo(self, hostname):
+        """Blocking fallback for single-label names (e.g. from /etc/hosts)
+        and hosts without a usable resolv.conf."""
+        try:
+            infos = socket.getaddrinfo(hostname, None)
+        except socket.gaierror:
+            return []
+        addresses = []
+        for info in infos:
+            address = info[4][0]
+            if address not in addresses:
+                addresses.append(address)
+        return addresses
+
+    def _query(self, key):
+        """Look up A and AAAA records, returning (addresses, ttl)."""
+        try:
+            resolver = self._get_resolver()
+        except dns.resolver.NoResolverConfiguration:
+            return self._getaddrinfo(key), FALLBACK_TTL
+
+        answers = []
+        for rdtype in RECORD_TYPES:
+            try:
+                answers.append(resolver.resolve(key, rdtype, search=True))
+            except dns.exception.DNSException:
+                answers.append(None)
+        addresses, ttl = self._collect(answers)
+        if not addresses and "." not in key:
+            return self._getaddrinfo(key), FALLBACK_TTL
+        return addresses, ttl
+
+    async def _query_async(self, key):
+        """Look up A and AAAA records concurrently, returning (addresses, ttl)."""
+        loop = asyncio.get_running_loop()
+        try:
+            resolver = self._get_async_resolver()
+        except dns.resolver.NoResolverConfiguration:
+            return await loop.run_in_executor(None, self._getaddrinfo, key), FALLBACK_TTL
+
+        results = await asyncio.gather(
+            *(resolver.resolve(key, rdtype, search=True) for rdtype in RECORD_TYPES),
+            return_exceptions=True,
+        )
+        answers = [None if isinstance(r, Exception) else r for r in results]
+        addresses, ttl = self._collect(answers)
+        if not addresses and "." not in key:
+            return await loop.run_in_executor(None, self._getaddrinfo, key), FALLBACK_TTL
+        return addresses, ttl
+
+    def resolve(self, hostname):
+        """Resolve a hostname to a list of IP address strings (blocking).
+
+        Raises socket.gaierror if the name does not resolve.
+        """
+        literal = _literal_address(hostname)
+        if literal:
+            return [literal]
+
+        key = hostname.lower().rstrip(".")
+        cached = self._cache_lookup(key)
+        if cached is None:
+            addresses, ttl = self._query(key)
+            cached = self._cache_store(key, addresses, ttl)
+
+        if not cached[1]:
+            raise _not_found(hostname)
+        return list(cached[1])
+
+    async def resolve_async(self, hostname):
+        """Resolve a hostname without blocking the event loop.
+
+        Raises socket.gaierror if the name does not resolve.
+        """
+        literal = _literal_address(hostname)
+        if literal:
+            return [literal]
+
+        key = hostname.lower().rstrip(".")
+        cached = self._cache_lookup(key)
+        if cached is None:
+            addresses, ttl = await self._query_async(key)
+            cached = self._cache_store(key, addresses, ttl)
+
+        if not cached[1]:
+            raise _not_found(hostname)
+        return list(cached[1])
+
+
+# Resolver shared by the core and all modules
+resolver = CachingResolver()
+
+
+def resolve(hostname):
+    """Resolve a hostname through the shared caching resolver (blocking)."""
+    return resolver.resolve(hostname)
+
+
+async def resolve_async(hostname):
+    """Resolve a hostname through the shared caching resolver."""
+    return await resolver.resolve_async(hostname)
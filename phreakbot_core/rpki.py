@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline RPKI route origin validation for PhreakBot.
+
+Loads the validated ROA payloads (VRPs) exported by a relying party such
+as routinator, rpki-client or OctoRPKI, in their JSON or CSV formats,
+and validates (prefix, origin AS) pairs locally as described in RFC 6811.
+
+VRPs are stored like the SSRF policy tables: one dict per prefix length,
+mapping the network bits to the (maxLength, ASN) pairs published for
+that prefix. Finding every VRP that covers a route therefore costs one
+dict probe per prefix length in use that is not longer than the route.
+"""
+
+import csv
+import json
+import socket
+from collections import namedtuple
+
+from .asn import parse_asn
+
+
+DEFAULT_PATH = "data/vrps.json"
+
+VALID = "valid"
+INVALID_LENGTH = "invalid-length"
+INVALID_ASN = "invalid-asn"
+NOT_FOUND = "not-found"
+
+Vrp = namedtuple("Vrp", ["prefix", "max_length", "asn"])
+Validation = namedtuple("Validation", ["state", "matched", "covering"])
+Validation.__doc__ = """Result of validating one route.
+
+matched holds the VRPs that make the route valid, covering all VRPs
+whose prefix covers the route.
+"""
+
+def parse_vrp_json(data):
+    """Yield (prefix, max_length, asn) from routinator/rpki-client/OctoRPKI JSON."""
+    roas = data.get("roas", []) if isinstance(data, dict) else data
+    for roa in roas:
+        try:
+            prefix = roa["prefix"]
+            max_length = roa.get("maxLength", roa.get("max_length"))
+            yield prefix, None if max_length is None else int(max_length), parse_asn(roa["asn"])
+        except (KeyError, TypeError, ValueError):
+            continue
+
+
+def parse_vrp_csv(lines):
+    """Yield (prefix, max_length, asn) from ``ASN,IP Prefix,Max Length,...`` CSV."""
+    for row in csv.reader(lines):
+        if len(row) < 3:
+            continue
+        try:
+            yield row[1].strip(), int(row[2]), parse_asn(row[0])
+        except ValueError:
+            # Header row or malformed line
+            continue
+
+
+def _parse_route(prefix):
+    """Parse "network/length" into (version, bits, value, length) quickly.
+
+    Host bits are cleared; a bare address is treated as a host route.
+    Raises ValueError for invalid prefixes.
+    """
+    address, _, length = prefix.partition("/")
+    try:
+        if ":" in address:
+            version, bits = 6, 128
+            value = int.from_bytes(socket.inet_pton(socket.AF_INET6, address), "big")
+        else:
+            version, bits = 4, 32
+            value = int.from_bytes(socket.inet_pton(socket.AF_INET, address), "big")
+        length = int(length) if length else bits
+    except (OSError, ValueError):
+        raise ValueError(f"invalid prefix: {prefix!r}")
+    if not 0 <= length <= bits:
+        raise ValueError(f"invalid prefix length: {prefix!r}")
+    return version, bits, value >> (bits - length) << (bits - length), length
+
+
+class VrpTable:
+    """VRPs indexed for RFC 6811 route origin validation."""
+
+    def __init__(self, vrps=()):
+        self._tables = {4: {}, 6: {}}
+        self._lengths = {4: (), 6: ()}
+        self._count = 0
+        for prefix, max_length, asn in vrps:
+            try:
+                self.add(prefix, max_length, asn)
+            except ValueError:
+                continue
+
+    def __len__(self):
+        return self._count
+
+    def add(self, prefix, max_length, asn):
+        version, bits, value, length = _parse_route(prefix)
+        if max_length is None:
+            max_length = length
+        if not length <= max_length <= bits:
+            raise ValueError(f"invalid maxLength {max_length} for {prefix}")
+        tables = self._tables[version]
+        if length not in tables:
+            tables[length] = {}
+            self._lengths[version] = tuple(sorted(tables))
+        entries = tables[length].setdefault(value >> (bits - length), [])
+        if (max_length, asn) not in entries:
+            entries.append((max_length, asn))
+            self._count += 1
+
+    def _covering(self, version, bits, value, route_length):
+        tables = self._tables[version]
+        found = []
+        for length in self._lengths[version]:
+            if length > route_length:
+                break
+            entries = tables[length].get(value >> (bits - length))
+            if entries:
+                network = (value >> (bits - length) << (bits - length)).to_bytes(bits // 8, "big")
+                family = socket.AF_INET if version == 4 else socket.AF_INET6
+                vrp_prefix = f"{socket.inet_ntop(family, network)}/{length}"
+                found.extend(Vrp(vrp_prefix, m, a) for m, a in entries)
+        return found
+
+    def covering(self, prefix):
+        """Return all VRPs whose prefix covers the given prefix, least specific first."""
+        return self._covering(*_parse_route(prefix))
+
+    def validate(self, prefix, origin_asn):
+        """Validate a route per RFC 6811.
+
+        Returns:
+            Validation: state is one of "valid", "invalid-length",
+            "invalid-asn" or "not-found"
+        """
+        version, bits, value, route_length = _parse_route(prefix)
+        origin_asn = parse_asn(origin_asn)
+        covering = self._covering(version, bits, value, route_length)
+        if not covering:
+            return Validation(NOT_FOUND, [], covering)
+
+        # AS0 VRPs (RFC 6483) never match a route
+        matched = [
+            vrp for vrp in covering
+            if vrp.asn == origin_asn and origin_asn != 0 and route_length <= vrp.max_length
+        ]
+        if matched:
+            return Validation(VALID, matched, covering)
+        if any(vrp.asn == origin_asn and origin_asn != 0 for vrp in covering):
+            return Validation(INVALID_LENGTH, [], covering)
+        return Validation(INVALID_ASN, [], covering)
+
+
+def load_vrps(path):
+    """Build a VrpTable from a VRP JSON or CSV export."""
+    with open(path, encoding="utf-8") as f:
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        f.seek(0)
+        if head in ("{", "["):
+            return VrpTable(parse_vrp_json(json.load(f)))
+        return VrpTable(parse_vrp_csv(f))
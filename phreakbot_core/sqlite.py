@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Embedded SQLite storage backend for PhreakBot.
+
+Selected with ``"db_backend": "sqlite"``; the database is the file named
+by ``sqlite_path`` (default ``phreakbot.db``), opened in WAL mode so
+readers never wait for the writer. It suits small single-network bots
+and gives the tests a real database without a server.
+
+``SQLitePool`` stands in for psycopg2's ThreadedConnectionPool, and its
+connections and cursors behave like psycopg2's, so modules keep their
+SQL. Statements are translated on the fly (and cached):
+
+- ``%s`` placeholders become ``?``; ``= ANY(%s)`` with a list becomes
+  ``IN (?, ?, ...)``
+- ``::type`` casts are dropped, ``ILIKE`` becomes ``LIKE`` (which is
+  case-insensitive in SQLite), ``EXTRACT(MONTH FROM x)`` becomes strftime
+- ``FOR UPDATE`` is dropped, but opens the transaction with
+  ``BEGIN IMMEDIATE`` so the row read is not changed before the commit
+
+A transaction is opened by the first statement and ends with commit() or
+rollback(), as with psycopg2. Columns declared BOOLEAN, DATE, TIMESTAMP,
+TIMESTAMPTZ or JSONB come back as bool, date, datetime and dict values,
+and constraint errors are raised as the matching ``psycopg2.errors``
+class (UniqueViolation and so on), so modules catch the same exceptions.
+Any ``cursor_factory`` gives rows addressable by column name, like
+DictCursor.
+
+COPY, DISTINCT ON and array aggregates have no translation; the bulk
+import/export script and the migrations in ``migrations/`` are
+PostgreSQL only. The SQLite schema is applied from ``migrations/sqlite/``.
+"""
+
+import functools
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, timezone
+
+import psycopg2
+import psycopg2.errors
+import psycopg2.pool
+
+from . import migrations
+
+
+DEFAULT_PATH = "phreakbot.db"
+DEFAULT_DIRECTORY = os.path.join(migrations.DEFAULT_DIRECTORY, "sqlite")
+BUSY_TIMEOUT = 5.0
+
+_TOKEN_RE = re.compile(r"'(?:[^']|'')*'|\"[^\"]*\"|--[^\n]*|[^'\"-]+|-")
+_PLACEHOLDER_RE = re.compile(r"=\s*ANY\s*\(\s*%s\s*\)|%s|%%", re.IGNORECASE)
+_CAST_RE = re.compile(r"::\w+(?:\[\])?")
+_ILIKE_RE = re.compile(r"\bILIKE\b", re.IGNORECASE)
+_FOR_UPDATE_RE = re.compile(r"\s*\bFOR\s+UPDATE\b", re.IGNORECASE)
+_EXTRACT_RE = re.compile(r"\bEXTRACT\s*\(\s*(YEAR|MONTH|DAY|HOUR|MINUTE)\s+FROM\s+([\w.]+)\s*\)", re.IGNORECASE)
+_STRFTIME = {"YEAR": "%Y", "MONTH": "%m", "DAY": "%d", "HOUR": "%H", "MINUTE": "%M"}
+_ANY = "\x00"
+
+_INTEGRITY_ERRORS = (
+    ("UNIQUE constraint", psycopg2.errors.UniqueViolation),
+    ("FOREIGN KEY constraint", psycopg2.errors.ForeignKeyViolation),
+    ("NOT NULL constraint", psycopg2.errors.NotNullViolation),
+    ("CHECK constraint", psycopg2.errors.CheckViolation),
+)
+
+
+def _parse_timestamp(value):
+    return datetime.fromisoformat(value.decode())
+
+
+def _parse_timestamptz(value):
+    parsed = datetime.fromisoformat(value.decode())
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+sqlite3.register_converter("BOOLEAN", lambda value: value not in (b"0", b"false", b"FALSE"))
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter("TIMESTAMP", _parse_timestamp)
+sqlite3.register_converter("TIMESTAMPTZ", _parse_timestamptz)
+sqlite3.register_converter("JSONB", json.loads)
+
+
+def _adapt(value):
+    """Convert a parameter to a value SQLite stores as the schema expects."""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.isoformat(" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _literal(value):
+    """Quote a parameter as an SQL literal (for mogrify)."""
+    value = _adapt(value)
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, bytes):
+        return f"X'{value.hex()}'"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _rewrite(code, placeholders, anys):
+    """Translate one stretch of SQL outside quotes and comments."""
+    if placeholders is not None:
+
+        def placeholder(match):
+            token = match.group(0)
+            if token == "%%":
+                return "%"
+            placeholders[0] += 1
+            if token == "%s":
+                return "?"
+            anys.append(placeholders[0] - 1)
+            return _ANY
+
+        code = _PLACEHOLDER_RE.sub(placeholder, code)
+    code = _CAST_RE.sub("", code)
+    code = _ILIKE_RE.sub("LIKE", code)
+    code = _FOR_UPDATE_RE.sub("", code)
+    return _EXTRACT_RE.sub(
+        lambda m: f"CAST(strftime('{_STRFTIME[m.group(1).upper()]}', {m.group(2)}) AS INTEGER)", code
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile(sql, with_params):
+    """Translate a statement once.
+
+    Returns:
+        tuple: (pieces of the translated SQL split at each ``= ANY``
+        placeholder, parameter indexes of those placeholders, whether the
+        statement locked rows with FOR UPDATE)
+    """
+    placeholders = [0] if with_params else None
+    anys = []
+    out = []
+    for token in _TOKEN_RE.findall(sql):
+        if token.startswith("--"):
+            out.append(token)
+        elif token[0] in "'\"":
+            # psycopg2 formats the whole statement, string literals included
+            out.append(token.replace("%%", "%") if with_params else token)
+        else:
+            out.append(_rewrite(token, placeholders, anys))
+    for_update = bool(_FOR_UPDATE_RE.search(sql))
+    return tuple("".join(out).split(_ANY)), tuple(anys), for_update
+
+
+def translate(sql, params=None):
+    """Translate a psycopg2 statement and its parameters for SQLite.
+
+    Returns:
+        tuple: (sql, parameters, whether the statement needs a write lock)
+    """
+    if isinstance(sql, bytes):
+        sql = sql.decode("utf-8")
+    pieces, anys, for_update = _compile(sql, params is not None)
+    if params is None:
+        return pieces[0], (), for_update
+    params = [_adapt(value) for value in params] if not anys else list(params)
+    if not anys:
+        return pieces[0], params, for_update
+
+    out = [pieces[0]]
+    values = []
+    for index, value in enumerate(params):
+        if index in anys:
+            value = list(value)
+            values.extend(_adapt(v) for v in value)
+            out.append("IN (" + ", ".join("?" * len(value)) + ")")
+            out.append(pieces[anys.index(index) + 1])
+        else:
+            values.append(_adapt(value))
+    return "".join(out), values, for_update
+
+
+def _translate_error(error):
+    """The psycopg2 exception matching an sqlite3 exception."""
+    if isinstance(error, sqlite3.IntegrityError):
+        message = str(error)
+        for prefix, cls in _INTEGRITY_ERRORS:
+            if message.startswith(prefix):
+                return cls(message)
+        return psycopg2.IntegrityError(message)
+    if isinstance(error, sqlite3.OperationalError):
+        return psycopg2.OperationalError(str(error))
+    if isinstance(error, sqlite3.ProgrammingError):
+        return psycopg2.ProgrammingError(str(error))
+    return psycopg2.DatabaseError(str(error))
+
+
+class SQLiteCursor:
+    """psycopg2-style cursor over an sqlite3 cursor."""
+
+    def __init__(self, connection, dict_rows=False):
+        self.connection = connection
+        self._cursor = connection.raw.cursor()
+        if dict_rows:
+            self._cursor.row_factory = sqlite3.Row
+        self.closed = False
+
+    def _begin(self, for_update):
+        conn = self.connection
+        if not conn.autocommit and not conn.raw.in_transaction:
+            self._cursor.execute("BEGIN IMMEDIATE" if for_update else "BEGIN")
+
+    def execute(self, sql, params=None):
+        sql, params, for_update = translate(sql, params)
+        try:
+            self._begin(for_update)
+            self._cursor.execute(sql, params)
+        except sqlite3.Error as e:
+            raise _translate_error(e) from e
+
+    def executemany(self, sql, params_list):
+        statements = [translate(sql, params) for params in params_list]
+        if not statements:
+            return
+        try:
+            self._begin(False)
+            self._cursor.executemany(statements[0][0], [params for _, params, _ in statements])
+        except sqlite3.Error as e:
+            raise _translate_error(e) from e
+
+    def mogrify(self, sql, params=None):
+        """The statement with its parameters inlined, as bytes (used by execute_values)."""
+        if isinstance(sql, bytes):
+            sql = sql.decode("utf-8")
+        if params is None:
+            return sql.encode("utf-8")
+        values = iter(params)
+        return re.sub(r"%s|%%", lambda m: "%" if m.group(0) == "%%" else _literal(next(values)), sql).encode(
+            "utf-8"
+        )
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size or self._cursor.arraysize)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        if not self.closed:
+            self._cursor.close()
+            self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SQLiteConnection:
+    """psycopg2-style connection: transactions begin implicitly, end with commit()/rollback()."""
+
+    encoding = "UTF8"
+
+    def __init__(self, path):
+        self.raw = sqlite3.connect(
+            path,
+            timeout=BUSY_TIMEOUT,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self.raw.execute("PRAGMA foreign_keys = ON")
+        self.raw.execute("PRAGMA synchronous = NORMAL")
+        self.autocommit = False
+        self.closed = False
+
+    def cursor(self, cursor_factory=None):
+        return SQLiteCursor(self, dict_rows=cursor_factory is not None)
+
+    def commit(self):
+        if self.raw.in_transaction:
+            self.raw.execute("COMMIT")
+
+    def rollback(self):
+        if self.raw.in_transaction:
+            self.raw.execute("ROLLBACK")
+
+    def close(self):
+        if not self.closed:
+            self.raw.close()
+            self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+
+class SQLitePool:
+    """Connection pool with the interface of psycopg2's ThreadedConnectionPool."""
+
+    def __init__(self, minconn, maxconn, path=DEFAULT_PATH):
+        if path == ":memory:":
+            raise ValueError("the SQLite backend needs a database file, not :memory:")
+        self.path = path
+        self.maxconn = maxconn
+        self._idle = []
+        self._used = set()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = SQLiteConnection(path)
+        conn.raw.execute("PRAGMA journal_mode = WAL")
+        self._idle.append(conn)
+        for _ in range(1, minconn):
+            self._idle.append(SQLiteConnection(path))
+
+    def getconn(self):
+        with self._lock:
+            if self._idle:
+                conn = self._idle.pop()
+            elif len(self._used) < self.maxconn:
+                conn = SQLiteConnection(self.path)
+            else:
+                raise psycopg2.pool.PoolError("connection pool exhausted")
+            self._used.add(conn)
+            return conn
+
+    def putconn(self, conn, close=False):
+        with self._lock:
+            self._used.discard(conn)
+            if close or conn.closed:
+                conn.close()
+                return
+            try:
+                conn.rollback()
+                conn.autocommit = False
+            except sqlite3.Error:
+                conn.close()
+                return
+            self._idle.append(conn)
+
+    def closeall(self):
+        with self._lock:
+            for conn in self._idle + list(self._used):
+                conn.close()
+            self._idle = []
+            self._used = set()
+
+
+def migrate(conn, directory=DEFAULT_DIRECTORY, logger=None):
+    """Apply the pending SQLite migrations, each in one transaction.
+
+    Uses the same ``schema_version`` table as the PostgreSQL runner;
+    BEGIN IMMEDIATE keeps two bots from migrating the file at once.
+
+    Returns:
+        list: The migrations applied
+    """
+    applied_now = []
+    cur = conn.raw.cursor()
+    conn.rollback()
+    for migration in migrations.list_migrations(directory):
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            cur.execute(
+                "CREATE TABLE IF NOT EXISTS schema_version ("
+                "version INT PRIMARY KEY, "
+                "name VARCHAR(255) NOT NULL, "
+                "applied_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+            )
+            cur.execute("SELECT 1 FROM schema_version WHERE version = ?", (migration.version,))
+            if cur.fetchone():
+                cur.execute("COMMIT")
+                continue
+            if logger:
+                logger.info(f"Applying migration {migration.version:04d}_{migration.name}")
+            with open(migration.path, encoding="utf-8") as f:
+                for statement in migrations.split_statements(f.read()):
+                    cur.execute(statement)
+            cur.execute(
+                "INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                (migration.version, migration.name),
+            )
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+        applied_now.append(migration)
+    cur.close()
+    if logger and applied_now:
+        logger.info(f"Database schema is at version {applied_now[-1].version}")
+    return applied_now
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persistent timers for delayed actions (tempban expiry and the like).
+
+Modules register a named action once, from their config():
+
+    bot.add_timer_action("kickban.unban", unban)
+
+and schedule it with ``bot.schedule(when, "kickban.unban", payload)``.
+Due actions are rows in ``phreakbot_timers``, so they survive restarts
+and module reloads. In memory, one task keeps the pending timers in a
+min-heap ordered by due time and sleeps until the earliest one (or until
+an earlier timer is scheduled), instead of one sleeping task per timer.
+Timers that fell due while the bot was down run as soon as it connects.
+A timer whose action has no handler when it falls due (its module is
+unloaded) is held back and runs as soon as the action is registered again.
+
+Without a database, timers are kept in memory only.
+"""
+
+import asyncio
+import heapq
+import inspect
+import json
+import time
+from datetime import datetime, timezone
+
+
+class TimersMixin:
+    """Mixin scheduling persistent delayed actions."""
+
+    def add_timer_action(self, name, handler):
+        """Register the handler run for timers of an action.
+
+        Args:
+            name: Action name, stored with each timer; prefix it with the module name
+            handler: Function or coroutine function (bot, payload)
+        """
+        self.timer_actions[name] = handler
+        for entry in self._orphan_timers.pop(name, ()):
+            self._push_timer(*entry)
+
+    def schedule(self, when, action, payload=None, key=None, replace=True):
+        """Run an action at a later time, across restarts.
+
+        Args:
+            when: datetime, or seconds from now
+            action: Name registered with add_timer_action()
+            payload: JSON-serializable data passed to the handler
+            key: Optional name for the timer; scheduling the same action
+                and key again replaces the pending timer
+            replace: If False, a pending timer with the same action and key
+                is kept instead (for recurring jobs set up at every start)
+
+        Returns:
+            int: The timer id
+        """
+        due = when.timestamp() if isinstance(when, datetime) else time.time() + when
+        payload = payload if payload is not None else {}
+        if key is not None and not replace:
+            for entry in self._timer_entries():
+                if entry[2] == action and entry[3] == key:
+                    return entry[1]
+        elif key is not None:
+            self.cancel_timer(action, key)
+
+        timer_id = None
+        conn = self.db_get()
+        if conn:
+            try:
+                cur = conn.cursor()
+                if key is not None and not replace:
+                    cur.execute(
+                        "SELECT id FROM phreakbot_timers WHERE action = %s AND timer_key = %s",
+                        (action, key),
+                    )
+                    row = cur.fetchone()
+                    if row:
+                        cur.close()
+                        return row[0]
+                cur.execute(
+                    "INSERT INTO phreakbot_timers (due_at, action, timer_key, payload) "
+                    "VALUES (%s, %s, %s, %s::jsonb) RETURNING id",
+                    (datetime.fromtimestamp(due, timezone.utc), action, key, json.dumps(payload)),
+                )
+                timer_id = cur.fetchone()[0]
+                conn.commit()
+                cur.close()
+            except Exception as e:
+                conn.rollback()
+                self.logger.error(f"Could not store timer {action}, keeping it in memory only: {e}")
+            finally:
+                self.db_return(conn)
+        if timer_id is None:
+            timer_id = next(self._memory_timer_ids)
+
+        self._push_timer(due, timer_id, action, key, payload)
+        self.logger.info(f"Scheduled timer {timer_id} ({action}) in {max(due - time.time(), 0):.0f}s")
+        return timer_id
+
+    def cancel_timer(self, action, key):
+        """Cancel the pending timer of an action with the given key.
+
+        Returns:
+            bool: True if a timer was pending
+        """
+        cancelled = False
+        for entry in self._timers:
+            if entry[2] == action and entry[3] == key:
+                entry[2] = None
+                cancelled = True
+        orphans = self._orphan_timers.get(action, [])
+        kept = [entry for entry in orphans if entry[3] != key]
+        if len(kept) < len(orphans):
+            self._orphan_timers[action] = kept
+            cancelled = True
+
+        conn = self.db_get()
+        if conn:
+            try:
+                cur = conn.cursor()
+                cur.execute(
+                    "DELETE FROM phreakbot_timers WHERE action = %s AND timer_key = %s",
+                    (action, key),
+                )
+                cancelled = cancelled or cur.rowcount > 0
+                conn.commit()
+                cur.close()
+            except Exception as e:
+                conn.rollback()
+                self.logger.error(f"Could not cancel timer {action} {key}: {e}")
+            finally:
+                self.db_return(conn)
+        return cancelled
+
+    def pending_timers(self, action=None):
+        """Pending timers as (due timestamp, id, action, key, payload), soonest first."""
+        return sorted(
+            tuple(entry) for entry in self._timer_entries()
+            if entry[2] is not None and (action is None or entry[2] == action)
+        )
+
+    def _timer_entries(self):
+        """Timers in the heap, then those waiting for their action's handler."""
+        yield from self._timers
+        for entries in self._orphan_timers.values():
+            yield from entries
+
+    def _push_timer(self, due, timer_id, action, key, payload):
+        if any(entry[1] == timer_id for entry in self._timers):
+            return
+        earliest = self._timers[0][0] if self._timers else None
+        heapq.heappush(self._timers, [due, timer_id, action, key, payload])
+        if self._timer_wakeup is not None and (earliest is None or due < earliest):
+            self._timer_wakeup.set()
+
+    def _load_timers(self):
+        """Read every stored timer, overdue ones included. Blocking."""
+        conn = self.db_get()
+        if not conn:
+            return []
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT due_at, id, action, timer_key, payload FROM phreakbot_timers ORDER BY due_at"
+            )
+            rows = cur.fetchall()
+            cur.close()
+            return rows
+        finally:
+            self.db_return(conn)
+
+    def _delete_timer(self, timer_id):
+        """Remove a timer that has run. Blocking."""
+        if timer_id < 0:
+            return
+        conn = self.db_get()
+        if not conn:
+            return
+        try:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM phreakbot_timers WHERE id = %s", (timer_id,))
+            conn.commit()
+            cur.close()
+        except Exception as e:
+            conn.rollback()
+            self.logger.error(f"Could not delete timer {timer_id}: {e}")
+        finally:
+            self.db_return(conn)
+
+    async def _run_timer(self, entry):
+        _, timer_id, action, _, payload = entry
+        handler = self.timer_actions.get(action)
+        if handler is None:
+            # Kept, with its row, until add_timer_action() registers the action
+            self._orphan_timers.setdefault(action, []).append(entry)
+            self.logger.warning(f"Timer {timer_id}: no handler for action {action}, waiting for it")
+            return
+        try:
+            result = handler(self, payload)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            self.logger.error(f"Timer {timer_id} ({action}) failed: {e}")
+        await asyncio.get_running_loop().run_in_executor(None, self._delete_timer, timer_id)
+
+    async def _run_timers(self):
+        """Load stored timers, then run each when it falls due."""
+        loop = asyncio.get_running_loop()
+        try:
+            rows = await loop.run_in_executor(None, self._load_timers)
+        except Exception as e:
+            self.logger.error(f"Could not load stored timers: {e}")
+            rows = []
+        overdue = 0
+        for due_at, timer_id, action, key, payload in rows:
+            due = due_at.timestamp()
+            overdue += due <= time.time()
+            self._push_timer(due, timer_id, action, key, payload or {})
+        if rows:
+            self.logger.info(f"Loaded {len(rows)} stored timers, {overdue} overdue")
+
+        while True:
+            self._timer_wakeup.clear()
+            if not self._timers:
+                await self._timer_wakeup.wait()
+                continue
+            due, _, action, _, _ = self._timers[0]
+            delay = due - time.time()
+            if action is not None and delay > 0:
+                try:
+                    await asyncio.wait_for(self._timer_wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue  # an earlier timer may have been scheduled
+            entry = heapq.heappop(self._timers)
+            if action is not None:
+                await self._run_timer(entry)
+
+    def start_timers(self):
+        """Start the timer task (idempotent); needs a running event loop."""
+        if self._timer_task is None or self._timer_task.done():
+            self._timer_wakeup = asyncio.Event()
+            self._timer_task = asyncio.get_running_loop().create_task(self._run_timers())
+
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming page metadata extraction for PhreakBot.
+
+Fetches only as much of a page as is needed to find the <title> and the
+<meta> description tags. Non-HTML responses are rejected from the
+Content-Type header before any body is read, and reading stops at
+</head> (or the first <body> tag) or after a byte cap, whichever comes
+first. The body is fed chunk by chunk into an incremental tag scanner, so
+no DOM tree is ever built.
+
+Results are kept in a UrlMetaCache shared by the urls and snarf modules,
+keyed by a normalized form of the URL.
+"""
+
+import codecs
+import re
+import time
+from collections import OrderedDict
+from html.parser import HTMLParser
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .url_safety import safe_get
+
+
+# Stop reading the response after this many bytes
+DEFAULT_MAX_BYTES = 256 * 1024
+
+# Size of each chunk read from the socket
+CHUNK_SIZE = 8192
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+# Meta tags that carry a page description, in order of preference
+DESCRIPTION_KEYS = ("og:description", "twitter:description", "description")
+
+_CHARSET_RE = re.compile(r"charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+
+
+class HeadMetaParser(HTMLParser):
+    """Incremental scanner collecting <title> and <meta> tags from <head>.
+
+    Sets ``done`` once </head> or <body> has been seen; callers should stop
+    feeding data at that point.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = None
+        self.meta = {}
+        self.done = False
+        self._in_title = False
+        self._title_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag == "title" and self.title is None:
+            self._in_title = True
+            self._title_parts = []
+        elif tag == "meta":
+            attrs = dict(attrs)
+            key = attrs.get("property") or attrs.get("name")
+            content = attrs.get("content")
+            if key and content is not None:
+                self.meta.setdefault(key.lower(), content)
+        elif tag == "body":
+            self._finish_title()
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._finish_title()
+        elif tag == "head":
+            self._finish_title()
+            self.done = True
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+
+    def _finish_title(self):
+        if self._in_title:
+            self._in_title = False
+            self.title = " ".join("".join(self._title_parts).split())
+
+    def description(self):
+        """Return the preferred description from the collected meta tags."""
+        for key in DESCRIPTION_KEYS:
+            value = self.meta.get(key, "").strip()
+            if value:
+                return " ".join(value.split())
+        return None
+
+
+def is_html_response(response):
+    """Check the Content-Type header of a response for an HTML type."""
+    content_type = response.headers.get("Content-Type", "")
+    return content_type.split(";")[0].strip().lower() in HTML_CONTENT_TYPES
+
+
+def response_charset(response, default="utf-8"):
+    """Return the charset declared in the Content-Type header, if valid."""
+    match = _CHARSET_RE.search(response.headers.get("Content-Type", ""))
+    if match:
+        try:
+            return codecs.lookup(match.group(1)).name
+        except LookupError:
+            pass
+    return default
+
+
+def parse_head(response, max_bytes=DEFAULT_MAX_BYTES):
+    """Feed a streamed response into a HeadMetaParser.
+
+    Reads at most ``max_bytes`` bytes and stops early once the parser has
+    seen the end of the document head.
+
+    Returns:
+        HeadMetaParser: the parser holding the extracted title and meta tags
+    """
+    parser = HeadMetaParser()
+    decoder = codecs.getincrementaldecoder(response_charset(response))(errors="replace")
+    received = 0
+
+    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+        if not chunk:
+            continue
+        chunk = chunk[: max_bytes - received]
+        received += len(chunk)
+        parser.feed(decoder.decode(chunk))
+        if parser.done or received >= max_bytes:
+            break
+
+    if not parser.done:
+        parser.feed(decoder.decode(b"", final=True))
+        parser._finish_title()
+    return parser
+
+
+def fetch_page_meta(url, headers=None, timeout=10, max_bytes=DEFAULT_MAX_BYTES):
+    """Fetch the title and description of an HTML page.
+
+    Raises ValueError if a redirect is blocked by the SSRF checks.
+    Raises requests.RequestException on network and HTTP errors.
+
+    Returns:
+        tuple: (title, description), either of which may be None. Both are
+               None for non-HTML responses.
+    """
+    response = safe_get(url, headers=headers, timeout=timeout, stream=True)
+    try:
+        response.raise_for_status()
+        if not is_html_response(response):
+            return None, None
+        parser = parse_head(response, max_bytes=max_bytes)
+        return parser.title or None, parser.description()
+    finally:
+        response.close()
+
+
+# Query parameters that only identify where a link was shared from
+TRACKING_PARAMS = frozenset(
+    {
+        "fbclid",
+        "gclid",
+        "dclid",
+        "msclkid",
+        "yclid",
+        "igshid",
+        "mc_cid",
+        "mc_eid",
+        "ref_src",
+        "ref_url",
+        "_hsenc",
+        "_hsmi",
+        "si",
+    }
+)
+TRACKING_PREFIXES = ("utm_",)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url):
+    """Normalize a URL for use as a cache key.
+
+    Lowercases the scheme and host, drops default ports, the fragment and
+    tracking query parameters, and adds http:// to bare www. links. A URL
+    that cannot be parsed (e.g. "http://[foo/bar") is its own key.
+    """
+    try:
+        if urlsplit(url).scheme.lower() not in ("http", "https"):
+            url = "http://" + url
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port in (None, DEFAULT_PORTS.get(scheme)) else f"{host}:{port}"
+
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+        and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    return urlunsplit((scheme, netloc, parts.path or "/", urlencode(query), ""))
+
+
+class UrlMetaCache:
+    """LRU cache of (title, description) results keyed by normalized URL.
+
+    Entries expire after ``ttl`` seconds and the cache never holds more
+    than ``max_entries`` URLs. The cache also remembers which URLs were
+    announced in which channel, so a repost within ``repost_window``
+    seconds can be ignored without fetching anything.
+    """
+
+    def __init__(self, ttl=3600, max_entries=1024, repost_window=600):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.repost_window = repost_window
+        self._entries = OrderedDict()
+        self._announced = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, url):
+        """Return the cached (title, description) for a URL, or None."""
+        key = normalize_url(url)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, meta = entry
+        if time.time() - stored_at >= self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return meta
+
+    def set(self, url, title, description):
+        """Store the title and description of a URL."""
+        key = normalize_url(url)
+        self._entries[key] = (time.time(), (title, description))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, url=None):
+        """Forget one URL, or everything if url is None."""
+        if url is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(normalize_url(url), None)
+
+    def recently_announced(self, channel, url):
+        """Check if a URL was announced in a channel within the repost window."""
+        announced = self._announced.get(channel.lower())
+        if not announced:
+            return False
+        cutoff = time.time() - self.repost_window
+        while announced and next(iter(announced.values())) < cutoff:
+            announced.popitem(last=False)
+        return normalize_url(url) in announced
+
+    def mark_announced(self, channel, url):
+        """Record that a URL's title was just announced in a channel."""
+        announced = self._announced.setdefault(channel.lower(), OrderedDict())
+        key = normalize_url(url)
+        announced[key] = time.time()
+        announced.move_to_end(key)
+        while len(announced) > self.max_entries:
+            announced.popitem(last=False)
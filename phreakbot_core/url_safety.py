@@ -6,35 +6,86 @@ URL safety utilities for PhreakBot.
 Prevents SSRF (Server-Side Request Forgery) attacks by blocking requests
 to private IP addresses, loopback addresses, link-local addresses,
 and cloud metadata endpoints.
+
+Hostnames are resolved once through the shared caching resolver, every
+address is checked against the compiled IPPolicy (see ip_policy.py), and
+safe_get() connects to exactly the addresses that passed the checks.
 """
 
 import socket
+from urllib.parse import urljoin, urlsplit, urlunsplit
 
-import netaddr
 import requests
+from requests.adapters import HTTPAdapter
+
+from .ip_policy import IPPolicy
+from .resolver import resolve, resolve_async
+
+
+# Compiled allow/deny policy; replaced from the bot config at startup
+ip_policy = IPPolicy()
+
+
+def set_ip_policy(policy):
+    """Install the IPPolicy used by all SSRF checks."""
+    global ip_policy
+    ip_policy = policy
+
 
+def is_ip_blocked(address):
+    """Check a single IP address string against the SSRF policy."""
+    return ip_policy.is_blocked(address)
 
-# IP ranges that should never be accessed by the bot
-BLOCKED_NETWORKS = [
-    # IPv4 loopback
-    netaddr.IPNetwork("127.0.0.0/8"),
-    # RFC 1918 private addresses
-    netaddr.IPNetwork("10.0.0.0/8"),
-    netaddr.IPNetwork("172.16.0.0/12"),
-    netaddr.IPNetwork("192.168.0.0/16"),
-    # Link-local
-    netaddr.IPNetwork("169.254.0.0/16"),
-    # Cloud provider metadata endpoints
-    netaddr.IPNetwork("169.254.169.254/32"),
-    # Carrier-grade NAT
-    netaddr.IPNetwork("100.64.0.0/10"),
-    # IPv6 loopback
-    netaddr.IPNetwork("::1/128"),
-    # IPv6 link-local
-    netaddr.IPNetwork("fe80::/10"),
-    # IPv6 unique local addresses
-    netaddr.IPNetwork("fc00::/7"),
-]
+
+def check_addresses(hostname, addresses):
+    """Check resolved addresses against the SSRF policy.
+
+    Returns:
+        tuple: (is_safe: bool, reason: str)
+    """
+    for ip_str in addresses:
+        network = ip_policy.blocked_by(ip_str)
+        if network is not None:
+            return (
+                False,
+                f"Hostname {hostname} resolves to blocked IP {ip_str} "
+                f"(matches {network})",
+            )
+
+    return True, ""
+
+
+def vet_hostname(hostname):
+    """Resolve a hostname and check every address it resolves to.
+
+    Returns:
+        tuple: (is_safe: bool, reason: str, addresses: list) - addresses
+               holds the vetted IPs, IPv4 first, and is empty if the host
+               is blocked or does not resolve.
+    """
+    # Resolve hostname to IP addresses through the shared caching resolver
+    try:
+        addresses = resolve(hostname)
+    except socket.gaierror:
+        return False, f"Could not resolve hostname: {hostname}", []
+
+    is_safe, reason = check_addresses(hostname, addresses)
+    if not is_safe:
+        return False, reason, []
+    return True, "", sorted(addresses, key=lambda a: ":" in a)
+
+
+async def vet_hostname_async(hostname):
+    """Like vet_hostname(), without blocking the event loop on DNS."""
+    try:
+        addresses = await resolve_async(hostname)
+    except socket.gaierror:
+        return False, f"Could not resolve hostname: {hostname}", []
+
+    is_safe, reason = check_addresses(hostname, addresses)
+    if not is_safe:
+        return False, reason, []
+    return True, "", sorted(addresses, key=lambda a: ":" in a)
 
 
 def is_url_safe(url, hostname=None):
@@ -53,58 +104,137 @@ def is_url_safe(url, hostname=None):
                the URL was blocked.
     """
     if hostname is None:
-        try:
-            from urllib.parse import urlparse
+        hostname, reason = _url_hostname(url)
+        if not hostname:
+            return False, reason
+
+    is_safe, reason, _ = vet_hostname(hostname)
+    return is_safe, reason
+
+
+async def is_url_safe_async(url, hostname=None):
+    """Like is_url_safe(), without blocking the event loop on DNS.
+
+    The answer is cached by the shared resolver, so a safe_get() of the
+    URL from a worker thread right after does not wait for DNS again.
+    """
+    if hostname is None:
+        hostname, reason = _url_hostname(url)
+        if not hostname:
+            return False, reason
+
+    is_safe, reason, _ = await vet_hostname_async(hostname)
+    return is_safe, reason
 
-            parsed = urlparse(url)
-            hostname = parsed.hostname
-            if not hostname:
-                return False, "Could not extract hostname from URL"
-        except Exception as e:
-            return False, f"Invalid URL: {e}"
 
-    # Resolve hostname to IP addresses (handle DNS resolution)
+def _url_hostname(url):
+    """Return (hostname, "") for a URL, or (None, reason) if it has none."""
     try:
-        # getaddrinfo returns all A/AAAA records
-        addr_infos = socket.getaddrinfo(hostname, None)
-    except socket.gaierror:
-        return False, f"Could not resolve hostname: {hostname}"
+        hostname = urlsplit(url).hostname
+    except Exception as e:
+        return None, f"Invalid URL: {e}"
+    if not hostname:
+        return None, "Could not extract hostname from URL"
+    return hostname, ""
+
+
+class PinnedHostAdapter(HTTPAdapter):
+    """Transport adapter for requests sent to a pinned IP address.
 
-    for addr_info in addr_infos:
-        # addr_info[4] is (ip, port) for IPv4 or (ip, port, flow, scopeid) for IPv6
-        ip_str = addr_info[4][0]
+    The request URL carries the IP; TLS SNI and certificate hostname checks
+    still use the original hostname.
+    """
+
+    def __init__(self, hostname, **kwargs):
+        self.hostname = hostname
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["server_hostname"] = self.hostname
+        kwargs["assert_hostname"] = self.hostname
+        super().init_poolmanager(*args, **kwargs)
+
+
+def pinned_get(url, address, headers=None, timeout=10, stream=False):
+    """GET a URL over a connection to an already-vetted IP address.
+
+    The hostname in the URL is never resolved again, so the address that
+    passed the SSRF checks is exactly the one connected to. The original
+    hostname is still sent in the Host header and used for TLS.
+    """
+    parts = urlsplit(url)
+    hostname = parts.hostname
+    try:
+        hostname = hostname.encode("idna").decode("ascii")
+    except UnicodeError:
+        pass
+
+    ip_host = f"[{address}]" if ":" in address else address
+    if parts.port is not None:
+        ip_host = f"{ip_host}:{parts.port}"
+        host_header = f"{hostname}:{parts.port}"
+    else:
+        host_header = hostname
+    pinned_url = urlunsplit((parts.scheme, ip_host, parts.path or "/", parts.query, ""))
+
+    request_headers = dict(headers or {})
+    request_headers["Host"] = host_header
+
+    session = requests.Session()
+    # Proxies from the environment would resolve the hostname themselves
+    session.trust_env = False
+    session.mount("https://", PinnedHostAdapter(hostname))
+    try:
+        return session.get(
+            pinned_url,
+            headers=request_headers,
+            timeout=timeout,
+            allow_redirects=False,
+            stream=stream,
+        )
+    finally:
+        # Connections of a streamed response are released when it is closed
+        session.close()
+
+
+def _get_vetted(url, headers, timeout, stream):
+    """Vet the host of a URL and GET it from the first reachable vetted address."""
+    hostname = urlsplit(url).hostname
+    if not hostname:
+        raise ValueError("Could not extract hostname from URL")
+    is_safe, reason, addresses = vet_hostname(hostname)
+    if not is_safe:
+        raise ValueError(f"URL blocked: {reason}")
+
+    for address in addresses[:-1]:
         try:
-            ip = netaddr.IPAddress(ip_str)
-        except (netaddr.AddrFormatError, ValueError):
+            return pinned_get(url, address, headers=headers, timeout=timeout, stream=stream)
+        except requests.ConnectionError:
             continue
+    return pinned_get(url, addresses[-1], headers=headers, timeout=timeout, stream=stream)
 
-        for network in BLOCKED_NETWORKS:
-            if ip in network:
-                return (
-                    False,
-                    f"Hostname {hostname} resolves to blocked IP {ip_str} "
-                    f"(matches {network})",
-                )
 
-    return True, ""
+def safe_get(url, headers=None, timeout=10, stream=False):
+    """Fetch a URL, re-checking SSRF rules on every redirect hop.
 
+    Every hop connects to the address that was vetted for it, so the
+    hostname cannot be re-resolved to a blocked address in between
+    (DNS rebinding).
 
-def safe_get(url, headers=None, timeout=10):
-    """Fetch a URL, re-checking SSRF rules on every redirect hop.
+    With stream=True the body is not downloaded up front; the caller is
+    responsible for closing the returned response.
 
-    Raises ValueError if any redirect target is blocked.
+    Raises ValueError if the URL or any redirect target is blocked.
     Raises requests.RequestException on network errors.
     """
     MAX_REDIRECTS = 5
     for _ in range(MAX_REDIRECTS):
-        response = requests.get(url, headers=headers, timeout=timeout, allow_redirects=False)
+        response = _get_vetted(url, headers, timeout, stream)
         if response.status_code not in (301, 302, 303, 307, 308):
             return response
         redirect_url = response.headers.get("Location", "")
         if not redirect_url:
             return response
-        is_safe, reason = is_url_safe(redirect_url)
-        if not is_safe:
-            raise ValueError(f"Redirect blocked: {reason}")
-        url = redirect_url
-    return requests.get(url, headers=headers, timeout=timeout, allow_redirects=False)
\ No newline at end of file
+        response.close()
+        url = urljoin(url, redirect_url)
+    return _get_vetted(url, headers, timeout, stream)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Benchmark local GeoIP lookups against the ip-api.com HTTP path.
+
+Usage: python scripts/bench_geoip.py <mmdb file> [lookups] [http lookups]
+
+The HTTP comparison is skipped unless a number of HTTP lookups is given;
+keep it small, ip-api.com allows 45 requests per minute.
+"""
+
+import os
+import random
+import socket
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phreakbot_core.geoip import GeoIPReader  # noqa: E402
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    http_count = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+    started = time.perf_counter()
+    reader = GeoIPReader(sys.argv[1])
+    print(
+        f"opened {reader.database_type} ({reader.node_count:,} nodes, "
+        f"{reader.record_size}-bit records) in {(time.perf_counter() - started) * 1000:.1f}ms"
+    )
+
+    rng = random.Random(2)
+    v4 = [socket.inet_ntoa(rng.getrandbits(32).to_bytes(4, "big")) for _ in range(count)]
+    v6 = [
+        socket.inet_ntop(socket.AF_INET6, ((0x2000 << 112) | rng.getrandbits(125)).to_bytes(16, "big"))
+        for _ in range(count // 10)
+    ]
+
+    def bench(label, func, items):
+        start = time.perf_counter()
+        results = list(map(func, items))
+        elapsed = time.perf_counter() - start
+        hits = sum(1 for result in results if result)
+        print(
+            f"{label:<28} {len(items) / elapsed:12,.0f} lookups/s "
+            f"{elapsed / len(items) * 1e6:8.1f} µs  ({hits:,} found)"
+        )
+
+    bench("lookup IPv4 (cold cache)", reader.lookup, v4)
+    bench("lookup IPv4 (warm cache)", reader.lookup, v4)
+    bench("lookup IPv6", reader.lookup, v6)
+    bench("location IPv4", reader.location, v4[: count // 10])
+
+    if http_count:
+        session = requests.Session()
+
+        def http_lookup(ip):
+            response = session.get(
+                f"https://ip-api.com/json/{ip}?fields=country,regionName,city,isp,org,as", timeout=5
+            )
+            return response.status_code == 200 and response.json().get("country")
+
+        bench("ip-api.com HTTP", http_lookup, v4[:http_count])
+
+
+if __name__ == "__main__":
+    main()
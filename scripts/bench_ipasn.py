@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Benchmark longest-prefix-match lookups in the local IP-to-ASN table.
+
+Usage: python scripts/bench_ipasn.py [lookups] [table file]
+
+Without a table file a synthetic full-table-sized set of nested IPv4
+and IPv6 prefixes is generated. The build time printed for it includes
+generating the prefixes.
+"""
+
+import os
+import random
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phreakbot_core.ipasn import AsnTable, load_table  # noqa: E402
+
+
+def synthetic_entries(v4_count=950000, v6_count=200000, seed=1):
+    """Random /8-/24 IPv4 and /19-/48 IPv6 prefixes."""
+    rng = random.Random(seed)
+    for _ in range(v4_count):
+        length = rng.choice((16, 19, 20, 21, 22, 22, 23, 24, 24, 24, 24))
+        start = rng.getrandbits(length) << (32 - length)
+        yield 4, start, start | ((1 << (32 - length)) - 1), start, length, rng.randrange(1, 400000), "", ""
+    for _ in range(v6_count):
+        length = rng.choice((29, 32, 36, 40, 44, 48, 48, 48))
+        start = ((0x2000 << 112) | rng.getrandbits(125)) >> (128 - length) << (128 - length)
+        yield 6, start, start | ((1 << (128 - length)) - 1), start, length, rng.randrange(1, 400000), "", ""
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    started = time.perf_counter()
+    if len(sys.argv) > 2:
+        table = load_table(sys.argv[2])
+    else:
+        table = AsnTable(synthetic_entries())
+    print(f"built {len(table):,} ranges in {time.perf_counter() - started:.1f}s")
+
+    rng = random.Random(2)
+    v4 = [rng.getrandbits(32) for _ in range(count)]
+    addresses = [socket.inet_ntoa(value.to_bytes(4, "big")) for value in v4]
+    v4_table = table._tables[4]
+
+    def bench(label, func, items, miss=None):
+        start = time.perf_counter()
+        results = list(map(func, items))
+        elapsed = time.perf_counter() - start
+        hits = sum(1 for result in results if result != miss)
+        print(f"{label:<34} {len(items) / elapsed:12,.0f} lookups/s  ({hits:,} routed)")
+
+    bench("find (integer address)", v4_table.find, v4, miss=-1)
+    bench("lookup_asn (address string)", table.lookup_asn, addresses)
+    bench("lookup (AsnInfo with prefix)", table.lookup, addresses[: count // 10])
+
+
+if __name__ == "__main__":
+    main()
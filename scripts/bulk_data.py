@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Import or export infoitems, quotes and karma in bulk.
+
+Usage: python scripts/bulk_data.py import|export <infoitems|quotes|karma> [FILE]
+       [--format jsonl|csv] [--config config.json]
+
+FILE defaults to stdin/stdout; the format defaults to the file extension
+(.csv is CSV, anything else JSON Lines). Records are streamed through
+COPY, so memory use does not grow with the corpus. Imports run in one
+transaction, map authors by username (unknown ones become
+phreakbot_import_user) and skip records that already exist. Database
+settings come from the bot config, or from DB_HOST, DB_PORT, DB_USER,
+DB_PASSWORD and DB_NAME if there is no config file.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phreakbot_core.bulk import KINDS, export_records, import_records, read_records  # noqa: E402
+
+
+def connect(config_path):
+    if os.path.exists(config_path):
+        with open(config_path, encoding="utf-8") as f:
+            config = json.load(f)
+        settings = {key: config.get(f"db_{key}") for key in ("host", "port", "user", "password", "name")}
+    else:
+        settings = {key: os.environ.get(f"DB_{key.upper()}") for key in ("host", "port", "user", "password", "name")}
+    return psycopg2.connect(
+        host=settings["host"] or "localhost",
+        port=settings["port"] or 5432,
+        user=settings["user"] or "phreakbot",
+        password=settings["password"],
+        dbname=settings["name"] or "phreakbot",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("action", choices=("import", "export"))
+    parser.add_argument("kind", choices=sorted(KINDS))
+    parser.add_argument("file", nargs="?", default="-", help="file to read or write, - for stdin/stdout")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="record format")
+    parser.add_argument("--config", default="config.json", help="bot config with the database settings")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.file.lower().endswith(".csv") else "jsonl")
+    conn = connect(args.config)
+    try:
+        if args.action == "import":
+            f = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8", newline="")
+            try:
+                stats = import_records(conn, args.kind, read_records(f, fmt))
+            finally:
+                if f is not sys.stdin:
+                    f.close()
+            print(
+                f"Read {stats['read']:,} {args.kind} records: {stats['inserted']:,} imported, "
+                f"{stats['duplicates']:,} duplicates skipped, {stats['invalid']:,} invalid "
+                f"in {stats['seconds']:.2f}s ({stats['rows_per_second']:,.0f} rows/s)",
+                file=sys.stderr,
+            )
+        else:
+            f = sys.stdout if args.file == "-" else open(args.file, "w", encoding="utf-8", newline="")
+            try:
+                stats = export_records(conn, args.kind, f, fmt)
+            finally:
+                if f is not sys.stdout:
+                    f.close()
+            print(
+                f"Exported {stats['rows']:,} {args.kind} records "
+                f"in {stats['seconds']:.2f}s ({stats['rows_per_second']:,.0f} rows/s)",
+                file=sys.stderr,
+            )
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
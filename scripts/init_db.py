@@ -1,12 +1,20 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-"""Database initialization and connection waiter for PhreakBot."""
+"""Database initialization and connection waiter for PhreakBot.
+
+Waits for PostgreSQL, then applies pending schema migrations from
+migrations/. With --status, only lists the pending migrations.
+"""
 
 import os
 import sys
 import time
 import psycopg2
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phreakbot_core import migrations  # noqa: E402
+
 
 def main():
     # Read environment variables matching those used by PhreakBot
@@ -43,41 +51,21 @@ def main():
         sys.exit(1)
 
     try:
-        cur = conn.cursor()
-        # Check if the database schema is already initialized
-        cur.execute("SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = 'phreakbot_users')")
-        table_exists = cur.fetchone()[0]
-
-        if table_exists:
-            print("Database schema already exists. Skipping initialization.")
+        if "--status" in sys.argv[1:]:
+            pending = migrations.pending_migrations(conn)
+            for migration in pending:
+                print(f"Pending: {migration.version:04d}_{migration.name}")
+            print(f"{len(pending)} pending migration(s).")
         else:
-            print("Database schema does not exist. Creating schema...")
-            # We look for the schema file
-            schema_paths = ["/app/dbschema.psql", "dbschema.psql"]
-            schema_path = None
-            for path in schema_paths:
-                if os.path.exists(path):
-                    schema_path = path
-                    break
-
-            if not schema_path:
-                print("Error: dbschema.psql schema file not found!", file=sys.stderr)
-                sys.exit(1)
-
-            print(f"Loading schema from: {schema_path}")
-            with open(schema_path, "r", encoding="utf-8") as f:
-                schema_sql = f.read()
-
-            cur.execute(schema_sql)
-            conn.commit()
-            print("Database schema created successfully!")
-
-        cur.close()
+            # Creates the schema on an empty database, upgrades an existing one
+            applied = migrations.migrate(conn)
+            for migration in applied:
+                print(f"Applied migration {migration.version:04d}_{migration.name}")
+            print("Database schema is up to date.")
         conn.close()
     except Exception as e:
         print(f"Error during database initialization: {e}", file=sys.stderr)
         sys.exit(1)
 
-
 if __name__ == "__main__":
     main()
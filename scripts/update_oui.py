@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Download the IEEE MAC registries and compile the offline !mac database.
+
+Usage: python scripts/update_oui.py [--output data/oui.bin] [--csv FILE ...]
+
+Without --csv the MA-L, CID, MA-M, MA-S and IAB files are downloaded
+from standards-oui.ieee.org. A running bot picks up the new file on the
+next !mac lookup.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phreakbot_core.oui import IEEE_CSV_URLS, OuiDatabase, build_database  # noqa: E402
+
+
+def download(urls, directory):
+    """Download each URL into directory, returning the local paths."""
+    paths = []
+    for url in urls:
+        path = os.path.join(directory, url.rsplit("/", 1)[-1])
+        print(f"Downloading {url}")
+        with requests.get(url, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            with open(path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=65536):
+                    f.write(chunk)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="data/oui.bin", help="database file to write")
+    parser.add_argument("--csv", nargs="+", help="use local IEEE CSV files instead of downloading")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = args.csv or download(IEEE_CSV_URLS, tmp)
+        count = build_database(paths, args.output)
+
+    db = OuiDatabase(args.output)
+    start = time.perf_counter()
+    lookups = 100000
+    for i in range(lookups):
+        db.lookup(f"{(i * 2654435761) & 0xFFFFFFFFFFFF:012X}")
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {count:,} assignments to {args.output} ({os.path.getsize(args.output):,} bytes)")
+    print(f"{lookups / elapsed:,.0f} lookups/s ({elapsed / lookups * 1e6:.1f} us per lookup)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Download a PeeringDB snapshot for the offline !peering, !asn and !member lookups.
+
+Usage: python scripts/update_peeringdb.py [--output data/peeringdb.json] [--api-key KEY]
+
+Fetches the org, net, ix, ixlan, fac, netixlan and netfac objects from
+the PeeringDB API and writes them as one gzip-compressed dump in the
+CAIDA archive layout. The API key may also be given in PEERINGDB_API_KEY;
+anonymous requests are rate limited. A running bot picks up the new file
+on its next peeringdb refresh.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phreakbot_core.peeringdb import load_dump  # noqa: E402
+
+API_URL = "https://www.peeringdb.com/api"
+OBJECT_TYPES = ("org", "net", "ix", "ixlan", "fac", "netixlan", "netfac")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="data/peeringdb.json", help="dump file to write")
+    parser.add_argument("--api-key", default=os.environ.get("PEERINGDB_API_KEY"), help="PeeringDB API key")
+    args = parser.parse_args()
+
+    session = requests.Session()
+    session.headers["User-Agent"] = "PhreakBot/1.0 (IRC Bot; +https://github.com/jskoetsier/phreakbot)"
+    if args.api_key:
+        session.headers["Authorization"] = f"Api-Key {args.api_key}"
+
+    dump = {}
+    for kind in OBJECT_TYPES:
+        print(f"Downloading {API_URL}/{kind}")
+        response = session.get(f"{API_URL}/{kind}", params={"depth": 0}, timeout=300)
+        response.raise_for_status()
+        dump[kind] = {"data": response.json().get("data", [])}
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    tmp_path = f"{args.output}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(dump, f)
+    os.replace(tmp_path, args.output)
+
+    start = time.perf_counter()
+    db = load_dump(args.output)
+    print(
+        f"Wrote {len(db):,} networks, {len(db.exchanges):,} exchanges and "
+        f"{sum(map(len, db.connections_by_asn.values())):,} IX connections to {args.output} "
+        f"(indexed in {time.perf_counter() - start:.2f}s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Small IX-F member exports used by the IX-F index and frysix module tests.
+"""
+
+FRYSIX_EXPORT = {
+    "version": "1.0",
+    "ixp_list": [
+        {
+            "ixp_id": 1,
+            "shortname": "FRYS",
+            "name": "Frys-IX",
+            "vlan": [
+                {"id": 1, "ipv4": {"prefix": "185.1.203.0", "mask_length": 24},
+                 "ipv6": {"prefix": "2001:7f8:10f::", "mask_length": 64}},
+            ],
+        }
+    ],
+    "member_list": [
+        {
+            "asnum": 64500,
+            "name": "Example Networks",
+            "url": "https://example.net",
+            "peering_policy": "open",
+            "member_since": "2021-03-01T00:00:00Z",
+            "connection_list": [
+                {
+                    "ixp_id": 1,
+                    "if_list": [{"if_speed": 10000}],
+                    "vlan_list": [
+                        {
+                            "ipv4": {"address": "185.1.203.10", "max_prefix": 100},
+                            "ipv6": {"address": "2001:7f8:10f::fbe4:10", "max_prefix": 20},
+                        }
+                    ],
+                }
+            ],
+        },
+        {
+            "asnum": 64501,
+            "name": "Exemplary Hosting",
+            "connection_list": [
+                {"ixp_id": 1, "if_list": [{"if_speed": 1000}], "vlan_list": [{"ipv4": {"address": "185.1.203.11"}}]}
+            ],
+        },
+    ],
+}
+
+AMSIX_EXPORT = {
+    "ixp_list": [
+        {"ixp_id": 7, "shortname": "AMS-IX", "vlan": [{"ipv4": {"prefix": "80.249.208.0", "mask_length": 21}}]}
+    ],
+    "member_list": [
+        {
+            "asnum": 64500,
+            "name": "Example Networks",
+            "connection_list": [
+                {"ixp_id": 7, "if_list": [{"if_speed": 100000}], "vlan_list": [{"ipv4": {"address": "80.249.208.10"}}]}
+            ],
+        },
+        {
+            "asnum": 64502,
+            "name": "Other Transit",
+            "connection_list": [{"ixp_id": 7, "vlan_list": [{"ipv4": {"address": "80.249.208.12"}}]}],
+        },
+    ],
+}
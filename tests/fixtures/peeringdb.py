@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Small PeeringDB dump used by the PeeringDB index and module tests.
+"""
+
+PEERINGDB_DUMP = {
+    "org": {"data": [{"id": 1, "name": "Cloudflare, Inc.", "country": "US", "status": "ok"}]},
+    "net": {
+        "data": [
+            {"id": 10, "asn": 13335, "name": "Cloudflare", "aka": "CF", "org_id": 1, "status": "ok",
+             "policy_general": "Open", "info_prefixes4": 2000, "info_prefixes6": 500},
+            {"id": 11, "asn": 64500, "name": "Cloudy Networks", "aka": "", "org_id": 1, "status": "ok"},
+            {"id": 12, "asn": 64501, "name": "Closed Net", "status": "deleted"},
+        ]
+    },
+    "ix": {
+        "data": [
+            {"id": 100, "name": "AMS-IX", "name_long": "Amsterdam Internet Exchange", "status": "ok"},
+            {"id": 101, "name": "Frys-IX", "name_long": "Frys-IX", "status": "ok"},
+        ]
+    },
+    "ixlan": {"data": [{"id": 200, "ix_id": 100, "status": "ok"}, {"id": 201, "ix_id": 101, "status": "ok"}]},
+    "fac": {"data": [{"id": 300, "name": "Equinix AM7", "city": "Amsterdam", "country": "NL", "status": "ok"}]},
+    "netixlan": {
+        "data": [
+            {"net_id": 10, "ixlan_id": 200, "asn": 13335, "ipaddr4": "80.249.208.1", "speed": 100000, "status": "ok"},
+            {"net_id": 10, "ixlan_id": 200, "asn": 13335, "ipaddr4": "80.249.208.2", "speed": 100000, "status": "ok"},
+            {"net_id": 10, "ix_id": 101, "asn": 13335, "ipaddr6": "2001:7f8:10f::1", "speed": 10000, "status": "ok"},
+        ]
+    },
+    "netfac": {"data": [{"net_id": 10, "fac_id": 300, "status": "ok"}]},
+}
@@ -108,5 +108,206 @@ class TestQuerySafety:
         assert len(params) == 1
 
 
+@pytest.fixture
+def sqlite_bot(tmp_path):
+    """Bot on the embedded SQLite backend, with a real database file."""
+    import json
+
+    config_file = tmp_path / "sqlite_config.json"
+    with open(config_file, "w") as f:
+        json.dump(
+            {
+                "server": "test.server",
+                "nickname": "TestBot",
+                "channels": ["#test"],
+                "owner": "owner",
+                "db_backend": "sqlite",
+                "sqlite_path": str(tmp_path / "phreakbot.db"),
+            },
+            f,
+        )
+    bot = PhreakBot(str(config_file))
+    bot._active_output = []
+    yield bot
+    bot.db_pool.closeall()
+
+
+def _messages(bot):
+    messages = [line["msg"] for line in bot._active_output]
+    bot._active_output.clear()
+    return messages
+
+
+@pytest.mark.integration
+class TestSQLiteBackend:
+    """Modules and core queries against a real SQLite database."""
+
+    def test_schema_migrated_in_wal_mode(self, sqlite_bot):
+        from phreakbot_core import sqlite
+
+        conn = sqlite_bot.db_get()
+        cur = conn.cursor()
+        cur.execute("PRAGMA journal_mode")
+        assert cur.fetchone()[0] == "wal"
+        cur.execute("SELECT version FROM schema_version")
+        assert cur.fetchall() == [(1,)]
+        cur.execute("SELECT username FROM phreakbot_users")
+        assert cur.fetchall() == [("phreakbot_import_user",)]
+        assert sqlite.migrate(conn) == []
+        sqlite_bot.db_return(conn)
+
+    def test_meet_perm_and_profile(self, sqlite_bot):
+        from modules import meet, perm
+
+        sqlite_bot.user_hostmasks["alice"] = "Alice!a@example.org"
+        meet.run(sqlite_bot, {"command_args": "Alice"})
+        perm.run(sqlite_bot, {"command_args": "add alice op topic #test"})
+        assert _messages(sqlite_bot)
+
+        info = sqlite_bot.db_get_userinfo_by_userhost("alice!a@example.org")
+        assert info["username"] == "alice"
+        assert info["hostmasks"] == ["alice!a@example.org"]
+        assert info["permissions"]["global"] == ["user"]
+        assert sorted(info["permissions"]["#test"]) == ["op", "topic"]
+        assert info["is_admin"] is False
+
+        profile = sqlite_bot.db_get_user_profile(hostmask="alice!a@example.org")
+        assert profile["matched_by"] == "hostmask"
+        assert profile["permissions"] == {"global": ["user"], "#test": ["op", "topic"]}
+        assert sqlite_bot.db_get_permission_index()[("op", "#test")] == ["alice"]
+
+        meet.run(sqlite_bot, {"command_args": "ALICE"})
+        assert "already exists" in _messages(sqlite_bot)[0]
+
+    def test_karma_with_reasons(self, sqlite_bot):
+        from modules import karma
+
+        for text in ("!python++ #readable", "!python++", "!python-- #whitespace"):
+            karma.run(sqlite_bot, {"trigger": "event", "signal": "pubmsg", "text": text, "nick": "bob", "channel": "#test"})
+        assert _messages(sqlite_bot)[-1] == "python now has 1 karma"
+
+        karma.run(sqlite_bot, {"trigger": "command", "command": "karma", "command_args": "Python", "channel": "#test"})
+        assert _messages(sqlite_bot) == ["python has 1 karma - Recent reasons: -1 for whitespace, +1 for readable"]
+
+    def test_repository_modules(self, sqlite_bot):
+        import importlib
+
+        from modules import infoitems, meet, quotes
+
+        auto_op = importlib.import_module("modules.auto-op")
+        autovoice = importlib.import_module("modules.autovoice")
+        sqlite_bot.nickname = "TestBot"
+        sqlite_bot.user_hostmasks["alice"] = "alice!a@example.org"
+        meet.run(sqlite_bot, {"command_args": "alice"})
+        user = sqlite_bot.db_get_userinfo_by_userhost("alice!a@example.org")
+        event = {
+            "trigger": "command", "nick": "alice", "hostmask": "alice!a@example.org",
+            "channel": "#test", "user_info": user,
+        }
+        _messages(sqlite_bot)
+
+        for _ in range(2):
+            quotes.run(sqlite_bot, dict(event, command="aq", command_args="hello world"))
+        quotes.run(sqlite_bot, dict(event, command="q", command_args="1"))
+        messages = _messages(sqlite_bot)
+        assert messages[:2] == ["Quote #1 added successfully.", "This quote already exists in the database."]
+        assert messages[2].startswith("Quote #1: hello world (added by alice in #test on ")
+
+        infoitems._get_infoitem(sqlite_bot, event, "bot")
+        infoitems._add_infoitem(sqlite_bot, event, "bot", "phreakbot")
+        infoitems._get_infoitem(sqlite_bot, event, "bot")
+        infoitems._forget_infoitem(sqlite_bot, event, "bot", "phreakbot")
+        infoitems._get_infoitem(sqlite_bot, event, "bot")
+        messages = _messages(sqlite_bot)
+        assert messages[0] == messages[-1] == "No info found for 'bot'."
+        assert messages[2] == "bot: phreakbot"
+
+        join = dict(event, trigger="event", signal="join")
+        with patch("asyncio.create_task") as create_task:
+            auto_op.run(sqlite_bot, join)
+            sqlite_bot._is_owner = Mock(return_value=True)
+            auto_op.run(sqlite_bot, dict(event, command="autoop", command_args="alice"))
+            auto_op.run(sqlite_bot, join)
+            assert create_task.call_count == 1
+            autovoice.run(sqlite_bot, dict(event, command="autovoice", command_args="on"))
+            autovoice.run(sqlite_bot, join)
+            assert create_task.call_count == 3  # +o, +m, +v
+            for coro in (c[0][0] for c in create_task.call_args_list):
+                coro.close()
+        autovoice.run(sqlite_bot, dict(event, command="autovoice", command_args="status"))
+        assert _messages(sqlite_bot)[-1] == "Autovoice is enabled for #test."
+
+    def test_massmeet_uses_any_and_execute_values(self, sqlite_bot):
+        from modules import massmeet
+
+        stats = massmeet.register_users(sqlite_bot, {"Bob": "bob!b@host", "Carol": "carol!c@host"})
+        assert stats["registered_new"] == 2
+        stats = massmeet.register_users(sqlite_bot, {"bob": "bob!b@host", "carol": "carol!c@other"})
+        assert stats["already_registered"] == 1
+        assert stats["merged_hostmasks"] == 1
+        assert sorted(sqlite_bot.db_get_user_profile(username="carol")["hostmasks"]) == [
+            "carol!c@host",
+            "carol!c@other",
+        ]
+
+    def test_mixed_case_rows_found(self, sqlite_bot):
+        from modules import lockdown, massmeet
+
+        conn = sqlite_bot.db_get()
+        cur = conn.cursor()
+        cur.execute("INSERT INTO phreakbot_users (username) VALUES (%s) RETURNING id", ("Legacy",))
+        user_id = cur.fetchone()[0]
+        cur.execute("INSERT INTO phreakbot_hostmasks (users_id, hostmask) VALUES (%s, %s)", (user_id, "Legacy!L@Host"))
+        conn.commit()
+        sqlite_bot.db_return(conn)
+
+        assert sqlite_bot.db_get_userinfo_by_userhost("legacy!l@host")["id"] == user_id
+        assert sqlite_bot.db_get_user_profile(username="LEGACY")["id"] == user_id
+        assert sqlite_bot.db_get_user_profile(hostmask="legacy!L@HOST")["matched_by"] == "hostmask"
+        sqlite_bot.user_hostmasks["other"] = "other!x@legacy.host"
+        assert lockdown.find_registered(sqlite_bot, ["legacy", "other"]) == {"legacy"}
+        stats = massmeet.register_users(sqlite_bot, {"legacy": "legacy!l@host"})
+        assert (stats["already_registered"], stats["registered_new"]) == (1, 0)
+
+    def test_birthdays_by_day_key(self, sqlite_bot):
+        import datetime
+
+        from modules import birthday
+
+        conn = sqlite_bot.db_get()
+        cur = conn.cursor()
+        for name, dob in (("dec", datetime.date(1990, 12, 30)), ("jan", datetime.date(1985, 1, 2)), ("jun", datetime.date(2000, 6, 1))):
+            cur.execute("INSERT INTO phreakbot_users (username, dob) VALUES (%s, %s)", (name, dob))
+        conn.commit()
+        assert birthday._birthdays_between(cur, datetime.date(2025, 12, 28), 7) == [
+            ("dec", datetime.date(1990, 12, 30)),
+            ("jan", datetime.date(1985, 1, 2)),
+        ]
+        sqlite_bot.db_return(conn)
+
+    def test_timers_survive_reopen(self, sqlite_bot):
+        from phreakbot_core import sqlite
+
+        timer_id = sqlite_bot.schedule(3600, "test.action", {"channel": "#test"}, key="k")
+        sqlite_bot.db_pool.closeall()
+        sqlite_bot.db_pool = sqlite.SQLitePool(1, 2, sqlite_bot.config["sqlite_path"])
+        rows = [row for row in sqlite_bot._load_timers() if row[2] == "test.action"]
+        due_at, stored_id, _, key, payload = rows[0]
+        assert (stored_id, key, payload) == (timer_id, "k", {"channel": "#test"})
+        assert due_at.tzinfo is not None
+        assert sqlite_bot.cancel_timer("test.action", "k") is True
+
+    def test_constraint_errors_raised_as_psycopg2(self, sqlite_bot):
+        conn = sqlite_bot.db_get()
+        cur = conn.cursor()
+        cur.execute("INSERT INTO phreakbot_users (username, is_owner) VALUES (%s, TRUE)", ("first",))
+        with pytest.raises(psycopg2.errors.UniqueViolation):
+            cur.execute("INSERT INTO phreakbot_users (username, is_owner) VALUES (%s, TRUE)", ("second",))
+        conn.rollback()
+        with pytest.raises(psycopg2.errors.ForeignKeyViolation):
+            cur.execute("INSERT INTO phreakbot_hostmasks (users_id, hostmask) VALUES (%s, %s)", (999, "x!y@z"))
+        sqlite_bot.db_return(conn)
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -422,6 +422,465 @@ class TestCaching:
         assert bot._cache_get("test_type", "key2") is None
 
 
+
+class TestUserProfiles:
+    """Tests for the single-query user profile and the permission index."""
+
+    @staticmethod
+    def _cursor(bot, fetchone=None, fetchall=None):
+        cursor = Mock()
+        cursor.fetchone.return_value = fetchone
+        cursor.fetchall.return_value = fetchall or []
+        bot.db_pool.getconn.return_value.cursor.return_value = cursor
+        return cursor
+
+    @pytest.mark.unit
+    def test_profile_in_one_query_and_cached(self, bot):
+        row = {
+            "id": 7, "username": "alice", "dob": None, "is_admin": True, "is_owner": False,
+            "hostmasks": ["alice!a@host"],
+            "perms": [["", "user"], ["#chan", "op"], ["#chan", "voice"]],
+        }
+        cursor = self._cursor(bot, fetchone=row)
+
+        profile = bot.db_get_user_profile(username="Alice", hostmask="Alice!a@host")
+        assert profile["permissions"] == {"global": ["user"], "#chan": ["op", "voice"]}
+        assert profile["matched_by"] == "username"
+        assert cursor.execute.call_args[0][1] == ("alice", "alice!a@host", "alice")
+
+        assert bot.db_get_user_profile(username="alice", hostmask="alice!a@host") is profile
+        cursor.execute.assert_called_once()
+
+        bot.db_invalidate_users()
+        bot.db_get_user_profile(username="alice", hostmask="alice!a@host")
+        assert cursor.execute.call_count == 2
+
+    @pytest.mark.unit
+    def test_profile_matched_by_hostmask(self, bot):
+        row = {
+            "id": 7, "username": "alice", "dob": None, "is_admin": False, "is_owner": False,
+            "hostmasks": ["alice!a@host"], "perms": [],
+        }
+        self._cursor(bot, fetchone=row)
+        profile = bot.db_get_user_profile(username="al", hostmask="al!a@host")
+        assert profile["matched_by"] == "hostmask"
+        assert profile["permissions"] == {"global": []}
+
+    @pytest.mark.unit
+    def test_permission_index(self, bot):
+        cursor = self._cursor(bot, fetchall=[
+            ("admin", "", "alice"), ("op", "#chan", "alice"), ("op", "#chan", "bob"), ("user", None, "bob"),
+        ])
+        index = bot.db_get_permission_index()
+        assert index[("op", "#chan")] == ["alice", "bob"]
+        assert index[("user", "")] == ["bob"]
+        assert bot.db_get_permission_index() is index
+        cursor.execute.assert_called_once()
+
+
+class TestRepositories:
+    """Tests for connection handling, prepared statements and cached reads."""
+
+    @pytest.mark.unit
+    def test_transaction_commits_or_rolls_back(self, bot):
+        from phreakbot_core.repositories import Repository
+
+        conn = bot.db_pool.getconn.return_value
+        with Repository(bot).transaction() as cur:
+            cur.execute("SELECT 1")
+        conn.commit.assert_called_once()
+        cur.close.assert_called_once()
+        bot.db_pool.putconn.assert_called_once_with(conn)
+
+        with pytest.raises(ValueError):
+            with Repository(bot).transaction():
+                raise ValueError("boom")
+        conn.rollback.assert_called_once()
+        assert bot.db_pool.putconn.call_count == 2
+
+    @pytest.mark.unit
+    def test_connection_returned_when_cursor_fails(self, bot):
+        from phreakbot_core.repositories import DatabaseUnavailable, Repository
+
+        conn = bot.db_pool.getconn.return_value
+        conn.cursor.side_effect = Exception("connection lost")
+        with pytest.raises(Exception, match="connection lost"):
+            with Repository(bot).transaction():
+                pass
+        bot.db_pool.putconn.assert_called_once_with(conn)
+
+        bot.db_pool.getconn.return_value = None
+        with pytest.raises(DatabaseUnavailable):
+            with Repository(bot).transaction():
+                pass
+
+    @pytest.mark.unit
+    def test_hot_reads_prepared_once_per_connection(self, bot):
+        from phreakbot_core.repositories import Users
+
+        cursor = bot.db_pool.getconn.return_value.cursor.return_value
+        cursor.fetchone.return_value = (1,)
+        assert Users(bot).is_registered("Alice!a@host") is True
+        assert Users(bot).is_registered("bob!b@host") is True
+        statements = [c[0] for c in cursor.execute.call_args_list]
+        assert statements == [
+            ("PREPARE users_registered AS SELECT 1 FROM phreakbot_hostmasks WHERE lower(hostmask) = $1",),
+            ("EXECUTE users_registered (%s)", ("alice!a@host",)),
+            ("EXECUTE users_registered (%s)", ("bob!b@host",)),
+        ]
+
+        bot.db_pool.getconn.return_value = Mock()
+        other = bot.db_pool.getconn.return_value.cursor.return_value
+        bot.config["db_prepared_statements"] = False
+        Users(bot).is_registered("alice!a@host")
+        other.execute.assert_called_once_with(
+            "SELECT 1 FROM phreakbot_hostmasks WHERE lower(hostmask) = %s", ("alice!a@host",)
+        )
+
+    @pytest.mark.unit
+    def test_autoop_check_cached_until_changed(self, bot):
+        from phreakbot_core.repositories import AutoOp
+
+        cursor = bot.db_pool.getconn.return_value.cursor.return_value
+        cursor.fetchone.return_value = None
+        assert AutoOp(bot).has_auto_op("alice!a@host", "#Chan") is False
+        assert AutoOp(bot).has_auto_op("alice!a@host", "#chan") is False
+        assert cursor.execute.call_count == 2  # PREPARE and one EXECUTE
+
+        cursor.fetchone.return_value = (1,)
+        assert AutoOp(bot).add(7, "#chan") is True
+        assert AutoOp(bot).has_auto_op("alice!a@host", "#chan") is True
+
+        bot.db_invalidate_users()
+        assert bot.cache["autoop"] == {}
+
+
+class TestCacheNotify:
+    """Tests for invalidating caches from database notifications."""
+
+    @staticmethod
+    def _fill(bot):
+        bot._cache_set("user_info", "Alice!a@host", {"id": 7})
+        bot._cache_set("user_info", "bob!b@host", {"id": 8})
+        bot._cache_set("user_profile", ("alice", "alice!a@host"), {"id": 7})
+        bot._cache_set("user_profile", ("bob", ""), {"id": 8})
+        bot._cache_set("user_profile", ("a|b", "a|b!x@host"), {"id": 9})
+        bot._cache_set("infoitems", "#chan bot", ["phreakbot"])
+        bot._cache_set("perm_index", "all", {})
+        bot._cache_set("autoop", "#chan alice!a@host", True)
+        bot._cache_set("autoop", "#other alice!a@host", False)
+        bot._cache_set("autoop", "#chan bob!b@host", False)
+        bot._cache_set("autovoice", "#chan", True)
+        bot._cache_set("autovoice", "#other", False)
+
+    @pytest.mark.unit
+    def test_perm_change_drops_that_users_entries(self, bot):
+        self._fill(bot)
+        bot.invalidate_from_notification({
+            "table": "phreakbot_perms", "old": None,
+            "new": {"id": 1, "users_id": 7, "permission": "op", "channel": "#chan"},
+        })
+        assert list(bot.cache["user_info"]) == ["bob!b@host"]
+        assert list(bot.cache["user_profile"]) == [("bob", ""), ("a|b", "a|b!x@host")]
+        assert bot.cache["perm_index"] == {}
+        assert len(bot.cache["autoop"]) == 3
+
+    @pytest.mark.unit
+    def test_hostmask_and_username_changes(self, bot):
+        self._fill(bot)
+        bot.invalidate_from_notification({
+            "table": "phreakbot_hostmasks",
+            "old": {"id": 3, "users_id": 9, "hostmask": "alice!a@host"}, "new": None,
+        })
+        assert list(bot.cache["autoop"]) == ["#chan bob!b@host"]
+        assert list(bot.cache["user_info"]) == ["bob!b@host"]
+        assert "all" in bot.cache["perm_index"]
+
+        bot.invalidate_from_notification({
+            "table": "phreakbot_users", "old": None,
+            "new": {"id": 10, "username": "bob", "dob": None, "is_admin": False, "is_owner": False},
+        })
+        assert bot.cache["user_info"] == {}
+        assert bot.cache["user_profile"] == {}
+        assert bot.cache["perm_index"] == {}
+
+    @pytest.mark.unit
+    def test_profile_of_nick_with_pipe(self, bot):
+        self._fill(bot)
+        bot.invalidate_from_notification({
+            "table": "phreakbot_users", "old": None,
+            "new": {"id": 11, "username": "a|b", "dob": None, "is_admin": False, "is_owner": False},
+        })
+        assert list(bot.cache["user_profile"]) == [("alice", "alice!a@host"), ("bob", "")]
+
+    @pytest.mark.unit
+    def test_autoop_and_autovoice_changes(self, bot):
+        self._fill(bot)
+        bot.invalidate_from_notification({
+            "table": "phreakbot_autoop", "old": None,
+            "new": {"id": 1, "users_id": 7, "channel": "#chan"}, "hostmasks": ["alice!a@host"],
+        })
+        assert sorted(bot.cache["autoop"]) == ["#chan bob!b@host", "#other alice!a@host"]
+        bot.invalidate_from_notification({
+            "table": "phreakbot_autoop", "old": {"id": 1, "users_id": 7, "channel": ""},
+            "new": None, "hostmasks": ["alice!a@host"],
+        })
+        assert list(bot.cache["autoop"]) == ["#chan bob!b@host"]
+        assert len(bot.cache["user_info"]) == 2
+
+        bot.invalidate_from_notification({
+            "table": "phreakbot_autovoice", "old": {"id": 1, "channel": "#Chan", "enabled": True},
+            "new": {"id": 1, "channel": "#Chan", "enabled": False},
+        })
+        assert list(bot.cache["autovoice"]) == ["#other"]
+
+        bot.invalidate_from_notification({"table": "phreakbot_autovoice"})
+        assert bot.cache["autovoice"] == {}
+
+    @pytest.mark.unit
+    def test_listener_lifecycle(self, bot):
+        import asyncio
+        import json
+        import socket
+
+        import psycopg2
+
+        first, second = socket.socketpair()
+        conn = Mock()
+        conn.fileno.return_value = first.fileno()
+        conn.notifies = []
+
+        async def run():
+            with patch("phreakbot_core.cache_notify.psycopg2.connect", return_value=conn):
+                bot.start_cache_listener()
+                bot.start_cache_listener()
+            conn.cursor.return_value.execute.assert_called_once_with("LISTEN phreakbot_cache")
+            assert bot.cache["cache_ttls"]["user_profile"] == 3600
+            assert "infoitems" not in bot.cache["cache_ttls"]
+            # Info items have no trigger and keep expiring after cache_ttl
+            self._fill(bot)
+            for cache_key in ("infoitems:#chan bot", "autovoice:#chan"):
+                bot.cache["cache_timestamps"][cache_key] -= 400
+            assert bot._cache_get("infoitems", "#chan bot") is None
+            assert bot._cache_get("autovoice", "#chan") is True
+
+            self._fill(bot)
+            conn.notifies.append(Mock(payload=json.dumps({"table": "phreakbot_autovoice"})))
+            bot._on_cache_notify()
+            assert bot.cache["autovoice"] == {}
+            assert len(bot.cache["user_info"]) == 2
+
+            conn.poll.side_effect = psycopg2.OperationalError("server closed the connection")
+            bot._on_cache_notify()
+            assert bot._cache_listener is None
+            assert bot.cache["cache_ttls"] == {}
+            assert bot.cache["user_info"] == {}
+            conn.close.assert_called_once()
+            assert bot._cache_listen_retry is not None
+            bot._cache_listen_retry.cancel()
+
+        try:
+            asyncio.run(run())
+        finally:
+            first.close()
+            second.close()
+
+    @pytest.mark.unit
+    def test_no_listener_on_sqlite(self, bot):
+        bot.config["db_backend"] = "sqlite"
+        with patch("phreakbot_core.cache_notify.psycopg2.connect") as connect:
+            bot.start_cache_listener()
+        connect.assert_not_called()
+
+    @pytest.mark.unit
+    def test_migration_adds_triggers_to_each_table(self):
+        from phreakbot_core.migrations import list_migrations
+
+        migration = [m for m in list_migrations() if m.version == 3][0]
+        with open(migration.path) as f:
+            sql = f.read()
+        for table in ("users", "hostmasks", "perms", "autoop", "autovoice"):
+            assert f"'phreakbot_{table}'" in sql
+        assert "pg_notify('phreakbot_cache'" in sql
+
+
+class TestMigrations:
+    """Tests for the schema migration runner."""
+
+    @pytest.mark.unit
+    def test_split_statements_keeps_quoted_bodies(self):
+        from phreakbot_core.migrations import split_statements
+        sql = (
+            "-- migrate: no-transaction\n"
+            "CREATE INDEX CONCURRENTLY a ON t (lower(x));\n"
+            "INSERT INTO t VALUES ('a;b', 'it''s');\n"
+            "CREATE FUNCTION f() RETURNS trigger AS $$ BEGIN PERFORM 1; END $$ LANGUAGE plpgsql;\n"
+            "-- trailing comment\n"
+        )
+        assert split_statements(sql) == [
+            "-- migrate: no-transaction\nCREATE INDEX CONCURRENTLY a ON t (lower(x))",
+            "INSERT INTO t VALUES ('a;b', 'it''s')",
+            "CREATE FUNCTION f() RETURNS trigger AS $$ BEGIN PERFORM 1; END $$ LANGUAGE plpgsql",
+        ]
+
+    @pytest.mark.unit
+    def test_shipped_migrations_are_ordered(self):
+        from phreakbot_core.migrations import list_migrations
+        versions = [m.version for m in list_migrations()]
+        assert versions[:2] == [1, 2]
+        assert versions == sorted(versions)
+
+    @pytest.mark.unit
+    def test_migrate_applies_pending_in_order(self, tmp_path):
+        from phreakbot_core.migrations import migrate
+        (tmp_path / "0001_base.sql").write_text("CREATE TABLE phreakbot_a (id INT);")
+        (tmp_path / "0002_index.sql").write_text(
+            "-- migrate: no-transaction\nCREATE INDEX CONCURRENTLY IF NOT EXISTS i ON phreakbot_a (id);\n"
+        )
+        (tmp_path / "0003_col.sql").write_text("ALTER TABLE phreakbot_a ADD COLUMN n TEXT;")
+        (tmp_path / "notes.txt").write_text("ignored")
+
+        conn = MagicMock()
+        conn.autocommit = False
+        cur = conn.cursor.return_value
+        cur.fetchall.side_effect = [[(1,)], []]
+
+        applied = migrate(conn, str(tmp_path))
+        assert [m.version for m in applied] == [2, 3]
+        statements = [c[0][0] for c in cur.execute.call_args_list]
+        assert "CREATE TABLE phreakbot_a (id INT);" not in statements
+        index = statements.index("-- migrate: no-transaction\nCREATE INDEX CONCURRENTLY IF NOT EXISTS i ON phreakbot_a (id)")
+        begin = statements.index("BEGIN")
+        assert index < begin
+        assert statements[begin + 1] == "ALTER TABLE phreakbot_a ADD COLUMN n TEXT;"
+        assert statements[begin + 3] == "COMMIT"
+        assert conn.autocommit is False
+
+
+class TestBulkData:
+    """Tests for streaming COPY import and export."""
+
+    @pytest.mark.unit
+    def test_copy_fields_round_trip(self):
+        from phreakbot_core.bulk import copy_field, parse_copy_field
+        for value in ["plain", "tab\there", "new\nline", "back\\slash", "cr\r"]:
+            assert parse_copy_field(copy_field(value)) == value
+        assert copy_field(None) == "\\N"
+        assert parse_copy_field("\\N") is None
+
+    @pytest.mark.unit
+    def test_import_streams_records_in_chunks(self):
+        from phreakbot_core.bulk import import_records
+
+        staged = []
+        reads = []
+
+        def copy_expert(sql, source, size):
+            while True:
+                chunk = source.read(size)
+                reads.append(len(chunk))
+                if not chunk:
+                    break
+                staged.append(chunk)
+
+        conn = MagicMock()
+        cur = conn.cursor.return_value
+        cur.copy_expert.side_effect = copy_expert
+        cur.rowcount = 2999
+
+        records = ({"item": f"item{i}", "value": "v\tx", "channel": "#c", "username": "alice"} for i in range(3000))
+        records = list(records) + [{"item": "no value"}, None]
+        stats = import_records(conn, "infoitems", records, chunk_size=4096)
+
+        lines = "".join(staged).splitlines()
+        assert len(lines) == 3000
+        assert lines[0] == "1\titem0\tv\\tx\t#c\talice\t\\N"
+        assert max(reads) <= 4096 and len(reads) > 10
+        assert "FROM bulk_stage" in cur.execute.call_args_list[-1][0][0]
+        conn.commit.assert_called_once()
+        assert stats["read"] == 3002
+        assert stats["invalid"] == 2
+        assert stats["inserted"] == 2999
+        assert stats["duplicates"] == 1
+
+    @pytest.mark.unit
+    def test_export_writes_jsonl_and_csv(self):
+        import io
+        from phreakbot_core.bulk import export_records
+
+        def copy_expert(sql, sink, size):
+            data = "foo\t#c\t3\nb\\tar\t#c\t-1\n"
+            sink.write(data[:7])
+            sink.write(data[7:])
+
+        conn = MagicMock()
+        conn.cursor.return_value.copy_expert.side_effect = copy_expert
+
+        out = io.StringIO()
+        assert export_records(conn, "karma", out, "jsonl")["rows"] == 2
+        assert out.getvalue() == (
+            '{"item": "foo", "channel": "#c", "karma": 3}\n'
+            '{"item": "b\\tar", "channel": "#c", "karma": -1}\n'
+        )
+
+        out = io.StringIO()
+        export_records(conn, "karma", out, "csv")
+        assert out.getvalue().splitlines() == ["item,channel,karma", "foo,#c,3", "b\tar,#c,-1"]
+
+
+class TestSQLiteTranslation:
+    """Tests for translating psycopg2 statements to SQLite."""
+
+    @pytest.mark.unit
+    def test_placeholders_casts_and_operators(self):
+        from phreakbot_core.sqlite import translate
+        sql, params, for_update = translate(
+            "SELECT id FROM t WHERE name ILIKE %s AND n::int = %s AND pct LIKE '5%%' "
+            "AND note = '%s::text' FOR UPDATE",
+            ("a%", 3),
+        )
+        assert sql == "SELECT id FROM t WHERE name LIKE ? AND n = ? AND pct LIKE '5%' AND note = '%s::text'"
+        assert params == ["a%", 3]
+        assert for_update is True
+
+        # Without parameters psycopg2 leaves % alone, and so does the backend
+        assert translate("SELECT '%%'")[0] == "SELECT '%%'"
+
+    @pytest.mark.unit
+    def test_any_expands_to_in_list(self):
+        from phreakbot_core.sqlite import translate
+        sql, params, _ = translate(
+            "SELECT 1 FROM t WHERE a = %s AND b = ANY(%s) AND c = ANY (%s)", (1, ["x", "y"], [])
+        )
+        assert sql == "SELECT 1 FROM t WHERE a = ? AND b IN (?, ?) AND c IN ()"
+        assert params == [1, "x", "y"]
+
+    @pytest.mark.unit
+    def test_extract_and_datetime_parameters(self):
+        import datetime
+        from phreakbot_core.sqlite import translate
+        sql, params, _ = translate(
+            "SELECT (EXTRACT(MONTH FROM dob) * 100 + EXTRACT(DAY FROM dob))::int FROM t WHERE due < %s",
+            (datetime.datetime(2025, 1, 2, 4, 0, tzinfo=datetime.timezone(datetime.timedelta(hours=2))),),
+        )
+        assert sql == (
+            "SELECT (CAST(strftime('%m', dob) AS INTEGER) * 100 + CAST(strftime('%d', dob) AS INTEGER)) "
+            "FROM t WHERE due < ?"
+        )
+        assert params == ["2025-01-02 02:00:00"]
+
+    @pytest.mark.unit
+    def test_backend_selected_by_config(self, bot, tmp_path):
+        from phreakbot_core.sqlite import SQLitePool
+        bot.config["db_backend"] = "sqlite"
+        bot.config["sqlite_path"] = str(tmp_path / "bot.db")
+        assert bot.db_connect() is True
+        assert isinstance(bot.db_pool, SQLitePool)
+        assert bot.db_migrate() is True
+        assert bot.db_get_user_profile(username="phreakbot_import_user")["hostmasks"] == ["phreakbot_import_user"]
+        bot.db_pool.closeall()
+
+
 class TestConfigurationManagement:
     """Test configuration loading and management."""
 
@@ -162,7 +162,16 @@ class TestOnConnect:
         """Test on_connect joins configured channels."""
         bot.join = AsyncMock()
         bot.network = "testnet"
-        await bot.on_connect()
+        with patch.object(bot, "start_datasets") as mock_start, patch.object(
+            bot.feeds, "start"
+        ) as mock_feeds, patch.object(bot, "start_timers") as mock_timers, patch.object(
+            bot, "start_cache_listener"
+        ) as mock_listener:
+            await bot.on_connect()
+        mock_listener.assert_called_once()
+        mock_start.assert_called_once()
+        mock_feeds.assert_called_once_with(bot.message)
+        mock_timers.assert_called_once()
         assert bot.join.await_count == 2
         bot.join.assert_any_await("#test")
         bot.join.assert_any_await("#another")
@@ -173,10 +182,131 @@ class TestOnConnect:
         """Test on_connect handles join failure gracefully."""
         bot.join = AsyncMock(side_effect=[None, Exception("banned")])
         bot.network = "testnet"
-        await bot.on_connect()
+        with patch.object(bot, "start_datasets"), patch.object(bot.feeds, "start"), patch.object(
+            bot, "start_timers"
+        ), patch.object(bot, "start_cache_listener"):
+            await bot.on_connect()
         assert bot.join.await_count == 2
 
 
+class TestWho:
+    """Test the WHO round used by bulk commands."""
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_who_collects_replies_until_end(self, bot):
+        def reply(params):
+            message = Mock()
+            message.params = params
+            return message
+
+        async def rawmsg(command, channel):
+            assert (command, channel) == ("WHO", "#test")
+            await bot.on_raw_352(reply(["TestBot", "#test", "alice", "a.example", "srv", "Alice", "H", "0 Alice"]))
+            await bot.on_raw_352(reply(["TestBot", "#other", "bob", "b.example", "srv", "Bob", "H", "0 Bob"]))
+            await bot.on_raw_315(reply(["TestBot", "#Test", "End of WHO list"]))
+
+        bot.rawmsg = rawmsg
+        users = await bot.who("#test")
+        assert users == {"Alice": "Alice!alice@a.example"}
+        assert bot.user_hostmasks["bob"] == "Bob!bob@b.example"
+        assert bot._who_requests == {}
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_who_timeout_returns_partial_reply(self, bot):
+        bot.rawmsg = AsyncMock()
+        assert await bot.who("#test", timeout=0.01) == {}
+        assert bot._who_requests == {}
+
+
+class TestTimers:
+    """Test the persistent timer service."""
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_timers_run_in_due_order_and_replace_by_key(self, bot):
+        bot.db_pool = None
+        ran = []
+        bot.add_timer_action("test.sync", lambda b, payload: ran.append(payload["n"]))
+
+        async def handler(b, payload):
+            ran.append(payload["n"])
+
+        bot.add_timer_action("test.async", handler)
+        bot.start_timers()
+        bot.schedule(0.06, "test.sync", {"n": 3})
+        bot.schedule(0.02, "test.async", {"n": 1})
+        bot.schedule(0.03, "test.sync", {"n": 0}, key="k")
+        bot.schedule(0.04, "test.sync", {"n": 2}, key="k")
+        await asyncio.sleep(0.15)
+        bot._timer_task.cancel()
+        assert ran == [1, 2, 3]
+        assert bot.pending_timers() == []
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_overdue_timers_run_at_start(self, bot):
+        from datetime import datetime, timedelta, timezone
+
+        handler = AsyncMock()
+        bot.add_timer_action("test.unban", handler)
+        now = datetime.now(timezone.utc)
+        rows = [
+            (now - timedelta(hours=2), 7, "test.unban", "a", {"n": 7}),
+            (now + timedelta(hours=1), 8, "test.unban", "b", {"n": 8}),
+        ]
+        with patch.object(bot, "_load_timers", return_value=rows), patch.object(bot, "_delete_timer") as mock_delete:
+            bot.start_timers()
+            await asyncio.sleep(0.05)
+            bot._timer_task.cancel()
+        handler.assert_awaited_once_with(bot, {"n": 7})
+        mock_delete.assert_called_once_with(7)
+        assert [timer[1] for timer in bot.pending_timers()] == [8]
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_timer_without_handler_runs_once_registered(self, bot):
+        bot.db_pool = None
+        bot.start_timers()
+        bot.schedule(0, "test.reloaded", {"n": 1}, key="a")
+        bot.schedule(0, "test.reloaded", {"n": 2}, key="b")
+        await asyncio.sleep(0.02)
+        assert [timer[3] for timer in bot.pending_timers("test.reloaded")] == ["a", "b"]
+        assert bot.cancel_timer("test.reloaded", "b") is True
+
+        handler = AsyncMock()
+        bot.add_timer_action("test.reloaded", handler)
+        await asyncio.sleep(0.02)
+        bot._timer_task.cancel()
+        handler.assert_awaited_once_with(bot, {"n": 1})
+        assert bot.pending_timers() == []
+
+
+class TestKickMany:
+    """Test batched, paced kicks."""
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_kicks_batched_by_targmax_and_paced(self, bot):
+        bot._isupport = {"TARGMAX": "PRIVMSG:4,KICK:3,JOIN:"}
+        bot.config["kick_burst"] = 2
+        bot.rawmsg = AsyncMock()
+        nicks = [f"user{i}" for i in range(8)]
+        with patch("phreakbot_core.events.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            assert await bot.kick_many("#test", nicks, "bye") == 3
+        assert bot.rawmsg.await_args_list[0].args == ("KICK", "#test", "user0,user1,user2", "bye")
+        assert bot.rawmsg.await_args_list[2].args == ("KICK", "#test", "user6,user7", "bye")
+        assert mock_sleep.await_count == 1
+
+    @pytest.mark.unit
+    def test_targmax_defaults_to_one(self, bot):
+        bot._isupport = {}
+        assert bot._targmax("KICK") == 1
+        bot._isupport = {"TARGMAX": "KICK:"}
+        assert bot._targmax("KICK") > 1
+
+
 class TestOnDisconnect:
     """Test on_disconnect event handler."""
 
@@ -648,5 +778,47 @@ class TestRouteToModules:
         assert bot._active_output is None
 
 
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_async_module_output_is_collected(self, bot):
+        """Test awaitables returned by run() are awaited with the event's output."""
+
+        async def run(bot_arg, event):
+            await asyncio.sleep(0)
+            bot_arg.add_response("async result")
+
+        mock_module = Mock()
+        mock_module.run = run
+        bot.modules = {
+            "asyncmod": {
+                "commands": [],
+                "events": ["join"],
+                "permissions": ["user"],
+                "object": mock_module,
+            }
+        }
+        output = []
+        event = {"trigger": "event", "signal": "join"}
+        pending = bot._route_to_modules(event, output)
+        assert len(pending) == 1 and output == []
+        await bot._run_pending(pending, output)
+        assert output == [{"type": "say", "msg": "async result"}]
+        assert bot._active_output is None
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_async_module_error_is_logged(self, bot):
+        """Test a failing async handler does not break output processing."""
+
+        async def run(bot_arg, event):
+            raise RuntimeError("boom")
+
+        bot.logger = Mock()
+        output = []
+        await bot._run_pending([("asyncmod", run(bot, {}))], output)
+        assert output == []
+        bot.logger.error.assert_called()
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
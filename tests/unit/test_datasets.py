@@ -0,0 +1,685 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for background-refreshed datasets, feeds, release watching and
+the local IP-to-ASN, GeoIP, PeeringDB, IX-F and RPKI tables.
+"""
+
+import asyncio
+import gzip
+import ipaddress
+import json
+import os
+import struct
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phreakbot_core.datasets import Dataset, DatasetsMixin
+from phreakbot_core.feeds import FeedManager, parse_feed
+from phreakbot_core.geoip import METADATA_MARKER, GeoIPReader, InvalidDatabaseError
+from phreakbot_core.ixf import IxfIndex, load_export, parse_export
+from phreakbot_core.ipasn import AsnTable, flatten, load_table, parse_prefixes
+from phreakbot_core.peeringdb import PeeringDB, format_speed, load_dump
+from phreakbot_core.releases import latest, parse_releases, watch
+from phreakbot_core.rpki import VrpTable, load_vrps
+from tests.fixtures.ixf import AMSIX_EXPORT, FRYSIX_EXPORT
+from tests.fixtures.peeringdb import PEERINGDB_DUMP
+
+
+IPTOASN = (
+    "1.0.0.0\t1.0.0.255\t13335\tUS\tCLOUDFLARENET\n"
+    "1.0.1.0\t1.0.3.255\t0\tNone\tNot routed\n"
+    "8.8.8.0\t8.8.8.255\t15169\tUS\tGOOGLE\n"
+    "10.0.0.0\t10.0.2.255\t64500\tNL\tEXAMPLE\n"
+    "2001:4860::\t2001:4860:ffff:ffff:ffff:ffff:ffff:ffff\t15169\tUS\tGOOGLE\n"
+)
+
+
+def _response(status, body=b"", headers=None):
+    response = MagicMock()
+    response.status_code = status
+    response.headers = headers or {}
+    response.iter_content.return_value = [body]
+    response.__enter__.return_value = response
+    return response
+
+
+class _Pointer(int):
+    """Data section offset to encode as an MMDB pointer."""
+
+
+def _mmdb_control(kind, size):
+    extended = b""
+    if kind > 7:
+        extended = bytes([kind - 7])
+        kind = 0
+    if size < 29:
+        return bytes([kind << 5 | size]) + extended
+    if size < 285:
+        return bytes([kind << 5 | 29]) + extended + bytes([size - 29])
+    return bytes([kind << 5 | 30]) + extended + (size - 285).to_bytes(2, "big")
+
+
+def _mmdb_encode(value):
+    if isinstance(value, _Pointer):
+        return bytes([1 << 5 | value >> 8, value & 0xFF])
+    if isinstance(value, bool):
+        return _mmdb_control(14, int(value))
+    if isinstance(value, str):
+        data = value.encode("utf-8")
+        return _mmdb_control(2, len(data)) + data
+    if isinstance(value, float):
+        return _mmdb_control(3, 8) + struct.pack(">d", value)
+    if isinstance(value, int):
+        data = value.to_bytes((value.bit_length() + 7) // 8, "big")
+        return _mmdb_control(6 if value < 1 << 32 else 9, len(data)) + data
+    if isinstance(value, dict):
+        return _mmdb_control(7, len(value)) + b"".join(
+            _mmdb_encode(k) + _mmdb_encode(v) for k, v in value.items()
+        )
+    if isinstance(value, list):
+        return _mmdb_control(11, len(value)) + b"".join(_mmdb_encode(v) for v in value)
+    raise TypeError(value)
+
+
+def write_mmdb(path, networks, record_size=24, ip_version=6):
+    """Write a minimal MaxMind DB mapping networks to records."""
+    data = b""
+    offsets = []
+    for _, record in networks:
+        offsets.append(len(data))
+        data += _mmdb_encode(record)
+
+    nodes = [[None, None]]
+    for (network, _), offset in zip(networks, offsets):
+        net = ipaddress.ip_network(network)
+        value, bits, depth = int(net.network_address), net.max_prefixlen, net.prefixlen
+        if ip_version == 6 and net.version == 4:
+            bits, depth = 128, depth + 96
+        node = 0
+        for i in range(depth):
+            bit = (value >> (bits - 1 - i)) & 1
+            if i == depth - 1:
+                nodes[node][bit] = ("data", offset)
+            else:
+                if not isinstance(nodes[node][bit], int):
+                    nodes.append([None, None])
+                    nodes[node][bit] = len(nodes) - 1
+                node = nodes[node][bit]
+
+    count = len(nodes)
+
+    def record_value(child):
+        if child is None:
+            return count
+        if isinstance(child, int):
+            return child
+        return count + 16 + child[1]
+
+    tree = b""
+    for left, right in nodes:
+        left, right = record_value(left), record_value(right)
+        if record_size == 24:
+            tree += left.to_bytes(3, "big") + right.to_bytes(3, "big")
+        elif record_size == 28:
+            tree += (left & 0xFFFFFF).to_bytes(3, "big") + bytes([(left >> 24) << 4 | right >> 24])
+            tree += (right & 0xFFFFFF).to_bytes(3, "big")
+        else:
+            tree += left.to_bytes(4, "big") + right.to_bytes(4, "big")
+
+    metadata = {
+        "node_count": count,
+        "record_size": record_size,
+        "ip_version": ip_version,
+        "database_type": "Test-City",
+        "binary_format_major_version": 2,
+        "binary_format_minor_version": 0,
+        "languages": ["en"],
+    }
+    with open(path, "wb") as f:
+        f.write(tree + bytes(16) + data + METADATA_MARKER + _mmdb_encode(metadata))
+
+
+@pytest.mark.unit
+class TestDataset:
+    """Tests for conditional download and atomic swap."""
+
+    def test_load_only_when_file_changes(self, tmp_path):
+        path = tmp_path / "data.txt"
+        path.write_text("one")
+        loader = MagicMock(side_effect=lambda p: open(p).read())
+        dataset = Dataset("test", str(path), loader)
+        assert dataset.value is None
+        assert dataset.load()
+        assert not dataset.load()
+        assert dataset.value == "one"
+        path.write_text("two")
+        os.utime(path, (1, 1))
+        assert dataset.load()
+        assert dataset.value == "two"
+        assert loader.call_count == 2
+
+    def test_failed_load_keeps_old_value(self, tmp_path):
+        path = tmp_path / "data.txt"
+        path.write_text("good")
+        dataset = Dataset("test", str(path), lambda p: open(p).read())
+        dataset.refresh()
+        dataset.loader = MagicMock(side_effect=ValueError("corrupt"))
+        os.utime(path, (1, 1))
+        assert not dataset.refresh()
+        assert dataset.value == "good"
+
+    def test_run_forever_serves_local_copy_before_download(self, tmp_path):
+        path = tmp_path / "data.txt"
+        path.write_text("cached")
+        dataset = Dataset("test", str(path), lambda p: open(p).read(), url="https://example.com/data")
+        seen = []
+
+        def download():
+            seen.append(dataset.value)
+            raise OSError("offline")
+
+        dataset.download = download
+
+        async def run_once():
+            with patch("phreakbot_core.datasets.asyncio.sleep", side_effect=asyncio.CancelledError):
+                with pytest.raises(asyncio.CancelledError):
+                    await dataset.run_forever()
+
+        asyncio.run(run_once())
+        assert seen == ["cached"]
+        assert dataset.value == "cached"
+
+    def test_re_adding_dataset_replaces_refresh_task(self):
+        bot = DatasetsMixin()
+        bot.datasets = {}
+        bot._dataset_tasks = {}
+        old_task = MagicMock()
+        bot._dataset_tasks["test"] = old_task
+        bot.datasets["test"] = Dataset("test", "old", str)
+        with patch.object(DatasetsMixin, "_start_dataset") as start:
+            new = bot.add_dataset(Dataset("test", "new", str))
+        old_task.cancel.assert_called_once()
+        start.assert_called_once_with(new)
+        assert bot.datasets["test"] is new
+
+    def test_download_sends_validators(self, tmp_path):
+        path = tmp_path / "data.txt"
+        dataset = Dataset("test", str(path), lambda p: open(p).read(), url="https://example.com/data")
+        first = _response(200, b"payload", {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2026 00:00:00 GMT"})
+        with patch("phreakbot_core.datasets.requests.get", return_value=first):
+            assert dataset.download()
+        assert path.read_text() == "payload"
+
+        with patch("phreakbot_core.datasets.requests.get", return_value=_response(304)) as mock_get:
+            assert not dataset.download()
+        headers = mock_get.call_args[1]["headers"]
+        assert headers["If-None-Match"] == '"v1"'
+        assert headers["If-Modified-Since"] == "Mon, 01 Jan 2026 00:00:00 GMT"
+
+
+@pytest.mark.unit
+class TestAsnTable:
+    """Tests for importing routing dumps and longest-prefix match."""
+
+    def test_flatten_nested_ranges(self):
+        ranges = flatten([(0, 255, "outer"), (16, 31, "inner"), (20, 23, "innermost")])
+        assert ranges == [
+            (0, 15, "outer"),
+            (16, 19, "inner"),
+            (20, 23, "innermost"),
+            (24, 31, "inner"),
+            (32, 255, "outer"),
+        ]
+
+    def test_iptoasn_lookup(self, tmp_path):
+        path = tmp_path / "ip2asn.tsv.gz"
+        with gzip.open(path, "wt") as f:
+            f.write(IPTOASN)
+        table = load_table(str(path))
+        info = table.lookup("8.8.8.8")
+        assert (info.prefix, info.asn, info.name, info.country) == ("8.8.8.0/24", 15169, "GOOGLE", "US")
+        assert table.lookup("2001:4860:4860::8888").prefix == "2001:4860::/32"
+        # Unrouted and uncovered addresses
+        assert table.lookup("1.0.2.1") is None
+        assert table.lookup("9.9.9.9") is None
+        assert table.lookup("not-an-ip") is None
+
+    def test_unaligned_range_gives_covering_block(self):
+        table = AsnTable([(4, 0x0A000000, 0x0A0002FF, 0x0A000000, 255, 64500, "NL", "EXAMPLE")])
+        assert table.lookup("10.0.1.7").prefix == "10.0.0.0/23"
+        assert table.lookup("10.0.2.7").prefix == "10.0.2.0/24"
+
+    def test_more_specific_prefix_wins(self):
+        lines = [
+            "TABLE_DUMP2|1700000000|B|192.0.2.1|64496|203.0.0.0/16|64496 64510|IGP",
+            "TABLE_DUMP2|1700000000|B|192.0.2.1|64496|203.0.113.0/24|64496 {64511,64512}|IGP",
+            "2001:db8::/32\t64499",
+        ]
+        table = AsnTable(parse_prefixes(lines))
+        assert table.lookup_asn("203.0.113.9") == 64511
+        assert table.lookup("203.0.114.1").prefix == "203.0.0.0/16"
+        assert table.lookup_asn("2001:db8::1") == 64499
+
+    def test_bucket_slots_match_linear_search(self):
+        import random
+
+        rng = random.Random(5)
+        entries = []
+        for _ in range(300):
+            length = rng.choice((8, 10, 11, 12, 16, 24))
+            start = rng.getrandbits(length) << (32 - length)
+            entries.append((4, start, start | ((1 << (32 - length)) - 1), start, length, rng.randrange(1, 1000), "", ""))
+        table = AsnTable(entries)
+        # The first origin of a repeated prefix wins
+        first = {}
+        for e in entries:
+            first.setdefault((e[1], e[2]), e[5])
+        ranges = flatten((start, end, asn) for (start, end), asn in first.items())
+        probes = [rng.getrandbits(32) for _ in range(2000)]
+        probes += [r[0] for r in ranges] + [r[1] for r in ranges] + [r[1] + 1 for r in ranges if r[1] < 2**32 - 1]
+        for value in probes:
+            expected = next((asn for start, end, asn in ranges if start <= value <= end), None)
+            address = str(ipaddress.IPv4Address(value))
+            assert table.lookup_asn(address) == expected, address
+
+
+@pytest.mark.unit
+class TestGeoIPReader:
+    """Tests for the memory-mapped MaxMind DB reader."""
+
+    NL = {"iso_code": "NL", "names": {"en": "Netherlands", "de": "Niederlande"}}
+
+    def _networks(self):
+        return [
+            (
+                "192.0.2.0/24",
+                {
+                    "city": {"names": {"en": "Amsterdam"}},
+                    "country": self.NL,
+                    "location": {"latitude": 52.37, "longitude": 4.89, "accuracy_radius": 20},
+                    "subdivisions": [{"names": {"en": "North Holland"}}],
+                    "traits": {"is_anycast": True},
+                },
+            ),
+            ("198.51.100.0/25", {"registered_country": {"iso_code": "US", "names": {"en": "United States"}}}),
+            ("2001:db8::/32", {"country": {"iso_code": "DE", "names": {"en": "Germany"}}}),
+        ]
+
+    @pytest.mark.parametrize("record_size", [24, 28, 32])
+    def test_lookup_record_sizes(self, tmp_path, record_size):
+        path = tmp_path / "test.mmdb"
+        write_mmdb(str(path), self._networks(), record_size=record_size)
+        reader = GeoIPReader(str(path))
+        record = reader.lookup("192.0.2.77")
+        assert record["city"]["names"]["en"] == "Amsterdam"
+        assert record["location"]["latitude"] == 52.37
+        assert record["traits"]["is_anycast"] is True
+        assert reader.country("2001:db8:1::1") == ("DE", "Germany")
+        assert reader.lookup("198.51.100.200") is None
+        assert reader.lookup("2001:db9::1") is None
+
+    def test_country_and_location(self, tmp_path):
+        path = tmp_path / "test.mmdb"
+        write_mmdb(str(path), self._networks())
+        reader = GeoIPReader(str(path))
+        assert reader.location("192.0.2.1") == "Amsterdam, North Holland, Netherlands"
+        assert reader.country("198.51.100.1") == ("US", "United States")
+        assert reader.location("198.51.100.1") == "United States"
+        # Repeated lookups share the cached record
+        assert reader.lookup("192.0.2.1") is reader.lookup("192.0.2.254")
+
+    def test_ipv4_only_database(self, tmp_path):
+        path = tmp_path / "v4.mmdb"
+        write_mmdb(str(path), self._networks()[:2], ip_version=4)
+        reader = GeoIPReader(str(path))
+        assert reader.country("192.0.2.1") == ("NL", "Netherlands")
+        with pytest.raises(ValueError):
+            reader.lookup("2001:db8::1")
+
+    def test_pointer_and_extended_types(self, tmp_path):
+        path = tmp_path / "test.mmdb"
+        # The second record points at the first record's country map, which
+        # starts after the first record's one-byte map header and "country" key
+        country_offset = 1 + len(_mmdb_encode("country"))
+        write_mmdb(
+            str(path),
+            [
+                ("10.0.0.0/8", {"country": self.NL}),
+                ("11.0.0.0/8", {"country": _Pointer(country_offset), "big": 1 << 40, "list": [1, "x"]}),
+            ],
+        )
+        record = GeoIPReader(str(path)).lookup("11.1.2.3")
+        assert record["country"]["iso_code"] == "NL"
+        assert record["big"] == 1 << 40
+        assert record["list"] == [1, "x"]
+
+    def test_invalid_input(self, tmp_path):
+        path = tmp_path / "test.mmdb"
+        write_mmdb(str(path), self._networks())
+        with pytest.raises(ValueError):
+            GeoIPReader(str(path)).lookup("not-an-ip")
+        bogus = tmp_path / "bogus.mmdb"
+        bogus.write_bytes(b"\x00" * 64)
+        with pytest.raises(InvalidDatabaseError):
+            GeoIPReader(str(bogus))
+
+    def test_hot_swap_through_dataset(self, tmp_path):
+        path = tmp_path / "test.mmdb"
+        write_mmdb(str(path), self._networks())
+        dataset = Dataset("geoip", str(path), GeoIPReader)
+        dataset.refresh()
+        assert dataset.value.country("2001:db8::1") == ("DE", "Germany")
+
+        new_path = tmp_path / "new.mmdb"
+        write_mmdb(str(new_path), [("2001:db8::/32", {"country": self.NL})])
+        os.replace(new_path, path)
+        os.utime(path, (1, 1))
+        dataset.refresh()
+        assert dataset.value.country("2001:db8::1") == ("NL", "Netherlands")
+
+
+@pytest.mark.unit
+class TestPeeringDB:
+    """Tests for the indexed PeeringDB snapshot."""
+
+    def test_indexes(self):
+        db = PeeringDB(PEERINGDB_DUMP)
+        assert len(db) == 2
+        assert db.network("13335").name == "Cloudflare"
+        assert db.network(64501) is None
+        assert db.organization(db.network(13335)).country == "US"
+        assert db.facilities_of(13335)[0].name == "Equinix AM7"
+        exchanges = db.exchanges_of(13335)
+        assert [(ix.name, len(conns)) for ix, conns in exchanges] == [("AMS-IX", 2), ("Frys-IX", 1)]
+        assert db.connections(13335, ix_id=101)[0].ipaddr6 == "2001:7f8:10f::1"
+
+    def test_name_prefix_search(self):
+        db = PeeringDB(PEERINGDB_DUMP)
+        assert [net.asn for net in db.search("clou", kind="net")] == [13335, 64500]
+        assert [net.asn for net in db.search("CF")] == [13335]
+        assert [ix.name for ix in db.search("am", kind="ix")] == ["AMS-IX"]
+        assert db.search("amsterdam internet")[0].id == 100
+        assert db.search("") == []
+        assert db.find_exchange("frys-ix").id == 101
+
+    def test_load_gzip_dump(self, tmp_path):
+        path = tmp_path / "peeringdb.json"
+        with gzip.open(path, "wt") as f:
+            json.dump(PEERINGDB_DUMP, f)
+        assert load_dump(str(path)).network(64500).name == "Cloudy Networks"
+
+    def test_format_speed(self):
+        assert format_speed(100) == "100M"
+        assert format_speed(100000) == "100G"
+        assert format_speed(1600000) == "1.6T"
+        assert format_speed(0) == "?"
+
+
+@pytest.mark.unit
+class TestIxfIndex:
+    """Tests for the multi-exchange IX-F member index."""
+
+    def _index(self):
+        return IxfIndex([parse_export(FRYSIX_EXPORT, "Frys-IX"), parse_export(AMSIX_EXPORT, "AMS-IX")])
+
+    def test_parse_export(self, tmp_path):
+        path = tmp_path / "ixf.json"
+        path.write_text(json.dumps(FRYSIX_EXPORT))
+        export = load_export(str(path), "Frys-IX")
+        assert len(export) == 2
+        member = export.members[0]
+        assert (member.asn, member.ixp.name, member.speeds) == (64500, "Frys-IX", [10000])
+        assert member.addresses == ["185.1.203.10", "2001:7f8:10f::fbe4:10"]
+        assert (member.max_prefix4, member.max_prefix6) == (100, 20)
+        assert export.ixps[0].lans == ("185.1.203.0/24", "2001:7f8:10f::/64")
+        assert not hasattr(member, "__dict__")
+        with pytest.raises(ValueError):
+            parse_export({"member_list": []})
+
+    def test_by_asn(self):
+        index = self._index()
+        assert index.ixps_of(64500) == ["Frys-IX", "AMS-IX"]
+        assert [m.ixp.name for m in index.members("64500", ixp="AMS-IX")] == ["AMS-IX"]
+        assert index.members(1) == []
+
+    def test_find_address(self):
+        index = self._index()
+        member, ixp = index.find_address("80.249.208.12")
+        assert (member.asn, ixp.name) == (64502, "AMS-IX")
+        assert index.find_address("2001:7f8:10f:0:0::fbe4:10")[0].asn == 64500
+        assert index.find_address("80.249.215.1") == (None, index.ixps[1])
+        assert index.find_address("192.0.2.1") == (None, None)
+        with pytest.raises(ValueError):
+            index.find_address("example")
+
+    def test_name_search(self):
+        index = self._index()
+        assert [(m.asn, m.ixp.name) for m in index.search("EX")] == [
+            (64500, "AMS-IX"), (64500, "Frys-IX"), (64501, "Frys-IX")
+        ]
+        assert [m.asn for m in index.search("exam", ixp="Frys-IX", limit=1)] == [64500]
+        assert index.search("zzz") == []
+
+
+@pytest.mark.unit
+class TestVrpTable:
+    """Tests for RFC 6811 origin validation against local VRPs."""
+
+    def _table(self):
+        return VrpTable(
+            [
+                ("192.0.2.0/24", 24, 64496),
+                ("198.51.100.0/22", 24, 64497),
+                ("198.51.100.0/22", 22, 64498),
+                ("203.0.113.0/24", 24, 0),
+                ("2001:db8::/32", 48, 64499),
+            ]
+        )
+
+    def test_valid(self):
+        result = self._table().validate("198.51.101.0/24", 64497)
+        assert result.state == "valid"
+        assert result.matched[0].prefix == "198.51.100.0/22"
+
+    def test_invalid_length(self):
+        assert self._table().validate("198.51.101.0/24", 64498).state == "invalid-length"
+        assert self._table().validate("2001:db8:1::/56", "AS64499").state == "invalid-length"
+
+    def test_invalid_asn(self):
+        assert self._table().validate("192.0.2.0/24", 64511).state == "invalid-asn"
+
+    def test_as0_vrp_makes_everything_invalid(self):
+        assert self._table().validate("203.0.113.0/24", 0).state == "invalid-asn"
+
+    def test_not_found(self):
+        assert self._table().validate("10.0.0.0/8", 64496).state == "not-found"
+
+    def test_parse_asn(self):
+        from phreakbot_core.asn import parse_asn
+
+        assert [parse_asn(v) for v in (13335, "13335", " as13335 ", "AS13335")] == [13335] * 4
+        with pytest.raises(ValueError):
+            parse_asn("AS-CLOUDFLARE")
+        # A more specific VRP does not cover a less specific route
+        assert self._table().validate("192.0.0.0/16", 64496).state == "not-found"
+
+    def test_load_json_and_csv(self, tmp_path):
+        json_file = tmp_path / "vrps.json"
+        json_file.write_text(
+            '{"metadata": {}, "roas": [{"asn": "AS13335", "prefix": "1.0.0.0/24", "maxLength": 24, "ta": "apnic"},'
+            ' {"asn": 15169, "prefix": "8.8.8.0/24", "maxLength": 24}]}'
+        )
+        csv_file = tmp_path / "vrps.csv"
+        csv_file.write_text("ASN,IP Prefix,Max Length,Trust Anchor\nAS13335,1.0.0.0/24,24,apnic\n")
+        assert len(load_vrps(str(json_file))) == 2
+        table = load_vrps(str(csv_file))
+        assert len(table) == 1
+        assert table.validate("1.0.0.0/24", 13335).state == "valid"
+
+
+RSS = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>News</title>
+<item><title><![CDATA[Third & last]]></title><link>https://example.net/3</link><guid>n3</guid></item>
+<item><title>Second</title><link>https://example.net/2</link><guid>n2</guid></item>
+<item><title>First</title><link>https://example.net/1</link><guid>n1</guid></item>
+</channel></rss>"""
+
+ATOM = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"><title>Blog</title>
+<entry><title>Post</title><id>tag:example.net,2024:1</id>
+<link rel="edit" href="https://example.net/edit/1"/><link href="https://example.net/post/1"/>
+<updated>2024-01-01T00:00:00Z</updated></entry>
+</feed>"""
+
+
+class TestFeeds:
+    """Tests for feed parsing and the seen-set."""
+
+    def test_parse_rss_in_chunks(self):
+        chunks = [RSS[i:i + 7] for i in range(0, len(RSS), 7)]
+        items = parse_feed(chunks)
+        assert [item.id for item in items] == ["n3", "n2", "n1"]
+        assert items[0].title == "Third & last"
+        assert items[0].link == "https://example.net/3"
+
+    def test_parse_stops_at_max_items(self):
+        assert len(parse_feed([RSS], max_items=2)) == 2
+
+    def test_parse_atom(self):
+        (item,) = parse_feed([ATOM])
+        assert item.id == "tag:example.net,2024:1"
+        assert item.link == "https://example.net/post/1"
+        assert item.published == "2024-01-01T00:00:00Z"
+
+    def test_parse_invalid(self):
+        with pytest.raises(ValueError):
+            parse_feed([b"<html><body>"])
+
+    def test_poll_announces_only_new_items(self, tmp_path):
+        state_path = str(tmp_path / "state.json")
+        manager = FeedManager(state_path)
+        feed = manager.add_feed("news", "https://example.net/rss", channels=["#c"])
+        older = RSS.replace(b"<item><title><![CDATA[Third & last]]></title><link>https://example.net/3</link><guid>n3</guid></item>", b"")
+
+        with patch("phreakbot_core.feeds.safe_get", return_value=_response(200, older, {"ETag": '"v1"'})):
+            assert manager.poll(feed) == []  # first fetch only fills the seen-set
+        with patch("phreakbot_core.feeds.safe_get", return_value=_response(200, RSS, {"ETag": '"v2"'})) as mock_get:
+            new = manager.poll(feed)
+        assert [item.id for item in new] == ["n3"]
+        assert mock_get.call_args.kwargs["headers"]["If-None-Match"] == '"v1"'
+
+        # A restart keeps the validators and the seen-set, but the items
+        # are not stored, so the first fetch asks for the full feed
+        manager = FeedManager(state_path)
+        feed = manager.add_feed("news", "https://example.net/rss")
+        assert feed.etag == '"v2"'
+        with patch("phreakbot_core.feeds.safe_get", return_value=_response(200, RSS, {"ETag": '"v2"'})) as mock_get:
+            assert manager.poll(feed) == []
+        assert "If-None-Match" not in mock_get.call_args.kwargs["headers"]
+        assert [item.id for item in manager.items("news")] == ["n3", "n2", "n1"]
+        with patch("phreakbot_core.feeds.safe_get", return_value=_response(304)) as mock_get:
+            assert manager.poll(feed) == []
+        assert mock_get.call_args.kwargs["headers"]["If-None-Match"] == '"v2"'
+        assert len(manager.items("news")) == 3
+
+    def test_announce_and_config(self, tmp_path):
+        manager = FeedManager(str(tmp_path / "state.json"))
+        manager.add_feed("news", "https://example.net/rss", interval=600, channels=["#a"])
+        manager.subscribe("news", "#b")
+        manager.add_feed("news", "https://other.example/rss")
+        assert manager.to_config() == {
+            "news": {"url": "https://example.net/rss", "interval": 600, "channels": ["#a", "#b"]}
+        }
+
+        sent = []
+
+        async def send(target, text):
+            sent.append((target, text))
+
+        manager.send = send
+        items = parse_feed([RSS])
+        asyncio.run(manager.announce(manager.feeds["news"], items[:1]))
+        assert sent == [
+            ("#a", "📰 [news] Third & last - https://example.net/3"),
+            ("#b", "📰 [news] Third & last - https://example.net/3"),
+        ]
+
+
+def _github_release(tag, published, prerelease=False, draft=False):
+    return {
+        "name": tag,
+        "tag_name": tag,
+        "published_at": published,
+        "html_url": f"https://github.com/example/project/releases/tag/{tag}",
+        "target_commitish": "dev" if prerelease else "release",
+        "prerelease": prerelease,
+        "draft": draft,
+    }
+
+
+class TestReleases:
+    """Tests for the GitHub release watcher."""
+
+    def test_parse_releases(self):
+        info = parse_releases([
+            _github_release("2024.2.0", "2024-02-01T00:00:00Z"),
+            _github_release("2024.3.0b1", "2024-02-20T00:00:00Z", prerelease=True),
+            _github_release("2024.3.0", "2024-03-01T00:00:00Z", draft=True),
+            _github_release("2024.2.0b1", "2024-01-20T00:00:00Z", prerelease=True),
+        ])
+        assert info.stable.tag == "2024.2.0"
+        assert info.dev.tag == "2024.3.0b1"
+        assert parse_releases([_github_release("1.0", "2024-01-01T00:00:00Z")]).dev is None
+        with pytest.raises(ValueError):
+            parse_releases({"message": "API rate limit exceeded"})
+
+    def test_watch_registers_dataset_and_announces(self, tmp_path):
+        bot = DatasetsMixin()
+        bot.datasets = {}
+        bot._dataset_tasks = None
+        bot.logger = MagicMock()
+        bot.config = {"github_token": "t0ken", "release_announce": {"example/project": ["#c"]}}
+        sent = []
+
+        async def message(target, text):
+            sent.append((target, text))
+
+        bot.message = message
+        dataset = watch(bot, "example/project", "Project")
+        assert watch(bot, "example/project") is dataset
+        assert dataset.headers["Authorization"] == "Bearer t0ken"
+        assert dataset.url.startswith("https://api.github.com/repos/example/project/releases")
+        assert latest(bot, "example/project") is None
+
+        dataset.path = str(tmp_path / "releases.json")
+        releases = [_github_release("1.0", "2024-01-01T00:00:00Z")]
+
+        def download():
+            with open(dataset.path, "w") as f:
+                json.dump(releases, f)
+            os.utime(dataset.path, (len(releases), len(releases)))
+
+        dataset.download = download
+
+        async def run_once():
+            with patch("phreakbot_core.datasets.asyncio.sleep", side_effect=asyncio.CancelledError):
+                with pytest.raises(asyncio.CancelledError):
+                    await dataset.run_forever()
+
+        asyncio.run(run_once())
+        assert latest(bot, "example/project").stable.tag == "1.0"
+        assert sent == []  # the first load is not a new release
+
+        releases.insert(0, _github_release("1.1", "2024-02-01T00:00:00Z"))
+        asyncio.run(run_once())
+        assert latest(bot, "example/project").stable.tag == "1.1"
+        assert sent == [("#c", "New Project release 1.1: https://github.com/example/project/releases/tag/1.1")]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
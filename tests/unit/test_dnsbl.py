@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the concurrent DNSBL checker.
+"""
+
+import asyncio
+import os
+import sys
+from unittest.mock import Mock
+
+import dns.exception
+import dns.resolver
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phreakbot_core.dnsbl import DnsblChecker, decode_answer, reverse_address
+
+
+def _answer(codes, ttl=900):
+    answer = Mock()
+    answer.rrset = Mock(ttl=ttl)
+    answer.__iter__ = Mock(return_value=iter([Mock(address=c) for c in codes]))
+    return answer
+
+
+def _checker(listings, zones=("zen.spamhaus.org", "bl.spamcop.net"), **kwargs):
+    """Checker whose resolver answers from {qname: codes or exception}."""
+    checker = DnsblChecker(zones=zones, **kwargs)
+    backend = Mock()
+    backend.calls = []
+
+    async def fake_resolve(qname, rdtype, search=False):
+        backend.calls.append(qname)
+        await asyncio.sleep(0)
+        entry = listings.get(qname)
+        if entry is None:
+            raise dns.resolver.NXDOMAIN()
+        if isinstance(entry, Exception):
+            raise entry
+        return _answer(entry)
+
+    backend.resolve = fake_resolve
+    checker._resolver = backend
+    return checker, backend
+
+
+@pytest.mark.unit
+class TestDnsbl:
+    """Tests for address reversal, return code decoding and caching."""
+
+    def test_reverse_ipv4(self):
+        assert reverse_address("192.0.2.1") == "1.2.0.192"
+
+    def test_reverse_ipv6_nibbles(self):
+        label = reverse_address("2001:db8::1")
+        assert label.startswith("1.0.0.0.")
+        assert label.endswith(".8.b.d.0.1.0.0.2")
+        assert len(label.split(".")) == 32
+
+    def test_reverse_invalid(self):
+        with pytest.raises(ValueError):
+            reverse_address("not-an-ip")
+
+    def test_decode_spamhaus_codes(self):
+        result = decode_answer("zen.spamhaus.org", ["127.0.0.2", "127.0.0.11"])
+        assert result.listed
+        assert result.reasons == ("SBL spam source", "PBL Spamhaus policy")
+
+    def test_decode_error_code_is_not_listing(self):
+        result = decode_answer("zen.spamhaus.org", ["127.255.255.254"])
+        assert not result.listed
+        assert "public resolver" in result.error
+
+    def test_decode_unknown_zone_reports_raw_code(self):
+        result = decode_answer("dnsbl.example.net", ["127.0.0.4"])
+        assert result.listed and result.reasons == ("127.0.0.4",)
+
+    def test_check_queries_every_zone(self):
+        checker, backend = _checker({"2.0.0.127.zen.spamhaus.org.": ["127.0.0.4"]})
+        results = asyncio.run(checker.check("127.0.0.2"))
+        assert [r.zone for r in results] == ["zen.spamhaus.org", "bl.spamcop.net"]
+        assert results[0].listed and results[0].reasons == ("XBL exploited host",)
+        assert not results[1].listed and results[1].error is None
+        assert len(backend.calls) == 2
+
+    def test_check_many_keeps_order(self):
+        checker, _ = _checker({"2.2.0.192.bl.spamcop.net.": ["127.0.0.2"]}, zones=("bl.spamcop.net",))
+        results = asyncio.run(checker.check_many(["192.0.2.1", "192.0.2.2"]))
+        assert [r[0].listed for r in results] == [False, True]
+
+    def test_results_are_cached(self):
+        checker, backend = _checker({"2.0.0.127.zen.spamhaus.org.": ["127.0.0.2"]})
+        asyncio.run(checker.check("127.0.0.2"))
+        asyncio.run(checker.check("127.0.0.2"))
+        assert len(backend.calls) == 2
+        assert len(checker) == 2
+
+    def test_timeouts_are_not_cached(self):
+        checker, backend = _checker(
+            {"1.2.0.192.bl.spamcop.net.": dns.exception.Timeout()}, zones=("bl.spamcop.net",)
+        )
+        result = asyncio.run(checker.check("192.0.2.1"))[0]
+        assert result.error == "timeout"
+        asyncio.run(checker.check("192.0.2.1"))
+        assert len(backend.calls) == 2
+
+    def test_from_config(self):
+        checker = DnsblChecker.from_config({"rbl_zones": ["dnsbl.example.net."]})
+        assert checker.zones == ("dnsbl.example.net",)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
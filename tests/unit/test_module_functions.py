@@ -6,15 +6,18 @@ Unit tests for individual PhreakBot modules.
 Tests ASN, MAC, IP, Karma, Quotes, and URLs modules with mocked dependencies.
 """
 
+import asyncio
 import sys
 import os
 from datetime import datetime
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from phreakbot_core.url_meta import UrlMetaCache
+
 
 @pytest.fixture
 def mock_bot():
@@ -22,6 +25,7 @@ def mock_bot():
     bot = Mock()
     bot._active_output = []
     bot.logger = Mock()
+    bot.config = {"max_output_lines": 3}
 
     def add_response(msg, private=False):
         bot._active_output.append({"type": "private" if private else "say", "msg": msg})
@@ -31,6 +35,10 @@ def mock_bot():
 
     bot.add_response = Mock(side_effect=add_response)
     bot.reply = Mock(side_effect=reply)
+    bot.url_cache = UrlMetaCache()
+    bot.oui_db = None
+    bot.dataset = Mock(return_value=None)
+    bot._cache_get = Mock(return_value=None)
     return bot
 
 
@@ -132,6 +140,20 @@ class TestAsnModule:
             asn.lookup_asn_by_ip(mock_bot, "8.8.8.8")
         assert any("Error looking up ASN" in r["msg"] for r in mock_bot._active_output)
 
+    def test_lookup_asn_by_ip_local_table(self, mock_bot):
+        from modules import asn
+        from phreakbot_core.ipasn import AsnTable, parse_prefixes
+        table = AsnTable(parse_prefixes(["8.8.8.0/24 15169"]))
+        table.names[15169] = "GOOGLE"
+        mock_bot.dataset = Mock(return_value=table)
+        with patch("modules.asn.requests.get") as mock_get:
+            asn.lookup_asn_by_ip(mock_bot, "8.8.8.8")
+            asn.lookup_asn_by_ip(mock_bot, "9.9.9.9")
+        mock_get.assert_not_called()
+        messages = [r["msg"] for r in mock_bot._active_output]
+        assert "AS15169 (GOOGLE) | Prefix: 8.8.8.0/24" in messages[0]
+        assert "not announced" in messages[1]
+
     def test_lookup_asn_by_number_success(self, mock_bot):
         from modules import asn
         mock_resp = Mock()
@@ -157,6 +179,21 @@ class TestAsnModule:
             asn.lookup_asn_by_number(mock_bot, "15169")
         assert any("Google LLC" in r["msg"] and "US" in r["msg"] for r in mock_bot._active_output)
 
+    def test_lookup_asn_by_number_from_peeringdb(self, mock_bot):
+        from modules import asn
+        from phreakbot_core.peeringdb import PeeringDB
+        from tests.fixtures.peeringdb import PEERINGDB_DUMP
+        mock_bot.dataset = Mock(side_effect=lambda name: PeeringDB(PEERINGDB_DUMP) if name == "peeringdb" else None)
+        with patch("modules.asn.requests.get") as mock_get:
+            asn.lookup_asn_by_number(mock_bot, "13335")
+            asn.run(mock_bot, {"command": "asn", "command_args": "cloud"})
+        mock_get.assert_not_called()
+        messages = [r["msg"] for r in mock_bot._active_output]
+        assert messages[0] == (
+            "ASN Lookup for AS13335: Cloudflare | Country: US | Policy: Open | IXPs: 2 (see !peering AS13335)"
+        )
+        assert messages[1] == "Networks matching 'cloud': Cloudflare (AS13335), Cloudy Networks (AS64500)"
+
     def test_lookup_asn_by_number_status_not_ok(self, mock_bot):
         from modules import asn
         mock_resp = Mock()
@@ -188,6 +225,325 @@ class TestAsnModule:
         assert result == "Unknown"
 
 
+@pytest.mark.unit
+class TestLockdownModule:
+    """Tests for the lockdown module."""
+
+    def test_find_registered_in_one_query(self, mock_bot, mock_db_conn, mock_db_cursor):
+        from modules import lockdown
+        mock_bot.db_get = Mock(return_value=mock_db_conn)
+        mock_bot.user_hostmasks = {"alice": "Alice!a@host", "mallory": "Mallory!m@evil"}
+        mock_db_cursor.fetchall.return_value = [("alice!a@host",), ("bob",)]
+        registered = lockdown.find_registered(mock_bot, ["Alice", "Bob", "Mallory", "Eve"])
+        assert registered == {"Alice", "Bob"}
+        mock_db_cursor.execute.assert_called_once()
+        assert mock_db_cursor.execute.call_args[0][1] == (
+            ["alice!a@host", "mallory!m@evil"],
+            ["alice", "bob", "mallory", "eve"],
+        )
+
+    def test_lockdown_kicks_unregistered_in_background(self, mock_bot):
+        from unittest.mock import AsyncMock
+        from modules import lockdown
+        mock_bot.nickname = "TestBot"
+        mock_bot.channels = {"#c": {"users": {"TestBot", "Alice", "Eve"}}}
+        mock_bot.set_mode = AsyncMock()
+        mock_bot.kick_many = AsyncMock(return_value=1)
+
+        async def run():
+            with patch("modules.lockdown.find_registered", return_value={"Alice"}):
+                await lockdown.run(mock_bot, {"command": "lockdown", "channel": "#c"})
+            assert len(lockdown._kick_tasks) == 1
+            await asyncio.gather(*lockdown._kick_tasks)
+            await asyncio.sleep(0)
+            assert not lockdown._kick_tasks
+
+        asyncio.run(run())
+        mock_bot.set_mode.assert_awaited_once_with("#c", "+im")
+        mock_bot.kick_many.assert_awaited_once_with("#c", ["Eve"], lockdown.KICK_REASON)
+        assert "Kicking 1 unregistered users" in mock_bot._active_output[-1]["msg"]
+
+    def test_lockdown_kicks_nobody_without_database(self, mock_bot):
+        from unittest.mock import AsyncMock
+        from modules import lockdown
+        mock_bot.nickname = "TestBot"
+        mock_bot.channels = {"#c": {"users": {"Eve"}}}
+        mock_bot.set_mode = AsyncMock()
+        mock_bot.kick_many = AsyncMock()
+        mock_bot.db_get = Mock(return_value=None)
+        asyncio.run(lockdown.run(mock_bot, {"command": "lockdown", "channel": "#c"}))
+        mock_bot.kick_many.assert_not_awaited()
+        assert "nobody was kicked" in mock_bot._active_output[-1]["msg"]
+
+
+
+class TestKickbanModule:
+    """Tests for tempbans on the timer service."""
+
+    def test_tempban_schedules_persistent_unban(self, mock_bot):
+        from modules import kickban
+        kickban.config(mock_bot)
+        mock_bot.add_timer_action.assert_called_once_with(kickban.UNBAN_ACTION, kickban._timed_unban)
+        kickban._schedule_unban(mock_bot, "#c", "*!*@Host", 30)
+        mock_bot.schedule.assert_called_once_with(
+            1800, kickban.UNBAN_ACTION, {"channel": "#c", "hostmask": "*!*@Host"}, key="#c:*!*@host"
+        )
+
+    def test_timed_unban(self, mock_bot):
+        from unittest.mock import AsyncMock
+        from modules import kickban
+        mock_bot.set_mode = AsyncMock()
+        mock_bot.message = AsyncMock()
+        asyncio.run(kickban._timed_unban(mock_bot, {"channel": "#c", "hostmask": "*!*@host"}))
+        mock_bot.set_mode.assert_awaited_once_with("#c", "-b", "*!*@host")
+        mock_bot.message.assert_awaited_once_with("#c", "Auto-unban: *!*@host has been unbanned")
+
+
+class TestBirthdayModule:
+    """Tests for indexed birthday ranges and the daily announcement."""
+
+    def test_upcoming_range_wraps_at_year_end(self, mock_db_cursor):
+        from datetime import date
+        from modules import birthday
+        birthday._birthdays_between(mock_db_cursor, date(2025, 12, 20), 30)
+        sql, params = mock_db_cursor.execute.call_args[0]
+        assert birthday.BIRTHDAY_KEY in sql and " OR " in sql
+        assert params == (1220, 119, 1220)
+
+        birthday._birthdays_between(mock_db_cursor, date(2025, 2, 28), 0)
+        sql, params = mock_db_cursor.execute.call_args[0]
+        assert "BETWEEN" in sql
+        assert params == (228, 229, 228)
+
+    def test_next_birthday_of_leap_day(self):
+        from datetime import date
+        from modules import birthday
+        assert birthday._next_birthday(date(2000, 2, 29), date(2025, 3, 1)) == date(2026, 2, 28)
+        assert birthday._next_birthday(date(2000, 2, 29), date(2027, 3, 1)) == date(2028, 2, 29)
+
+    def test_todays_birthdays_queried_once(self, mock_bot, mock_db_conn, mock_db_cursor):
+        from datetime import date
+        from modules import birthday
+        mock_bot.state = {}
+        mock_bot.db_get = Mock(return_value=mock_db_conn)
+        today = date.today()
+        mock_db_cursor.fetchall.return_value = [("alice", date(today.year - 30, today.month, today.day))]
+        assert birthday._todays_birthdays(mock_bot) == [("alice", 30)]
+        assert birthday._todays_birthdays(mock_bot) == [("alice", 30)]
+        mock_db_cursor.execute.assert_called_once()
+
+    def test_daily_announcement_reschedules(self, mock_bot):
+        from unittest.mock import AsyncMock
+        from modules import birthday
+        mock_bot.config = {"channels": ["#a", "#b"]}
+        mock_bot.message = AsyncMock()
+        with patch("modules.birthday._todays_birthdays", return_value=[("alice", 30)]):
+            asyncio.run(birthday._announce_birthdays(mock_bot, {}))
+        assert mock_bot.message.await_count == 4
+        mock_bot.message.assert_any_await("#b", "Happy 30th Birthday to alice! 🎉🎈🎁")
+        args, kwargs = mock_bot.schedule.call_args
+        assert args[1] == birthday.ANNOUNCE_ACTION and kwargs == {"key": "daily"}
+
+class TestMassmeetModule:
+    """Tests for set-based bulk registration."""
+
+    def test_register_users_uses_set_queries(self, mock_bot, mock_db_conn, mock_db_cursor):
+        from modules import massmeet
+        mock_bot.db_get = Mock(return_value=mock_db_conn)
+        mock_db_cursor.fetchall.side_effect = [
+            [("alice", 1), ("bob", 2)],
+            [("alice!a@host", 1), ("carol!c@host", 9)],
+        ]
+        users = {
+            "Alice": "Alice!a@host",
+            "Bob": "bob!b@host",
+            "Carol": "carol!c@host",
+            "Dave": "dave!d@host",
+            "Erin": "erin!e@host",
+        }
+        with patch("modules.massmeet.execute_values", return_value=[(10, "dave"), (11, "erin")]) as mock_values:
+            stats = massmeet.register_users(mock_bot, users)
+
+        assert mock_db_cursor.execute.call_count == 2
+        assert "= ANY(%s)" in mock_db_cursor.execute.call_args_list[0][0][0]
+        inserted = [c[0][2] for c in mock_values.call_args_list]
+        assert inserted == [
+            [("dave",), ("erin",)],
+            [(10, "user"), (11, "user")],
+            [(2, "bob!b@host"), (10, "dave!d@host"), (11, "erin!e@host")],
+        ]
+        mock_db_conn.commit.assert_called_once()
+        assert stats == {
+            "total_users": 5,
+            "registered_new": 2,
+            "merged_hostmasks": 1,
+            "already_registered": 1,
+            "skipped": 1,
+        }
+
+    def test_run_uses_who_and_reports(self, mock_bot):
+        from modules import massmeet
+        mock_bot.channels = {"#c": {"users": {"TestBot": {}, "Alice": {}, "Quiet": {}}}}
+        mock_bot.nickname = "TestBot"
+        mock_bot.user_hostmasks = {}
+
+        async def who(channel):
+            return {"TestBot": "TestBot!bot@host", "Alice": "Alice!a@host"}
+
+        mock_bot.who = who
+        stats = {"total_users": 1, "registered_new": 1, "merged_hostmasks": 0, "already_registered": 0, "skipped": 0}
+        with patch("modules.massmeet.register_users", return_value=stats) as mock_register:
+            asyncio.run(massmeet.run(mock_bot, {"command": "massmeet", "channel": "#c"}))
+        mock_register.assert_called_once_with(mock_bot, {"Alice": "Alice!a@host"})
+        assert "1 new registrations" in mock_bot._active_output[-1]["msg"]
+        assert "1 skipped" in mock_bot._active_output[-1]["msg"]
+
+
+
+class TestUserProfileModules:
+    """Tests for whois, userinfo and whocan on the shared profile API."""
+
+    PROFILE = {
+        "id": 7, "username": "alice", "dob": None, "is_admin": False, "is_owner": True,
+        "hostmasks": ["alice!a@host"], "permissions": {"global": ["user"], "#c": ["op"]},
+        "matched_by": "username",
+    }
+
+    def _bot(self, mock_bot):
+        mock_bot.nickname = "TestBot"
+        mock_bot.user_hostmasks = {"alice": "Alice!a@host"}
+        mock_bot.channels = {"#c": {"users": {"Alice"}}}
+        mock_bot.db_get_user_profile = Mock(return_value=self.PROFILE)
+        return mock_bot
+
+    def test_whois_uses_profile(self, mock_bot):
+        from modules import whois
+        bot = self._bot(mock_bot)
+        whois.run(bot, {"command_args": "Alice", "channel": "#c"})
+        bot.db_get_user_profile.assert_called_once_with(username="Alice", hostmask="Alice!a@host")
+        assert [o["msg"] for o in bot._active_output] == [
+            "Alice is on channel #c as Alice!a@host.",
+            "Recognized as user 'alice'",
+            "Global permissions: user",
+            "Channel permissions for #c: op",
+            "Hostmasks: alice!a@host",
+            "This user is the bot owner.",
+        ]
+
+    def test_userinfo_unknown_user(self, mock_bot):
+        from modules import userinfo
+        bot = self._bot(mock_bot)
+        bot.db_get_user_profile.return_value = None
+        userinfo.run(bot, {"trigger": "command", "command": "userinfo", "command_args": "Alice", "channel": "#c"})
+        assert bot._active_output[-1]["msg"] == "Unrecognized user (not in database)."
+
+    def test_whocan_uses_permission_index(self, mock_bot):
+        from modules import whocan
+        mock_bot.db_get_permission_index = Mock(return_value={("op", "#c"): ["alice", "bob"]})
+        whocan.run(mock_bot, {"command_args": "op #C", "channel": "#c"})
+        whocan.run(mock_bot, {"command_args": "admin", "channel": "#c"})
+        assert [o["msg"] for o in mock_bot._active_output] == [
+            "Users with 'op' permission in #C: alice, bob",
+            "No users found with global 'admin' permission.",
+        ]
+
+class TestFanOut:
+    """Tests for concurrent multi-target lookups."""
+
+    def test_split_targets(self):
+        from phreakbot_core.fanout import split_targets
+        assert split_targets("a b a c", limit=2) == (["a", "b"], 1)
+
+    def test_compact_keeps_order_within_budget(self):
+        from phreakbot_core.fanout import compact
+        segments = [f"target {i}: result" for i in range(7)]
+        lines = compact(segments, 3)
+        assert len(lines) == 3
+        assert " | ".join(lines) == " | ".join(segments)
+        assert compact(segments[:2], 3) == segments[:2]
+
+    def test_lookups_run_concurrently_in_input_order(self, mock_bot):
+        import threading
+        import time
+        from phreakbot_core.fanout import fan_out
+        mock_bot.config = {"max_output_lines": 3, "lookup_concurrency": 2}
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def lookup(bot, target):
+            with lock:
+                running.append(target)
+                peak.append(len(running))
+            time.sleep(0.05 if target == "1" else 0.01)
+            with lock:
+                running.remove(target)
+            bot.add_response(f"{target}: ok")
+            if target == "3":
+                raise RuntimeError("boom")
+
+        asyncio.run(fan_out(mock_bot, lookup, ["1", "2", "3", "4"]))
+        assert max(peak) == 2
+        text = " | ".join(r["msg"] for r in mock_bot._active_output)
+        assert text == "1: ok | 2: ok | 3: ok | 3: lookup failed | 4: ok"
+        assert len(mock_bot._active_output) <= 3
+
+    def test_asn_fans_out_multiple_targets(self, mock_bot):
+        from modules import asn
+        calls = []
+
+        def fake_number(bot, number):
+            calls.append(number)
+            bot.add_response(f"AS{number}")
+
+        with patch("modules.asn.lookup_asn_by_number", fake_number):
+            result = asn.run(mock_bot, {"command": "asn", "command_args": "AS1 AS2 3"})
+            asyncio.run(result)
+        assert sorted(calls) == ["1", "2", "3"]
+        assert [r["msg"] for r in mock_bot._active_output] == ["AS1", "AS2", "AS3"]
+
+    def test_rpki_routes_keep_their_origin(self):
+        from modules import roa
+        assert roa._split_routes(["1.0.0.0/24", "AS1", "2001:db8::/32", "10.0.0.1", "AS2"]) == [
+            ("1.0.0.0/24", "AS1"),
+            ("2001:db8::/32", None),
+            ("10.0.0.1", "AS2"),
+        ]
+
+
+class TestPeeringModule:
+    """Tests for the peering module."""
+
+    def _bot(self, mock_bot):
+        from phreakbot_core.peeringdb import PeeringDB
+        from tests.fixtures.peeringdb import PEERINGDB_DUMP
+        mock_bot.dataset = Mock(return_value=PeeringDB(PEERINGDB_DUMP))
+        return mock_bot
+
+    def test_peering_by_asn(self, mock_bot):
+        from modules import peering
+        peering.run(self._bot(mock_bot), {"command_args": "AS13335"})
+        messages = [r["msg"] for r in mock_bot._active_output]
+        assert messages == [
+            "AS13335 Cloudflare | Policy: Open | Max prefixes: 2000 v4 / 500 v6",
+            "IXPs (2): AMS-IX (2x100G), Frys-IX (10G)",
+            "Facilities (1): Equinix AM7",
+        ]
+
+    def test_peering_by_name(self, mock_bot):
+        from modules import peering
+        peering.run(self._bot(mock_bot), {"command_args": "cloud"})
+        assert "Cloudy Networks (AS64500)" in mock_bot._active_output[0]["msg"]
+        mock_bot._active_output.clear()
+        peering.run(mock_bot, {"command_args": "cloudy"})
+        assert mock_bot._active_output[1]["msg"] == "AS64500 has no public IX connections in PeeringDB"
+
+    def test_peering_without_snapshot(self, mock_bot):
+        from modules import peering
+        peering.run(mock_bot, {"command_args": "AS13335"})
+        assert "not available" in mock_bot._active_output[0]["msg"]
+
+
 # ---------------------------------------------------------------------------
 # MAC Module Tests
 # ---------------------------------------------------------------------------
@@ -249,8 +605,9 @@ class TestMacModule:
             "vendorDetails": {"companyName": "Cisco Systems", "companyAddress": "San Jose, CA"},
             "blockDetails": {"blockType": "MA-L"},
         }
-        with patch("modules.mac.requests.get", return_value=mock_resp):
-            result = mac.get_mac_info("001122334455")
+        with patch("modules.mac.requests.get", return_value=mock_resp) as mock_get:
+            result = mac.get_mac_info("001122334455", api_key="key")
+        assert mock_get.call_args[1]["params"]["apiKey"] == "key"
         assert "Cisco Systems" in result
         assert "MA-L" in result
 
@@ -262,8 +619,17 @@ class TestMacModule:
         fallback.status_code = 200
         fallback.text = "Apple Inc"
         with patch("modules.mac.requests.get", side_effect=[primary, fallback]):
+            result = mac.get_mac_info("AABBCCDDEEFF", api_key="key")
+        assert "Apple Inc" in result
+
+    def test_get_mac_info_without_api_key_skips_macaddress_io(self):
+        from modules import mac
+        fallback = Mock(status_code=200, text="Apple Inc")
+        with patch("modules.mac.requests.get", return_value=fallback) as mock_get:
             result = mac.get_mac_info("AABBCCDDEEFF")
         assert "Apple Inc" in result
+        assert mock_get.call_count == 1
+        assert "macvendors.com" in mock_get.call_args[0][0]
 
     def test_get_mac_info_both_apis_fail(self):
         from modules import mac
@@ -272,7 +638,7 @@ class TestMacModule:
         fallback = Mock()
         fallback.status_code = 404
         with patch("modules.mac.requests.get", side_effect=[primary, fallback]):
-            result = mac.get_mac_info("AABBCCDDEEFF")
+            result = mac.get_mac_info("AABBCCDDEEFF", api_key="key")
         assert "Unknown" in result
 
     def test_get_mac_info_exception(self):
@@ -281,6 +647,81 @@ class TestMacModule:
             result = mac.get_mac_info("AABBCC")
         assert "Error processing MAC" in result
 
+    def _oui_db(self, tmp_path):
+        from phreakbot_core.oui import OuiDatabase, build_database
+        csv_file = tmp_path / "oui.csv"
+        csv_file.write_text(
+            "Registry,Assignment,Organization Name,Organization Address\n"
+            "MA-L,001122,Cimsys Inc,\"Seoul KR\"\n"
+            "MA-L,70B3D5,IEEE Registration Authority,\"Piscataway NJ US\"\n"
+            "MA-S,70B3D5123,Example Sensors,Berlin DE\n"
+            "MA-M,AABBCCD,Example Widgets,\n"
+        )
+        build_database([str(csv_file)], str(tmp_path / "oui.bin"))
+        return OuiDatabase(str(tmp_path / "oui.bin"))
+
+    def test_get_mac_info_local_database(self, tmp_path):
+        from modules import mac
+        db = self._oui_db(tmp_path)
+        with patch("modules.mac.requests.get") as mock_get:
+            result = mac.get_mac_info("001122334455", oui_db=db)
+        mock_get.assert_not_called()
+        assert "Cimsys Inc" in result and "MA-L (001122/24)" in result
+
+    def test_local_database_longest_prefix_wins(self, tmp_path):
+        db = self._oui_db(tmp_path)
+        assert db.lookup("70B3D5123456").organization == "Example Sensors"
+        assert db.lookup("70B3D5999999").organization == "IEEE Registration Authority"
+        assert db.lookup("AABBCCDDEEFF").bits == 28
+        # Too few digits to reach the 28-bit assignment
+        assert db.lookup("AABBCC") is None
+
+    def test_get_mac_info_local_miss_without_remote(self, tmp_path):
+        from modules import mac
+        db = self._oui_db(tmp_path)
+        with patch("modules.mac.requests.get") as mock_get:
+            result = mac.get_mac_info("123456", oui_db=db, remote=False)
+        mock_get.assert_not_called()
+        assert "Unknown" in result
+
+    def test_get_oui_db_opened_once_installed(self, tmp_path):
+        from modules import mac
+        bot = Mock(oui_db=None, config={"oui_db_path": str(tmp_path / "oui.bin")})
+        assert mac.get_oui_db(bot) is None
+
+        (tmp_path / "oui.bin").write_bytes(b"not a database")
+        assert mac.get_oui_db(bot) is None
+        bot.logger.error.assert_called_once()
+        # The broken file is not reopened until it changes
+        assert mac.get_oui_db(bot) is None
+        bot.logger.error.assert_called_once()
+
+        db = self._oui_db(tmp_path)
+        db.close()
+        os.utime(tmp_path / "oui.bin", (1, 1))
+        assert mac.get_oui_db(bot).lookup("001122").organization == "Cimsys Inc"
+        assert bot.oui_db is mac.get_oui_db(bot)
+
+    def test_get_oui_db_replaced_on_disk(self, tmp_path):
+        from modules import mac
+        old_db = self._oui_db(tmp_path)
+        bot = Mock(oui_db=old_db, config={})
+
+        (tmp_path / "oui.bin.tmp").write_bytes(b"not a database")
+        os.replace(tmp_path / "oui.bin.tmp", tmp_path / "oui.bin")
+        os.utime(tmp_path / "oui.bin", (1, 1))
+        # The old registry keeps answering, and the broken file is opened once
+        assert mac.get_oui_db(bot) is old_db
+        assert mac.get_oui_db(bot) is old_db
+        bot.logger.error.assert_called_once()
+        assert old_db.lookup("001122").organization == "Cimsys Inc"
+
+        self._oui_db(tmp_path).close()
+        new_db = mac.get_oui_db(bot)
+        assert new_db is not old_db and bot.oui_db is new_db
+        assert old_db._mm.closed
+        assert new_db.lookup("001122").organization == "Cimsys Inc"
+
     def test_format_mac_for_display_full(self):
         from modules import mac
         assert mac.format_mac_for_display("001122334455") == "00:11:22:33:44:55"
@@ -318,8 +759,7 @@ class TestIpModule:
 
     def test_run_with_hostname(self, mock_bot):
         from modules import ip as ip_module
-        addr_info = [(2, 1, 6, "", ("93.184.216.34", 0))]
-        with patch("modules.ip.socket.getaddrinfo", return_value=addr_info):
+        with patch("modules.ip.resolve", return_value=["93.184.216.34"]):
             with patch("modules.ip.get_ip_info", return_value="IP info"):
                 event = {"command": "ip", "command_args": "example.com"}
                 ip_module.run(mock_bot, event)
@@ -327,14 +767,14 @@ class TestIpModule:
 
     def test_run_hostname_resolution_failure(self, mock_bot):
         from modules import ip as ip_module
-        with patch("modules.ip.socket.getaddrinfo", side_effect=ip_module.socket.gaierror):
+        with patch("modules.ip.resolve", side_effect=ip_module.socket.gaierror):
             event = {"command": "ip", "command_args": "bad.host"}
             ip_module.run(mock_bot, event)
         assert any("Could not resolve hostname" in r["msg"] for r in mock_bot._active_output)
 
     def test_run_exception(self, mock_bot):
         from modules import ip as ip_module
-        with patch("modules.ip.socket.getaddrinfo", side_effect=Exception("boom")):
+        with patch("modules.ip.resolve", side_effect=Exception("boom")):
             event = {"command": "ip", "command_args": "example.com"}
             ip_module.run(mock_bot, event)
         assert any("Error looking up IP" in r["msg"] for r in mock_bot._active_output)
@@ -370,6 +810,30 @@ class TestIpModule:
         assert "IPv4" in result
         assert "Global" in result
 
+    def test_get_ip_info_local_geoip_skips_http(self):
+        from modules import ip as ip_module
+        geoip = Mock()
+        geoip.location.return_value = "Amsterdam, North Holland, Netherlands"
+        with patch("modules.ip.requests.get") as mock_get:
+            result = ip_module.get_ip_info("8.8.8.8", geoip=geoip)
+        mock_get.assert_not_called()
+        assert "Location: Amsterdam, North Holland, Netherlands" in result
+
+    def test_country_from_geoip(self, mock_bot):
+        from modules import country
+        geoip = Mock()
+        geoip.country.return_value = ("NL", "Netherlands")
+        mock_bot.dataset = Mock(return_value=geoip)
+        with patch("modules.country.resolve_async", AsyncMock(return_value=["2001:db8::1", "192.0.2.1"])):
+            asyncio.run(country.run(mock_bot, {"command_args": "example.nl"}))
+        geoip.country.assert_called_once_with("192.0.2.1")
+        assert mock_bot._active_output[-1]["msg"] == "example.nl (192.0.2.1) is located in Netherlands (NL)"
+
+    def test_country_without_database(self, mock_bot):
+        from modules import country
+        asyncio.run(country.run(mock_bot, {"command_args": "8.8.8.8"}))
+        assert "not available" in mock_bot._active_output[-1]["msg"]
+
     def test_get_ip_info_exception(self):
         from modules import ip as ip_module
         with patch("modules.ip.ipaddress.ip_address", side_effect=Exception("bad")):
@@ -414,7 +878,7 @@ class TestKarmaModule:
     def test_run_pubmsg_karma_pattern(self, mock_bot, mock_db_conn, mock_db_cursor):
         from modules import karma
         mock_bot.db_get.return_value = mock_db_conn
-        mock_db_cursor.fetchone.return_value = {"id": 1, "karma": 5}
+        mock_db_cursor.fetchone.side_effect = [(1,), (1, 6)]
         event = {"trigger": "event", "signal": "pubmsg", "text": "!python++", "nick": "other"}
         karma.run(mock_bot, event)
         assert any("python now has" in r["msg"] for r in mock_bot._active_output)
@@ -435,15 +899,17 @@ class TestKarmaModule:
     def test_handle_karma_upvote_existing(self, mock_bot, mock_db_conn, mock_db_cursor):
         from modules import karma
         mock_bot.db_get.return_value = mock_db_conn
-        mock_db_cursor.fetchone.return_value = {"id": 1, "karma": 5}
+        mock_db_cursor.fetchone.side_effect = [(1,), (1, 6)]
         event = {"text": "!python++", "nick": "other"}
         karma._handle_karma_pattern(mock_bot, event)
         assert any("python now has 6 karma" in r["msg"] for r in mock_bot._active_output)
+        assert mock_db_cursor.execute.call_args_list[1][0][1] == (1, 1)
+        mock_db_conn.commit.assert_called_once()
 
     def test_handle_karma_upvote_new(self, mock_bot, mock_db_conn, mock_db_cursor):
         from modules import karma
         mock_bot.db_get.return_value = mock_db_conn
-        mock_db_cursor.fetchone.side_effect = [None, {"karma": 1}]
+        mock_db_cursor.fetchone.side_effect = [None, (1, 1)]
         event = {"text": "!python++", "nick": "other"}
         karma._handle_karma_pattern(mock_bot, event)
         assert any("python now has 1 karma" in r["msg"] for r in mock_bot._active_output)
@@ -451,15 +917,16 @@ class TestKarmaModule:
     def test_handle_karma_downvote_existing(self, mock_bot, mock_db_conn, mock_db_cursor):
         from modules import karma
         mock_bot.db_get.return_value = mock_db_conn
-        mock_db_cursor.fetchone.return_value = {"id": 1, "karma": 5}
+        mock_db_cursor.fetchone.side_effect = [(1,), (1, 4)]
         event = {"text": "!python--", "nick": "other"}
         karma._handle_karma_pattern(mock_bot, event)
         assert any("python now has 4 karma" in r["msg"] for r in mock_bot._active_output)
+        assert mock_db_cursor.execute.call_args_list[1][0][1] == (-1, 1)
 
     def test_handle_karma_downvote_new(self, mock_bot, mock_db_conn, mock_db_cursor):
         from modules import karma
         mock_bot.db_get.return_value = mock_db_conn
-        mock_db_cursor.fetchone.side_effect = [None, {"karma": -1}]
+        mock_db_cursor.fetchone.side_effect = [None, (1, -1)]
         event = {"text": "!python--", "nick": "other"}
         karma._handle_karma_pattern(mock_bot, event)
         assert any("python now has -1 karma" in r["msg"] for r in mock_bot._active_output)
@@ -467,12 +934,13 @@ class TestKarmaModule:
     def test_handle_karma_with_reason(self, mock_bot, mock_db_conn, mock_db_cursor):
         from modules import karma
         mock_bot.db_get.return_value = mock_db_conn
-        mock_db_cursor.fetchone.side_effect = [{"id": 1, "karma": 5}, {"id": 1}]
+        mock_db_cursor.fetchone.side_effect = [(1,), (1, 6)]
         # Note: KARMA_PATTERN requires reason to start with # (e.g. "!item++ #reason")
         event = {"text": "!python++ #great language", "nick": "other"}
         karma._handle_karma_pattern(mock_bot, event)
         calls = [c for c in mock_db_cursor.execute.call_args_list if "phreakbot_karma_why" in str(c)]
         assert len(calls) > 0
+        assert calls[0][0][1] == (1, "great language", "up", "")
 
     def test_handle_karma_exception(self, mock_bot, mock_db_conn, mock_db_cursor):
         from modules import karma
@@ -500,11 +968,8 @@ class TestKarmaModule:
     def test_cmd_karma_with_reasons(self, mock_bot, mock_db_conn, mock_db_cursor):
         from modules import karma
         mock_bot.db_get.return_value = mock_db_conn
-        mock_db_cursor.fetchone.return_value = {"karma": 10}
-        mock_db_cursor.fetchall.return_value = [
-            {"direction": "up", "reason": "awesome"},
-            {"direction": "down", "reason": "bugs"},
-        ]
+        mock_db_cursor.fetchone.return_value = (1, "python", 10, "")
+        mock_db_cursor.fetchall.return_value = [("up", "awesome"), ("down", "bugs")]
         event = {"command_args": "python"}
         karma._cmd_karma(mock_bot, event)
         assert any("+1 for awesome" in r["msg"] and "-1 for bugs" in r["msg"] for r in mock_bot._active_output)
@@ -520,7 +985,7 @@ class TestKarmaModule:
     def test_cmd_topkarma_default_limit(self, mock_bot, mock_db_conn, mock_db_cursor):
         from modules import karma
         mock_bot.db_get.return_value = mock_db_conn
-        mock_db_cursor.fetchall.return_value = [{"item": "python", "karma": 10}]
+        mock_db_cursor.fetchall.return_value = [(1, "python", 10, "")]
         event = {"command_args": ""}
         karma._cmd_topkarma(mock_bot, event)
         assert any("Top 1 positive karma" in r["msg"] for r in mock_bot._active_output)
@@ -780,29 +1245,77 @@ class TestUrlsModule:
         event = {"trigger": "event", "signal": "pubmsg", "text": "hello world", "user_info": {"id": 1}}
         assert urls.run(mock_bot, event) is None
 
-    def test_run_unsafe_url(self, mock_bot):
+    @staticmethod
+    def _run(bot, event):
+        """Run the handler and the fetch it returns, as the event loop would"""
         from modules import urls
-        with patch("modules.urls.is_url_safe", return_value=(False, "private IP")):
-            event = {"trigger": "event", "signal": "pubmsg", "text": "http://192.168.1.1", "user_info": {"id": 1}}
-            urls.run(mock_bot, event)
+        result = urls.run(bot, event)
+        if result is not None:
+            asyncio.run(result)
+
+    def test_run_unsafe_url(self, mock_bot):
+        with patch("modules.urls.is_url_safe_async", AsyncMock(return_value=(False, "private IP"))):
+            event = {"trigger": "event", "signal": "pubmsg", "channel": "#test",
+                     "text": "http://192.168.1.1", "user_info": {"id": 1}}
+            self._run(mock_bot, event)
         mock_bot.logger.warning.assert_called_once()
 
     def test_run_success(self, mock_bot):
-        from modules import urls
-        with patch("modules.urls.is_url_safe", return_value=(True, "")):
-            with patch("modules.urls.get_url_title", return_value="Example Domain"):
-                event = {"trigger": "event", "signal": "pubmsg", "text": "http://example.com", "user_info": {"id": 1}}
-                urls.run(mock_bot, event)
+        with patch("modules.urls.is_url_safe_async", AsyncMock(return_value=(True, ""))):
+            with patch("modules.urls.get_url_meta", return_value=("Example Domain", None)):
+                event = {"trigger": "event", "signal": "pubmsg", "channel": "#test",
+                         "text": "http://example.com", "user_info": {"id": 1}}
+                self._run(mock_bot, event)
         assert any("Example Domain" in r["msg"] for r in mock_bot._active_output)
 
-    def test_run_exception(self, mock_bot):
+    def test_run_fetches_off_the_event_loop(self, mock_bot):
+        import threading
         from modules import urls
-        with patch("modules.urls.is_url_safe", return_value=(True, "")):
-            with patch("modules.urls.get_url_title", side_effect=Exception("fetch error")):
-                event = {"trigger": "event", "signal": "pubmsg", "text": "http://example.com", "user_info": {"id": 1}}
-                urls.run(mock_bot, event)
+        threads = []
+
+        def fetch(url, max_bytes):
+            threads.append(threading.current_thread())
+            return "Title", None
+
+        with patch("modules.urls.is_url_safe_async", AsyncMock(return_value=(True, ""))):
+            with patch("modules.urls.get_url_meta", side_effect=fetch):
+                event = {"trigger": "event", "signal": "pubmsg", "channel": "#test",
+                         "text": "http://example.com", "user_info": {"id": 1}}
+                result = urls.run(mock_bot, event)
+                assert mock_bot._active_output == []
+                asyncio.run(result)
+        assert threads and threads[0] is not threading.main_thread()
+        assert mock_bot._active_output[-1]["msg"] == "Title: Title"
+
+    def test_run_exception(self, mock_bot):
+        with patch("modules.urls.is_url_safe_async", AsyncMock(return_value=(True, ""))):
+            with patch("modules.urls.get_url_meta", side_effect=Exception("fetch error")):
+                event = {"trigger": "event", "signal": "pubmsg", "channel": "#test",
+                         "text": "http://example.com", "user_info": {"id": 1}}
+                self._run(mock_bot, event)
         mock_bot.logger.error.assert_called_once()
 
+    def test_run_uses_cache(self, mock_bot):
+        from modules import urls
+        mock_bot.url_cache.set("https://example.com/a", "Cached Title", "desc")
+        with patch("modules.urls.get_url_meta") as mock_fetch:
+            event = {"trigger": "event", "signal": "pubmsg", "channel": "#test",
+                     "text": "see https://Example.com/a?utm_source=x#top", "user_info": {"id": 1}}
+            assert urls.run(mock_bot, event) is None
+        mock_fetch.assert_not_called()
+        assert any("Cached Title" in r["msg"] for r in mock_bot._active_output)
+
+    def test_run_suppresses_repost(self, mock_bot):
+        event = {"trigger": "event", "signal": "pubmsg", "channel": "#test",
+                 "text": "https://example.com/a", "user_info": {"id": 1}}
+        with patch("modules.urls.is_url_safe_async", AsyncMock(return_value=(True, ""))):
+            with patch("modules.urls.get_url_meta", return_value=("Title", None)) as mock_fetch:
+                self._run(mock_bot, event)
+                self._run(mock_bot, event)
+                self._run(mock_bot, dict(event, channel="#other"))
+        assert mock_fetch.call_count == 1
+        assert len(mock_bot._active_output) == 2
+
     def test_extract_urls_with_http(self):
         from modules import urls
         text = "Check out http://example.com and https://test.org/page"
@@ -816,50 +1329,265 @@ class TestUrlsModule:
         result = urls.extract_urls(text)
         assert "www.example.com" in result
 
-    def test_get_url_title_with_prefix(self):
-        from modules import urls
+    @staticmethod
+    def _patch_fetch(**kwargs):
+        """Patch DNS and the pinned HTTP session used by safe_get."""
+        session = Mock()
+        session.get = Mock(**kwargs)
+        resolver = patch("phreakbot_core.url_safety.resolve", return_value=["93.184.216.34"])
+        return resolver, patch("phreakbot_core.url_safety.requests.Session", return_value=session), session
+
+    def _html_response(self, body, content_type="text/html; charset=utf-8"):
         mock_resp = Mock()
-        mock_resp.text = "<html><head><title>My Title</title></head><body></body></html>"
+        mock_resp.status_code = 200
+        mock_resp.headers = {"Content-Type": content_type}
         mock_resp.raise_for_status = Mock()
-        with patch("phreakbot_core.url_safety.requests.get", return_value=mock_resp):
+        data = body.encode("utf-8")
+        mock_resp.iter_content = Mock(return_value=[data[i:i + 16] for i in range(0, len(data), 16)])
+        return mock_resp
+
+    def test_get_url_title_with_prefix(self):
+        from modules import urls
+        mock_resp = self._html_response("<html><head><title>My Title</title></head><body></body></html>")
+        resolver, session_cls, _ = self._patch_fetch(return_value=mock_resp)
+        with resolver, session_cls:
             result = urls.get_url_title("http://example.com")
         assert result == "My Title"
+        mock_resp.close.assert_called_once()
 
     def test_get_url_title_adds_prefix(self):
         from modules import urls
-        mock_resp = Mock()
-        mock_resp.text = "<html><head><title>Title</title></head><body></body></html>"
-        mock_resp.raise_for_status = Mock()
-        with patch("phreakbot_core.url_safety.requests.get", return_value=mock_resp) as mock_get:
+        mock_resp = self._html_response("<html><head><title>Title</title></head><body></body></html>")
+        resolver, session_cls, session = self._patch_fetch(return_value=mock_resp)
+        with resolver, session_cls:
             urls.get_url_title("example.com")
-        assert "http://example.com" in mock_get.call_args[0][0]
+        assert session.get.call_args[0][0] == "http://93.184.216.34/"
+        assert session.get.call_args[1]["headers"]["Host"] == "example.com"
+        assert session.get.call_args[1]["stream"] is True
 
     def test_get_url_title_no_title_tag(self):
         from modules import urls
-        mock_resp = Mock()
-        mock_resp.text = "<html><body>No title</body></html>"
-        mock_resp.raise_for_status = Mock()
-        with patch("phreakbot_core.url_safety.requests.get", return_value=mock_resp):
+        mock_resp = self._html_response("<html><body>No title</body></html>")
+        resolver, session_cls, _ = self._patch_fetch(return_value=mock_resp)
+        with resolver, session_cls:
             result = urls.get_url_title("http://example.com")
         assert result is None
 
     def test_get_url_title_exception(self):
         from modules import urls
-        with patch("phreakbot_core.url_safety.requests.get", side_effect=Exception("timeout")):
+        resolver, session_cls, _ = self._patch_fetch(side_effect=Exception("timeout"))
+        with resolver, session_cls:
             result = urls.get_url_title("http://example.com")
         assert result is None
 
     def test_get_url_title_truncates_long_title(self):
         from modules import urls
         long_title = "A" * 250
-        mock_resp = Mock()
-        mock_resp.text = f"<html><head><title>{long_title}</title></head><body></body></html>"
-        mock_resp.raise_for_status = Mock()
-        with patch("phreakbot_core.url_safety.requests.get", return_value=mock_resp):
+        mock_resp = self._html_response(f"<html><head><title>{long_title}</title></head><body></body></html>")
+        resolver, session_cls, _ = self._patch_fetch(return_value=mock_resp)
+        with resolver, session_cls:
             result = urls.get_url_title("http://example.com")
         assert len(result) == 200
         assert result.endswith("...")
 
+    def test_get_url_title_non_html_not_read(self):
+        from modules import urls
+        mock_resp = self._html_response("", content_type="application/octet-stream")
+        resolver, session_cls, _ = self._patch_fetch(return_value=mock_resp)
+        with resolver, session_cls:
+            result = urls.get_url_title("http://example.com/big.iso")
+        assert result is None
+        mock_resp.iter_content.assert_not_called()
+        mock_resp.close.assert_called_once()
+
+    def test_get_url_title_stops_at_head(self):
+        from modules import urls
+        mock_resp = self._html_response("<html><head><title>Head</title></head>")
+        mock_resp.iter_content = Mock(return_value=iter([
+            b"<html><head><title>Head</title></head>",
+            b"<body>",
+            None,
+        ]))
+        resolver, session_cls, _ = self._patch_fetch(return_value=mock_resp)
+        with resolver, session_cls:
+            result = urls.get_url_title("http://example.com")
+        assert result == "Head"
+
+    def test_get_url_title_byte_cap(self):
+        from modules import urls
+        mock_resp = self._html_response("<html><head><title>Capped</title>" + "<!-- pad -->" * 100)
+        resolver, session_cls, _ = self._patch_fetch(return_value=mock_resp)
+        with resolver, session_cls:
+            result = urls.get_url_title("http://example.com", max_bytes=12)
+        assert result is None
+
+
+@pytest.mark.unit
+class TestUrlMeta:
+    """Tests for the streaming page metadata parser."""
+
+    def test_parser_collects_title_and_descriptions(self):
+        from phreakbot_core.url_meta import HeadMetaParser
+        parser = HeadMetaParser()
+        parser.feed('<html><head><title>  A &amp;\n B </title>'
+                    '<meta name="Description" content="plain">'
+                    '<meta property="og:description" content="open graph">')
+        parser.feed('</head><body><title>ignored</title>')
+        assert parser.done
+        assert parser.title == "A & B"
+        assert parser.description() == "open graph"
+
+    def test_parser_falls_back_to_meta_description(self):
+        from phreakbot_core.url_meta import HeadMetaParser
+        parser = HeadMetaParser()
+        parser.feed('<head><meta name="description" content="fallback"></head>')
+        assert parser.description() == "fallback"
+
+    def test_response_charset(self):
+        from phreakbot_core.url_meta import response_charset
+        resp = Mock(headers={"Content-Type": "text/html; charset=ISO-8859-1"})
+        assert response_charset(resp) == "iso8859-1"
+        resp = Mock(headers={"Content-Type": "text/html; charset=bogus"})
+        assert response_charset(resp) == "utf-8"
+
+    def test_normalize_url(self):
+        from phreakbot_core.url_meta import normalize_url
+        assert normalize_url("HTTPS://Example.COM:443/Path?b=2&utm_source=irc&a=1#frag") == \
+            "https://example.com/Path?b=2&a=1"
+        assert normalize_url("www.example.com") == "http://www.example.com/"
+        assert normalize_url("http://example.com:8080/?fbclid=abc") == "http://example.com:8080/"
+        assert normalize_url("Http://Example.com") == "http://example.com/"
+        assert normalize_url("hTTpS://Example.com/a") == "https://example.com/a"
+        assert normalize_url("http://[foo/bar") == "http://[foo/bar"
+
+    def test_unparseable_url_not_announced_twice(self):
+        cache = UrlMetaCache()
+        cache.mark_announced("#c", "http://[foo/bar")
+        assert cache.recently_announced("#c", "http://[foo/bar") is True
+
+    def test_cache_ttl_expiry(self):
+        cache = UrlMetaCache(ttl=60)
+        with patch("phreakbot_core.url_meta.time.time", return_value=1000):
+            cache.set("http://example.com", "Title", None)
+        with patch("phreakbot_core.url_meta.time.time", return_value=1059):
+            assert cache.get("http://example.com/") == ("Title", None)
+        with patch("phreakbot_core.url_meta.time.time", return_value=1060):
+            assert cache.get("http://example.com/") is None
+        assert len(cache) == 0
+
+    def test_cache_size_limit_evicts_lru(self):
+        cache = UrlMetaCache(max_entries=2)
+        cache.set("http://a.example", "A", None)
+        cache.set("http://b.example", "B", None)
+        cache.get("http://a.example")
+        cache.set("http://c.example", "C", None)
+        assert cache.get("http://b.example") is None
+        assert cache.get("http://a.example") == ("A", None)
+        assert len(cache) == 2
+
+    def test_recently_announced_window(self):
+        cache = UrlMetaCache(repost_window=600)
+        with patch("phreakbot_core.url_meta.time.time", return_value=1000):
+            cache.mark_announced("#Test", "http://example.com/?utm_medium=x")
+        with patch("phreakbot_core.url_meta.time.time", return_value=1599):
+            assert cache.recently_announced("#test", "http://EXAMPLE.com/")
+            assert not cache.recently_announced("#other", "http://example.com/")
+        with patch("phreakbot_core.url_meta.time.time", return_value=1601):
+            assert not cache.recently_announced("#test", "http://example.com/")
+
+    def test_fetch_page_meta_decodes_declared_charset(self):
+        from phreakbot_core.url_meta import fetch_page_meta
+        mock_resp = Mock(status_code=200, headers={"Content-Type": "text/html; charset=latin-1"})
+        mock_resp.iter_content = Mock(return_value=["<title>caf\u00e9</title>".encode("latin-1")])
+        with patch("phreakbot_core.url_safety.resolve", return_value=["93.184.216.34"]):
+            with patch("phreakbot_core.url_safety.requests.Session") as session_cls:
+                session_cls.return_value.get.return_value = mock_resp
+                title, description = fetch_page_meta("http://example.com")
+        assert title == "caf\u00e9"
+        assert description is None
+
+
+@pytest.mark.unit
+class TestRblModule:
+    """Tests for the RBL lookup module."""
+
+    def _bot(self, mock_bot, listings):
+        from phreakbot_core.dnsbl import DnsblResult
+
+        async def check_many(ips):
+            return [
+                [DnsblResult("zen.spamhaus.org", ip in listings, tuple(listings.get(ip, ())), None)]
+                for ip in ips
+            ]
+
+        mock_bot.dnsbl = Mock()
+        mock_bot.dnsbl.check_many = check_many
+        return mock_bot
+
+    def test_run_with_empty_args(self, mock_bot):
+        from modules import rbl
+        asyncio.run(rbl.run(mock_bot, {"command": "rbl", "command_args": ""}))
+        assert any("Please provide" in r["msg"] for r in mock_bot._active_output)
+
+    def test_run_with_ipv6_address(self, mock_bot):
+        from modules import rbl
+        bot = self._bot(mock_bot, {"2001:db8::1": ["SBL spam source"]})
+        asyncio.run(rbl.run(bot, {"command": "rbl", "command_args": "2001:db8::1"}))
+        assert any(
+            "LISTED" in r["msg"] and "SBL spam source" in r["msg"] for r in bot._active_output
+        )
+
+    def test_run_checks_every_mx_address(self, mock_bot):
+        from modules import rbl
+        bot = self._bot(mock_bot, {"192.0.2.2": ["XBL exploited host"]})
+        addresses = {"mx1.example.com": ["192.0.2.1"], "mx2.example.com": ["192.0.2.2", "2001:db8::25"]}
+
+        async def fake_mx(domain):
+            return [("mx1.example.com", 10), ("mx2.example.com", 20)]
+
+        async def fake_resolve(hostname):
+            return addresses[hostname]
+
+        with patch("modules.rbl.get_mx_records", fake_mx), patch("modules.rbl.resolve_async", fake_resolve):
+            asyncio.run(rbl.run(bot, {"command": "rbl", "command_args": "example.com"}))
+        messages = [r["msg"] for r in bot._active_output]
+        assert any("192.0.2.2 is LISTED" in m for m in messages)
+        assert any("2 IPs NOT listed" in m and "2001:db8::25" in m for m in messages)
+
+    def test_run_invalid_input(self, mock_bot):
+        from modules import rbl
+        asyncio.run(rbl.run(mock_bot, {"command": "rbl", "command_args": "not a domain"}))
+        assert any("Invalid input" in r["msg"] for r in mock_bot._active_output)
+
+
+@pytest.mark.unit
+class TestRoaModule:
+    """Tests for local RPKI validation in the deprecated roa module."""
+
+    def _datasets(self, mock_bot):
+        from phreakbot_core.ipasn import AsnTable, parse_prefixes
+        from phreakbot_core.rpki import VrpTable
+        datasets = {
+            "rpki": VrpTable([("1.0.0.0/24", 24, 13335)]),
+            "ipasn": AsnTable(parse_prefixes(["1.0.0.0/24 13335"])),
+        }
+        mock_bot.dataset = Mock(side_effect=datasets.get)
+        return mock_bot
+
+    def test_ip_validated_with_origin_from_routing_table(self, mock_bot):
+        from modules import roa
+        bot = self._datasets(mock_bot)
+        with patch("modules.roa.requests.get") as mock_get:
+            roa.run(bot, {"command": "rpki-old", "command_args": "1.0.0.1"})
+        mock_get.assert_not_called()
+        assert "RPKI valid" in bot._active_output[0]["msg"]
+
+    def test_explicit_origin_invalid(self, mock_bot):
+        from modules import roa
+        bot = self._datasets(mock_bot)
+        roa.run(bot, {"command": "rpki-old", "command_args": "1.0.0.0/24 AS64496"})
+        assert "origin AS not authorised" in bot._active_output[0]["msg"]
+
 
 @pytest.mark.unit
 class TestInfoItemsModule:
@@ -914,6 +1642,133 @@ class TestInfoItemsModule:
         assert infoitems.handle_custom_command(mock_bot, event) is False
 
 
+@pytest.mark.unit
+class TestTweakersModule:
+    """Tests for the tweakers and feed modules."""
+
+    def _event(self, command, args=""):
+        return {"trigger": "command", "command": command, "command_args": args, "nick": "n", "channel": "#c"}
+
+    def test_tweakers_served_from_feed_cache(self, mock_bot, tmp_path):
+        from modules import tweakers
+        from phreakbot_core.feeds import FeedItem, FeedManager
+        mock_bot.feeds = FeedManager(str(tmp_path / "state.json"))
+        tweakers.config(mock_bot)
+        tweakers.run(mock_bot, self._event("tw"))
+        assert "No articles" in mock_bot._active_output[0]["msg"]
+
+        mock_bot._active_output.clear()
+        mock_bot.feeds.feeds["tweakers"].items = [
+            FeedItem(str(i), f"Article {i}", f"https://tweakers.net/{i}", "") for i in range(8)
+        ]
+        with patch("phreakbot_core.feeds.safe_get") as mock_get:
+            tweakers.run(mock_bot, self._event("tweakers"))
+        mock_get.assert_not_called()
+        assert len(mock_bot._active_output) == 6
+        assert mock_bot._active_output[1]["msg"] == "1. Article 0 - https://tweakers.net/0"
+
+    def test_feed_sub_persists_config(self, mock_bot, tmp_path):
+        from modules import feed
+        from phreakbot_core.feeds import FeedManager
+        mock_bot.feeds = FeedManager(str(tmp_path / "state.json"))
+        mock_bot.config = {}
+        mock_bot._check_permissions = Mock(return_value=True)
+
+        feed.run(mock_bot, self._event("feed", "add news https://example.net/rss 30"))
+        feed.run(mock_bot, self._event("feed", "sub news"))
+        assert mock_bot.config["feeds"] == {
+            "news": {"url": "https://example.net/rss", "interval": 1800, "channels": ["#c"]}
+        }
+        assert mock_bot.save_config.call_count == 2
+
+        mock_bot._check_permissions = Mock(return_value=False)
+        feed.run(mock_bot, self._event("feed", "del news"))
+        assert "news" in mock_bot.feeds.feeds
+        assert "permission" in mock_bot._active_output[-1]["msg"]
+
+
+class TestFrysixModule:
+    """Tests for the frysix module."""
+
+    def _event(self, command, args=""):
+        return {"trigger": "command", "command": command, "command_args": args, "nick": "n", "channel": "#c"}
+
+    def _instance(self, mock_bot, tmp_path, amsix=True):
+        import json
+        from modules import frysix
+        from phreakbot_core.ixf import parse_export
+        from tests.fixtures.ixf import AMSIX_EXPORT, FRYSIX_EXPORT
+        mock_bot.config = {"frysix_ixf_path": str(tmp_path / "ixf.json")}
+        if amsix:
+            mock_bot.config["ixf_exports"] = {"AMS-IX": "https://example.net/ixf.json"}
+        frysix.config(mock_bot)
+        instance = frysix.init(mock_bot)
+        (tmp_path / "ixf.json").write_text(json.dumps(FRYSIX_EXPORT))
+        instance.datasets[0].load()
+        if amsix:
+            instance.datasets[1].value = parse_export(AMSIX_EXPORT, "AMS-IX")
+        return instance
+
+    def test_instance_created_once_and_commands_stay_offline(self, mock_bot, tmp_path):
+        from modules import frysix
+        instance = self._instance(mock_bot, tmp_path, amsix=False)
+        mock_bot.add_dataset.assert_called_once_with(instance.datasets[0])
+
+        with patch("phreakbot_core.datasets.requests.get") as mock_get:
+            frysix.run(mock_bot, self._event("member", "AS64500"))
+            frysix.run(mock_bot, self._event("members"))
+        mock_get.assert_not_called()
+        assert frysix.init(mock_bot) is instance
+        messages = [r["msg"] for r in mock_bot._active_output]
+        assert messages[0] == (
+            "AS64500: Example Networks - Website: https://example.net - Joined: 2021-03-01"
+            " - Peering Policy: open - Port Speed: 10G - IP: 185.1.203.10, 2001:7f8:10f::fbe4:10"
+            " - Max Prefixes: 100"
+        )
+        assert messages[1].startswith("Frys-IX has 2 members")
+
+    def test_member_on_other_exchanges(self, mock_bot, tmp_path):
+        from modules import frysix
+        self._instance(mock_bot, tmp_path)
+        frysix.run(mock_bot, self._event("member", "64500"))
+        frysix.run(mock_bot, self._event("member", "AS64502"))
+        frysix.run(mock_bot, self._event("members"))
+        messages = [r["msg"] for r in mock_bot._active_output]
+        assert messages[0].endswith(" - Also on: AMS-IX")
+        assert messages[1] == "AS64502 is not a Frys-IX member; it is connected to: AMS-IX"
+        assert messages[2].endswith("Also loaded: AMS-IX (2).")
+
+    def test_member_name_search(self, mock_bot, tmp_path):
+        from modules import frysix
+        self._instance(mock_bot, tmp_path)
+        frysix.run(mock_bot, self._event("member", "exam"))
+        assert mock_bot._active_output[0]["msg"] == (
+            "Members matching 'exam': Example Networks (AS64500) @ AMS-IX, Frys-IX"
+        )
+
+    def test_ix_peer_address(self, mock_bot, tmp_path):
+        from modules import frysix
+        self._instance(mock_bot, tmp_path)
+        frysix.run(mock_bot, self._event("ix", "2001:7f8:10f:0::fbe4:10"))
+        frysix.run(mock_bot, self._event("ix", "185.1.203.99"))
+        frysix.run(mock_bot, self._event("ix", "192.0.2.1"))
+        messages = [r["msg"] for r in mock_bot._active_output]
+        assert messages == [
+            "2001:7f8:10f::fbe4:10 is AS64500 Example Networks at Frys-IX (10G)",
+            "185.1.203.99 is in the Frys-IX peering LAN but not assigned to a member.",
+            "192.0.2.1 is not on a known peering LAN.",
+        ]
+
+    def test_members_before_first_load(self, mock_bot, tmp_path):
+        from modules import frysix
+        mock_bot.config = {"frysix_ixf_path": str(tmp_path / "missing.json")}
+        frysix._instance = None
+        frysix.run(mock_bot, self._event("members"))
+        frysix.run(mock_bot, self._event("member", "64500"))
+        for response in mock_bot._active_output:
+            assert "No Frys-IX member data available yet" in response["msg"]
+
+
 @pytest.mark.unit
 class TestVersionModule:
     """Tests for the version module."""
@@ -1040,8 +1895,8 @@ class TestAutoOpModule:
     def test_run_add_auto_op_success(self, mock_bot, mock_db_conn, mock_db_cursor, auto_op):
         mock_bot._is_owner.return_value = True
         mock_bot.db_get.return_value = mock_db_conn
-        # First call finds user (2,), second call checks if in auto-op (None)
-        mock_db_cursor.fetchone.side_effect = [(2,), None]
+        # First call finds the user, the insert returns the new row's id
+        mock_db_cursor.fetchone.side_effect = [(2, "phreak", None, False, False), (5,)]
         
         event = {
             "trigger": "command",
@@ -1071,8 +1926,8 @@ class TestAutoOpModule:
     def test_run_add_auto_op_already_exists(self, mock_bot, mock_db_conn, mock_db_cursor, auto_op):
         mock_bot._is_owner.return_value = True
         mock_bot.db_get.return_value = mock_db_conn
-        # First call finds user (2,), second call checks if in auto-op (already exists)
-        mock_db_cursor.fetchone.side_effect = [(2,), (1,)]
+        # First call finds the user, the insert conflicts and returns no row
+        mock_db_cursor.fetchone.side_effect = [(2, "phreak", None, False, False), None]
         
         event = {
             "trigger": "command",
@@ -1087,8 +1942,7 @@ class TestAutoOpModule:
     def test_run_remove_auto_op_success(self, mock_bot, mock_db_conn, mock_db_cursor, auto_op):
         mock_bot._is_owner.return_value = True
         mock_bot.db_get.return_value = mock_db_conn
-        mock_db_cursor.fetchone.return_value = (2,)
-        mock_db_cursor.rowcount = 1
+        mock_db_cursor.fetchone.side_effect = [(2, "phreak", None, False, False), (3,)]
         
         event = {
             "trigger": "command",
@@ -1103,8 +1957,7 @@ class TestAutoOpModule:
     def test_run_remove_auto_op_not_found(self, mock_bot, mock_db_conn, mock_db_cursor, auto_op):
         mock_bot._is_owner.return_value = True
         mock_bot.db_get.return_value = mock_db_conn
-        mock_db_cursor.fetchone.return_value = (2,)
-        mock_db_cursor.rowcount = 0
+        mock_db_cursor.fetchone.side_effect = [(2, "phreak", None, False, False), None]
         
         event = {
             "trigger": "command",
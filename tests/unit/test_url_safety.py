@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the caching resolver and SSRF-safe URL fetching.
+"""
+
+import asyncio
+import os
+import socket
+import sys
+from unittest.mock import Mock, patch
+
+import dns.resolver
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phreakbot_core import url_safety
+from phreakbot_core.resolver import CachingResolver
+
+
+def _answer(addresses, ttl=300):
+    """Build a fake dnspython Answer for the given addresses."""
+    answer = Mock()
+    answer.rrset = Mock(ttl=ttl)
+    answer.__iter__ = Mock(return_value=iter([Mock(address=a) for a in addresses]))
+    return answer
+
+
+@pytest.mark.unit
+class TestCachingResolver:
+    """Tests for the TTL-respecting resolver cache."""
+
+    def _resolver(self, a=None, aaaa=None, **kwargs):
+        resolver = CachingResolver(**kwargs)
+        backend = Mock()
+
+        def fake_resolve(name, rdtype, search=True):
+            records = a if rdtype == "A" else aaaa
+            if records is None:
+                raise dns.resolver.NoAnswer()
+            return _answer(records[0], ttl=records[1])
+
+        backend.resolve = Mock(side_effect=fake_resolve)
+        resolver._resolver = backend
+        return resolver, backend
+
+    def test_ip_literal_not_resolved(self):
+        resolver, backend = self._resolver()
+        assert resolver.resolve("192.0.2.1") == ["192.0.2.1"]
+        assert resolver.resolve("[2001:db8::1]") == ["2001:db8::1"]
+        backend.resolve.assert_not_called()
+
+    def test_merges_a_and_aaaa(self):
+        resolver, _ = self._resolver(a=(["192.0.2.1"], 300), aaaa=(["2001:db8::1"], 300))
+        assert resolver.resolve("Example.com.") == ["192.0.2.1", "2001:db8::1"]
+
+    def test_answer_cached_for_ttl(self):
+        resolver, backend = self._resolver(a=(["192.0.2.1"], 120), min_ttl=30)
+        with patch("phreakbot_core.resolver.time.time", return_value=1000):
+            resolver.resolve("example.com")
+        with patch("phreakbot_core.resolver.time.time", return_value=1119):
+            resolver.resolve("EXAMPLE.com")
+        assert backend.resolve.call_count == 2  # A + AAAA, once
+        with patch("phreakbot_core.resolver.time.time", return_value=1120):
+            resolver.resolve("example.com")
+        assert backend.resolve.call_count == 4
+
+    def test_ttl_clamped_to_minimum(self):
+        resolver, backend = self._resolver(a=(["192.0.2.1"], 0), min_ttl=30)
+        with patch("phreakbot_core.resolver.time.time", return_value=1000):
+            resolver.resolve("example.com")
+        with patch("phreakbot_core.resolver.time.time", return_value=1029):
+            resolver.resolve("example.com")
+        assert backend.resolve.call_count == 2
+
+    def test_negative_answer_cached(self):
+        resolver, backend = self._resolver(negative_ttl=60)
+        for _ in range(2):
+            with pytest.raises(socket.gaierror):
+                resolver.resolve("nothing.example")
+        assert backend.resolve.call_count == 2
+
+    def test_single_label_falls_back_to_getaddrinfo(self):
+        resolver, _ = self._resolver()
+        infos = [(socket.AF_INET, 1, 6, "", ("127.0.0.1", 0))]
+        with patch("phreakbot_core.resolver.socket.getaddrinfo", return_value=infos):
+            assert resolver.resolve("localhost") == ["127.0.0.1"]
+
+    def test_cache_size_limit(self):
+        resolver, _ = self._resolver(a=(["192.0.2.1"], 300), max_entries=2)
+        for name in ("a.example", "b.example", "c.example"):
+            resolver.resolve(name)
+        assert len(resolver) == 2
+
+    def test_resolve_async_shares_cache(self):
+        resolver, backend = self._resolver(a=(["192.0.2.1"], 300))
+        resolver.resolve("example.com")
+        result = asyncio.run(resolver.resolve_async("example.com"))
+        assert result == ["192.0.2.1"]
+        assert backend.resolve.call_count == 2
+
+    def test_resolve_async_queries_concurrently(self):
+        resolver = CachingResolver()
+        backend = Mock()
+
+        async def fake_resolve(name, rdtype, search=True):
+            if rdtype == "A":
+                return _answer(["192.0.2.7"])
+            raise dns.resolver.NoAnswer()
+
+        backend.resolve = fake_resolve
+        resolver._async_resolver = backend
+        assert asyncio.run(resolver.resolve_async("example.com")) == ["192.0.2.7"]
+
+
+@pytest.mark.unit
+class TestSafeGet:
+    """Tests for vetted, address-pinned fetching."""
+
+    def test_vet_hostname_blocks_private(self):
+        with patch("phreakbot_core.url_safety.resolve", return_value=["93.184.216.34", "10.0.0.1"]):
+            is_safe, reason, addresses = url_safety.vet_hostname("mixed.example")
+        assert not is_safe
+        assert "10.0.0.1" in reason
+        assert addresses == []
+
+    def test_vet_hostname_orders_ipv4_first(self):
+        with patch("phreakbot_core.url_safety.resolve", return_value=["2606:2800:220:1::1", "93.184.216.34"]):
+            is_safe, _, addresses = url_safety.vet_hostname("example.com")
+        assert is_safe
+        assert addresses == ["93.184.216.34", "2606:2800:220:1::1"]
+
+    def test_is_url_safe_unresolvable(self):
+        with patch("phreakbot_core.url_safety.resolve", side_effect=socket.gaierror):
+            is_safe, reason = url_safety.is_url_safe("http://nothing.example/")
+        assert not is_safe
+        assert "Could not resolve" in reason
+
+    def test_is_url_safe_async(self):
+        async def resolve(hostname):
+            return {"example.com": ["93.184.216.34"], "intranet.example": ["10.0.0.1"]}[hostname]
+
+        with patch("phreakbot_core.url_safety.resolve_async", side_effect=resolve):
+            with patch("phreakbot_core.url_safety.resolve") as blocking:
+                assert asyncio.run(url_safety.is_url_safe_async("https://example.com/")) == (True, "")
+                is_safe, reason = asyncio.run(url_safety.is_url_safe_async("http://intranet.example/"))
+        blocking.assert_not_called()
+        assert not is_safe
+        assert "10.0.0.1" in reason
+        assert asyncio.run(url_safety.is_url_safe_async("www.example.com")) == (
+            False,
+            "Could not extract hostname from URL",
+        )
+
+    def test_safe_get_connects_to_vetted_address(self):
+        response = Mock(status_code=200, headers={})
+        with patch("phreakbot_core.url_safety.resolve", return_value=["93.184.216.34"]):
+            with patch("phreakbot_core.url_safety.requests.Session") as session_cls:
+                session_cls.return_value.get.return_value = response
+                result = url_safety.safe_get("https://Example.com:8443/a?b=1#frag", headers={"X": "1"})
+        assert result is response
+        args, kwargs = session_cls.return_value.get.call_args
+        assert args[0] == "https://93.184.216.34:8443/a?b=1"
+        assert kwargs["headers"] == {"X": "1", "Host": "example.com:8443"}
+        assert kwargs["allow_redirects"] is False
+        adapter = session_cls.return_value.mount.call_args[0][1]
+        assert adapter.hostname == "example.com"
+        assert session_cls.return_value.trust_env is False
+
+    def test_safe_get_blocks_rebinding_redirect(self):
+        redirect = Mock(status_code=302, headers={"Location": "http://internal.example/"})
+        answers = {"example.com": ["93.184.216.34"], "internal.example": ["169.254.169.254"]}
+        with patch("phreakbot_core.url_safety.resolve", side_effect=lambda h: answers[h]):
+            with patch("phreakbot_core.url_safety.requests.Session") as session_cls:
+                session_cls.return_value.get.return_value = redirect
+                with pytest.raises(ValueError):
+                    url_safety.safe_get("http://example.com/")
+        assert session_cls.return_value.get.call_count == 1
+        redirect.close.assert_called_once()
+
+    def test_safe_get_relative_redirect(self):
+        redirect = Mock(status_code=301, headers={"Location": "/next"})
+        final = Mock(status_code=200, headers={})
+        with patch("phreakbot_core.url_safety.resolve", return_value=["93.184.216.34"]):
+            with patch("phreakbot_core.url_safety.requests.Session") as session_cls:
+                session_cls.return_value.get.side_effect = [redirect, final]
+                assert url_safety.safe_get("http://example.com/start") is final
+        assert session_cls.return_value.get.call_args[0][0] == "http://93.184.216.34/next"
+
+    def test_safe_get_falls_back_to_next_address(self):
+        import requests
+        final = Mock(status_code=200, headers={})
+        with patch("phreakbot_core.url_safety.resolve", return_value=["93.184.216.34", "2606:2800:220:1::1"]):
+            with patch("phreakbot_core.url_safety.requests.Session") as session_cls:
+                session_cls.return_value.get.side_effect = [requests.ConnectionError(), final]
+                assert url_safety.safe_get("http://example.com/") is final
+        assert session_cls.return_value.get.call_args[0][0] == "http://[2606:2800:220:1::1]/"
+
+
+# (address, blocked) for the default policy
+DEFAULT_POLICY_TABLE = [
+    # IPv4 special-purpose ranges
+    ("0.0.0.0", True),
+    ("0.255.255.255", True),
+    ("10.0.0.1", True),
+    ("10.255.255.255", True),
+    ("100.64.0.1", True),
+    ("100.127.255.255", True),
+    ("100.128.0.0", False),
+    ("127.0.0.1", True),
+    ("127.255.255.254", True),
+    ("169.254.169.254", True),
+    ("172.15.255.255", False),
+    ("172.16.0.1", True),
+    ("172.31.255.255", True),
+    ("172.32.0.0", False),
+    ("192.0.0.8", True),
+    ("192.0.2.10", True),
+    ("192.88.99.1", True),
+    ("192.167.255.255", False),
+    ("192.168.1.1", True),
+    ("198.18.0.1", True),
+    ("198.19.255.255", True),
+    ("198.51.100.7", True),
+    ("203.0.113.9", True),
+    ("224.0.0.1", True),
+    ("239.255.255.250", True),
+    ("240.0.0.1", True),
+    ("255.255.255.255", True),
+    # Public IPv4
+    ("1.1.1.1", False),
+    ("8.8.8.8", False),
+    ("93.184.216.34", False),
+    ("223.255.255.255", False),
+    # IPv6 special-purpose ranges
+    ("::", True),
+    ("::1", True),
+    ("100::1", True),
+    ("2001:db8::1", True),
+    ("2001:2::1", True),
+    ("fc00::1", True),
+    ("fd12:3456::1", True),
+    ("fe80::1", True),
+    ("fe80::1%eth0", True),
+    ("fec0::1", True),
+    ("ff02::1", True),
+    ("64:ff9b:1::1", True),
+    # Public IPv6
+    ("2606:4700:4700::1111", False),
+    ("2a00:1450:4001:80b::200e", False),
+    # IPv4 embedded in IPv6
+    ("::ffff:127.0.0.1", True),
+    ("::ffff:7f00:1", True),
+    ("::ffff:10.1.2.3", True),
+    ("::ffff:169.254.169.254", True),
+    ("::ffff:8.8.8.8", False),
+    ("::127.0.0.1", True),
+    ("::8.8.8.8", False),
+    ("64:ff9b::127.0.0.1", True),
+    ("64:ff9b::8.8.8.8", False),
+    ("2002:7f00:1::", True),
+    ("2002:c0a8:101::1", True),
+    ("2002:808:808::1", False),
+    # Teredo: server 65.54.227.120, client 127.0.0.1 stored inverted
+    ("2001:0:4136:e378:8000:63bf:80ff:fffe", True),
+    ("2001:0:4136:e378:8000:63bf:f7f7:f7f7", False),
+    # Unparseable
+    ("not-an-ip", True),
+    ("300.1.1.1", True),
+]
+
+
+@pytest.mark.unit
+class TestIPPolicy:
+    """Tests for the compiled SSRF allow/deny policy."""
+
+    @pytest.mark.parametrize("address,blocked", DEFAULT_POLICY_TABLE)
+    def test_default_policy(self, address, blocked):
+        from phreakbot_core.ip_policy import IPPolicy
+        assert IPPolicy().is_blocked(address) is blocked
+
+    @pytest.mark.parametrize("address,blocked", DEFAULT_POLICY_TABLE)
+    def test_matches_ipaddress_objects(self, address, blocked):
+        import ipaddress
+        from phreakbot_core.ip_policy import IPPolicy
+        try:
+            parsed = ipaddress.ip_address(address.split("%")[0])
+        except ValueError:
+            pytest.skip("not an address")
+        assert IPPolicy().is_blocked(parsed) is blocked
+
+    def test_blocked_by_reports_network(self):
+        from phreakbot_core.ip_policy import IPPolicy
+        assert str(IPPolicy().blocked_by("::ffff:169.254.169.254")) == "169.254.0.0/16"
+        assert IPPolicy().blocked_by("8.8.8.8") is None
+
+    def test_allow_list_punches_hole(self):
+        from phreakbot_core.ip_policy import IPPolicy
+        policy = IPPolicy(allowed=["10.1.2.0/24"])
+        assert not policy.is_blocked("10.1.2.3")
+        assert not policy.is_blocked("::ffff:10.1.2.3")
+        assert policy.is_blocked("10.1.3.3")
+
+    def test_more_specific_deny_inside_allow(self):
+        from phreakbot_core.ip_policy import IPPolicy
+        policy = IPPolicy(blocked=["10.1.2.128/25"], allowed=["10.0.0.0/8"])
+        assert not policy.is_blocked("10.1.2.1")
+        assert policy.is_blocked("10.1.2.200")
+
+    def test_deny_wins_exact_tie(self):
+        from phreakbot_core.ip_policy import IPPolicy
+        policy = IPPolicy(blocked=["198.51.100.0/24"], allowed=["198.51.100.0/24"])
+        assert policy.is_blocked("198.51.100.1")
+
+    def test_from_config_extends_defaults(self):
+        from phreakbot_core.ip_policy import IPPolicy
+        policy = IPPolicy.from_config({
+            "ssrf_blocked_networks": ["8.8.8.0/24", "2606:4700::/32"],
+            "ssrf_allowed_networks": ["192.168.50.10/32"],
+        })
+        assert policy.is_blocked("8.8.8.8")
+        assert policy.is_blocked("2606:4700:4700::1111")
+        assert policy.is_blocked("127.0.0.1")
+        assert not policy.is_blocked("192.168.50.10")
+        assert not policy.is_blocked("1.1.1.1")
+
+    def test_from_config_rejects_invalid_network(self):
+        from phreakbot_core.ip_policy import IPPolicy
+        with pytest.raises(ValueError):
+            IPPolicy.from_config({"ssrf_blocked_networks": ["not-a-network"]})
+
+    def test_check_addresses_uses_installed_policy(self):
+        from phreakbot_core.ip_policy import IPPolicy
+        original = url_safety.ip_policy
+        try:
+            url_safety.set_ip_policy(IPPolicy(allowed=["10.0.0.5/32"]))
+            assert url_safety.check_addresses("svc", ["10.0.0.5"]) == (True, "")
+            assert url_safety.check_addresses("svc", ["::ffff:127.0.0.1"])[0] is False
+        finally:
+            url_safety.set_ip_policy(original)